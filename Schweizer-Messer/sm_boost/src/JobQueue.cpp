@@ -4,11 +4,14 @@ namespace sm {
     
     JobQueue::JobQueue() : killWorkers_(false), started_(false), threadsInPool_(0), activeThreads_(0) {}
     JobQueue::~JobQueue() { // we must kill thread before we're dead
-        boost::mutex::scoped_lock lck(mutex_);
-        killWorkers_ = true; // flag to tell thread to die
-        condition_.notify_all();
-        while (threadsInPool_) // all threads must exit
-            condition_.wait(lck);
+        {
+            boost::mutex::scoped_lock lck(mutex_);
+            killWorkers_ = true; // flag to tell thread to die
+            condition_.notify_all();
+        }
+        // join all threads, also those that did not enter exec_loop() yet
+        if (work_)
+            work_->join_all();
     }
 
     void JobQueue::scheduleWork(boost::function<void(void)> const & fn)
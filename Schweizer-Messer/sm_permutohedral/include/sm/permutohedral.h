@@ -31,14 +31,19 @@
 #include <cassert>
 #include <cstdio>
 #include <cmath>
+#include <memory>
 #include <Eigen/Core>
+#include <boost/function.hpp>
 using namespace Eigen;
 
 /************************************************/
 /***          Permutohedral Lattice           ***/
 /************************************************/
 
+namespace sm { class JobQueue; }
+
 namespace sm { namespace permutohedral{
+    class HashTable;
     class Permutohedral
     {
     protected:
@@ -50,15 +55,42 @@ namespace sm { namespace permutohedral{
         std::vector<int> offset_, rank_;
         std::vector<float> barycentric_;
         std::vector<Neighbors> blur_neighbors_;
+        // The lattice vertices, kept to add the vertices of moved features in update()
+        std::shared_ptr<HashTable> hash_table_;
         // Number of elements, size of sparse discretized space, dimension of features
         int N_, M_, d_;
+        // Number of vertices some feature lies next to
+        int n_used_;
         bool with_blur_;
+        int n_threads_;
+        // The n_threads_-1 workers that run the parallel steps next to the calling thread
+        std::shared_ptr<sm::JobQueue> job_queue_;
+        void embed ( const MatrixXf & features, int start );
+        int findUsedVertices ( std::vector<bool> & used ) const;
+        void removeUnusedVertices ( const std::vector<bool> & used );
+        void computeBlurNeighbors();
         void sseCompute ( float* out, const float* in, int value_size, bool reverse=false, int start=0 ) const;
         void seqCompute ( float* out, const float* in, int value_size, bool reverse=false, int start=0 ) const;
+        void parallelCompute ( float* out, const float* in, int value_size, bool reverse=false, int start=0 ) const;
+        void splat ( std::vector< std::vector<float> > * buffers, const float* in, int value_size, int thread, int begin, int end ) const;
+        void blur ( float* new_values, const float* values, int value_size, int j, int begin, int end ) const;
+        void slice ( float* out, const float* values, int value_size, int begin, int end ) const;
+        void parallelFor ( int begin, int end, int n_threads, const boost::function<void(int, int, int)> & f ) const;
     public:
         Permutohedral();
         void init ( const MatrixXf & features, bool with_blur = true );
+        // Move the features start, ..., start + features.cols() - 1 and add the lattice
+        // vertices they need. The vertices of the other features are kept, so this is
+        // cheaper than init() if only a part of the features moves. Once the vertices
+        // no feature lies next to anymore outnumber the used ones, they are removed.
+        void update ( const MatrixXf & features, int start = 0 );
+        // The number of lattice vertices, including those no feature lies next to anymore after update()
         int getLatticeSize() const;
+        // The number of lattice vertices some feature lies next to
+        int getUsedLatticeSize() const;
+        // The number of threads used for splatting, blurring and slicing
+        void setNumThreads ( int n_threads );
+        int getNumThreads() const;
         MatrixXf compute ( const MatrixXf & v, bool reverse=false, int start=0 ) const;
         void compute ( MatrixXf & out, const MatrixXf & in, bool reverse=false, int start=0 ) const;
     };
@@ -26,6 +26,9 @@
 */
 
 #include "sm/permutohedral.h"
+#include <algorithm>
+#include <boost/bind.hpp>
+#include <sm/boost/JobQueue.hpp>
 
 #ifdef WIN32
 inline int round(double X) {
@@ -134,7 +137,22 @@ public:
 /***          Permutohedral Lattice           ***/
 /************************************************/
 
-Permutohedral::Permutohedral():N_( 0 ), M_( 0 ), d_( 0 ), with_blur_( true ) {
+// Run f( thread, begin, end ) on n_threads threads, each on a contiguous part of [begin, end).
+// The calling thread runs the first part and the workers of the job queue the others.
+void Permutohedral::parallelFor( int begin, int end, int n_threads, const boost::function<void(int, int, int)> & f ) const {
+	n_threads = std::max( 1, std::min( n_threads, end-begin ) );
+	if (n_threads == 1){
+		f( 0, begin, end );
+		return;
+	}
+	const int chunk = (end-begin + n_threads-1) / n_threads;
+	for( int t=1; t<n_threads; t++ )
+		job_queue_->scheduleWork( boost::bind( f, t, begin + t*chunk, std::min( end, begin + (t+1)*chunk ) ) );
+	f( 0, begin, std::min( end, begin + chunk ) );
+	job_queue_->waitForEmptyQueue();
+}
+
+Permutohedral::Permutohedral():N_( 0 ), M_( 0 ), d_( 0 ), n_used_( 0 ), with_blur_( true ), n_threads_( 1 ) {
 }
 #ifdef SSE_PERMUTOHEDRAL
 void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
@@ -143,7 +161,8 @@ void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
 	N_ = feature.cols();
 	d_ = feature.rows();
 	with_blur_ = with_blur;
-	HashTable hash_table( d_, N_/**(d_+1)*/ );
+	hash_table_.reset( new HashTable( d_, N_/**(d_+1)*/ ) );
+	HashTable & hash_table = *hash_table_;
 	
 	constexpr int blocksize = sizeof(__m128) / sizeof(float);
 	const __m128 invdplus1   = _mm_set1_ps( 1.0f / (d_+1) );
@@ -297,31 +316,7 @@ void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
 	// Get the number of vertices in the lattice
 	M_ = hash_table.size();
 	
-	if (with_blur_){
-		// Create the neighborhood structure
-		blur_neighbors_.resize( (d_+1)*M_ );
-
-		short * n1 = new short[d_+1];
-		short * n2 = new short[d_+1];
-
-		// For each of d+1 axes,
-		for( int j = 0; j <= d_; j++ ){
-			for( int i=0; i<M_; i++ ){
-				const short * key = hash_table.getKey( i );
-				for( int k=0; k<d_; k++ ){
-					n1[k] = key[k] - 1;
-					n2[k] = key[k] + 1;
-				}
-				n1[j] = key[j] + d_;
-				n2[j] = key[j] - d_;
-
-				blur_neighbors_[j*M_+i].n1 = hash_table.find( n1 );
-				blur_neighbors_[j*M_+i].n2 = hash_table.find( n2 );
-			}
-		}
-		delete[] n1;
-		delete[] n2;
-	}
+	computeBlurNeighbors();
 }
 #else
 void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
@@ -330,13 +325,27 @@ void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
 	N_ = feature.cols();
 	d_ = feature.rows();
 	with_blur_ = with_blur;
-	HashTable hash_table( d_, N_*(d_+1) );
+	hash_table_.reset( new HashTable( d_, N_*(d_+1) ) );
 
 	// Allocate the class memory
 	offset_.resize( (d_+1)*N_ );
 	rank_.resize( (d_+1)*N_ );
 	barycentric_.resize( (d_+1)*N_ );
-	
+
+	embed( feature, 0 );
+
+	// Find the Neighbors of each lattice point
+
+	// Get the number of vertices in the lattice
+	M_ = hash_table_->size();
+
+	computeBlurNeighbors();
+}
+#endif
+// Compute the simplex, the lattice vertices and the barycentric weights of the
+// features start, ..., start + feature.cols() - 1
+void Permutohedral::embed ( const MatrixXf & feature, int start )
+{
 	// Allocate the local memory
 	float * scale_factor = new float[d_];
 	float * elevated = new float[d_+1];
@@ -361,7 +370,7 @@ void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
 		scale_factor[i] = 1.0 / sqrt( double((i+2)*(i+1)) ) * inv_std_dev;
 	
 	// Compute the simplex each feature lies in
-	for( int k=0; k<N_; k++ ){
+	for( int k=0; k<feature.cols(); k++ ){
 		// Elevate the feature ( y = Ep, see p.5 in [Adams etal 2010])
 		const float * f = &feature(0,k);
 		
@@ -434,9 +443,9 @@ void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
 		for( int remainder=0; remainder<=d_; remainder++ ){
 			for( int i=0; i<d_; i++ )
 				key[i] = rem0[i] + canonical[ remainder*(d_+1) + rank[i] ];
-			offset_[ k*(d_+1)+remainder ] = hash_table.find( key, true );
-			rank_[ k*(d_+1)+remainder ] = rank[remainder];
-			barycentric_[ k*(d_+1)+remainder ] = barycentric[ remainder ];
+			offset_[ (start+k)*(d_+1)+remainder ] = hash_table_->find( key, true );
+			rank_[ (start+k)*(d_+1)+remainder ] = rank[remainder];
+			barycentric_[ (start+k)*(d_+1)+remainder ] = barycentric[ remainder ];
 		}
 	}
 	delete [] scale_factor;
@@ -447,12 +456,41 @@ void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
 	delete [] canonical;
 	delete [] key;
 	
-	// Find the Neighbors of each lattice point
-	
-	// Get the number of vertices in the lattice
-	M_ = hash_table.size();
-	
+}
+// Mark the vertices some feature lies next to and return their number
+int Permutohedral::findUsedVertices ( std::vector<bool> & used ) const
+{
+	used.assign( M_, false );
+	int n_used = 0;
+	for( int i=0; i<N_*(d_+1); i++ )
+		if (!used[ offset_[i] ]){
+			used[ offset_[i] ] = true;
+			n_used++;
+		}
+	return n_used;
+}
+// Rebuild the hash table from the used vertices only, as init() would have
+void Permutohedral::removeUnusedVertices ( const std::vector<bool> & used )
+{
+	std::shared_ptr<HashTable> hash_table( new HashTable( d_, N_*(d_+1) ) );
+	std::vector<int> index( M_, -1 );
+	for( int i=0; i<M_; i++ )
+		if (used[i])
+			index[i] = hash_table->find( hash_table_->getKey( i ), true );
+	for( int i=0; i<N_*(d_+1); i++ )
+		offset_[i] = index[ offset_[i] ];
+	hash_table_ = hash_table;
+	M_ = hash_table_->size();
+}
+void Permutohedral::computeBlurNeighbors()
+{
+	// Vertices no feature lies next to anymore (see update()) are left out like
+	// missing ones, so the filter is the same as on a lattice built from scratch
+	std::vector<bool> used;
+	n_used_ = findUsedVertices( used );
 	if (with_blur_){
+		const HashTable & hash_table = *hash_table_;
+
 		// Create the neighborhood structure
 		blur_neighbors_.resize( (d_+1)*M_ );
 
@@ -470,15 +508,35 @@ void Permutohedral::init ( const MatrixXf & feature, bool with_blur )
 				n1[j] = key[j] + d_;
 				n2[j] = key[j] - d_;
 
-				blur_neighbors_[j*M_+i].n1 = hash_table.find( n1 );
-				blur_neighbors_[j*M_+i].n2 = hash_table.find( n2 );
+				const int e1 = hash_table_->find( n1 );
+				const int e2 = hash_table_->find( n2 );
+				blur_neighbors_[j*M_+i].n1 = e1 >= 0 && used[e1] ? e1 : -1;
+				blur_neighbors_[j*M_+i].n2 = e2 >= 0 && used[e2] ? e2 : -1;
 			}
 		}
 		delete[] n1;
 		delete[] n2;
 	}
 }
-#endif
+void Permutohedral::update ( const MatrixXf & feature, int start )
+{
+	assert( feature.rows() == d_ );
+	assert( start >= 0 && start + feature.cols() <= N_ );
+	// Copies share the vertices, so give this lattice its own before adding to them
+	if (!hash_table_.unique())
+		hash_table_.reset( new HashTable( *hash_table_ ) );
+
+	// The vertices of the old positions stay in the lattice, but are not blurred over.
+	// They still cost memory and time in splat() and blur(), so once they outnumber
+	// the used vertices the lattice is rebuilt without them.
+	embed( feature, start );
+	M_ = hash_table_->size();
+	std::vector<bool> used;
+	const int n_used = findUsedVertices( used );
+	if (M_ - n_used > n_used)
+		removeUnusedVertices( used );
+	computeBlurNeighbors();
+}
 void Permutohedral::seqCompute ( float* out, const float* in, int value_size, bool reverse, int start ) const
 {
 	// Shift all values by 1 such that -1 -> 0 (used for blurring)
@@ -605,14 +663,92 @@ void Permutohedral::sseCompute ( float* out, const float* in, int value_size, bo
 	seqCompute( out, in, value_size, reverse, start );
 }
 #endif
+void Permutohedral::splat ( std::vector< std::vector<float> > * buffers, const float* in, int value_size, int thread, int begin, int end ) const
+{
+	float * values = &(*buffers)[thread][0];
+	for( int i=begin; i<end; i++ ){
+		for( int j=0; j<=d_; j++ ){
+			const int o = offset_[i*(d_+1)+j]+1;
+			const float& w = barycentric_[i*(d_+1)+j];
+			for( int k=0; k<value_size; k++ )
+				values[ o*value_size+k ] += w * in[ i*value_size+k ];
+		}
+	}
+}
+void Permutohedral::blur ( float* new_values, const float* values, int value_size, int j, int begin, int end ) const
+{
+	for( int i=begin; i<end; i++ ){
+		const float * old_val = values + (i+1)*value_size;
+		float * new_val = new_values + (i+1)*value_size;
+
+		int n1 = blur_neighbors_[j*M_+i].n1+1;
+		int n2 = blur_neighbors_[j*M_+i].n2+1;
+		const float * n1_val = values + n1*value_size;
+		const float * n2_val = values + n2*value_size;
+		for( int k=0; k<value_size; k++ )
+			new_val[k] = old_val[k]+0.5*(n1_val[k] + n2_val[k]);
+	}
+}
+void Permutohedral::slice ( float* out, const float* values, int value_size, int begin, int end ) const
+{
+	// Alpha is a magic scaling constant (write Andrew if you really wanna understand this)
+	const float alpha = 1.0f / (1+powf(2, -d_));
+
+	for( int i=begin; i<end; i++ ){
+		for( int k=0; k<value_size; k++ )
+			out[i*value_size+k] = 0;
+		for( int j=0; j<=d_; j++ ){
+			const int o = offset_[i*(d_+1)+j]+1;
+			const float& w = barycentric_[i*(d_+1)+j];
+			for( int k=0; k<value_size; k++ )
+				out[ i*value_size+k ] += w * values[ o*value_size+k ] * alpha;
+		}
+	}
+}
+static void sumBuffers( std::vector< std::vector<float> > * buffers, int /*thread*/, int begin, int end ){
+	for( size_t t=1; t<buffers->size(); t++ )
+		for( int i=begin; i<end; i++ )
+			(*buffers)[0][i] += (*buffers)[t][i];
+}
+// Each thread splats its range of the features into a buffer of its own and the buffers
+// are summed up. Blurring and slicing write disjoint ranges of vertices and features.
+void Permutohedral::parallelCompute ( float* out, const float* in, int value_size, bool reverse, int start ) const
+{
+	// Shift all values by 1 such that -1 -> 0 (used for blurring)
+	const int size = (M_+2)*value_size;
+	const int n_splat = std::max( 1, std::min( n_threads_, N_-start ) );
+	std::vector< std::vector<float> > buffers( n_splat, std::vector<float>( size, 0 ) );
+
+	// Splatting
+	parallelFor( start, N_, n_splat, boost::bind( &Permutohedral::splat, this, &buffers, in, value_size, _1, _2, _3 ) );
+	parallelFor( 0, size, n_threads_, boost::bind( &sumBuffers, &buffers, _1, _2, _3 ) );
+	std::vector<float> values;
+	values.swap( buffers[0] );
+	buffers.clear();
+
+	// Blurring
+	if (with_blur_)
+	{
+		std::vector<float> new_values( size, 0 );
+		for( int j=reverse?d_:0; j<=d_ && j>=0; reverse?j--:j++ ){
+			parallelFor( 0, M_, n_threads_, boost::bind( &Permutohedral::blur, this, &new_values[0], &values[0], value_size, j, _2, _3 ) );
+			values.swap( new_values );
+		}
+	}
+
+	// Slicing
+	parallelFor( 0, N_, n_threads_, boost::bind( &Permutohedral::slice, this, out, &values[0], value_size, _2, _3 ) );
+}
 void Permutohedral::compute ( MatrixXf & out, const MatrixXf & in, bool reverse, int start ) const
 {
 	if( out.cols() != in.cols() || out.rows() != in.rows() )
 		out = 0*in;
-	if( in.rows() <= 2 )
-		seqCompute( out.data(), in.data(), in.rows(), reverse );
+	if( n_threads_ > 1 )
+		parallelCompute( out.data(), in.data(), in.rows(), reverse, start );
+	else if( in.rows() <= 2 )
+		seqCompute( out.data(), in.data(), in.rows(), reverse, start );
 	else
-		sseCompute( out.data(), in.data(), in.rows(), reverse );
+		sseCompute( out.data(), in.data(), in.rows(), reverse, start );
 }
 MatrixXf Permutohedral::compute ( const MatrixXf & in, bool reverse, int start ) const
 {
@@ -625,4 +761,25 @@ int Permutohedral::getLatticeSize() const
 {
 	return M_;
 }
+int Permutohedral::getUsedLatticeSize() const
+{
+	return n_used_;
+}
+void Permutohedral::setNumThreads ( int n_threads )
+{
+	n_threads = std::max( 1, n_threads );
+	if (n_threads == n_threads_)
+		return;
+	n_threads_ = n_threads;
+	// The workers are kept between the calls to compute(). Copies of the lattice share them.
+	job_queue_.reset();
+	if (n_threads_ > 1){
+		job_queue_.reset( new sm::JobQueue );
+		job_queue_->start( n_threads_-1 );
+	}
+}
+int Permutohedral::getNumThreads() const
+{
+	return n_threads_;
+}
 }}
\ No newline at end of file
@@ -0,0 +1,105 @@
+#include <gtest/gtest.h>
+#include <sm/permutohedral.h>
+
+using sm::permutohedral::Permutohedral;
+
+namespace {
+
+MatrixXf randomFeatures(int d, int n) {
+  // Spread the features over a few lattice cells
+  return 3.0f * MatrixXf::Random(d, n);
+}
+
+void expectNear(const MatrixXf & A, const MatrixXf & B, float tolerance) {
+  ASSERT_EQ(A.rows(), B.rows());
+  ASSERT_EQ(A.cols(), B.cols());
+  EXPECT_LT((A - B).cwiseAbs().maxCoeff(), tolerance);
+}
+
+}  // namespace
+
+TEST(PermutohedralTestSuite, testParallelCompute) {
+  const MatrixXf features = randomFeatures(3, 2000);
+  for (int valueSize = 1; valueSize <= 4; ++valueSize) {
+    const MatrixXf values = MatrixXf::Random(valueSize, features.cols());
+    Permutohedral lattice;
+    lattice.init(features);
+    const MatrixXf expected = lattice.compute(values);
+    const MatrixXf expectedReverse = lattice.compute(values, true);
+    lattice.setNumThreads(4);
+    EXPECT_EQ(4, lattice.getNumThreads());
+    expectNear(expected, lattice.compute(values), 1e-5f);
+    expectNear(expectedReverse, lattice.compute(values, true), 1e-5f);
+  }
+}
+
+TEST(PermutohedralTestSuite, testUpdateMatchesInit) {
+  MatrixXf features = randomFeatures(3, 1000);
+  const MatrixXf values = MatrixXf::Random(2, features.cols());
+  Permutohedral updated;
+  updated.init(features);
+
+  // Move a block of the features
+  features.middleCols(200, 100) = randomFeatures(3, 100);
+  updated.update(features.middleCols(200, 100), 200);
+
+  Permutohedral expected;
+  expected.init(features);
+  // A new lattice has no unused vertices
+  EXPECT_EQ(expected.getLatticeSize(), expected.getUsedLatticeSize());
+  EXPECT_EQ(expected.getUsedLatticeSize(), updated.getUsedLatticeSize());
+  expectNear(expected.compute(values), updated.compute(values), 1e-5f);
+  expectNear(expected.compute(values, true), updated.compute(values, true), 1e-5f);
+}
+
+TEST(PermutohedralTestSuite, testUpdateRemovesUnusedVertices) {
+  MatrixXf features = randomFeatures(3, 500);
+  const MatrixXf values = MatrixXf::Random(2, features.cols());
+  Permutohedral updated;
+  updated.init(features);
+  for (int i = 0; i < 20; ++i) {
+    // Moving all features leaves most of the old vertices unused
+    features.array() += 0.7f;
+    updated.update(features);
+
+    Permutohedral expected;
+    expected.init(features);
+    EXPECT_EQ(expected.getUsedLatticeSize(), updated.getUsedLatticeSize());
+    EXPECT_LE(updated.getLatticeSize(), 2 * updated.getUsedLatticeSize());
+    expectNear(expected.compute(values), updated.compute(values), 1e-5f);
+  }
+}
+
+TEST(PermutohedralTestSuite, testUpdateKeepsCopies) {
+  MatrixXf features = randomFeatures(3, 500);
+  const MatrixXf values = MatrixXf::Random(2, features.cols());
+  Permutohedral lattice;
+  lattice.init(features);
+  const MatrixXf expected = lattice.compute(values);
+
+  Permutohedral copy = lattice;
+  copy.update(randomFeatures(3, 100), 100);
+  expectNear(expected, lattice.compute(values), 1e-6f);
+}
+
+TEST(PermutohedralTestSuite, testCopiesKeepWorkers) {
+  const MatrixXf features = randomFeatures(3, 500);
+  const MatrixXf values = MatrixXf::Random(2, features.cols());
+  Permutohedral sequential;
+  sequential.init(features);
+  const MatrixXf expected = sequential.compute(values);
+
+  // The workers outlive the lattice they were started for
+  Permutohedral copy;
+  {
+    Permutohedral lattice;
+    lattice.setNumThreads(4);
+    lattice.init(features);
+    copy = lattice;
+  }
+  EXPECT_EQ(4, copy.getNumThreads());
+  for (int i = 0; i < 10; ++i)
+    expectNear(expected, copy.compute(values), 1e-5f);
+  copy.setNumThreads(1);
+  expectNear(expected, copy.compute(values), 1e-5f);
+}
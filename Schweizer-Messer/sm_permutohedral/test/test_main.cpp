@@ -0,0 +1,7 @@
+#include <gtest/gtest.h>
+
+/// Run all the tests that were declared with TEST()
+int main(int argc, char **argv){
+  testing::InitGoogleTest(&argc, argv);
+  return RUN_ALL_TESTS();
+}
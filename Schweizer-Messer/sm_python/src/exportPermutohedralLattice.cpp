@@ -12,6 +12,12 @@ void exportPermutohedralLattice() {
 
   class_<Permutohedral>("Permutohedral", init<>())
     .def("init", &Permutohedral::init)
-    .def("get_lattice_size", &Permutohedral::getLatticeSize)
+    .def("update", &Permutohedral::update)
+    .def("get_lattice_size", &Permutohedral::getLatticeSize,
+         "The number of lattice vertices, including those no feature lies next to anymore after update()")
+    .def("get_used_lattice_size", &Permutohedral::getUsedLatticeSize,
+         "The number of lattice vertices some feature lies next to")
+    .def("set_num_threads", &Permutohedral::setNumThreads)
+    .def("get_num_threads", &Permutohedral::getNumThreads)
     .def("filter", &filter);
 }
\ No newline at end of file
@@ -5,6 +5,7 @@
 #include <aslam/backend/ReprojectionError.hpp>
 #include <aslam/backend/CovarianceReprojectionError.hpp>
 #include <aslam/backend/SimpleReprojectionError.hpp>
+#include <aslam/backend/SplinePoseReprojectionError.hpp>
 #include <aslam/backend/HomogeneousExpression.hpp>
 #include <aslam/backend/CameraDesignVariable.hpp>
 #include <aslam/backend/Scalar.hpp>
@@ -58,6 +59,21 @@ void exportReprojectionError(const std::string & camName) {
               + "Simple( y, invR, homogeneousPointExpression, cameraGeometry )")
               .c_str()));
 
+  class_<SplinePoseReprojectionError<frame_t>,
+      boost::shared_ptr<SplinePoseReprojectionError<frame_t> >, bases<ErrorTerm> >(
+      (name + "SplinePose").c_str(),
+      init<const measurement_t &, const inverse_covariance_t &,
+          const Eigen::Vector4d &, const geometry_t &,
+          aslam::splines::BSplinePoseDesignVariable *, const ScalarExpression &,
+          double, double, const TransformationExpression &,
+          const TransformationExpression &>(
+          (name
+              + "SplinePose( y, invR, p_p, cameraGeometry, bsplineDesignVariable, time, leftBuffer, rightBuffer, T_c_b, T_w_p )")
+              .c_str())).def(
+      "getMeasurement", &SplinePoseReprojectionError<frame_t>::getMeasurement).def(
+      "getPredictedMeasurement",
+      &SplinePoseReprojectionError<frame_t>::getPredictedMeasurement);
+
 }
 
 template<typename CAMERA_GEOMETRY_T>
@@ -0,0 +1,115 @@
+#ifndef ASLAM_BACKEND_SPLINE_POSE_REPROJECTION_ERROR_HPP
+#define ASLAM_BACKEND_SPLINE_POSE_REPROJECTION_ERROR_HPP
+
+#include <aslam/backend/ErrorTerm.hpp>
+#include <aslam/backend/TransformationExpression.hpp>
+#include <aslam/backend/ScalarExpression.hpp>
+#include <aslam/splines/BSplinePoseDesignVariable.hpp>
+#include <sm/kinematics/rotations.hpp>
+#include <sm/kinematics/transformations.hpp>
+
+namespace aslam {
+namespace backend {
+
+/// \brief The reprojection error of a target point observed by a camera on a pose spline.
+///
+/// The point p in the target frame is predicted in the camera frame as
+///   p_c = T_c_b * T_w_b(t).inverse() * T_w_p * p
+/// This is the same chain the expression
+///   T_c_b * bsplineDv.transformationAtTime(t, leftBuffer, rightBuffer).inverse() * T_w_p * p
+/// builds for a SimpleReprojectionError, but the chain and the spline Jacobians are
+/// computed in one fixed-size routine instead of walking a tree of expression nodes.
+/// The spline value and basis are read from the evaluation cache of the spline design
+/// variable, so the terms observed at the same time share one spline evaluation.
+/// T_c_b and T_w_p are passed as expressions so that a composed extrinsic
+/// (e.g. T_c_cm1 * T_cm1_b) can be used as well.
+template<typename FRAME_T>
+class SplinePoseReprojectionError : public ErrorTermFs<FRAME_T::KeypointDimension> {
+ public:
+  EIGEN_MAKE_ALIGNED_OPERATOR_NEW
+
+  typedef FRAME_T frame_t;
+  typedef typename frame_t::keypoint_t keypoint_t;
+  typedef typename frame_t::camera_geometry_t camera_geometry_t;
+  typedef aslam::splines::BSplinePoseDesignVariable spline_t;
+  enum {
+    KeypointDimension = frame_t::KeypointDimension /*!< The dimension of the keypoint associated with this geometry policy */
+  };
+
+  typedef Eigen::Matrix<double, KeypointDimension, 1> measurement_t;
+  typedef Eigen::Matrix<double, KeypointDimension, KeypointDimension> inverse_covariance_t;
+  typedef ErrorTermFs<KeypointDimension> parent_t;
+
+  SplinePoseReprojectionError(const measurement_t & y,
+                              const inverse_covariance_t & invR,
+                              const Eigen::Vector4d & p_p,
+                              const camera_geometry_t & geometry,
+                              spline_t * spline,
+                              const ScalarExpression & time,
+                              double leftBuffer, double rightBuffer,
+                              const TransformationExpression & T_c_b,
+                              const TransformationExpression & T_w_p);
+
+  virtual ~SplinePoseReprojectionError();
+
+  measurement_t getMeasurement() const;
+  measurement_t getPredictedMeasurement();
+
+ protected:
+  /// \brief evaluate the error term
+  virtual double evaluateErrorImplementation();
+
+  /// \brief evaluate the jacobian
+  virtual void evaluateJacobiansImplementation(
+      aslam::backend::JacobianContainer & _jacobians) const;
+
+  /// \brief the point in the camera frame.
+  Eigen::Vector4d predictPoint() const;
+
+  /// \brief read the pose spline at time t from the evaluation cache of the spline unless
+  ///        the last evaluation was at the same time with the same spline coefficients.
+  void evaluateSpline(double t) const;
+
+  /// \brief the measured keypoint.
+  measurement_t _y;
+
+  /// \brief the homogeneous point in the target frame.
+  Eigen::Vector4d _p_p;
+
+  /// \brief The camera geometry
+  const camera_geometry_t * _geometry;
+
+  spline_t * _spline;
+  ScalarExpression _time;
+
+  /// \brief the spline coefficients the time may move over and the time range they cover.
+  std::vector<DesignVariable *> _bufferedDesignVariables;
+  int _bufferedMinIndex;
+  double _bufferTmin;
+  double _bufferTmax;
+
+  /// \brief the last spline evaluation, shared by the error and the Jacobians of one
+  ///        iteration. The basis vector keeps its size between evaluations.
+  mutable bool _splineEvaluated;
+  mutable double _splineTime;
+  mutable size_t _splineRevision;
+  /// \brief the index of the first active coefficient in the buffered design variables.
+  mutable int _splineMinIndex;
+  mutable Eigen::Matrix4d _T_b_w;
+  mutable Eigen::Matrix<double, 6, 1> _cdot;
+  /// \brief the basis function values of the active coefficients. The Jacobian of the
+  ///        curve value wrt. the active coefficients is kron(basis^T, I).
+  mutable Eigen::VectorXd _basis;
+  /// \brief the Jacobian of T_w_b wrt. the curve value.
+  mutable Eigen::Matrix<double, 6, 6> _JT;
+
+  TransformationExpression _T_c_b;
+  TransformationExpression _T_w_p;
+};
+
+}  // namespace backend
+}  // namespace aslam
+
+#include "implementation/SplinePoseReprojectionError.hpp"
+
+#endif /* ASLAM_BACKEND_SPLINE_POSE_REPROJECTION_ERROR_HPP */
@@ -0,0 +1,171 @@
+namespace aslam {
+namespace backend {
+
+template<typename F>
+SplinePoseReprojectionError<F>::SplinePoseReprojectionError(
+    const measurement_t & y, const inverse_covariance_t & invR,
+    const Eigen::Vector4d & p_p, const camera_geometry_t & geometry,
+    spline_t * spline, const ScalarExpression & time,
+    double leftBuffer, double rightBuffer,
+    const TransformationExpression & T_c_b,
+    const TransformationExpression & T_w_p)
+    : _y(y),
+      _p_p(p_p),
+      _geometry(&geometry),
+      _spline(spline),
+      _time(time),
+      _splineEvaluated(false),
+      _splineTime(0.0),
+      _splineRevision(0),
+      _splineMinIndex(0),
+      _T_c_b(T_c_b),
+      _T_w_p(T_w_p) {
+  SM_ASSERT_TRUE(aslam::Exception, spline != NULL, "The spline must not be null");
+  parent_t::setInvR(invR);
+
+  // Take the full time span of the segments within the buffer around the initial time,
+  // exactly as BSplinePoseDesignVariable::transformationAtTime() does.
+  const bsplines::BSplinePose & bsplinePose = _spline->spline();
+  const double initTime = time.toScalar();
+  int bufferRight = bsplinePose.numValidTimeSegments() - 1;
+  if (rightBuffer + initTime <= bsplinePose.t_max())
+    bufferRight = bsplinePose.segmentIndex(initTime + rightBuffer);
+  int bufferLeft = 0;
+  if (initTime - leftBuffer >= bsplinePose.t_min())
+    bufferLeft = bsplinePose.segmentIndex(initTime - leftBuffer);
+  _bufferTmax = bsplinePose.timeInterval(bufferRight).second;
+  _bufferTmin = bsplinePose.timeInterval(bufferLeft).first;
+  const std::pair<double, double> left = bsplinePose.timeInterval(bufferLeft);
+  const std::pair<double, double> right = bsplinePose.timeInterval(bufferRight);
+  Eigen::VectorXi leftCoeff = bsplinePose.localVvCoefficientVectorIndices((left.first + left.second) / 2.0);
+  Eigen::VectorXi rightCoeff = bsplinePose.localVvCoefficientVectorIndices((right.first + right.second) / 2.0);
+  _bufferedMinIndex = leftCoeff(0);
+  for (int i = leftCoeff(0); i <= rightCoeff(rightCoeff.size() - 1); ++i) {
+    _bufferedDesignVariables.push_back(_spline->designVariable(i));
+  }
+
+  JacobianContainer::set_t dvs;
+  dvs.insert(_bufferedDesignVariables.begin(), _bufferedDesignVariables.end());
+  _time.getDesignVariables(dvs);
+  _T_c_b.getDesignVariables(dvs);
+  _T_w_p.getDesignVariables(dvs);
+  parent_t::setDesignVariablesIterator(dvs.begin(), dvs.end());
+}
+
+template<typename F>
+SplinePoseReprojectionError<F>::~SplinePoseReprojectionError() {
+
+}
+
+template<typename F>
+Eigen::Vector4d SplinePoseReprojectionError<F>::predictPoint() const {
+  const double t = _time.toScalar();
+  SM_ASSERT_GE_LT(aslam::Exception, t, _bufferTmin, _bufferTmax, "Spline Coefficient Buffer Exceeded. Set larger buffer margins!");
+  evaluateSpline(t);
+  return _T_c_b.toTransformationMatrix() * (_T_b_w * (_T_w_p.toTransformationMatrix() * _p_p));
+}
+
+template<typename F>
+void SplinePoseReprojectionError<F>::evaluateSpline(double t) const {
+  if (_splineEvaluated && t == _splineTime && _spline->revision() == _splineRevision) {
+    return;
+  }
+  // The cache of the spline design variable is keyed by the current time, so it is hit
+  // by the other terms observed at the same time.
+  const bsplines::BSplinePose & bsplinePose = _spline->spline();
+  const spline_t::Evaluation & e = _spline->evaluation(t, 0);
+  const Eigen::Vector3d r_w_b = e.value.template head<3>();
+  Eigen::Matrix3d S;
+  const Eigen::Matrix3d C_w_b = bsplinePose.rotation()->parametersToRotationMatrix(e.value.template tail<3>(), &S);
+
+  // The rigid inverse of T_w_b.
+  _T_b_w.setIdentity();
+  _T_b_w.template topLeftCorner<3, 3>() = C_w_b.transpose();
+  _T_b_w.template topRightCorner<3, 1>() = -C_w_b.transpose() * r_w_b;
+
+  // As bsplines::BSplinePose::curveValueToTransformationAndJacobian().
+  _JT.setIdentity();
+  _JT.template topRightCorner<3, 3>() = -sm::kinematics::crossMx(r_w_b) * S;
+  _JT.template bottomRightCorner<3, 3>() = S;
+
+  _basis = e.basis;
+  _cdot = _spline->evalD(t, 1);
+  _splineMinIndex = bsplinePose.segmentIndex(t) - _bufferedMinIndex;
+  _splineTime = t;
+  _splineRevision = _spline->revision();
+  _splineEvaluated = true;
+}
+
+template<typename F>
+double SplinePoseReprojectionError<F>::evaluateErrorImplementation() {
+
+  Eigen::Vector4d p = predictPoint();
+  measurement_t hat_y;
+  _geometry->homogeneousToKeypoint(p, hat_y);
+
+  parent_t::setError(_y - hat_y);
+
+  return parent_t::error().dot(parent_t::invR() * parent_t::error());
+}
+
+template<typename F>
+void SplinePoseReprojectionError<F>::evaluateJacobiansImplementation(
+    aslam::backend::JacobianContainer & _jacobians) const {
+  typedef Eigen::Matrix<double, KeypointDimension, 6> chain_t;
+
+  const double t = _time.toScalar();
+  SM_ASSERT_GE_LT(aslam::Exception, t, _bufferTmin, _bufferTmax, "Spline Coefficient Buffer Exceeded. Set larger buffer margins!");
+
+  // Usually the spline was already evaluated for the error at the same time.
+  evaluateSpline(t);
+
+  const Eigen::Matrix4d T_c_b = _T_c_b.toTransformationMatrix();
+  const Eigen::Matrix4d T_c_w = T_c_b * _T_b_w;
+  const Eigen::Matrix4d T_c_p = T_c_w * _T_w_p.toTransformationMatrix();
+  const Eigen::Vector4d p_c = T_c_p * _p_p;
+
+  typename camera_geometry_t::jacobian_homogeneous_t J;
+  measurement_t hat_y;
+  _geometry->homogeneousToKeypoint(p_c, hat_y, J);
+
+  // d(-hat_y) / d(perturbation of T_c_p) is also the chain for T_c_b.
+  const chain_t C_c_b = -J * sm::kinematics::boxMinus(p_c);
+  _T_c_b.evaluateJacobians(_jacobians, C_c_b);
+
+  // Perturbing T_w_p on the left moves the point the same way as perturbing T_c_p
+  // by the adjoint of T_c_w. Perturbing T_w_b on the left moves it the opposite way.
+  const chain_t C_w_p = C_c_b * sm::kinematics::boxTimes(T_c_w);
+  _T_w_p.evaluateJacobians(_jacobians, C_w_p);
+
+  // The spline Jacobian is kron(basis^T, I), so each coefficient block is the chain
+  // through the curve value scaled by its basis function value.
+  const chain_t C_curve = -C_w_p * _JT;
+  const int numActive = _basis.size();
+  for (int i = 0; i < (int) _bufferedDesignVariables.size(); ++i) {
+    const int j = i - _splineMinIndex;
+    if (j >= 0 && j < numActive) {
+      _jacobians.add(_bufferedDesignVariables[i], C_curve * _basis[j]);
+    } else {
+      // Keep the buffered coefficients in the Jacobian so its structure does not change with the time.
+      _jacobians.add(_bufferedDesignVariables[i], chain_t::Zero());
+    }
+  }
+
+  // The time derivative of the curve value.
+  _time.evaluateJacobians(_jacobians, C_curve * _cdot);
+}
+
+template<typename F>
+typename SplinePoseReprojectionError<F>::measurement_t SplinePoseReprojectionError<F>::getMeasurement() const {
+  return _y;
+}
+
+template<typename F>
+typename SplinePoseReprojectionError<F>::measurement_t SplinePoseReprojectionError<F>::getPredictedMeasurement() {
+  measurement_t hat_y;
+  _geometry->homogeneousToKeypoint(predictPoint(), hat_y);
+  return hat_y;
+}
+
+}  // namespace backend
+}  // namespace aslam
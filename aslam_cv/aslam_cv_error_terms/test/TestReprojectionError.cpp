@@ -1,5 +1,7 @@
 #include <sm/eigen/gtest.hpp>
 #include <aslam/backend/ReprojectionError.hpp>
+#include <aslam/backend/SimpleReprojectionError.hpp>
+#include <aslam/backend/SplinePoseReprojectionError.hpp>
 #include <aslam/Frame.hpp>
 #include <sm/kinematics/homogeneous_coordinates.hpp>
 #include <aslam/backend/HomogeneousPoint.hpp>
@@ -16,6 +18,9 @@
 //#include <aslam/FrameTypedefs.hpp>
 #include <aslam/backend/CameraDesignVariable.hpp>
 #include <aslam/cameras.hpp>
+#include <aslam/backend/Scalar.hpp>
+#include <aslam/splines/BSplinePoseDesignVariable.hpp>
+#include <sm/kinematics/EulerRodriguez.hpp>
 
 class HpErr : public aslam::backend::ErrorTermFs<4> {
  public:
@@ -332,3 +337,91 @@ TEST(ReprojectionErrorTestSuite, testEstimator)
     FAIL() << e.what();
   }
 }
+
+TEST(ReprojectionErrorTestSuite, testSplinePoseReprojectionError)
+{
+  try
+  {
+    using namespace aslam;
+    using namespace aslam::backend;
+    using namespace aslam::cameras;
+    typedef Frame<DistortedPinholeCameraGeometry> frame_t;
+    typedef frame_t::camera_geometry_t camera_geometry_t;
+    typedef SplinePoseReprojectionError<frame_t> error_t;
+
+    boost::shared_ptr<camera_geometry_t> geometry( new camera_geometry_t( camera_geometry_t::getTestGeometry() ) );
+
+    // A random pose spline.
+    boost::shared_ptr<sm::kinematics::EulerRodriguez> rk( new sm::kinematics::EulerRodriguez );
+    bsplines::BSplinePose bsplinePose(4, rk);
+    const int N = 10;
+    Eigen::VectorXd times(N);
+    for(int i = 0; i < N; ++i)
+      times(i) = i;
+    Eigen::Matrix<double, 6, Eigen::Dynamic> K(6, N);
+    K.setRandom();
+    bsplinePose.initPoseSpline3(times, K, 6, 1e-4);
+    aslam::splines::BSplinePoseDesignVariable splineDv(bsplinePose);
+
+    // A composed extrinsic as used for fixed baselines, a target and a time offset.
+    sm::kinematics::Transformation T_c_cm1, T_cm1_b, T_w_p;
+    T_c_cm1.setRandom(0.2, 0.2);
+    T_cm1_b.setRandom(0.2, 0.2);
+    T_w_p.setRandom(1.0, 0.5);
+    RotationQuaternion q_c_cm1(T_c_cm1.q()), q_cm1_b(T_cm1_b.q()), q_w_p(T_w_p.q());
+    EuclideanPoint t_c_cm1(T_c_cm1.t()), t_cm1_b(T_cm1_b.t()), t_w_p(T_w_p.t());
+    Scalar timeOffset(0.01);
+
+    std::vector<DesignVariable *> dvs;
+    for(size_t i = 0; i < splineDv.numDesignVariables(); ++i)
+      dvs.push_back(splineDv.designVariable(i));
+    dvs.push_back(&q_c_cm1); dvs.push_back(&t_c_cm1);
+    dvs.push_back(&q_cm1_b); dvs.push_back(&t_cm1_b);
+    dvs.push_back(&q_w_p); dvs.push_back(&t_w_p);
+    dvs.push_back(&timeOffset);
+    for(size_t i = 0; i < dvs.size(); ++i)
+    {
+      dvs[i]->setActive(true);
+      dvs[i]->setBlockIndex(i);
+    }
+
+    TransformationBasic Tb_c_cm1(RotationExpression(&q_c_cm1), EuclideanExpression(&t_c_cm1));
+    TransformationBasic Tb_cm1_b(RotationExpression(&q_cm1_b), EuclideanExpression(&t_cm1_b));
+    TransformationBasic Tb_w_p(RotationExpression(&q_w_p), EuclideanExpression(&t_w_p));
+    TransformationExpression T_c_b = TransformationExpression(&Tb_c_cm1) * TransformationExpression(&Tb_cm1_b);
+    TransformationExpression T_w_p_e(&Tb_w_p);
+    ScalarExpression time = timeOffset.toExpression() + 5.3;
+
+    // The same chain as an expression tree.
+    TransformationExpression T_w_b = splineDv.transformationAtTime(time, 0.5, 0.5);
+    TransformationExpression T_c_p = T_c_b * T_w_b.inverse() * T_w_p_e;
+
+    Eigen::Matrix2d invR = Eigen::Matrix2d::Identity();
+    for(int n = 0; n < 10; ++n)
+    {
+      Eigen::Vector4d p_c = sm::kinematics::toHomogeneous(geometry->createRandomVisiblePoint());
+      Eigen::Vector4d p_p = T_c_p.toTransformationMatrix().inverse() * p_c;
+      Eigen::Vector2d y = Eigen::Vector2d::Random();
+
+      error_t e(y, invR, p_p, *geometry, &splineDv, time, 0.5, 0.5, T_c_b, T_w_p_e);
+      SimpleReprojectionError<frame_t> se(y, invR, T_c_p * HomogeneousExpression(p_p), *geometry);
+      ASSERT_EQ(se.numDesignVariables(), e.numDesignVariables());
+      ASSERT_NEAR(se.evaluateError(), e.evaluateError(), 1e-8);
+      sm::eigen::assertNear(se.error(), e.error(), 1e-8, SM_SOURCE_FILE_POS, "Checking the error against the expression chain");
+
+      JacobianContainer J(2), Jexpr(2);
+      e.evaluateJacobians(J);
+      se.evaluateJacobians(Jexpr);
+      SCOPED_TRACE("");
+      sm::eigen::assertNear(J.asDenseMatrix(), Jexpr.asDenseMatrix(), 1e-8, SM_SOURCE_FILE_POS, "Checking the jacobian against the expression chain");
+
+      JacobianContainer estJ(2);
+      e.evaluateJacobiansFiniteDifference(estJ);
+      sm::eigen::assertNear(J.asDenseMatrix(), estJ.asDenseMatrix(), 1e-4, SM_SOURCE_FILE_POS, "Checking the jacobian vs. finite differences");
+    }
+  }
+  catch(const std::exception & e)
+  {
+    FAIL() << e.what();
+  }
+}
@@ -114,6 +114,10 @@ namespace aslam {
       void addErrorTerm(const ErrorTermSP& errorTerm);
       /// Removes an error term from the problem
       void removeErrorTerm(const ErrorTermSP& errorTerm);
+      /// Removes error terms from the problem in a single pass
+      void removeErrorTerms(const ErrorTermsSP& errorTerms);
+      /// Keeps the error terms whose entry in the mask is true
+      void retainErrorTerms(const std::vector<bool>& mask);
       /// Checks if an error term is in the problem
       bool isErrorTermInProblem(const ErrorTerm* errorTerm) const;
       /// Permutes the error terms
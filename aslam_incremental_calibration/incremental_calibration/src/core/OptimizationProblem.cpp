@@ -189,6 +189,37 @@ namespace aslam {
       _errorTerms.erase(std::find(_errorTerms.begin(), _errorTerms.end(), errorTerm));
     }
 
+    void OptimizationProblem::removeErrorTerms(const ErrorTermsSP& errorTerms) {
+      ErrorTermsP toRemove;
+      for (auto it = errorTerms.cbegin(); it != errorTerms.cend(); ++it) {
+        if (!*it)
+          throw NullPointerException("errorTerm", __FILE__, __LINE__,
+            __PRETTY_FUNCTION__);
+        if (!isErrorTermInProblem(it->get()))
+          throw InvalidOperationException("error term not included",
+            __FILE__, __LINE__, __PRETTY_FUNCTION__);
+        toRemove.insert(it->get());
+      }
+      std::vector<bool> mask(_errorTerms.size());
+      for (size_t i = 0; i < _errorTerms.size(); ++i)
+        mask[i] = !toRemove.count(_errorTerms[i].get());
+      retainErrorTerms(mask);
+    }
+
+    void OptimizationProblem::retainErrorTerms(const std::vector<bool>& mask) {
+      if (mask.size() != _errorTerms.size())
+        throw OutOfBoundException<size_t>(mask.size(), _errorTerms.size(),
+          "wrong mask size", __FILE__, __LINE__, __PRETTY_FUNCTION__);
+      size_t numRetained = 0;
+      for (size_t i = 0; i < _errorTerms.size(); ++i) {
+        if (mask[i])
+          _errorTerms[numRetained++].swap(_errorTerms[i]);
+        else
+          _errorTermsLookup.erase(_errorTerms[i].get());
+      }
+      _errorTerms.resize(numRetained);
+    }
+
     bool OptimizationProblem::
         isErrorTermInProblem(const ErrorTerm* errorTerm) const {
       return _errorTermsLookup.count(errorTerm);
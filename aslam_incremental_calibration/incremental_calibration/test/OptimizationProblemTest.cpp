@@ -132,3 +132,32 @@ TEST(AslamCalibrationTestSuite, testOptimizationProblem) {
   dv1->getParameters(dv1Param);
   ASSERT_EQ(dv1Param, Eigen::Vector2d::Zero());
 }
+
+TEST(AslamCalibrationTestSuite, testRemoveErrorTerms) {
+  OptimizationProblem problem;
+  auto et1 = boost::make_shared<DummyErrorTerm>();
+  auto et2 = boost::make_shared<DummyErrorTerm>();
+  auto et3 = boost::make_shared<DummyErrorTerm>();
+  auto et4 = boost::make_shared<DummyErrorTerm>();
+  auto et5 = boost::make_shared<DummyErrorTerm>();
+  problem.addErrorTerm(et1);
+  problem.addErrorTerm(et2);
+  problem.addErrorTerm(et3);
+  problem.addErrorTerm(et4);
+  problem.removeErrorTerms({et3, et1});
+  ASSERT_EQ(problem.getErrorTerms(),
+    OptimizationProblem::ErrorTermsSP({et2, et4}));
+  ASSERT_FALSE(problem.isErrorTermInProblem(et1.get()));
+  ASSERT_FALSE(problem.isErrorTermInProblem(et3.get()));
+  ASSERT_THROW(problem.removeErrorTerms({et2, et5}), InvalidOperationException);
+  ASSERT_EQ(problem.numErrorTerms(), 2);
+  problem.addErrorTerm(et5);
+  ASSERT_THROW(problem.retainErrorTerms({true, false}),
+    OutOfBoundException<size_t>);
+  problem.retainErrorTerms({false, true, true});
+  ASSERT_EQ(problem.getErrorTerms(),
+    OptimizationProblem::ErrorTermsSP({et4, et5}));
+  ASSERT_FALSE(problem.isErrorTermInProblem(et2.get()));
+  ASSERT_TRUE(problem.isErrorTermInProblem(et4.get()));
+  ASSERT_TRUE(problem.isErrorTermInProblem(et5.get()));
+}
@@ -29,11 +29,37 @@
 #include <boost/python/suite/indexing/vector_indexing_suite.hpp>
 
 #include <aslam/backend/DesignVariable.hpp>
+#include <aslam/backend/ErrorTerm.hpp>
+
+/// Removes a list of error terms from the problem
+void removeErrorTerms(aslam::calibration::OptimizationProblem* problem,
+    const boost::python::list& errorTerms) {
+  aslam::calibration::OptimizationProblem::ErrorTermsSP terms;
+  terms.reserve(boost::python::len(errorTerms));
+  for (boost::python::ssize_t i = 0; i < boost::python::len(errorTerms); ++i)
+    terms.push_back(boost::python::extract<
+      aslam::calibration::OptimizationProblem::ErrorTermSP>(errorTerms[i]));
+  problem->removeErrorTerms(terms);
+}
+
+/// Keeps the error terms whose entry in a list of booleans is true
+void retainErrorTerms(aslam::calibration::OptimizationProblem* problem,
+    const boost::python::list& keep) {
+  std::vector<bool> mask(boost::python::len(keep));
+  for (size_t i = 0; i < mask.size(); ++i)
+    mask[i] = boost::python::extract<bool>(keep[i]);
+  problem->retainErrorTerms(mask);
+}
 
 void exportOptimizationProblem() {
   using namespace boost::python;
   using aslam::calibration::OptimizationProblem;
 
+  /// Returns the group of a design variable
+  size_t (OptimizationProblem::*getGroupId)(
+    const aslam::backend::DesignVariable*) const =
+    &OptimizationProblem::getGroupId;
+
   /// Python export for OptimizationProblem class
   class_<aslam::calibration::OptimizationProblem,
     boost::shared_ptr<aslam::calibration::OptimizationProblem>,
@@ -44,8 +70,11 @@ void exportOptimizationProblem() {
     .def("removeDesignVariable", &OptimizationProblem::removeDesignVariable)
     .def("addErrorTerm", &OptimizationProblem::addErrorTerm)
     .def("removeErrorTerm", &OptimizationProblem::removeErrorTerm)
+    .def("removeErrorTerms", &removeErrorTerms)
+    .def("retainErrorTerms", &retainErrorTerms)
     .def("clear", &OptimizationProblem::clear)
     .def("clearAllErrorTerms", &OptimizationProblem::clearAllErrorTerms)
+    .def("getGroupId", getGroupId)
     ;
 
   using aslam::calibration::IncrementalOptimizationProblem;
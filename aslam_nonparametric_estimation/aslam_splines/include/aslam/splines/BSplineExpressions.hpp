@@ -23,7 +23,7 @@ namespace aslam {
         class BSplineTransformationExpressionNode : public aslam::backend::TransformationExpressionNode
         {
         public:
-            BSplineTransformationExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
+            BSplineTransformationExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
             virtual ~BSplineTransformationExpressionNode();
 
         protected:
@@ -32,7 +32,7 @@ namespace aslam {
             virtual void evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const;
             virtual void getDesignVariablesImplementation(aslam::backend::DesignVariable::set_t & designVariables) const;
 
-            bsplines::BSplinePose * _spline;
+            BSplinePoseDesignVariable * _spline;
             std::vector<aslam::backend::DesignVariable *> _designVariables;
             double _time;
         };
@@ -41,7 +41,7 @@ namespace aslam {
         class BSplineRotationExpressionNode : public aslam::backend::RotationExpressionNode
         {
         public:
-            BSplineRotationExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
+            BSplineRotationExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
             virtual ~BSplineRotationExpressionNode();
 
         protected:
@@ -50,7 +50,7 @@ namespace aslam {
             virtual void evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const;
             virtual void getDesignVariablesImplementation(aslam::backend::DesignVariable::set_t & designVariables) const;
 
-            bsplines::BSplinePose * _spline;
+            BSplinePoseDesignVariable * _spline;
             std::vector<aslam::backend::DesignVariable *> _designVariables;
             double _time;
 
@@ -62,7 +62,7 @@ namespace aslam {
         class BSplinePositionExpressionNode : public aslam::backend::EuclideanExpressionNode
         {
         public:
-            BSplinePositionExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
+            BSplinePositionExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
             virtual ~BSplinePositionExpressionNode();
 
         protected:
@@ -71,7 +71,7 @@ namespace aslam {
             virtual void evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const;
             virtual void getDesignVariablesImplementation(aslam::backend::DesignVariable::set_t & designVariables) const;
 
-            bsplines::BSplinePose * _spline;
+            BSplinePoseDesignVariable * _spline;
             std::vector<aslam::backend::DesignVariable *> _designVariables;
             double _time;
 
@@ -81,7 +81,7 @@ namespace aslam {
         class BSplineVelocityExpressionNode : public aslam::backend::EuclideanExpressionNode
         {
         public:
-            BSplineVelocityExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
+            BSplineVelocityExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
             virtual ~BSplineVelocityExpressionNode();
 
         protected:
@@ -90,7 +90,7 @@ namespace aslam {
             virtual void evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const;
             virtual void getDesignVariablesImplementation(aslam::backend::DesignVariable::set_t & designVariables) const;
 
-            bsplines::BSplinePose * _spline;
+            BSplinePoseDesignVariable * _spline;
             std::vector<aslam::backend::DesignVariable *> _designVariables;
             double _time;
 
@@ -102,7 +102,7 @@ namespace aslam {
         class BSplineAccelerationExpressionNode : public aslam::backend::EuclideanExpressionNode
         {
         public:
-            BSplineAccelerationExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
+            BSplineAccelerationExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
             virtual ~BSplineAccelerationExpressionNode();
 
         protected:
@@ -111,7 +111,7 @@ namespace aslam {
             virtual void evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const;
             virtual void getDesignVariablesImplementation(aslam::backend::DesignVariable::set_t & designVariables) const;
 
-            bsplines::BSplinePose * _spline;
+            BSplinePoseDesignVariable * _spline;
             std::vector<aslam::backend::DesignVariable *> _designVariables;
             double _time;
 
@@ -120,7 +120,7 @@ namespace aslam {
     class BSplineAccelerationBodyFrameExpressionNode :
       public aslam::backend::EuclideanExpressionNode {
     public:
-        BSplineAccelerationBodyFrameExpressionNode(bsplines::BSplinePose*
+        BSplineAccelerationBodyFrameExpressionNode(BSplinePoseDesignVariable*
           spline, const std::vector<aslam::backend::DesignVariable*>&
           designVariables, double time);
         virtual ~BSplineAccelerationBodyFrameExpressionNode();
@@ -135,7 +135,7 @@ namespace aslam {
         virtual void getDesignVariablesImplementation(
           aslam::backend::DesignVariable::set_t& designVariables) const;
 
-        bsplines::BSplinePose* _spline;
+        BSplinePoseDesignVariable* _spline;
         std::vector<aslam::backend::DesignVariable*> _designVariables;
         double _time;
 
@@ -144,7 +144,7 @@ namespace aslam {
         class BSplineAngularVelocityBodyFrameExpressionNode : public aslam::backend::EuclideanExpressionNode
         {
         public:
-            BSplineAngularVelocityBodyFrameExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
+            BSplineAngularVelocityBodyFrameExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
             virtual ~BSplineAngularVelocityBodyFrameExpressionNode();
 
         protected:
@@ -153,7 +153,7 @@ namespace aslam {
             virtual void evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const;
             virtual void getDesignVariablesImplementation(aslam::backend::DesignVariable::set_t & designVariables) const;
 
-            bsplines::BSplinePose * _spline;
+            BSplinePoseDesignVariable * _spline;
             std::vector<aslam::backend::DesignVariable *> _designVariables;
             double _time;
 
@@ -163,7 +163,7 @@ namespace aslam {
         class BSplineAngularAccelerationBodyFrameExpressionNode : public aslam::backend::EuclideanExpressionNode
         {
         public:
-        BSplineAngularAccelerationBodyFrameExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
+        BSplineAngularAccelerationBodyFrameExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time);
         virtual ~BSplineAngularAccelerationBodyFrameExpressionNode();
          
         protected:
@@ -172,7 +172,7 @@ namespace aslam {
         virtual void evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const;
         virtual void getDesignVariablesImplementation(aslam::backend::DesignVariable::set_t & designVariables) const;
          
-        bsplines::BSplinePose * _spline;
+        BSplinePoseDesignVariable * _spline;
         std::vector<aslam::backend::DesignVariable *> _designVariables;
         double _time;
          
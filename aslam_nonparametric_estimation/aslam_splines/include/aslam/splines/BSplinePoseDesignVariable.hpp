@@ -5,6 +5,8 @@
 #include <bsplines/BSplinePose.hpp>
 #include <Eigen/StdVector>
 #include <boost/ptr_container/ptr_vector.hpp>
+#include <boost/unordered_map.hpp>
+#include <boost/thread/mutex.hpp>
 #include <aslam/backend/TransformationExpression.hpp>
 #include <aslam/backend/RotationExpression.hpp>
 #include <aslam/backend/EuclideanExpression.hpp>
@@ -24,11 +26,15 @@ namespace aslam {
 
             /// \brief this guy takes a copy.
             BSplinePoseDesignVariable(const bsplines::BSplinePose & bsplinePose);
+
+            /// \brief copies the spline. The design variables of the copy map into its own spline.
+            BSplinePoseDesignVariable(const BSplinePoseDesignVariable & other);
       
             virtual ~BSplinePoseDesignVariable();
 
-            /// \brief get the spline.
-            const bsplines::BSplinePose & spline();
+            /// \brief get the spline. It is read-only so that every change of the curve goes through
+            ///        the design variables or the segment methods, which invalidate the evaluation cache.
+            const bsplines::BSplinePose & spline() const;
 
             // \todo Return a Transformation expression, a Rotation expression, A Euclidean point expression, and lots of VectorExpressions.
             aslam::backend::TransformationExpression transformation(double tk);
@@ -64,12 +70,105 @@ namespace aslam {
             void addSegment2(double t, Eigen::Matrix4d T, double lambda);
             void removeSegment();
 
+            /// \brief the spline value (or derivative) at a time and the basis function values.
+            struct Evaluation
+            {
+                /// \brief the spline value or derivative.
+                Eigen::VectorXd value;
+                /// \brief the basis function values. The Jacobian of the value wrt. the local coefficients is kron(basis^T, I).
+                Eigen::VectorXd basis;
+            };
+
+            /// \brief the cached spline value (or derivative) at time tk.
+            ///
+            /// The evaluations are cached per time segment by (tk, derivativeOrder)
+            /// until one of the design variables is updated, reverted or set, so
+            /// all expressions evaluated at the same time within one optimizer
+            /// iteration share a single spline evaluation. Each segment has its own
+            /// lock and drops its stale entries on the first access after a change.
+            /// The reference stays valid until the spline coefficients change.
+            const Evaluation & evaluation(double tk, int derivativeOrder);
+
+            /// \brief the spline value (or derivative) at time tk and its Jacobian wrt. the local coefficients.
+            const Eigen::VectorXd & evalDAndJacobian(double tk, int derivativeOrder, Eigen::MatrixXd * J);
+            const Eigen::VectorXd & evalD(double tk, int derivativeOrder);
+
+            // The spline quantities computed from the cached evaluations.
+            Eigen::Matrix4d transformationAndJacobian(double tk, Eigen::MatrixXd * J);
+            Eigen::Matrix3d orientationAndJacobian(double tk, Eigen::MatrixXd * J);
+            Eigen::Vector3d angularVelocityBodyFrameAndJacobian(double tk, Eigen::MatrixXd * J);
+            Eigen::Vector3d angularAccelerationBodyFrameAndJacobian(double tk, Eigen::MatrixXd * J);
+
+            /// \brief invalidate all cached spline evaluations.
+            void clearEvaluationCache();
+
+            /// \brief the number of spline evaluations done on cache misses since the time segments last changed.
+            size_t numEvaluations() const;
+
+            /// \brief a counter that is incremented whenever the spline coefficients change.
+            ///
+            /// Caches of derived spline quantities compare it to the value they
+            /// were computed with instead of comparing the coefficients.
+            size_t revision() const { return _revision; }
+
+            /// \brief transform the 3 x N points by the spline transformations at the sorted times.
+            ///
+            /// The points are split into nThreads contiguous chunks that are
+            /// transformed in parallel with BSplinePose::transformPointsBatch().
+            Eigen::MatrixXd transformPointsBatch(const Eigen::VectorXd & times, const Eigen::MatrixXd & points, size_t nThreads = 1);
+
         private:
+            /// \brief a spline coefficient that clears the evaluation cache of its spline when it changes.
+            class CoefficientDesignVariable : public dv_t
+            {
+            public:
+                CoefficientDesignVariable(BSplinePoseDesignVariable * spline, Eigen::Map< dv_t::vector_t > v);
+                virtual ~CoefficientDesignVariable();
+
+            protected:
+                virtual void revertUpdateImplementation();
+                virtual void updateImplementation(const double * dp, int size);
+                virtual void setParametersImplementation(const Eigen::MatrixXd & value);
+
+                BSplinePoseDesignVariable * _spline;
+            };
+
+            typedef boost::unordered_map< std::pair<double, int>, Evaluation > evaluation_cache_t;
+
+            /// \brief the cached evaluations of one time segment.
+            struct SegmentCache
+            {
+                SegmentCache() : revision(0), evaluations(0) {}
+
+                boost::mutex mutex;
+                /// \brief the revision the entries were computed with.
+                size_t revision;
+                /// \brief the number of cache misses.
+                size_t evaluations;
+                evaluation_cache_t entries;
+            };
+
+            /// \brief one empty cache per time segment.
+            void resetEvaluationCache();
+
+            /// \brief the angular velocity (derivativeOrder 1) or acceleration (derivativeOrder 2) in the body frame.
+            Eigen::Vector3d angularBodyFrameAndJacobian(double tk, int derivativeOrder, Eigen::MatrixXd * J);
+
+            /// \brief transform chunk threadId of nThreads for transformPointsBatch().
+            void transformPointsChunk(size_t threadId, size_t nThreads, const Eigen::VectorXd & times, const Eigen::MatrixXd & points, Eigen::MatrixXd & outPoints) const;
+
+
             /// \brief the internal spline.
             bsplines::BSplinePose _bsplinePose;
 
             /// \brief the vector of design variables.
             boost::ptr_vector< dv_t > _designVariables;
+
+            /// \brief the cached spline evaluations of the current revision, one cache per time segment.
+            boost::ptr_vector< SegmentCache > _segmentCaches;
+
+            /// \brief the number of changes of the spline coefficients.
+            size_t _revision;
       
         };
     
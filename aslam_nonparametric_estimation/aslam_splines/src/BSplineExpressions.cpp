@@ -4,7 +4,7 @@
 namespace aslam {
     namespace splines {
     
-        BSplineTransformationExpressionNode::BSplineTransformationExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
+        BSplineTransformationExpressionNode::BSplineTransformationExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
             _spline(spline), _designVariables(designVariables), _time(time)
         {
 
@@ -17,7 +17,7 @@ namespace aslam {
 
         Eigen::Matrix4d BSplineTransformationExpressionNode::toTransformationMatrixImplementation()
         {
-            return _spline->transformation(_time);
+            return _spline->transformationAndJacobian(_time, NULL);
         }
 
         void BSplineTransformationExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians) const
@@ -59,7 +59,7 @@ namespace aslam {
 
         ///////////
 
-        BSplineRotationExpressionNode::BSplineRotationExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
+        BSplineRotationExpressionNode::BSplineRotationExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
             _spline(spline), _designVariables(designVariables), _time(time)
         {
 
@@ -72,13 +72,13 @@ namespace aslam {
 
         Eigen::Matrix3d BSplineRotationExpressionNode::toRotationMatrixImplementation() const
         {
-            return _spline->orientation(_time);
+            return _spline->orientationAndJacobian(_time, NULL);
         }
 
         void BSplineRotationExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians) const
         {
             Eigen::MatrixXd J;
-            _spline->orientationAndJacobian(_time, &J, NULL);
+            _spline->orientationAndJacobian(_time, &J);
 
             SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 3, "Bad");
             SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
@@ -94,7 +94,7 @@ namespace aslam {
             SM_ASSERT_EQ_DBG(aslam::Exception, applyChainRule.cols(), 3, "The chain rule matrix is the wrong size");
 
             Eigen::MatrixXd J;
-            _spline->orientationAndJacobian(_time, &J, NULL);
+            _spline->orientationAndJacobian(_time, &J);
 
             SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 3, "Bad");
             SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
@@ -118,7 +118,7 @@ namespace aslam {
 
         /////////////////////
 
-        BSplinePositionExpressionNode::BSplinePositionExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
+        BSplinePositionExpressionNode::BSplinePositionExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
             _spline(spline), _designVariables(designVariables), _time(time)
         {
 
@@ -132,19 +132,20 @@ namespace aslam {
         Eigen::Vector3d BSplinePositionExpressionNode::toEuclideanImplementation() const
         {
 
-            return _spline->eval(_time).head<3>();
+            return _spline->evalD(_time, 0).head<3>();
         }
 
         void BSplinePositionExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians) const
         {
-            Eigen::MatrixXd J;
-            _spline->evalDAndJacobian(_time, 0, &J, NULL);
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
+            // the translational part of coefficient i enters with basis[i] * identity
+            const Eigen::VectorXd & basis = _spline->evaluation(_time, 0).basis;
+            SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(), (int)_designVariables.size(), "Bad");
 
+            Eigen::Matrix<double,3,6> J = Eigen::Matrix<double,3,6>::Zero();
             for(size_t i = 0; i < _designVariables.size(); ++i)
             {
-                outJacobians.add(_designVariables[i], J.block<3,6>(0,i*6) );
+                J.leftCols<3>().diagonal().setConstant(basis[i]);
+                outJacobians.add(_designVariables[i], J );
             }
         }
 
@@ -152,14 +153,15 @@ namespace aslam {
         {
             SM_ASSERT_EQ_DBG(aslam::Exception, applyChainRule.cols(), 3, "The chain rule matrix is the wrong size");
 
-            Eigen::MatrixXd J;
-            _spline->evalDAndJacobian(_time, 0, &J, NULL);
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
+            // the translational part of coefficient i enters with basis[i] * identity
+            const Eigen::VectorXd & basis = _spline->evaluation(_time, 0).basis;
+            SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(), (int)_designVariables.size(), "Bad");
       
+            Eigen::Matrix<double,3,6> J = Eigen::Matrix<double,3,6>::Zero();
             for(size_t i = 0; i < _designVariables.size(); ++i)
             {
-                outJacobians.add(_designVariables[i], applyChainRule * J.block<3,6>(0,i*6) );
+                J.leftCols<3>().diagonal().setConstant(basis[i]);
+                outJacobians.add(_designVariables[i], applyChainRule * J );
             }
 
         }
@@ -177,7 +179,7 @@ namespace aslam {
 
         /////////////////////
 
-        BSplineVelocityExpressionNode::BSplineVelocityExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
+        BSplineVelocityExpressionNode::BSplineVelocityExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
             _spline(spline), _designVariables(designVariables), _time(time)
         {
 
@@ -196,14 +198,15 @@ namespace aslam {
 
         void BSplineVelocityExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians) const
         {
-            Eigen::MatrixXd J;
-            _spline->evalDAndJacobian(_time, 1, &J, NULL);
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
+            // the translational part of coefficient i enters with basis[i] * identity
+            const Eigen::VectorXd & basis = _spline->evaluation(_time, 1).basis;
+            SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(), (int)_designVariables.size(), "Bad");
 
+            Eigen::Matrix<double,3,6> J = Eigen::Matrix<double,3,6>::Zero();
             for(size_t i = 0; i < _designVariables.size(); ++i)
             {
-                outJacobians.add(_designVariables[i], J.block<3,6>(0,i*6) );
+                J.leftCols<3>().diagonal().setConstant(basis[i]);
+                outJacobians.add(_designVariables[i], J );
             }
         }
 
@@ -211,14 +214,15 @@ namespace aslam {
         {
             SM_ASSERT_EQ_DBG(aslam::Exception, applyChainRule.cols(), 3, "The chain rule matrix is the wrong size");
 
-            Eigen::MatrixXd J;
-            _spline->evalDAndJacobian(_time, 1, &J, NULL);
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
+            // the translational part of coefficient i enters with basis[i] * identity
+            const Eigen::VectorXd & basis = _spline->evaluation(_time, 1).basis;
+            SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(), (int)_designVariables.size(), "Bad");
       
+            Eigen::Matrix<double,3,6> J = Eigen::Matrix<double,3,6>::Zero();
             for(size_t i = 0; i < _designVariables.size(); ++i)
             {
-                outJacobians.add(_designVariables[i], applyChainRule * J.block<3,6>(0,i*6) );
+                J.leftCols<3>().diagonal().setConstant(basis[i]);
+                outJacobians.add(_designVariables[i], applyChainRule * J );
             }
 
         }
@@ -237,7 +241,7 @@ namespace aslam {
 
         /////////////////////
 
-        BSplineAccelerationExpressionNode::BSplineAccelerationExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
+        BSplineAccelerationExpressionNode::BSplineAccelerationExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
             _spline(spline), _designVariables(designVariables), _time(time)
         {
 
@@ -256,14 +260,15 @@ namespace aslam {
 
         void BSplineAccelerationExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians) const
         {
-            Eigen::MatrixXd J;
-            _spline->evalDAndJacobian(_time, 2, &J, NULL);
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
+            // the translational part of coefficient i enters with basis[i] * identity
+            const Eigen::VectorXd & basis = _spline->evaluation(_time, 2).basis;
+            SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(), (int)_designVariables.size(), "Bad");
 
+            Eigen::Matrix<double,3,6> J = Eigen::Matrix<double,3,6>::Zero();
             for(size_t i = 0; i < _designVariables.size(); ++i)
             {
-                outJacobians.add(_designVariables[i], J.block<3,6>(0,i*6) );
+                J.leftCols<3>().diagonal().setConstant(basis[i]);
+                outJacobians.add(_designVariables[i], J );
             }
         }
 
@@ -271,14 +276,15 @@ namespace aslam {
         {
             SM_ASSERT_EQ_DBG(aslam::Exception, applyChainRule.cols(), 3, "The chain rule matrix is the wrong size");
 
-            Eigen::MatrixXd J;
-            _spline->evalDAndJacobian(_time, 2, &J, NULL);
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-            SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
+            // the translational part of coefficient i enters with basis[i] * identity
+            const Eigen::VectorXd & basis = _spline->evaluation(_time, 2).basis;
+            SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(), (int)_designVariables.size(), "Bad");
       
+            Eigen::Matrix<double,3,6> J = Eigen::Matrix<double,3,6>::Zero();
             for(size_t i = 0; i < _designVariables.size(); ++i)
             {
-                outJacobians.add(_designVariables[i], applyChainRule * J.block<3,6>(0,i*6) );
+                J.leftCols<3>().diagonal().setConstant(basis[i]);
+                outJacobians.add(_designVariables[i], applyChainRule * J );
             }
 
         }
@@ -294,7 +300,7 @@ namespace aslam {
 
     BSplineAccelerationBodyFrameExpressionNode::
         BSplineAccelerationBodyFrameExpressionNode(
-        bsplines::BSplinePose* spline,
+        BSplinePoseDesignVariable* spline,
         const std::vector<aslam::backend::DesignVariable*>& designVariables,
         double time) :
         _spline(spline), _designVariables(designVariables), _time(time) {
@@ -306,19 +312,21 @@ namespace aslam {
 
     Eigen::Vector3d BSplineAccelerationBodyFrameExpressionNode::
         toEuclideanImplementation() const {
-        return _spline->linearAccelerationBodyFrame(_time);
+        return _spline->orientationAndJacobian(_time, NULL).transpose() *
+          _spline->evalD(_time, 2).head<3>();
     }
 
     void BSplineAccelerationBodyFrameExpressionNode::
         evaluateJacobiansImplementation(aslam::backend::JacobianContainer&
         outJacobians) const {
-      Eigen::MatrixXd J;
-      _spline->evalDAndJacobian(_time, 2, &J, NULL);
-      SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-      SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(),
-        6 * (int)_designVariables.size(), "Bad");
-      for (size_t i = 0; i < _designVariables.size(); ++i)
-        outJacobians.add(_designVariables[i], J.block<3, 6>(0, i * 6));
+      const Eigen::VectorXd& basis = _spline->evaluation(_time, 2).basis;
+      SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(),
+        (int)_designVariables.size(), "Bad");
+      Eigen::Matrix<double, 3, 6> J = Eigen::Matrix<double, 3, 6>::Zero();
+      for (size_t i = 0; i < _designVariables.size(); ++i) {
+        J.leftCols<3>().diagonal().setConstant(basis[i]);
+        outJacobians.add(_designVariables[i], J);
+      }
     }
 
     void BSplineAccelerationBodyFrameExpressionNode::
@@ -326,14 +334,15 @@ namespace aslam {
         outJacobians, const Eigen::MatrixXd & applyChainRule) const {
       SM_ASSERT_EQ_DBG(aslam::Exception, applyChainRule.cols(), 3,
         "The chain rule matrix is the wrong size");
-      Eigen::MatrixXd J;
-      _spline->evalDAndJacobian(_time, 2, &J, NULL);
-      SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 6, "Bad");
-      SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(),
-        6 * (int)_designVariables.size(), "Bad");
-      for (size_t i = 0; i < _designVariables.size(); ++i)
+      const Eigen::VectorXd& basis = _spline->evaluation(_time, 2).basis;
+      SM_ASSERT_EQ_DBG(aslam::Exception, basis.size(),
+        (int)_designVariables.size(), "Bad");
+      Eigen::Matrix<double, 3, 6> J = Eigen::Matrix<double, 3, 6>::Zero();
+      for (size_t i = 0; i < _designVariables.size(); ++i) {
+        J.leftCols<3>().diagonal().setConstant(basis[i]);
         outJacobians.add(_designVariables[i],
-          applyChainRule * J.block<3 , 6>(0, i * 6));
+          applyChainRule * J);
+      }
     }
 
     void BSplineAccelerationBodyFrameExpressionNode::
@@ -345,7 +354,7 @@ namespace aslam {
 
 
         ///////////////////
-        BSplineAngularVelocityBodyFrameExpressionNode::BSplineAngularVelocityBodyFrameExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
+        BSplineAngularVelocityBodyFrameExpressionNode::BSplineAngularVelocityBodyFrameExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
             _spline(spline), _designVariables(designVariables), _time(time)
         {
 
@@ -359,13 +368,13 @@ namespace aslam {
         Eigen::Vector3d BSplineAngularVelocityBodyFrameExpressionNode::toEuclideanImplementation() const
         {
 
-            return _spline->angularVelocityBodyFrame(_time);
+            return _spline->angularVelocityBodyFrameAndJacobian(_time, NULL);
         }
 
         void BSplineAngularVelocityBodyFrameExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians) const
         {
             Eigen::MatrixXd J;
-            _spline->angularVelocityBodyFrameAndJacobian(_time, &J, NULL);
+            _spline->angularVelocityBodyFrameAndJacobian(_time, &J);
             SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 3, "Bad");
             SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
 
@@ -380,7 +389,7 @@ namespace aslam {
             SM_ASSERT_EQ_DBG(aslam::Exception, applyChainRule.cols(), 3, "The chain rule matrix is the wrong size");
 
             Eigen::MatrixXd J;
-            _spline->angularVelocityBodyFrameAndJacobian(_time, &J, NULL);
+            _spline->angularVelocityBodyFrameAndJacobian(_time, &J);
             SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 3, "Bad");
             SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
       
@@ -445,48 +454,43 @@ namespace aslam {
         Eigen::Matrix4d TransformationTimeOffsetExpressionNode::toTransformationMatrixImplementation()
         {
         	SM_ASSERT_GE_LT(aslam::Exception, _time.toScalar(), _bufferTmin, _bufferTmax, "Spline Coefficient Buffer Exceeded. Set larger buffer margins!");
-            return _spline->spline().transformation(_time.toScalar());
+            // The shared cache is keyed by the current time, so terms observed at the same time share the evaluation.
+            return _spline->transformationAndJacobian(_time.toScalar(), NULL);
         }
       
         void TransformationTimeOffsetExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians)  const
         {
-          
-            Eigen::MatrixXd JT;
-            Eigen::MatrixXd J;
-          
-          
             double observationTime = _time.toScalar();
 
             SM_ASSERT_GE_LT(aslam::Exception, observationTime, _bufferTmin, _bufferTmax, "Spline Coefficient Buffer Exceeded. Set larger buffer margins!");
 
             // the active indices
             Eigen::VectorXi dvidxs = _spline->spline().localVvCoefficientVectorIndices(observationTime);
-            // nonzero Jacobians:
-            _spline->spline().transformationAndJacobian(observationTime, &J);
-            Eigen::MatrixXd JS;
-            Eigen::VectorXd p;
-          
-            p = _spline->spline().evalDAndJacobian(observationTime,0,&JS, NULL);
-           
-          
-            /*Eigen::Matrix4d T =*/ _spline->spline().curveValueToTransformationAndJacobian( p, &JT );    
-            J = JT * JS;
+            const BSplinePoseDesignVariable::Evaluation & e = _spline->evaluation(observationTime, 0);
+
+            // The Jacobian wrt. coefficient j is basis[j] * JT
+            Eigen::MatrixXd JT;
+            /*Eigen::Matrix4d T =*/ _spline->spline().curveValueToTransformationAndJacobian( e.value, &JT );
 
             int minIdx = dvidxs(0);
             int maxIdx = dvidxs(dvidxs.size() - 1);
+            int j = 0;
 
             for(int i = 0; i < _localCoefficientIndices.size(); i ++)
             {
             	// nonzero Jacobian
-            	if(_localCoefficientIndices[i] >= minIdx && _localCoefficientIndices[i] <= maxIdx )
-            		outJacobians.add(_spline->designVariable(_localCoefficientIndices[i]), J.block<6,6>(0,(i-minIdx)*6) );
+            	if(_localCoefficientIndices[i] >= minIdx && _localCoefficientIndices[i] <= maxIdx ) {
+            		outJacobians.add(_spline->designVariable(_localCoefficientIndices[i]), e.basis[j] * JT );
+            		j++;
+            	}
             	// zero Jacobian:
-            	else
+            	else {
             		outJacobians.add(_spline->designVariable(_localCoefficientIndices[i]), Eigen::Matrix<double, 6,6>::Zero());
+            	}
             }
 
             // evaluate time derivative of the curves
-            Eigen::VectorXd Phi_dot_c = _spline->spline().evalD(observationTime,1); // phi_dot * c (t_0)
+            const Eigen::VectorXd & Phi_dot_c = _spline->evalD(observationTime,1); // phi_dot * c (t_0)
             
             // Add the jacobians wrt line delay: \mbf S_T * \mbsdot \Phi_dot(t) * c * p_{i,v}
             _time.evaluateJacobians(outJacobians, JT * Phi_dot_c );
@@ -494,53 +498,37 @@ namespace aslam {
       
         void TransformationTimeOffsetExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians, const Eigen::MatrixXd & applyChainRule) const
         {
-          
-            Eigen::MatrixXd JT;
-            Eigen::MatrixXd J;
-          
-          
             double observationTime = _time.toScalar();
             SM_ASSERT_GE_LT(aslam::Exception, observationTime, _bufferTmin, _bufferTmax, "Spline Coefficient Buffer Exceeded. Set larger buffer margins!");
 
-
             Eigen::VectorXi dvidxs = _spline->spline().localVvCoefficientVectorIndices(observationTime);
-            // _spline->spline().transformationAndJacobian(observationTime, &J);
-            Eigen::MatrixXd JS;
-            Eigen::VectorXd p;
-          
-            p = _spline->spline().evalDAndJacobian(observationTime,0,&JS, NULL);
-           
-          
-            /*Eigen::Matrix4d T =*/ _spline->spline().curveValueToTransformationAndJacobian( p, &JT );    
-            J = JT * JS;  
+            const BSplinePoseDesignVariable::Evaluation & e = _spline->evaluation(observationTime, 0);
+
+            Eigen::MatrixXd JT;
+            /*Eigen::Matrix4d T =*/ _spline->spline().curveValueToTransformationAndJacobian( e.value, &JT );
+            const Eigen::MatrixXd AJT = applyChainRule * JT;
           
             int minIdx = dvidxs(0);
             int maxIdx = dvidxs(dvidxs.size() - 1);
             int j = 0;
 
-            //std::cout << "dvidxs: " << std::endl << dvidxs << std::endl;
-            //std::cout << "_localCoefficientIndices" << std::endl << _localCoefficientIndices << std::endl;
-
             for(int i = 0; i < _localCoefficientIndices.size(); i ++)
             {
             	// nonzero Jacobian
             	if(_localCoefficientIndices[i] >= minIdx && _localCoefficientIndices[i] <= maxIdx ) {
-            		outJacobians.add(_spline->designVariable(_localCoefficientIndices[i]), applyChainRule * J.block<6,6>(0,(j)*6) );
+            		outJacobians.add(_spline->designVariable(_localCoefficientIndices[i]), e.basis[j] * AJT );
             		j++;
             	}
             	// zero Jacobian:
             	else {
-            		outJacobians.add(_spline->designVariable(_localCoefficientIndices[i]), applyChainRule * Eigen::Matrix<double, 6,6>::Zero());
+            		outJacobians.add(_spline->designVariable(_localCoefficientIndices[i]), Eigen::MatrixXd::Zero(AJT.rows(), 6));
             	}
             }
 
             // evaluate time derivative of the curves
-            Eigen::VectorXd Phi_dot_c = _spline->spline().evalD(observationTime,1); // phi_dot * c (t_0)
-          
-          
-            _time.evaluateJacobians(outJacobians, applyChainRule * JT * Phi_dot_c );
-            
+            const Eigen::VectorXd & Phi_dot_c = _spline->evalD(observationTime,1); // phi_dot * c (t_0)
           
+            _time.evaluateJacobians(outJacobians, AJT * Phi_dot_c );
         }
       
         void TransformationTimeOffsetExpressionNode::getDesignVariablesImplementation(aslam::backend::JacobianContainer::set_t & designVariables) const
@@ -607,7 +595,7 @@ namespace aslam {
             
         }
 
-        BSplineAngularAccelerationBodyFrameExpressionNode::BSplineAngularAccelerationBodyFrameExpressionNode(bsplines::BSplinePose * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
+        BSplineAngularAccelerationBodyFrameExpressionNode::BSplineAngularAccelerationBodyFrameExpressionNode(BSplinePoseDesignVariable * spline, const std::vector<aslam::backend::DesignVariable *> & designVariables, double time) :
         _spline(spline), _designVariables(designVariables), _time(time)
         {
 
@@ -621,13 +609,13 @@ namespace aslam {
         Eigen::Vector3d BSplineAngularAccelerationBodyFrameExpressionNode::toEuclideanImplementation() const
         {
 
-        	return _spline->angularAccelerationBodyFrame(_time);
+        	return _spline->angularAccelerationBodyFrameAndJacobian(_time, NULL);
         }
 
         void BSplineAngularAccelerationBodyFrameExpressionNode::evaluateJacobiansImplementation(aslam::backend::JacobianContainer & outJacobians) const
         {
         	Eigen::MatrixXd J;
-        	_spline->angularAccelerationBodyFrameAndJacobian(_time, &J, NULL);
+        	_spline->angularAccelerationBodyFrameAndJacobian(_time, &J);
         	SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 3, "Bad");
         	SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
 
@@ -642,7 +630,7 @@ namespace aslam {
         	SM_ASSERT_EQ_DBG(aslam::Exception, applyChainRule.cols(), 3, "The chain rule matrix is the wrong size");
 
         	Eigen::MatrixXd J;
-        	_spline->angularAccelerationBodyFrameAndJacobian(_time, &J, NULL);
+        	_spline->angularAccelerationBodyFrameAndJacobian(_time, &J);
         	SM_ASSERT_EQ_DBG(aslam::Exception, J.rows(), 3, "Bad");
         	SM_ASSERT_EQ_DBG(aslam::Exception, J.cols(), 6 * (int)_designVariables.size(), "Bad");
 
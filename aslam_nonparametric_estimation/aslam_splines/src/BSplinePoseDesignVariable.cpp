@@ -1,5 +1,10 @@
 #include <aslam/splines/BSplinePoseDesignVariable.hpp>
 #include <aslam/splines/BSplineExpressions.hpp>
+#include <sm/kinematics/rotations.hpp>
+#include <sm/kinematics/transformations.hpp>
+#include <aslam/backend/ThreadPool.hpp>
+#include <boost/bind.hpp>
+#include <algorithm>
 
 
 namespace aslam {
@@ -7,24 +12,39 @@ namespace aslam {
     
         /// \brief this guy takes a copy.
         BSplinePoseDesignVariable::BSplinePoseDesignVariable(const bsplines::BSplinePose & bsplinePose) :
-            _bsplinePose(bsplinePose)
+            _bsplinePose(bsplinePose), _revision(0)
         {
             // here is where the magic happens.
 
             // Create all of the design variables as maps into the vector of spline coefficients.
             for(int i = 0; i < _bsplinePose.numVvCoefficients(); ++i)
             {
-                _designVariables.push_back( new aslam::backend::DesignVariableMappedVector<6>( _bsplinePose.fixedSizeVvCoefficientVector<6>(i) ) );
+                _designVariables.push_back( new CoefficientDesignVariable( this, _bsplinePose.fixedSizeVvCoefficientVector<6>(i) ) );
             }
+            resetEvaluationCache();
         }
     
+        BSplinePoseDesignVariable::BSplinePoseDesignVariable(const BSplinePoseDesignVariable & other) :
+            _bsplinePose(other._bsplinePose), _revision(0)
+        {
+            for(int i = 0; i < _bsplinePose.numVvCoefficients(); ++i)
+            {
+                _designVariables.push_back( new CoefficientDesignVariable( this, _bsplinePose.fixedSizeVvCoefficientVector<6>(i) ) );
+                _designVariables[i].setActive(other._designVariables[i].isActive());
+                _designVariables[i].setMarginalized(other._designVariables[i].isMarginalized());
+                _designVariables[i].setBlockIndex(other._designVariables[i].blockIndex());
+                _designVariables[i].setScaling(other._designVariables[i].scaling());
+            }
+            resetEvaluationCache();
+        }
+
         BSplinePoseDesignVariable::~BSplinePoseDesignVariable()
         {
 
         }
     
         /// \brief get the spline.
-        const bsplines::BSplinePose & BSplinePoseDesignVariable::spline()
+        const bsplines::BSplinePose & BSplinePoseDesignVariable::spline() const
         {
             return _bsplinePose;
         }
@@ -67,7 +87,7 @@ namespace aslam {
                 dvs.push_back(&_designVariables[dvidxs[i]]);
             }
       
-            boost::shared_ptr<BSplineTransformationExpressionNode> root( new BSplineTransformationExpressionNode(&_bsplinePose, dvs, tk) );
+            boost::shared_ptr<BSplineTransformationExpressionNode> root( new BSplineTransformationExpressionNode(this, dvs, tk) );
       
             return aslam::backend::TransformationExpression(root);
 
@@ -82,7 +102,7 @@ namespace aslam {
                 dvs.push_back(&_designVariables[dvidxs[i]]);
             }
       
-            boost::shared_ptr<BSplineRotationExpressionNode> root( new BSplineRotationExpressionNode(&_bsplinePose, dvs, tk) );
+            boost::shared_ptr<BSplineRotationExpressionNode> root( new BSplineRotationExpressionNode(this, dvs, tk) );
       
             return aslam::backend::RotationExpression(root);
       
@@ -97,7 +117,7 @@ namespace aslam {
                 dvs.push_back(&_designVariables[dvidxs[i]]);
             }
 	
-            boost::shared_ptr<BSplinePositionExpressionNode> root( new BSplinePositionExpressionNode(&_bsplinePose, dvs, tk) );
+            boost::shared_ptr<BSplinePositionExpressionNode> root( new BSplinePositionExpressionNode(this, dvs, tk) );
 	
             return aslam::backend::EuclideanExpression(root);
 
@@ -112,7 +132,7 @@ namespace aslam {
                 dvs.push_back(&_designVariables[dvidxs[i]]);
             }
 
-            boost::shared_ptr<BSplineVelocityExpressionNode> root( new BSplineVelocityExpressionNode(&_bsplinePose, dvs, tk) );
+            boost::shared_ptr<BSplineVelocityExpressionNode> root( new BSplineVelocityExpressionNode(this, dvs, tk) );
 
             return aslam::backend::EuclideanExpression(root);
 
@@ -127,7 +147,7 @@ namespace aslam {
                 dvs.push_back(&_designVariables[dvidxs[i]]);
             }
 	
-            boost::shared_ptr<BSplineAccelerationExpressionNode> root( new BSplineAccelerationExpressionNode(&_bsplinePose, dvs, tk) );
+            boost::shared_ptr<BSplineAccelerationExpressionNode> root( new BSplineAccelerationExpressionNode(this, dvs, tk) );
 	
             return aslam::backend::EuclideanExpression(root);
 
@@ -142,7 +162,7 @@ namespace aslam {
           dvs.push_back(&_designVariables[dvidxs[i]]);
         boost::shared_ptr<BSplineAccelerationBodyFrameExpressionNode> root(
           new BSplineAccelerationBodyFrameExpressionNode(
-          &_bsplinePose, dvs, tk));
+          this, dvs, tk));
         return aslam::backend::EuclideanExpression(root);
       }
 
@@ -155,7 +175,7 @@ namespace aslam {
                 dvs.push_back(&_designVariables[dvidxs[i]]);
             }
 	
-            boost::shared_ptr<BSplineAngularVelocityBodyFrameExpressionNode> root( new BSplineAngularVelocityBodyFrameExpressionNode(&_bsplinePose, dvs, tk) );
+            boost::shared_ptr<BSplineAngularVelocityBodyFrameExpressionNode> root( new BSplineAngularVelocityBodyFrameExpressionNode(this, dvs, tk) );
 	
             return aslam::backend::EuclideanExpression(root);
 
@@ -170,31 +190,54 @@ namespace aslam {
         		dvs.push_back(&_designVariables[dvidxs[i]]);
         	}
 
-        	boost::shared_ptr<BSplineAngularAccelerationBodyFrameExpressionNode> root( new BSplineAngularAccelerationBodyFrameExpressionNode(&_bsplinePose, dvs, tk) );
+        	boost::shared_ptr<BSplineAngularAccelerationBodyFrameExpressionNode> root( new BSplineAngularAccelerationBodyFrameExpressionNode(this, dvs, tk) );
 
         	return aslam::backend::EuclideanExpression(root);
 
         }
 
+        Eigen::MatrixXd BSplinePoseDesignVariable::transformPointsBatch(const Eigen::VectorXd & times, const Eigen::MatrixXd & points, size_t nThreads)
+        {
+            SM_ASSERT_EQ(aslam::Exception, points.cols(), times.size(), "There must be one time per point");
+            nThreads = std::max((size_t)1, std::min(nThreads, (size_t)times.size()));
+            if(nThreads == 1)
+            {
+                return _bsplinePose.transformPointsBatch(times, points);
+            }
+            Eigen::MatrixXd outPoints(3, points.cols());
+            aslam::backend::ThreadPool threadPool;
+            threadPool.run(nThreads, boost::bind(&BSplinePoseDesignVariable::transformPointsChunk, this, _1, nThreads, boost::cref(times), boost::cref(points), boost::ref(outPoints)));
+            return outPoints;
+        }
+
+        void BSplinePoseDesignVariable::transformPointsChunk(size_t threadId, size_t nThreads, const Eigen::VectorXd & times, const Eigen::MatrixXd & points, Eigen::MatrixXd & outPoints) const
+        {
+            const size_t start = threadId * times.size() / nThreads;
+            const size_t end = (threadId + 1) * times.size() / nThreads;
+            outPoints.middleCols(start, end - start) = _bsplinePose.transformPointsBatch(times.segment(start, end - start), points.middleCols(start, end - start));
+        }
+
         void BSplinePoseDesignVariable::addSegment(double t, Eigen::Matrix4d T)
         {
             _bsplinePose.addPoseSegment(t,T);
-            _designVariables.push_back( new aslam::backend::DesignVariableMappedVector<6>( _bsplinePose.fixedSizeVvCoefficientVector<6>(_bsplinePose.numVvCoefficients()-1) ) );
+            _designVariables.push_back( new CoefficientDesignVariable( this, _bsplinePose.fixedSizeVvCoefficientVector<6>(_bsplinePose.numVvCoefficients()-1) ) );
             for(int i = 0; i < _bsplinePose.numVvCoefficients()-1; i++)
             {
                 _designVariables[i].updateMap(_bsplinePose.fixedSizeVvCoefficientVector<6>(i).data());
             }
+            resetEvaluationCache();
         }
 
 
         void BSplinePoseDesignVariable::addSegment2(double t, Eigen::Matrix4d T, double lambda)
         {
             _bsplinePose.addPoseSegment2(t,T,lambda);
-            _designVariables.push_back( new aslam::backend::DesignVariableMappedVector<6>( _bsplinePose.fixedSizeVvCoefficientVector<6>(_bsplinePose.numVvCoefficients()-1) ) );
+            _designVariables.push_back( new CoefficientDesignVariable( this, _bsplinePose.fixedSizeVvCoefficientVector<6>(_bsplinePose.numVvCoefficients()-1) ) );
             for(int i = 0; i < _bsplinePose.numVvCoefficients()-1; i++)
             {
                 _designVariables[i].updateMap(_bsplinePose.fixedSizeVvCoefficientVector<6>(i).data());
-            }    
+            }
+            resetEvaluationCache();
         }
 
 
@@ -206,6 +249,7 @@ namespace aslam {
             {
                 _designVariables[i].updateMap(_bsplinePose.fixedSizeVvCoefficientVector<6>(i).data());
             }
+            resetEvaluationCache();
         }
 
         aslam::backend::TransformationExpression BSplinePoseDesignVariable::transformationAtTime(const aslam::backend::ScalarExpression & time)
@@ -221,5 +265,188 @@ namespace aslam {
 
         }
 
+        const BSplinePoseDesignVariable::Evaluation & BSplinePoseDesignVariable::evaluation(double tk, int derivativeOrder)
+        {
+            SegmentCache & cache = _segmentCaches[_bsplinePose.segmentIndex(tk)];
+            boost::mutex::scoped_lock lock(cache.mutex);
+            if(cache.revision != _revision)
+            {
+                cache.entries.clear();
+                cache.revision = _revision;
+            }
+
+            const std::pair<double, int> key(tk, derivativeOrder);
+            evaluation_cache_t::iterator it = cache.entries.find(key);
+            if(it == cache.entries.end())
+            {
+                // The Jacobian of the spline is kron(basis^T, I) so the basis values are read off the first row.
+                Eigen::MatrixXd JS;
+                ++cache.evaluations;
+                Evaluation & entry = cache.entries[key];
+                entry.value = _bsplinePose.evalDAndJacobian(tk, derivativeOrder, &JS, NULL);
+                const int D = entry.value.size();
+                entry.basis.resize(JS.cols() / D);
+                for(int i = 0; i < entry.basis.size(); ++i)
+                {
+                    entry.basis[i] = JS(0, i * D);
+                }
+                return entry;
+            }
+
+            return it->second;
+        }
+
+        const Eigen::VectorXd & BSplinePoseDesignVariable::evalDAndJacobian(double tk, int derivativeOrder, Eigen::MatrixXd * J)
+        {
+            const Evaluation & e = evaluation(tk, derivativeOrder);
+            if(J)
+            {
+                const int D = e.value.size();
+                J->setZero(D, e.basis.size() * D);
+                for(int i = 0; i < e.basis.size(); ++i)
+                {
+                    J->block(0, i * D, D, D).diagonal().setConstant(e.basis[i]);
+                }
+            }
+
+            return e.value;
+        }
+
+        const Eigen::VectorXd & BSplinePoseDesignVariable::evalD(double tk, int derivativeOrder)
+        {
+            return evaluation(tk, derivativeOrder).value;
+        }
+
+        Eigen::Matrix4d BSplinePoseDesignVariable::transformationAndJacobian(double tk, Eigen::MatrixXd * J)
+        {
+            const Evaluation & e = evaluation(tk, 0);
+
+            Eigen::MatrixXd JT;
+            Eigen::Matrix4d T = _bsplinePose.curveValueToTransformationAndJacobian(e.value, J ? &JT : NULL);
+            if(J)
+            {
+                // JT * kron(basis^T, I)
+                J->resize(6, e.basis.size() * 6);
+                for(int i = 0; i < e.basis.size(); ++i)
+                {
+                    J->block<6,6>(0, i * 6) = e.basis[i] * JT;
+                }
+            }
+
+            return T;
+        }
+
+        Eigen::Matrix3d BSplinePoseDesignVariable::orientationAndJacobian(double tk, Eigen::MatrixXd * J)
+        {
+            const Evaluation & e = evaluation(tk, 0);
+
+            Eigen::Matrix3d S;
+            Eigen::Matrix3d C = _bsplinePose.rotation()->parametersToRotationMatrix(e.value.tail<3>(), &S);
+            if(J)
+            {
+                J->setZero(3, e.basis.size() * 6);
+                for(int i = 0; i < e.basis.size(); ++i)
+                {
+                    J->block<3,3>(0, i * 6 + 3) = e.basis[i] * S;
+                }
+            }
+
+            return C;
+        }
+
+        Eigen::Vector3d BSplinePoseDesignVariable::angularVelocityBodyFrameAndJacobian(double tk, Eigen::MatrixXd * J)
+        {
+            return angularBodyFrameAndJacobian(tk, 1, J);
+        }
+
+        Eigen::Vector3d BSplinePoseDesignVariable::angularAccelerationBodyFrameAndJacobian(double tk, Eigen::MatrixXd * J)
+        {
+            return angularBodyFrameAndJacobian(tk, 2, J);
+        }
+
+        Eigen::Vector3d BSplinePoseDesignVariable::angularBodyFrameAndJacobian(double tk, int derivativeOrder, Eigen::MatrixXd * J)
+        {
+            const Evaluation & e = evaluation(tk, 0);
+            const Evaluation & ed = evaluation(tk, derivativeOrder);
+            const Eigen::Vector3d p = e.value.tail<3>();
+            const Eigen::Vector3d pdot = ed.value.tail<3>();
+
+            Eigen::Matrix3d S;
+            Eigen::Matrix3d C_b_w = _bsplinePose.rotation()->parametersToRotationMatrix(p, &S).transpose();
+
+            Eigen::Matrix<double,3,6> Jo;
+            Eigen::Vector3d omega = -C_b_w * _bsplinePose.rotation()->angularVelocityAndJacobian(p, pdot, &Jo);
+            if(J)
+            {
+                // Only the rotation parameters of the coefficients enter. The jacobian of p and pdot
+                // wrt. coefficient i is basis[i] and basisd[i] times identity, as in bsplines::BSplinePose.
+                const Eigen::Matrix<double,3,6> A = -C_b_w * Jo;
+                const Eigen::Matrix3d Jp = A.leftCols<3>() - sm::kinematics::crossMx(omega) * C_b_w * S;
+                const Eigen::Matrix3d Jpdot = A.rightCols<3>();
+                J->setZero(3, e.basis.size() * 6);
+                for(int i = 0; i < e.basis.size(); ++i)
+                {
+                    J->block<3,3>(0, i * 6 + 3) = e.basis[i] * Jp + ed.basis[i] * Jpdot;
+                }
+            }
+
+            return omega;
+        }
+
+        void BSplinePoseDesignVariable::clearEvaluationCache()
+        {
+            // The segment caches drop their entries on the next access.
+            ++_revision;
+        }
+
+        size_t BSplinePoseDesignVariable::numEvaluations() const
+        {
+            size_t evaluations = 0;
+            for(size_t i = 0; i < _segmentCaches.size(); ++i)
+            {
+                evaluations += _segmentCaches[i].evaluations;
+            }
+            return evaluations;
+        }
+
+        void BSplinePoseDesignVariable::resetEvaluationCache()
+        {
+            ++_revision;
+            _segmentCaches.clear();
+            for(int i = 0; i < _bsplinePose.numValidTimeSegments(); ++i)
+            {
+                _segmentCaches.push_back(new SegmentCache());
+            }
+        }
+
+        BSplinePoseDesignVariable::CoefficientDesignVariable::CoefficientDesignVariable(BSplinePoseDesignVariable * spline, Eigen::Map< dv_t::vector_t > v) :
+            dv_t(v), _spline(spline)
+        {
+
+        }
+
+        BSplinePoseDesignVariable::CoefficientDesignVariable::~CoefficientDesignVariable()
+        {
+
+        }
+
+        void BSplinePoseDesignVariable::CoefficientDesignVariable::revertUpdateImplementation()
+        {
+            dv_t::revertUpdateImplementation();
+            _spline->clearEvaluationCache();
+        }
+
+        void BSplinePoseDesignVariable::CoefficientDesignVariable::updateImplementation(const double * dp, int size)
+        {
+            dv_t::updateImplementation(dp, size);
+            _spline->clearEvaluationCache();
+        }
+
+        void BSplinePoseDesignVariable::CoefficientDesignVariable::setParametersImplementation(const Eigen::MatrixXd & value)
+        {
+            dv_t::setParametersImplementation(value);
+            _spline->clearEvaluationCache();
+        }
+
     } // namespace splines
 } // namespace aslam
@@ -310,3 +310,152 @@ TEST(BSplineExpressionTestSuite, testTransformationAtTimeExpression)
   
 }
 
+
+
+TEST(BSplineExpressionTestSuite, testEvaluationCache)
+{
+    try {
+        BSplinePoseDesignVariable bdv = generateRandomSpline();
+        const double t = 5.0;
+
+        for(int d = 0; d < 3; ++d)
+        {
+            Eigen::MatrixXd J, Jcached;
+            Eigen::VectorXd v = bdv.spline().evalDAndJacobian(t, d, &J, NULL);
+            // evaluate twice to read the second result from the cache
+            bdv.evalDAndJacobian(t, d, NULL);
+            Eigen::VectorXd vcached = bdv.evalDAndJacobian(t, d, &Jcached);
+            sm::eigen::assertNear(v, vcached, 1e-12, SM_SOURCE_FILE_POS, "Cached spline value");
+            sm::eigen::assertNear(J, Jcached, 1e-12, SM_SOURCE_FILE_POS, "Cached spline jacobian");
+        }
+
+        // hits return the cached entry itself
+        ASSERT_EQ(&bdv.evaluation(t, 0), &bdv.evaluation(t, 0));
+
+        Eigen::MatrixXd J, Jcached;
+        sm::eigen::assertNear(bdv.spline().angularVelocityBodyFrameAndJacobian(t, &J, NULL), bdv.angularVelocityBodyFrameAndJacobian(t, &Jcached), 1e-12, SM_SOURCE_FILE_POS, "Cached angular velocity");
+        sm::eigen::assertNear(J, Jcached, 1e-12, SM_SOURCE_FILE_POS, "Cached angular velocity jacobian");
+        sm::eigen::assertNear(bdv.spline().angularAccelerationBodyFrameAndJacobian(t, &J, NULL), bdv.angularAccelerationBodyFrameAndJacobian(t, &Jcached), 1e-12, SM_SOURCE_FILE_POS, "Cached angular acceleration");
+        sm::eigen::assertNear(J, Jcached, 1e-12, SM_SOURCE_FILE_POS, "Cached angular acceleration jacobian");
+        sm::eigen::assertNear(bdv.spline().orientationAndJacobian(t, &J, NULL), bdv.orientationAndJacobian(t, &Jcached), 1e-12, SM_SOURCE_FILE_POS, "Cached orientation");
+        sm::eigen::assertNear(J, Jcached, 1e-12, SM_SOURCE_FILE_POS, "Cached orientation jacobian");
+        sm::eigen::assertNear(bdv.spline().transformationAndJacobian(t, &J, NULL), bdv.transformationAndJacobian(t, &Jcached), 1e-12, SM_SOURCE_FILE_POS, "Cached transformation");
+        sm::eigen::assertNear(J, Jcached, 1e-12, SM_SOURCE_FILE_POS, "Cached transformation jacobian");
+
+        // updating a design variable must invalidate the cached evaluations
+        Eigen::VectorXi dvidxs = bdv.getActiveDesignVariableIndices(t);
+        Eigen::VectorXd dp = Eigen::VectorXd::Random(6);
+        DesignVariable * dv = bdv.designVariable(dvidxs[0]);
+        dv->update(dp.data(), 6);
+        sm::eigen::assertNear(bdv.spline().transformation(t), bdv.transformationAndJacobian(t, NULL), 1e-12, SM_SOURCE_FILE_POS, "Transformation after update");
+
+        dv->revertUpdate();
+        sm::eigen::assertNear(bdv.spline().transformation(t), bdv.transformationAndJacobian(t, NULL), 1e-12, SM_SOURCE_FILE_POS, "Transformation after revert");
+    }
+    catch(const std::exception & e)
+    {
+        FAIL() << e.what();
+    }
+
+}
+
+
+
+TEST(BSplineExpressionTestSuite, testEvaluationCacheAfterSplineChanges)
+{
+    try {
+        BSplinePoseDesignVariable bdv = generateRandomSpline();
+        const double t = 5.0;
+        Eigen::MatrixXd J, Jcached;
+
+        // fill the cache, then change the curve through each of the mutating methods
+        bdv.transformationAndJacobian(t, &Jcached);
+
+        Eigen::VectorXi dvidxs = bdv.getActiveDesignVariableIndices(t);
+        Eigen::MatrixXd coefficient = Eigen::VectorXd::Random(6);
+        bdv.designVariable(dvidxs[1])->setParameters(coefficient);
+        sm::eigen::assertNear(bdv.spline().transformationAndJacobian(t, &J, NULL), bdv.transformationAndJacobian(t, &Jcached), 1e-12, SM_SOURCE_FILE_POS, "Transformation after setting the parameters");
+        sm::eigen::assertNear(J, Jcached, 1e-12, SM_SOURCE_FILE_POS, "Transformation jacobian after setting the parameters");
+
+        const double tEnd = bdv.spline().t_max() - 1e-3;
+        bdv.transformationAndJacobian(tEnd, NULL);
+        bdv.addSegment(bdv.spline().t_max() + 1.0, Eigen::Matrix4d::Identity());
+        sm::eigen::assertNear(bdv.spline().transformation(tEnd), bdv.transformationAndJacobian(tEnd, NULL), 1e-12, SM_SOURCE_FILE_POS, "Transformation after adding a segment");
+        sm::eigen::assertNear(bdv.spline().transformation(t), bdv.transformationAndJacobian(t, NULL), 1e-12, SM_SOURCE_FILE_POS, "Transformation after adding a segment");
+
+        bdv.removeSegment();
+        sm::eigen::assertNear(bdv.spline().transformationAndJacobian(t, &J, NULL), bdv.transformationAndJacobian(t, &Jcached), 1e-12, SM_SOURCE_FILE_POS, "Transformation after removing a segment");
+        sm::eigen::assertNear(J, Jcached, 1e-12, SM_SOURCE_FILE_POS, "Transformation jacobian after removing a segment");
+    }
+    catch(const std::exception & e)
+    {
+        FAIL() << e.what();
+    }
+
+}
+
+
+
+TEST(BSplineExpressionTestSuite, testTransformationAtTimeUsesEvaluationCache)
+{
+    try {
+        BSplinePoseDesignVariable bdv = generateRandomSpline();
+        for(size_t i = 0; i < bdv.numDesignVariables(); ++i)
+        {
+            bdv.designVariable(i)->setBlockIndex(i + 1);
+        }
+
+        // two terms observed at the same frame time with a shared time offset
+        Scalar offset(0.25);
+        offset.setActive(true);
+        offset.setBlockIndex(0);
+        ScalarExpression time = offset.toExpression() + 5.0;
+        TransformationExpression T1 = bdv.transformationAtTime(time, 1.0, 1.0);
+        TransformationExpression T2 = bdv.transformationAtTime(time, 1.0, 1.0);
+
+        const size_t evaluationsBefore = bdv.numEvaluations();
+        sm::eigen::assertNear(bdv.spline().transformation(5.25), T1.toTransformationMatrix(), 1e-12, SM_SOURCE_FILE_POS, "Transformation at the offset time");
+        sm::eigen::assertNear(T1.toTransformationMatrix(), T2.toTransformationMatrix(), 1e-12, SM_SOURCE_FILE_POS, "Transformations at the same time");
+        JacobianContainer J1(6), J2(6);
+        T1.evaluateJacobians(J1);
+        T2.evaluateJacobians(J2);
+        sm::eigen::assertNear(J1.asDenseMatrix(), J2.asDenseMatrix(), 1e-12, SM_SOURCE_FILE_POS, "Jacobians at the same time");
+        // the value and the first derivative are evaluated once for both terms
+        ASSERT_EQ(evaluationsBefore + 2, bdv.numEvaluations());
+
+        // moving the offset evaluates the spline at the new time
+        double dt = 0.1;
+        offset.update(&dt, 1);
+        sm::eigen::assertNear(bdv.spline().transformation(5.35), T1.toTransformationMatrix(), 1e-12, SM_SOURCE_FILE_POS, "Transformation at the updated offset time");
+        T2.toTransformationMatrix();
+        ASSERT_EQ(evaluationsBefore + 3, bdv.numEvaluations());
+    }
+    catch(const std::exception & e)
+    {
+        FAIL() << e.what();
+    }
+
+}
+
+
+
+TEST(BSplineExpressionTestSuite, testTransformPointsBatch)
+{
+    try {
+        BSplinePoseDesignVariable bdv = generateRandomSpline();
+        Eigen::VectorXd times = Eigen::VectorXd::LinSpaced(101, bdv.spline().t_min(), bdv.spline().t_max());
+        times.segment(10, 5).setConstant(times[10]);
+        Eigen::MatrixXd points = Eigen::MatrixXd::Random(3, times.size());
+
+        Eigen::MatrixXd expected = bdv.spline().transformPointsBatch(times, points);
+        for(size_t nThreads = 1; nThreads < 5; ++nThreads)
+        {
+            sm::eigen::assertNear(bdv.transformPointsBatch(times, points, nThreads), expected, 1e-12, SM_SOURCE_FILE_POS, "Points transformed in parallel");
+        }
+    }
+    catch(const std::exception & e)
+    {
+        FAIL() << e.what();
+    }
+
+}
@@ -64,6 +64,7 @@ BOOST_PYTHON_MODULE(libaslam_splines_python)
         .def("linearAcceleration", &BSplinePoseDesignVariable::linearAcceleration)
         .def("position", &BSplinePoseDesignVariable::position)
         .def("orientation", &BSplinePoseDesignVariable::orientation)
+        .def("transformPointsBatch", &BSplinePoseDesignVariable::transformPointsBatch, "Transform the 3 x N points by the transformations at a sorted array of times using nThreads threads. Returns a 3 x N matrix")
         .def("transformationAtTime", transformationAtTime1)
         .def("transformationAtTime", transformationAtTime2);
         ;
@@ -260,6 +260,19 @@ namespace bsplines {
        */
       Eigen::VectorXd evalD(double t, int derivativeOrder) const;
 
+      /** 
+       * Evaluate the derivative of the spline curve at a sequence of times.
+       * The times must be sorted in increasing order. The segment of each
+       * time is found by advancing from the segment of the previous time,
+       * so no search over the knot sequence is done per sample.
+       * 
+       * @param times The sorted times to evaluate the spline derivative.
+       * @param derivativeOrder The order of the derivative. This must be >= 0
+       * 
+       * @return An N x D matrix. Row i is evalD(times[i], derivativeOrder).
+       */
+      Eigen::MatrixXd evalDBatch(const Eigen::VectorXd & times, int derivativeOrder) const;
+
       /** 
        * Evaluate the derivative of the spline curve at time t and retrieve the Jacobian
        * of the value with respect to small changes in the paramter vector. The Jacobian
@@ -607,6 +620,17 @@ namespace bsplines {
        */
       std::pair<double,int> computeTIndex(double t) const;
 
+      /** 
+       * Like computeUAndTIndex() but the segment is found by advancing
+       * the index of a previous segment. The time must not lie before that segment.
+       * 
+       * @param t The time being queried.
+       * @param segmentIndex The index of the previous segment. This is updated to the segment of t.
+       * 
+       * @return A pair with the first value \f$ u = \frac{t - t_i}{t_{i+1} - t_i} \f$ and the second value the index \f$i\f$
+       */
+      std::pair<double,int> advanceUAndTIndex(double t, int & segmentIndex) const;
+
       /** 
        * Compute the vector \f$ \mathbf u(t) \f$ for a spline of
        * order \f$ S \f$, this is an \f$ S \times 1 \f$ vector.
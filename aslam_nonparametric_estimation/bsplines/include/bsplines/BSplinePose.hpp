@@ -48,6 +48,11 @@ namespace bsplines {
 
 
       Eigen::Matrix4d transformation(double tk) const;
+      /// \brief The transformations at the sorted times. Row i holds transformation(times[i]) in row-major order.
+      Eigen::MatrixXd transformationBatch(const Eigen::VectorXd & times) const;
+      /// \brief Transform the 3 x N points by the transformations at the sorted times. Column i is transformation(times[i]) * points.col(i).
+      ///        Points sharing a time share one spline evaluation.
+      Eigen::MatrixXd transformPointsBatch(const Eigen::VectorXd & times, const Eigen::MatrixXd & points) const;
       Eigen::Matrix4d transformationAndJacobian(double tk, Eigen::MatrixXd * J = NULL, Eigen::VectorXi * coefficientIndices = NULL) const;
 
       Eigen::Matrix4d inverseTransformationAndJacobian(double tk, Eigen::MatrixXd * J = NULL, Eigen::VectorXi * coefficientIndices = NULL) const;
@@ -73,6 +78,8 @@ namespace bsplines {
 
       Eigen::Vector3d angularVelocity(double tk) const;
       Eigen::Vector3d angularVelocityBodyFrame(double tk) const;
+      /// \brief The body frame angular velocities at the sorted times as N x 3 matrix.
+      Eigen::MatrixXd angularVelocityBodyFrameBatch(const Eigen::VectorXd & times) const;
       Eigen::Vector3d angularVelocityBodyFrameAndJacobian(double tk, Eigen::MatrixXd * J, Eigen::VectorXi * coefficientIndices) const;
       
       Eigen::Vector3d angularVelocityAndJacobian(double tk, Eigen::MatrixXd * J, Eigen::VectorXi * coefficientIndices) const;
@@ -317,6 +317,31 @@ namespace bsplines {
       return u;
     }
 
+    std::pair<double,int> BSpline::advanceUAndTIndex(double t, int & segmentIndex) const
+    {
+      SM_ASSERT_GE(Exception, t, t_min(), "The time is out of range by " << (t - t_min()));
+      //// HACK - avoids numerical problems on initialisation (see computeTIndex)
+      if ( fabs(t_max() - t) < 1e-10 )
+        t = t_max();
+      SM_ASSERT_LE(Exception, t, t_max(), "The time is out of range by " << (t_max() - t));
+      SM_ASSERT_GE_DBG(Exception, t, knots_[segmentIndex], "The times must be sorted");
+
+      // The last valid segment. Evaluating at t_max() falls on this one, as in computeTIndex().
+      const int lastSegment = (int)knots_.size() - splineOrder_ - 1;
+      while(segmentIndex < lastSegment && knots_[segmentIndex + 1] <= t)
+        {
+          ++segmentIndex;
+        }
+
+      double denom = knots_[segmentIndex + 1] - knots_[segmentIndex];
+      if(denom <= 0.0)
+	{
+	  // The case of duplicate knots.
+	  return std::make_pair(0.0, segmentIndex);
+	}
+      return std::make_pair((t - knots_[segmentIndex]) / denom, segmentIndex);
+    }
+
     Eigen::VectorXd BSpline::eval(double t) const
     {
       return evalD(t,0);
@@ -348,6 +373,28 @@ namespace bsplines {
 
     }
 
+    Eigen::MatrixXd BSpline::evalDBatch(const Eigen::VectorXd & times, int derivativeOrder) const
+    {
+      SM_ASSERT_GE(Exception, derivativeOrder, 0, "To integrate, use the integral function");
+      Eigen::MatrixXd rv(times.size(), coefficients_.rows());
+      if(times.size() == 0)
+	{
+	  return rv;
+	}
+
+      int segmentIndex = computeTIndex(times[0]).second;
+      for(int i = 0; i < times.size(); ++i)
+	{
+	  SM_ASSERT_TRUE(Exception, i == 0 || times[i] >= times[i-1], "The times must be sorted. times[" << i << "] = " << times[i] << " < " << times[i-1]);
+	  std::pair<double,int> ui = advanceUAndTIndex(times[i], segmentIndex);
+	  Eigen::VectorXd u = computeU(ui.first, ui.second, derivativeOrder);
+	  int bidx = ui.second - splineOrder_ + 1;
+	  rv.row(i) = (coefficients_.block(0,bidx,coefficients_.rows(),splineOrder_) * basisMatrices_[bidx].transpose() * u).transpose();
+	}
+
+      return rv;
+    }
+
     Eigen::VectorXd BSpline::evalDAndJacobian(double t, int derivativeOrder, Eigen::MatrixXd * Jacobian, Eigen::VectorXi * coefficientIndices) const
     {
       SM_ASSERT_GE(Exception, derivativeOrder, 0, "To integrate, use the integral function");
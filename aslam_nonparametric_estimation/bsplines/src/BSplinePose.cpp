@@ -111,6 +111,47 @@ namespace bsplines {
       return T;
     }
     
+    Eigen::MatrixXd BSplinePose::transformationBatch(const Eigen::VectorXd & times) const
+    {
+      Eigen::MatrixXd p = evalDBatch(times,0);
+      Eigen::MatrixXd T(times.size(), 16);
+      for(int i = 0; i < times.size(); ++i)
+	{
+	  Eigen::Matrix<double,4,4,Eigen::RowMajor> Ti = curveValueToTransformation(p.row(i).transpose());
+	  T.row(i) = Eigen::Map< const Eigen::Matrix<double,1,16> >(Ti.data());
+	}
+      return T;
+    }
+
+    Eigen::MatrixXd BSplinePose::transformPointsBatch(const Eigen::VectorXd & times, const Eigen::MatrixXd & points) const
+    {
+      SM_ASSERT_EQ(Exception, points.rows(), 3, "The points must be the columns of a 3 x N matrix");
+      SM_ASSERT_EQ(Exception, points.cols(), times.size(), "There must be one time per point");
+      Eigen::VectorXd uniqueTimes(times.size());
+      int numUniqueTimes = 0;
+      for(int i = 0; i < times.size(); ++i)
+	{
+	  if(i == 0 || times[i] != times[i-1])
+	    {
+	      uniqueTimes[numUniqueTimes++] = times[i];
+	    }
+	}
+      // The batch evaluation checks that the times are sorted.
+      Eigen::MatrixXd p = evalDBatch(uniqueTimes.head(numUniqueTimes), 0);
+
+      Eigen::MatrixXd rv(3, points.cols());
+      Eigen::Matrix4d T;
+      for(int i = 0, j = -1; i < times.size(); ++i)
+	{
+	  if(i == 0 || times[i] != times[i-1])
+	    {
+	      T = curveValueToTransformation(p.row(++j).transpose());
+	    }
+	  rv.col(i) = T.topLeftCorner<3,3>() * points.col(i) + T.topRightCorner<3,1>();
+	}
+      return rv;
+    }
+
     Eigen::Matrix4d BSplinePose::inverseTransformation(double tk) const
     {
       Eigen::Matrix4d T = curveValueToTransformation(eval(tk));
@@ -218,6 +259,20 @@ namespace bsplines {
 
     }
 
+    Eigen::MatrixXd BSplinePose::angularVelocityBodyFrameBatch(const Eigen::VectorXd & times) const
+    {
+      Eigen::MatrixXd r = evalDBatch(times,0);
+      Eigen::MatrixXd v = evalDBatch(times,1);
+      Eigen::MatrixXd omega(times.size(), 3);
+      Eigen::Matrix3d S;
+      for(int i = 0; i < times.size(); ++i)
+	{
+	  Eigen::Matrix3d C_w_b = rotation_->parametersToRotationMatrix(r.row(i).tail<3>().transpose(), &S);
+	  omega.row(i) = (-C_w_b.transpose() * S * v.row(i).tail<3>().transpose()).transpose();
+	}
+      return omega;
+    }
+
     // \omega_b_{w,b} (angular velocity of the world frame as seen from the body frame, expressed in the body frame)
     Eigen::Vector3d BSplinePose::angularVelocityBodyFrameAndJacobian(double tk, Eigen::MatrixXd * J, Eigen::VectorXi * coefficientIndices) const
     {
@@ -262,6 +262,46 @@ TEST(SplineTestSuite, testBSplineAccelerationJacobian)
 
 
 
+TEST(SplineTestSuite, testBSplineBatchEvaluation)
+{
+  boost::shared_ptr<RotationalKinematics> r(new RotationVector());
+
+  for(int order = 2; order < 10; order++)
+    {
+      BSplinePose bs(order, r);
+      bs.initPoseSpline(0.0, 1.0, bs.curveValueToTransformation(Eigen::VectorXd::Random(6)),
+			bs.curveValueToTransformation(Eigen::VectorXd::Random(6)));
+      bs.addPoseSegment(2.0,bs.curveValueToTransformation(Eigen::VectorXd::Random(6)));
+
+      // include both ends of the valid time interval and a repeated time
+      Eigen::VectorXd times = Eigen::VectorXd::LinSpaced(25, bs.t_min(), bs.t_max());
+      times[5] = times[4];
+
+      Eigen::MatrixXd v = bs.evalDBatch(times, 1);
+      Eigen::MatrixXd T = bs.transformationBatch(times);
+      Eigen::MatrixXd omega = bs.angularVelocityBodyFrameBatch(times);
+      for(int i = 0; i < times.size(); ++i)
+	{
+	  sm::eigen::assertNear(v.row(i).transpose(), bs.evalD(times[i], 1), 1e-10, SM_SOURCE_FILE_POS);
+	  Eigen::Matrix<double,1,16> Trow = T.row(i);
+	  Eigen::Map< Eigen::Matrix<double,4,4,Eigen::RowMajor> > Ti(Trow.data());
+	  sm::eigen::assertNear(Ti, bs.transformation(times[i]), 1e-10, SM_SOURCE_FILE_POS);
+	  sm::eigen::assertNear(omega.row(i).transpose(), bs.angularVelocityBodyFrame(times[i]), 1e-10, SM_SOURCE_FILE_POS);
+	}
+
+      Eigen::MatrixXd points = Eigen::MatrixXd::Random(3, times.size());
+      Eigen::MatrixXd transformed = bs.transformPointsBatch(times, points);
+      for(int i = 0; i < times.size(); ++i)
+	{
+	  Eigen::Vector3d expected = (bs.transformation(times[i]) * points.col(i).homogeneous()).head<3>();
+	  sm::eigen::assertNear(transformed.col(i), expected, 1e-10, SM_SOURCE_FILE_POS);
+	}
+      ASSERT_THROW(bs.transformPointsBatch(times.reverse(), points), BSpline::Exception);
+    }
+}
+
+
+
 TEST(SplineTestSuite, testBSplineCurveQuadraticIntegralSparse) {
     
     try {
@@ -95,6 +95,8 @@ void import_bspline_pose_python()
   // This initialization actually works! boost::python is amazing.
   class_<BSplinePose, bases<BSpline> >("BSplinePose", init<int, const RotationalKinematics::Ptr &>())
     .def("transformation",&BSplinePose::transformation)
+    .def("transformationBatch",&BSplinePose::transformationBatch, "Evaluate the transformations at a sorted array of times. Returns an N x 16 matrix, use reshape((-1,4,4)) to get the N x 4 x 4 stack")
+    .def("transformPointsBatch",&BSplinePose::transformPointsBatch, "Transform the 3 x N points by the transformations at a sorted array of times. Returns a 3 x N matrix")
     .def("inverseTransformation",&BSplinePose::inverseTransformation)
     .def("initPoseSpline", &BSplinePose::initPoseSpline)
     .def("initPoseSpline2", &BSplinePose::initPoseSpline2)
@@ -117,6 +119,7 @@ void import_bspline_pose_python()
     .def("angularVelocity", &BSplinePose::angularVelocity)
     .def("angularVelocityAndJacobian", &angularVelocityAndJacobianWrapper)
     .def("angularVelocityBodyFrame", &BSplinePose::angularVelocityBodyFrame)
+    .def("angularVelocityBodyFrameBatch", &BSplinePose::angularVelocityBodyFrameBatch, "Evaluate the body frame angular velocities at a sorted array of times. Returns an N x 3 matrix")
     .def("angularVelocityBodyFrameAndJacobian", &angularVelocityBodyFrameAndJacobianWrapper)
     .def("angularAccelerationBodyFrame", &BSplinePose::angularAccelerationBodyFrame)
     .def("angularAccelerationBodyFrameAndJacobian", &angularAccelerationBodyFrameAndJacobianWrapper)
@@ -73,6 +73,7 @@ void import_bspline_python()
     .def("t_max", &BSpline::t_max, "The maximum time that the spline is well-defined on")
     .def("eval", &BSpline::eval, "Evaluate the spline curve at a point in time")
     .def("evalD", &BSpline::evalD, "Evaluate a spline curve derivative at a point in time")
+    .def("evalDBatch", &BSpline::evalDBatch, "Evaluate a spline curve derivative at a sorted array of times. Returns an N x D matrix")
     .def("Phi", &BSpline::Phi, "Evaluate the local basis matrix at a point in time")
     .def("localBasisMatrix", &BSpline::localBasisMatrix, "Evaluate the local basis matrix at a point in time")
     .def("localCoefficientMatrix", &BSpline::localCoefficientMatrix, "Get the matrix of locally-active coefficients for a specified time in matrix form")
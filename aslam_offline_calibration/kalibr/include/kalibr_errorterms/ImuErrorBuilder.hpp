@@ -0,0 +1,172 @@
+#ifndef KALIBR_IMU_ERROR_BUILDER_HPP
+#define KALIBR_IMU_ERROR_BUILDER_HPP
+
+#include <vector>
+
+#include <boost/shared_ptr.hpp>
+
+#include <aslam/backend/EuclideanExpression.hpp>
+#include <aslam/backend/MatrixExpression.hpp>
+#include <aslam/backend/MEstimatorPolicies.hpp>
+#include <aslam/backend/RotationExpression.hpp>
+#include <aslam/calibration/core/OptimizationProblem.h>
+#include <aslam/splines/BSplinePoseDesignVariable.hpp>
+#include <aslam/splines/EuclideanBSplineDesignVariable.hpp>
+#include <kalibr_errorterms/EuclideanError.hpp>
+
+namespace kalibr_errorterms {
+
+/// \brief Builds all gyroscope and accelerometer error terms of one IMU in a single call.
+///
+/// The measurements are passed as columnar arrays (one row per sample, the
+/// stamps already shifted into the pose spline time). The inverse covariance
+/// is either one 3 x 3 matrix shared by all samples or the 3 x 3 matrices of
+/// the samples stacked into a 3N x 3 array. Samples outside the spline time
+/// range are skipped. The base class implements the plain "Imu"
+/// model; the derived classes implement the scale-misalignment and the
+/// scale-misalignment-size-effect models.
+///
+/// The pose spline kinematics are read through the evaluation cache of the
+/// pose spline design variable, so the gyroscope and accelerometer terms of
+/// the same stamp share one evaluation of the spline and each of its first
+/// two derivatives per optimizer iteration.
+class ImuErrorBuilder {
+ public:
+  typedef boost::shared_ptr<EuclideanError> error_ptr_t;
+
+  /// \brief C_i_b: reference-to-imu rotation, r_b: imu position in the reference frame
+  ImuErrorBuilder(aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+                  const aslam::backend::RotationExpression & C_i_b,
+                  const aslam::backend::EuclideanExpression & r_b);
+  virtual ~ImuErrorBuilder();
+
+  /// \brief use time-invariant biases
+  void setStaticBias(const aslam::backend::EuclideanExpression & gyroBias,
+                     const aslam::backend::EuclideanExpression & accelBias);
+
+  /// \brief use bias splines evaluated at the sample time
+  void setBiasSplines(aslam::splines::EuclideanBSplineDesignVariable * gyroBias,
+                      aslam::splines::EuclideanBSplineDesignVariable * accelBias);
+
+  /// \brief create the gyroscope error terms and add them to the problem.
+  ///        Returns the number of error terms added.
+  size_t buildGyroscopeErrors(aslam::calibration::OptimizationProblem & problem,
+                              const Eigen::VectorXd & stamps,
+                              const Eigen::MatrixXd & omegas,
+                              const Eigen::MatrixXd & invR,
+                              const aslam::backend::EuclideanExpression & g_w,
+                              const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator);
+
+  /// \brief create the accelerometer error terms and add them to the problem.
+  ///        Returns the number of error terms added.
+  size_t buildAccelerometerErrors(aslam::calibration::OptimizationProblem & problem,
+                                  const Eigen::VectorXd & stamps,
+                                  const Eigen::MatrixXd & alphas,
+                                  const Eigen::MatrixXd & invR,
+                                  const aslam::backend::EuclideanExpression & g_w,
+                                  const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator);
+
+  /// \brief the created error terms
+  const std::vector<error_ptr_t> & gyroscopeErrors() const { return _gyroErrors; }
+  const std::vector<error_ptr_t> & accelerometerErrors() const { return _accelErrors; }
+
+ protected:
+  /// \brief the predicted angular velocity (without bias) at time tk
+  virtual aslam::backend::EuclideanExpression predictAngularVelocity(
+      double tk, const aslam::backend::EuclideanExpression & g_w);
+
+  /// \brief the predicted specific force (without bias) at time tk
+  virtual aslam::backend::EuclideanExpression predictAcceleration(
+      double tk, const aslam::backend::EuclideanExpression & g_w);
+
+  /// \brief the specific force in the body frame C_b_w (a_w - g_w)
+  aslam::backend::EuclideanExpression specificForce(
+      double tk, const aslam::backend::EuclideanExpression & g_w);
+
+  /// \brief tangential and centripetal acceleration of the point r_b on the body
+  aslam::backend::EuclideanExpression leverArmAcceleration(
+      double tk, const aslam::backend::EuclideanExpression & r_b);
+
+  aslam::backend::EuclideanExpression gyroBias(double tk);
+  aslam::backend::EuclideanExpression accelBias(double tk);
+
+  aslam::splines::BSplinePoseDesignVariable * _poseSplineDv;
+  aslam::backend::RotationExpression _C_i_b;
+  aslam::backend::EuclideanExpression _r_b;
+
+ private:
+  size_t build(aslam::calibration::OptimizationProblem & problem,
+               const Eigen::VectorXd & stamps,
+               const Eigen::MatrixXd & measurements,
+               const Eigen::MatrixXd & invR,
+               const aslam::backend::EuclideanExpression & g_w,
+               const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator,
+               bool gyroscope,
+               std::vector<error_ptr_t> & errors);
+
+  aslam::backend::EuclideanExpression _gyroBias;
+  aslam::backend::EuclideanExpression _accelBias;
+  aslam::splines::EuclideanBSplineDesignVariable * _gyroBiasSpline;
+  aslam::splines::EuclideanBSplineDesignVariable * _accelBiasSpline;
+
+  std::vector<error_ptr_t> _gyroErrors;
+  std::vector<error_ptr_t> _accelErrors;
+};
+
+/// \brief scale-misalignment model: w = M (C_gyro_b w_b) + Ma (C_gyro_b a_b), a = M_accel (C_i_b a_b)
+class ScaledMisalignedImuErrorBuilder : public ImuErrorBuilder {
+ public:
+  ScaledMisalignedImuErrorBuilder(aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+                                  const aslam::backend::RotationExpression & C_i_b,
+                                  const aslam::backend::EuclideanExpression & r_b,
+                                  const aslam::backend::MatrixExpression & M_accel,
+                                  const aslam::backend::RotationExpression & C_gyro_i,
+                                  const aslam::backend::MatrixExpression & M_gyro,
+                                  const aslam::backend::MatrixExpression & M_accel_gyro);
+  virtual ~ScaledMisalignedImuErrorBuilder();
+
+ protected:
+  virtual aslam::backend::EuclideanExpression predictAngularVelocity(
+      double tk, const aslam::backend::EuclideanExpression & g_w);
+  virtual aslam::backend::EuclideanExpression predictAcceleration(
+      double tk, const aslam::backend::EuclideanExpression & g_w);
+
+  aslam::backend::MatrixExpression _M_accel;
+  aslam::backend::RotationExpression _C_gyro_i;
+  aslam::backend::MatrixExpression _M_gyro;
+  aslam::backend::MatrixExpression _M_accel_gyro;
+};
+
+/// \brief scale-misalignment model with individual lever arms (size effect) per accelerometer axis
+class ScaledMisalignedSizeEffectImuErrorBuilder : public ScaledMisalignedImuErrorBuilder {
+ public:
+  ScaledMisalignedSizeEffectImuErrorBuilder(aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+                                            const aslam::backend::RotationExpression & C_i_b,
+                                            const aslam::backend::EuclideanExpression & r_b,
+                                            const aslam::backend::MatrixExpression & M_accel,
+                                            const aslam::backend::RotationExpression & C_gyro_i,
+                                            const aslam::backend::MatrixExpression & M_gyro,
+                                            const aslam::backend::MatrixExpression & M_accel_gyro,
+                                            const aslam::backend::EuclideanExpression & rx_i,
+                                            const aslam::backend::EuclideanExpression & ry_i,
+                                            const aslam::backend::EuclideanExpression & rz_i,
+                                            const aslam::backend::MatrixExpression & Ix,
+                                            const aslam::backend::MatrixExpression & Iy,
+                                            const aslam::backend::MatrixExpression & Iz);
+  virtual ~ScaledMisalignedSizeEffectImuErrorBuilder();
+
+ protected:
+  virtual aslam::backend::EuclideanExpression predictAcceleration(
+      double tk, const aslam::backend::EuclideanExpression & g_w);
+
+  aslam::backend::EuclideanExpression _rx_i;
+  aslam::backend::EuclideanExpression _ry_i;
+  aslam::backend::EuclideanExpression _rz_i;
+  aslam::backend::MatrixExpression _Ix;
+  aslam::backend::MatrixExpression _Iy;
+  aslam::backend::MatrixExpression _Iz;
+};
+
+}  // namespace kalibr_errorterms
+
+#endif /* KALIBR_IMU_ERROR_BUILDER_HPP */
@@ -0,0 +1,110 @@
+#ifndef KALIBR_LIDAR_PLANE_RANGE_ERROR_HPP
+#define KALIBR_LIDAR_PLANE_RANGE_ERROR_HPP
+
+#include <vector>
+
+#include <aslam/backend/ErrorTerm.hpp>
+#include <aslam/backend/ScalarExpression.hpp>
+#include <aslam/backend/TransformationExpression.hpp>
+#include <aslam/splines/BSplinePoseDesignVariable.hpp>
+
+namespace kalibr_errorterms {
+
+/// \brief The range errors of a block of LiDAR points on one planar target.
+///
+/// Point i is measured at the range r_i along the unit direction v_i in the
+/// LiDAR frame at the LiDAR time t_i. With
+///   T_p_l = T_p_w * T_w_b(t_i + dt) * T_l_b.inverse()
+/// the predicted range is the distance along v_i to the target plane z = 0,
+///   -n^T t_p_l / n^T (C_p_l v_i), n = [0 0 1]^T,
+/// and error i is the predicted minus the measured range. This is the same
+/// model as one ScalarError per point, but the residuals and Jacobians of all
+/// points are evaluated in one loop without building expression trees.
+///
+/// All ranges have the same variance, so the error term keeps the square root of
+/// the inverse variance as a scalar instead of a dense N x N matrix.
+///
+/// The points should lie within a few spline segments. The spline coefficients
+/// covering [min t_i + dt - leftBuffer, max t_i + dt + rightBuffer] are connected
+/// to the error term so the time offset dt may move within the buffers.
+class LiDARPlaneRangeError : public aslam::backend::ErrorTerm {
+ public:
+  EIGEN_MAKE_ALIGNED_OPERATOR_NEW
+
+  /// \brief points: N x 3 points in the LiDAR frame, stamps: N LiDAR times,
+  ///        invR: the inverse variance of a single range measurement
+  LiDARPlaneRangeError(const Eigen::MatrixXd & points,
+                       const Eigen::VectorXd & stamps,
+                       double invR,
+                       aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+                       const aslam::backend::ScalarExpression & timeOffset,
+                       double leftBuffer, double rightBuffer,
+                       const aslam::backend::TransformationExpression & T_l_b,
+                       const aslam::backend::TransformationExpression & T_p_w);
+  virtual ~LiDARPlaneRangeError();
+
+  /// \brief the measured ranges
+  const Eigen::VectorXd & getMeasurement() const { return _ranges; }
+
+  /// \brief the predicted ranges
+  Eigen::VectorXd getPredictedMeasurement();
+
+  /// \brief the predicted minus the measured ranges
+  const Eigen::VectorXd & error() const { return _error; }
+
+  virtual void getWeightedJacobians(aslam::backend::JacobianContainer & outJc, bool useMEstimator);
+  virtual void getWeightedError(Eigen::VectorXd & e, bool useMEstimator) const;
+
+  /// \brief the inverse covariance invR * I. It is built as a dense matrix on request only.
+  virtual void getInvR(Eigen::MatrixXd & invR) const;
+  virtual Eigen::MatrixXd vsInvR() const;
+  /// \brief set the inverse covariance, which must be a multiple of the identity
+  virtual void vsSetInvR(const Eigen::MatrixXd & invR);
+
+ protected:
+  /// \brief evaluate the error term and return the weighted squared error e^T invR e
+  virtual double evaluateErrorImplementation();
+
+  /// \brief evaluate the jacobian
+  virtual void evaluateJacobiansImplementation(
+      aslam::backend::JacobianContainer & _jacobians) const;
+
+  /// \brief build the hessian without a dense inverse covariance
+  virtual void buildHessianImplementation(aslam::backend::SparseBlockMatrix & outHessian,
+                                          Eigen::VectorXd & outRhs, bool useMEstimator);
+
+  virtual size_t getDimensionImplementation() const { return _ranges.size(); }
+
+  virtual Eigen::VectorXd vsErrorImplementation() const { return _error; }
+
+ private:
+  /// \brief the spline time of point i, checked against the buffered time range
+  double pointTime(int i, double timeOffset) const;
+
+  /// \brief the unsigned predicted range of point i given T_p_l
+  static double predictRange(const Eigen::Matrix4d & T_p_l, const Eigen::Vector3d & direction);
+
+  Eigen::VectorXd _ranges;
+  Eigen::VectorXd _error;
+  /// \brief the square root of the inverse variance of a single range
+  double _sqrtInvR;
+  Eigen::Matrix3Xd _directions;
+  Eigen::VectorXd _stamps;
+  /// \brief +1 or -1 to make the initial prediction of each point positive
+  Eigen::VectorXd _signs;
+
+  aslam::splines::BSplinePoseDesignVariable * _spline;
+  aslam::backend::ScalarExpression _timeOffset;
+  aslam::backend::TransformationExpression _T_l_b;
+  aslam::backend::TransformationExpression _T_p_w;
+
+  /// \brief the spline coefficients the times may move over and the time range they cover.
+  std::vector<aslam::backend::DesignVariable *> _bufferedDesignVariables;
+  int _bufferedMinIndex;
+  double _bufferTmin;
+  double _bufferTmax;
+};
+
+}  // namespace kalibr_errorterms
+
+#endif /* KALIBR_LIDAR_PLANE_RANGE_ERROR_HPP */
@@ -0,0 +1,55 @@
+#ifndef KALIBR_LIDAR_PLANE_RANGE_ERROR_BUILDER_HPP
+#define KALIBR_LIDAR_PLANE_RANGE_ERROR_BUILDER_HPP
+
+#include <vector>
+
+#include <boost/shared_ptr.hpp>
+
+#include <aslam/backend/ScalarExpression.hpp>
+#include <aslam/backend/TransformationExpression.hpp>
+#include <aslam/calibration/core/OptimizationProblem.h>
+#include <aslam/splines/BSplinePoseDesignVariable.hpp>
+#include <kalibr_errorterms/LiDARPlaneRangeError.hpp>
+
+namespace kalibr_errorterms {
+
+/// \brief Builds the range error terms of one LiDAR in blocks of points.
+///
+/// The points of a target are passed as columnar arrays in time order. They
+/// are split into runs of consecutive points within the same pose spline
+/// segment, with at most maxBlockSize points per run, and one
+/// LiDARPlaneRangeError is created for each run. The residuals of the
+/// returned error terms follow the order of the points.
+class LiDARPlaneRangeErrorBuilder {
+ public:
+  typedef boost::shared_ptr<LiDARPlaneRangeError> error_ptr_t;
+
+  /// \brief timeOffset: the LiDAR-to-spline time offset, T_l_b: reference-to-LiDAR transformation
+  LiDARPlaneRangeErrorBuilder(aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+                              const aslam::backend::ScalarExpression & timeOffset,
+                              double leftBuffer, double rightBuffer,
+                              const aslam::backend::TransformationExpression & T_l_b,
+                              size_t maxBlockSize);
+  virtual ~LiDARPlaneRangeErrorBuilder();
+
+  /// \brief create the error terms of the N x 3 points in the LiDAR frame on the target with
+  ///        the world-to-target transformation T_p_w and add them to the problem.
+  ///        Returns the created error terms.
+  std::vector<error_ptr_t> build(aslam::calibration::OptimizationProblem & problem,
+                                 const Eigen::MatrixXd & points,
+                                 const Eigen::VectorXd & stamps,
+                                 double invR,
+                                 const aslam::backend::TransformationExpression & T_p_w);
+
+ private:
+  aslam::splines::BSplinePoseDesignVariable * _poseSplineDv;
+  aslam::backend::ScalarExpression _timeOffset;
+  double _leftBuffer;
+  double _rightBuffer;
+  aslam::backend::TransformationExpression _T_l_b;
+  size_t _maxBlockSize;
+};
+
+}  // namespace kalibr_errorterms
+
+#endif /* KALIBR_LIDAR_PLANE_RANGE_ERROR_BUILDER_HPP */
@@ -0,0 +1,61 @@
+#ifndef KALIBR_LIDAR_REGISTRATION_ERROR_HPP
+#define KALIBR_LIDAR_REGISTRATION_ERROR_HPP
+
+#include <vector>
+
+#include <aslam/backend/ErrorTermDs.hpp>
+#include <aslam/backend/TransformationExpression.hpp>
+
+namespace kalibr_errorterms {
+
+/// \brief The point-to-point errors of a block of LiDAR points registered
+///        through the motion of the sensor the LiDAR is mounted on.
+///
+/// Point i is measured as p_i in the LiDAR frame and moved by the known sensor
+/// motion T_i to
+///   p'_i = T_b_l.inverse() * T_i * T_b_l * p_i
+/// Error i is p'_i minus its target point y_i, weighted by w_i. The targets and
+/// weights are set separately, so the same error terms can be reused over the
+/// iterations of an EM registration. This is the same model as one
+/// EuclideanError per point, but the residuals and Jacobians of all points are
+/// evaluated in one loop without building expression trees.
+class LiDARRegistrationError : public aslam::backend::ErrorTermDs {
+ public:
+  EIGEN_MAKE_ALIGNED_OPERATOR_NEW
+
+  /// \brief points: N x 3 points in the LiDAR frame, sensorTransforms: 4N x 4 stacked
+  ///        sensor motions T_i, T_b_l: the LiDAR-to-sensor transformation.
+  ///        The targets are initialized to the points with unit weights.
+  LiDARRegistrationError(const Eigen::MatrixXd & points,
+                         const Eigen::MatrixXd & sensorTransforms,
+                         const aslam::backend::TransformationExpression & T_b_l);
+  virtual ~LiDARRegistrationError();
+
+  /// \brief set the N x 3 target points and the N weights (inverse variances)
+  void setTargets(const Eigen::MatrixXd & targets, const Eigen::VectorXd & weights);
+
+  /// \brief the N x 3 target points
+  const Eigen::MatrixXd & getMeasurement() const { return _targets; }
+
+  /// \brief the N x 3 transformed points
+  Eigen::MatrixXd getPredictedMeasurement();
+
+ protected:
+  /// \brief evaluate the error term and return the weighted squared error e^T invR e
+  virtual double evaluateErrorImplementation();
+
+  /// \brief evaluate the jacobian
+  virtual void evaluateJacobiansImplementation(
+      aslam::backend::JacobianContainer & _jacobians) const;
+
+ private:
+  Eigen::Matrix4Xd _points;
+  std::vector<Eigen::Matrix4d, Eigen::aligned_allocator<Eigen::Matrix4d> > _sensorTransforms;
+  Eigen::MatrixXd _targets;
+
+  aslam::backend::TransformationExpression _T_b_l;
+};
+
+}  // namespace kalibr_errorterms
+
+#endif /* KALIBR_LIDAR_REGISTRATION_ERROR_HPP */
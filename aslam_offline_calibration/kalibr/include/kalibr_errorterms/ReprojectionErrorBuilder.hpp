@@ -0,0 +1,108 @@
+#ifndef KALIBR_REPROJECTION_ERROR_BUILDER_HPP
+#define KALIBR_REPROJECTION_ERROR_BUILDER_HPP
+
+#include <map>
+#include <vector>
+
+#include <boost/shared_ptr.hpp>
+
+#include <aslam/Frame.hpp>
+#include <aslam/backend/MEstimatorPolicies.hpp>
+#include <aslam/backend/ScalarExpression.hpp>
+#include <aslam/backend/SplinePoseReprojectionError.hpp>
+#include <aslam/backend/TransformationExpression.hpp>
+#include <aslam/calibration/core/OptimizationProblem.h>
+#include <aslam/splines/BSplinePoseDesignVariable.hpp>
+
+namespace kalibr_errorterms {
+
+/// \brief Builds all reprojection error terms of one camera in a single call.
+///
+/// The observations are passed as columnar arrays: one row per corner in
+/// imageCorners/targetCorners and one entry per (image, target) observation
+/// in cornerCounts/stamps/targetIds. For every observation inside the spline
+/// time range, the builder creates one SplinePoseReprojectionError per corner
+/// predicting the corner through
+///   T_c_p = T_c_b * T_w_b(stamp + timeOffset).inverse() * T_p_w.inverse()
+template<typename CAMERA_GEOMETRY_T>
+class ReprojectionErrorBuilder {
+ public:
+  typedef CAMERA_GEOMETRY_T camera_geometry_t;
+  typedef aslam::Frame<camera_geometry_t> frame_t;
+  typedef aslam::backend::SplinePoseReprojectionError<frame_t> error_t;
+  typedef boost::shared_ptr<error_t> error_ptr_t;
+  typedef typename error_t::measurement_t measurement_t;
+  typedef typename error_t::inverse_covariance_t inverse_covariance_t;
+
+  enum {
+    KeypointDimension = error_t::KeypointDimension
+  };
+
+  ReprojectionErrorBuilder(
+      const boost::shared_ptr<camera_geometry_t> & geometry,
+      aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+      const aslam::backend::TransformationExpression & T_c_b,
+      const aslam::backend::ScalarExpression & timeOffset,
+      double cornerSigma, double timeOffsetPadding);
+  virtual ~ReprojectionErrorBuilder();
+
+  /// \brief set the world-to-target transformation of a calibration target.
+  void setTargetTransformation(int targetId,
+                               const aslam::backend::TransformationExpression & T_p_w);
+
+  /// \brief set the M-estimator attached to every created error term.
+  void setMEstimatorPolicy(const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator);
+
+  /// \brief create the error terms and add them to the problem.
+  ///        Returns the number of error terms added.
+  size_t build(aslam::calibration::OptimizationProblem & problem,
+               const Eigen::MatrixXd & imageCorners,
+               const Eigen::MatrixXd & targetCorners,
+               const Eigen::VectorXi & cornerCounts,
+               const Eigen::VectorXd & stamps,
+               const Eigen::VectorXi & targetIds);
+
+  /// \brief the number of error terms created so far
+  size_t numErrorTerms() const;
+
+  /// \brief get error term i
+  error_ptr_t errorTerm(size_t i) const;
+
+  /// \brief the number of observations that produced error terms
+  size_t numObservations() const;
+
+  /// \brief the index (into the input arrays) of accepted observation i
+  int observationIndex(size_t i) const;
+
+  /// \brief the range [begin, end) of error terms belonging to accepted observation i
+  size_t observationBegin(size_t i) const;
+  size_t observationEnd(size_t i) const;
+
+  /// \brief evaluate all error terms and return e^T invR e for each of them
+  Eigen::VectorXd evaluateErrors();
+
+  /// \brief the last evaluated error vectors, one row per error term
+  Eigen::MatrixXd errors() const;
+
+ private:
+  boost::shared_ptr<camera_geometry_t> _geometry;
+  aslam::splines::BSplinePoseDesignVariable * _poseSplineDv;
+  aslam::backend::TransformationExpression _T_c_b;
+  aslam::backend::ScalarExpression _timeOffset;
+  inverse_covariance_t _invR;
+  double _timeOffsetPadding;
+
+  /// \brief target-to-world expressions indexed by target id
+  std::map<int, aslam::backend::TransformationExpression> _T_w_p;
+  boost::shared_ptr<aslam::backend::MEstimator> _mEstimator;
+
+  std::vector<error_ptr_t> _errorTerms;
+  std::vector<int> _observationIndices;
+  std::vector<size_t> _observationOffsets;
+};
+
+}  // namespace kalibr_errorterms
+
+#include "implementation/ReprojectionErrorBuilder.hpp"
+
+#endif /* KALIBR_REPROJECTION_ERROR_BUILDER_HPP */
@@ -0,0 +1,160 @@
+#include <aslam/Exceptions.hpp>
+
+namespace kalibr_errorterms {
+
+template<typename C>
+ReprojectionErrorBuilder<C>::ReprojectionErrorBuilder(
+    const boost::shared_ptr<camera_geometry_t> & geometry,
+    aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+    const aslam::backend::TransformationExpression & T_c_b,
+    const aslam::backend::ScalarExpression & timeOffset,
+    double cornerSigma, double timeOffsetPadding)
+    : _geometry(geometry),
+      _poseSplineDv(poseSplineDv),
+      _T_c_b(T_c_b),
+      _timeOffset(timeOffset),
+      _timeOffsetPadding(timeOffsetPadding) {
+  SM_ASSERT_TRUE(aslam::Exception, _geometry, "The camera geometry must not be null");
+  SM_ASSERT_TRUE(aslam::Exception, _poseSplineDv != NULL, "The pose spline must not be null");
+  SM_ASSERT_GT(aslam::Exception, cornerSigma, 0.0, "The corner uncertainty must be positive");
+  // One inverse covariance shared by all corners instead of one per observation.
+  _invR = inverse_covariance_t::Identity() / (cornerSigma * cornerSigma);
+  _observationOffsets.push_back(0);
+}
+
+template<typename C>
+ReprojectionErrorBuilder<C>::~ReprojectionErrorBuilder() {
+
+}
+
+template<typename C>
+void ReprojectionErrorBuilder<C>::setTargetTransformation(
+    int targetId, const aslam::backend::TransformationExpression & T_p_w) {
+  _T_w_p[targetId] = T_p_w.inverse();
+}
+
+template<typename C>
+void ReprojectionErrorBuilder<C>::setMEstimatorPolicy(
+    const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator) {
+  _mEstimator = mEstimator;
+}
+
+template<typename C>
+size_t ReprojectionErrorBuilder<C>::build(
+    aslam::calibration::OptimizationProblem & problem,
+    const Eigen::MatrixXd & imageCorners,
+    const Eigen::MatrixXd & targetCorners,
+    const Eigen::VectorXi & cornerCounts,
+    const Eigen::VectorXd & stamps,
+    const Eigen::VectorXi & targetIds) {
+  SM_ASSERT_EQ(aslam::Exception, imageCorners.cols(), (int) KeypointDimension,
+               "The image corners must have one column per keypoint dimension");
+  SM_ASSERT_EQ(aslam::Exception, targetCorners.cols(), 3,
+               "The target corners must be given as N x 3 array");
+  SM_ASSERT_EQ(aslam::Exception, imageCorners.rows(), targetCorners.rows(),
+               "The number of image and target corners must match");
+  SM_ASSERT_EQ(aslam::Exception, cornerCounts.size(), stamps.size(),
+               "One corner count per observation is required");
+  SM_ASSERT_EQ(aslam::Exception, targetIds.size(), stamps.size(),
+               "One target id per observation is required");
+  SM_ASSERT_EQ(aslam::Exception, (int) cornerCounts.sum(), imageCorners.rows(),
+               "The corner counts do not sum up to the number of corners");
+
+  const double tMin = _poseSplineDv->spline().t_min();
+  const double tMax = _poseSplineDv->spline().t_max();
+  const size_t numErrorTermsBefore = _errorTerms.size();
+  _errorTerms.reserve(numErrorTermsBefore + imageCorners.rows());
+
+  int cornerBase = 0;
+  for (int obs = 0; obs < stamps.size(); ++obs) {
+    const int numCorners = cornerCounts[obs];
+    const int cornerStart = cornerBase;
+    cornerBase += numCorners;
+
+    // as we are applying an initial time shift outside the optimization
+    // we need to make sure that we dont add data outside the spline definition
+    aslam::backend::ScalarExpression frameTime = _timeOffset + stamps[obs];
+    const double frameTimeScalar = frameTime.toScalar();
+    if (numCorners == 0 || frameTimeScalar <= tMin || frameTimeScalar >= tMax) {
+      continue;
+    }
+
+    typename std::map<int, aslam::backend::TransformationExpression>::const_iterator
+        target = _T_w_p.find(targetIds[obs]);
+    SM_ASSERT_TRUE(aslam::Exception, target != _T_w_p.end(),
+                   "No transformation set for target " << targetIds[obs]);
+
+    for (int i = cornerStart; i < cornerStart + numCorners; ++i) {
+      Eigen::Vector4d targetPoint;
+      targetPoint << targetCorners.row(i).transpose(), 1.0;
+
+      measurement_t y = imageCorners.row(i).transpose();
+      error_ptr_t rerr(new error_t(y, _invR, targetPoint, *_geometry, _poseSplineDv, frameTime,
+                                   _timeOffsetPadding, _timeOffsetPadding, _T_c_b, target->second));
+      if (_mEstimator) {
+        rerr->setMEstimatorPolicy(_mEstimator);
+      }
+      problem.addErrorTerm(rerr);
+      _errorTerms.push_back(rerr);
+    }
+
+    _observationIndices.push_back(obs);
+    _observationOffsets.push_back(_errorTerms.size());
+  }
+
+  return _errorTerms.size() - numErrorTermsBefore;
+}
+
+template<typename C>
+size_t ReprojectionErrorBuilder<C>::numErrorTerms() const {
+  return _errorTerms.size();
+}
+
+template<typename C>
+typename ReprojectionErrorBuilder<C>::error_ptr_t ReprojectionErrorBuilder<C>::errorTerm(size_t i) const {
+  SM_ASSERT_LT(aslam::Exception, i, _errorTerms.size(), "Index out of bounds");
+  return _errorTerms[i];
+}
+
+template<typename C>
+size_t ReprojectionErrorBuilder<C>::numObservations() const {
+  return _observationIndices.size();
+}
+
+template<typename C>
+int ReprojectionErrorBuilder<C>::observationIndex(size_t i) const {
+  SM_ASSERT_LT(aslam::Exception, i, _observationIndices.size(), "Index out of bounds");
+  return _observationIndices[i];
+}
+
+template<typename C>
+size_t ReprojectionErrorBuilder<C>::observationBegin(size_t i) const {
+  SM_ASSERT_LT(aslam::Exception, i, _observationIndices.size(), "Index out of bounds");
+  return _observationOffsets[i];
+}
+
+template<typename C>
+size_t ReprojectionErrorBuilder<C>::observationEnd(size_t i) const {
+  SM_ASSERT_LT(aslam::Exception, i, _observationIndices.size(), "Index out of bounds");
+  return _observationOffsets[i + 1];
+}
+
+template<typename C>
+Eigen::VectorXd ReprojectionErrorBuilder<C>::evaluateErrors() {
+  Eigen::VectorXd squaredErrors(_errorTerms.size());
+  for (size_t i = 0; i < _errorTerms.size(); ++i) {
+    squaredErrors[i] = _errorTerms[i]->evaluateError();
+  }
+  return squaredErrors;
+}
+
+template<typename C>
+Eigen::MatrixXd ReprojectionErrorBuilder<C>::errors() const {
+  Eigen::MatrixXd e(_errorTerms.size(), (int) KeypointDimension);
+  for (size_t i = 0; i < _errorTerms.size(); ++i) {
+    e.row(i) = _errorTerms[i]->error().transpose();
+  }
+  return e;
+}
+
+}  // namespace kalibr_errorterms
@@ -6,6 +6,7 @@ import functools
 import math
 import aslam_cv as cv
 import aslam_cv_backend as cvb
+import kalibr_errorterms as ket
 import sm
 
 
@@ -30,6 +31,7 @@ class AslamCamera(object):
                 self.frameType = cv.DistortedPinholeFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.DistortedPinholeReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.DistortedPinholeReprojectionErrorBuilder
                 self.undistorterType = cv.PinholeUndistorterNoMask
 
             elif dist_model == 'equidistant':
@@ -45,6 +47,7 @@ class AslamCamera(object):
                 self.frameType = cv.EquidistantDistortedPinholeFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.EquidistantDistortedPinholeReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.EquidistantDistortedPinholeReprojectionErrorBuilder
                 self.undistorterType = cv.EquidistantPinholeUndistorterNoMask
 
             elif dist_model == 'fov':
@@ -59,6 +62,7 @@ class AslamCamera(object):
                 self.frameType = cv.FovDistortedPinholeFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.FovDistortedPinholeReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.FovDistortedPinholeReprojectionErrorBuilder
                 self.undistorterType = cv.FovPinholeUndistorterNoMask
             elif dist_model == 'none':
                 proj = cv.PinholeProjection(focalLength[0], focalLength[1],
@@ -70,6 +74,7 @@ class AslamCamera(object):
                 self.frameType = cv.PinholeFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.PinholeReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.PinholeReprojectionErrorBuilder
             else:
                 self.raiseError("pinhole camera model does not support distortion model '{}'".format(dist_model))
 
@@ -92,6 +97,7 @@ class AslamCamera(object):
                 self.frameType = cv.DistortedOmniFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.DistortedOmniReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.DistortedOmniReprojectionErrorBuilder
                 self.undistorterType = cv.OmniUndistorterNoMask
 
             elif dist_model == 'equidistant':
@@ -111,6 +117,7 @@ class AslamCamera(object):
                 self.frameType = cv.DistortedOmniFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.EquidistantDistortedOmniReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.EquidistantDistortedOmniReprojectionErrorBuilder
 
             elif dist_model == 'none':
 
@@ -123,6 +130,7 @@ class AslamCamera(object):
                 self.frameType = cv.OmniFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.OmniReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.OmniReprojectionErrorBuilder
 
             else:
                 raise RuntimeError("omni camera model does not support distortion model '{}'".format(dist_model))
@@ -143,6 +151,7 @@ class AslamCamera(object):
                 self.frameType = cv.ExtendedUnifiedFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.ExtendedUnifiedReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.ExtendedUnifiedReprojectionErrorBuilder
 
             else:
                 raise RuntimeError(
@@ -164,6 +173,7 @@ class AslamCamera(object):
                 self.frameType = cv.DoubleSphereFrame
                 self.keypointType = cv.Keypoint2
                 self.reprojectionErrorType = cvb.DoubleSphereReprojectionErrorSimple
+                self.reprojectionErrorBuilderType = ket.DoubleSphereReprojectionErrorBuilder
             else:
                 raise RuntimeError(
                     "camera model {} does not support distortion model '{}'".format(camera_model, dist_model))
@@ -48,3 +48,60 @@ class BagLiDARDatasetReader(BagDatasetReaderWrapper):
         BagDatasetReaderWrapper.__init__(self, lidar_data_parser, bag_file,
                                          topic, bag_from_to,
                                          perform_synchronization)
+
+
+class LiDARPointStore(object):
+    """Stores the points of a LiDAR sequence frame by frame.
+
+    The frames are collected in chunks and copied into exactly sized arrays by
+    finalize(). The coordinates are stored with the given dtype and the stamps
+    as float64, since float32 can not resolve absolute stamps. Point i of
+    frame k is at index frameOffsets[k] + i. If a backing file is given, the
+    arrays are memory mapped from that file instead of held in memory.
+    """
+
+    def __init__(self, dtype=np.float32, backingFile=None):
+        self.dtype = np.dtype(dtype)
+        self.backingFile = backingFile
+        self.frameOffsets = [0]
+        self.xyz = None
+        self.stamps = None
+        self._xyzChunks = []
+        self._stampChunks = []
+
+    def append(self, points):
+        """Add a frame given as N x 4 array of x, y, z, stamp."""
+        self._xyzChunks.append(np.array(points[:, 0:3], dtype=self.dtype))
+        self._stampChunks.append(np.array(points[:, 3], dtype=np.float64))
+        self.frameOffsets.append(self.frameOffsets[-1] + points.shape[0])
+
+    def finalize(self):
+        """Copy the frames into the final arrays and release the chunks."""
+        numPoints = self.frameOffsets[-1]
+        if self.backingFile is None:
+            self.stamps = np.empty(numPoints, dtype=np.float64)
+            self.xyz = np.empty((numPoints, 3), dtype=self.dtype)
+        else:
+            # the stamps come first to keep both arrays aligned
+            self.stamps = np.memmap(self.backingFile, dtype=np.float64, mode='w+',
+                                    shape=(max(numPoints, 1),))[0:numPoints]
+            self.xyz = np.memmap(self.backingFile, dtype=self.dtype, mode='r+',
+                                 offset=self.stamps.itemsize * max(numPoints, 1),
+                                 shape=(max(numPoints, 1), 3))[0:numPoints]
+        for k, (xyz, stamps) in enumerate(zip(self._xyzChunks, self._stampChunks)):
+            self.xyz[self.frameOffsets[k]:self.frameOffsets[k + 1]] = xyz
+            self.stamps[self.frameOffsets[k]:self.frameOffsets[k + 1]] = stamps
+        self._xyzChunks = []
+        self._stampChunks = []
+        self.frameOffsets = np.array(self.frameOffsets)
+
+    def numFrames(self):
+        return len(self.frameOffsets) - 1
+
+    def frame(self, k):
+        """The coordinates and stamps of frame k."""
+        return self.xyz[self.frameOffsets[k]:self.frameOffsets[k + 1]], \
+               self.stamps[self.frameOffsets[k]:self.frameOffsets[k + 1]]
+
+    def __len__(self):
+        return self.frameOffsets[-1]
@@ -1,9 +1,13 @@
+import collections
+import multiprocessing
+
 import numpy as np
 import open3d as o3d
-from skimage.measure import LineModelND, ransac
 
 from util import showPointCloud
 
+TAPE_INTENSITY_THRESHOLD = 200
+
 
 def extract_plane_points(point_cloud):
     num_point_threshold = 20
@@ -18,39 +22,67 @@ def extract_plane_points(point_cloud):
 
 
 def find_points_on_tapes(point_cloud):
-    filtered_points = point_cloud[point_cloud[:, 4] > 200]
+    filtered_points = extract_tape_points(point_cloud)
     filtered_points = extract_plane_points(filtered_points)
     return filtered_points
 
 
+def fit_line_ransac(points_xyz, min_inliers, residual_threshold=0.03, max_trials=100):
+    # RANSAC on two point samples. All hypotheses are scored at once and the
+    # best one is refined by a least squares fit to its inliers. The line is
+    # returned as (centroid, unit direction) together with the inlier mask.
+    num_points = points_xyz.shape[0]
+    if num_points < max(min_inliers, 2):
+        return None, None
+    first = np.random.randint(0, num_points, max_trials)
+    second = np.random.randint(0, num_points - 1, max_trials)
+    second += second >= first
+    origins = points_xyz[first]
+    directions = points_xyz[second] - origins
+    norms = np.linalg.norm(directions, axis=1)
+    valid = norms > 1e-9
+    if not valid.any():
+        return None, None
+    origins = origins[valid]
+    directions = directions[valid] / norms[valid, np.newaxis]
+
+    # squared point-line distances, hypotheses x points
+    offsets = points_xyz[np.newaxis, :, :] - origins[:, np.newaxis, :]
+    along = np.einsum('hnk,hk->hn', offsets, directions)
+    distances = np.einsum('hnk,hnk->hn', offsets, offsets) - along ** 2
+    inliers = distances < residual_threshold ** 2
+    inliers = inliers[inliers.sum(axis=1).argmax()]
+    if np.count_nonzero(inliers) < max(min_inliers, 2):
+        return None, None
+
+    centroid = points_xyz[inliers].mean(axis=0)
+    direction = np.linalg.svd(points_xyz[inliers] - centroid, full_matrices=False)[2][0]
+    offsets = points_xyz - centroid
+    distances = np.einsum('nk,nk->n', offsets, offsets) - offsets.dot(direction) ** 2
+    inliers = distances < residual_threshold ** 2
+    if np.count_nonzero(inliers) < max(min_inliers, 2):
+        return None, None
+    return np.array([centroid, direction]), inliers
+
+
 def fitting_tapes_lines(point_cloud):
     points_xyz = point_cloud[:, :3]
     num_inlier_threshold = max(int(points_xyz.shape[0] / 8), 5)
-    try:
-        tape1_model, tape1_inliers = ransac(points_xyz,
-                                            LineModelND,
-                                            min_samples=num_inlier_threshold,
-                                            residual_threshold=0.03,
-                                            max_trials=100)
-    except Exception:
+    tape1_params, tape1_inliers = fit_line_ransac(points_xyz, num_inlier_threshold)
+    if tape1_params is None:
         return None, None
 
-    rest_points_xyz = point_cloud[~tape1_inliers, :3]
+    rest_points_xyz = points_xyz[~tape1_inliers]
     num_inlier_threshold = max(int(rest_points_xyz.shape[0] / 8), 5)
-    try:
-        tape2_model, tape2_inliers = ransac(rest_points_xyz,
-                                            LineModelND,
-                                            min_samples=num_inlier_threshold,
-                                            residual_threshold=0.03,
-                                            max_trials=100)
-    except Exception:
+    tape2_params, _ = fit_line_ransac(rest_points_xyz, num_inlier_threshold)
+    if tape2_params is None:
         return None, None
 
-    cosine_angle = np.dot(tape1_model.params[1], tape2_model.params[1])
+    cosine_angle = np.dot(tape1_params[1], tape2_params[1])
     if abs(cosine_angle) > 0.087156:  # ~cos(85)
         return None, None
 
-    return tape1_model.params, tape2_model.params
+    return tape1_params, tape2_params
 
 
 def estimate_intersection(line_params1, line_params2):
@@ -93,6 +125,71 @@ def calculate_direction(line_centroid, intersection):
         return axis_vector / norm
 
 
+def voxel_indices(points_xyz, voxel_size):
+    # a unique integer per voxel, only comparable within one call
+    cells = np.floor(points_xyz / voxel_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+    return np.ravel_multi_index(cells.T, cells.max(axis=0) + 1)
+
+
+def voxel_downsample(indices, points_xyz, voxel_size):
+    # the first of the indices in each voxel, in their original order
+    if indices.size == 0:
+        return indices
+    _, first = np.unique(voxel_indices(points_xyz[indices], voxel_size), return_index=True)
+    return indices[np.sort(first)]
+
+
+def thin_out(indices, num_points):
+    # every k-th index so that at most num_points remain
+    if indices.size <= num_points:
+        return indices
+    if num_points <= 0:
+        return indices[:0]
+    return indices[::int(np.ceil(float(indices.size) / num_points))]
+
+
+def downsample_point_cloud(point_cloud, num_points, voxel_size, target_position=None, roi_radius=0.0,
+                           roi_voxel_size=0.02):
+    # Keep the points within roi_radius of the target position at
+    # full density and spend the rest of the num_points budget on one point
+    # per voxel elsewhere. A region of interest larger than the budget is
+    # first voxel-downsampled to roi_voxel_size and only then thinned out,
+    # so no frame keeps more than num_points points.
+    point_cloud = point_cloud[np.isfinite(point_cloud[:, :3]).all(axis=1)]
+    if point_cloud.shape[0] == 0:
+        return point_cloud
+    if target_position is None:
+        in_roi = np.zeros(point_cloud.shape[0], dtype=bool)
+    else:
+        in_roi = np.linalg.norm(point_cloud[:, :3] - target_position, axis=1) < roi_radius
+    roi = np.flatnonzero(in_roi)
+    if roi.size > num_points:
+        roi = thin_out(voxel_downsample(roi, point_cloud[:, :3], roi_voxel_size), num_points)
+    rest = voxel_downsample(np.flatnonzero(~in_roi), point_cloud[:, :3], voxel_size)
+    rest = thin_out(rest, num_points - roi.size)
+    keep = np.zeros(point_cloud.shape[0], dtype=bool)
+    keep[roi] = True
+    keep[rest] = True
+    return point_cloud[keep]
+
+
+def interpolate_target_position(time, pose_times, positions, max_gap):
+    # The target position at time, linearly interpolated between the
+    # detections at the sorted pose_times around it. Outside the detections,
+    # or between two detections more than max_gap apart, there is no position
+    # and None is returned.
+    if len(pose_times) == 0 or not pose_times[0] <= time <= pose_times[-1]:
+        return None
+    k = np.searchsorted(pose_times, time)
+    if pose_times[k] == time:
+        return positions[k]
+    if pose_times[k] - pose_times[k - 1] > max_gap:
+        return None
+    weight = (time - pose_times[k - 1]) / (pose_times[k] - pose_times[k - 1])
+    return (1.0 - weight) * positions[k - 1] + weight * positions[k]
+
+
 def find_target_pose(point_cloud, show_point_cloud=False):
 
     tape_points = find_points_on_tapes(point_cloud)
@@ -116,12 +213,50 @@ def find_target_pose(point_cloud, show_point_cloud=False):
     orientation = estimate_rotation(axis_vector1, axis_vector2, position)
 
     if show_point_cloud:
-        transformed_points = np.dot(point_cloud[:, :3] - position,
-                                    orientation)
-        transformed_tape_points = np.dot(tape_points[:, :3] - position,
-                                         orientation)
-        coordinate = o3d.geometry.TriangleMesh.create_coordinate_frame(size=0.6)
-        showPointCloud([transformed_points, transformed_tape_points],
-                       [coordinate])
+        show_target_pose(point_cloud, tape_points, position, orientation)
 
     return position, orientation, timestamp
+
+
+def show_target_pose(point_cloud, tape_points, position, orientation):
+    transformed_points = np.dot(point_cloud[:, :3] - position,
+                                orientation)
+    transformed_tape_points = np.dot(tape_points[:, :3] - position,
+                                     orientation)
+    coordinate = o3d.geometry.TriangleMesh.create_coordinate_frame(size=0.6)
+    showPointCloud([transformed_points, transformed_tape_points],
+                   [coordinate])
+
+
+def extract_tape_points(point_cloud):
+    return point_cloud[point_cloud[:, 4] > TAPE_INTENSITY_THRESHOLD]
+
+
+def find_target_poses(frames, num_processes=None, max_pending=64):
+    # Detect the target in each frame on a process pool. The frames are
+    # (timestamp, tape_points) pairs in time order, see extract_tape_points,
+    # and at most max_pending of them wait for their detection at any time.
+    # The (position, orientation, timestamp) poses are yielded in the order
+    # of the frames, skipping the frames without a detection.
+    if not num_processes:
+        num_processes = max(1, multiprocessing.cpu_count() - 1)
+    pool = multiprocessing.Pool(num_processes)
+    pending = collections.deque()
+    last_timestamp = None
+    try:
+        for timestamp, tape_points in frames:
+            if last_timestamp is not None and timestamp < last_timestamp:
+                raise ValueError("The frames must be given in time order")
+            last_timestamp = timestamp
+            pending.append(pool.apply_async(find_target_pose, (tape_points,)))
+            while len(pending) > max_pending or (pending and pending[0].ready()):
+                pose = pending.popleft().get()
+                if pose is not None:
+                    yield pose
+        while pending:
+            pose = pending.popleft().get()
+            if pose is not None:
+                yield pose
+    finally:
+        pool.terminate()
+        pool.join()
@@ -2,6 +2,7 @@ from __future__ import print_function
 from __future__ import division
 
 from collections import namedtuple
+import multiprocessing
 import sys
 import numpy as np
 import aslam_backend as aopt
@@ -14,23 +15,70 @@ EstepResult = namedtuple('EstepResult', ['m0', 'm1', 'nx'])
 MstepResult = namedtuple('MstepResult', ['transformation', 'q'])
 
 class Permutohedral(object):
-    def __init__(self, p, with_blur=True):
+    def __init__(self, p, with_blur=True, num_threads=1):
         self._impl = sm.Permutohedral()
+        self._impl.set_num_threads(num_threads)
         self._impl.init(p.astype(np.float32).T, with_blur)
 
     def get_lattice_size(self):
         return self._impl.get_lattice_size()
 
+    def get_used_lattice_size(self):
+        return self._impl.get_used_lattice_size()
+
+    def update(self, p, start=0):
+        """Move the points start, ..., start + len(p) - 1 of the lattice to p."""
+        self._impl.update(p.astype(np.float32).T, start)
+
     def filter(self, v, start=0):
         return self._impl.filter(v.astype(np.float32).T, start).T.astype(np.float64)
 
 
 class LiDARToSensorCalibrator:
-    def __init__(self, source, sensor_tfs, target_normals=None):
+    def __init__(self, source, sensor_tfs, target_normals=None, block_size=64):
         self._source = source
-        self._sensor_tfs = sensor_tfs
+        self._sensor_tfs = np.asarray(sensor_tfs, dtype=np.float64)
         self._target_normals = target_normals
         self._tf_result = np.eye(4, dtype=np.float32)
+        # the number of correspondences per error term
+        self._block_size = block_size
+        self._num_threads = max(1, multiprocessing.cpu_count() - 1)
+        # the lattices with and without blur over the moving source and the fixed target features
+        self._ph = None
+        self._ph_no_blur = None
+
+    def transform_source(self, T_b_l):
+        """Move the source points by the sensor motions: T_b_l^-1 * T_i * T_b_l * p_i"""
+        T_l_b = np.linalg.inv(T_b_l)
+        tfs = np.einsum('ij,mjk,kl->mil', T_l_b, self._sensor_tfs, T_b_l)
+        return np.einsum('mij,mj->mi', tfs[:, :3, :3], self._source) + tfs[:, :3, 3]
+
+    def build_problem(self):
+        self.problem = aopt.OptimizationProblem()
+        self.T_b_l_Dv = aopt.TransformationDv(sm.Transformation(), rotationActive=True, translationActive=True)
+        for i in range(0, self.T_b_l_Dv.numDesignVariables()):
+            self.problem.addDesignVariable(self.T_b_l_Dv.getDesignVariable(i))
+
+        # the correspondences only change their targets and weights between the EM iterations
+        self.errors = []
+        source = np.asarray(self._source, dtype=np.float64)
+        for start in xrange(0, source.shape[0], self._block_size):
+            end = min(start + self._block_size, source.shape[0])
+            err = ket.LiDARRegistrationError(source[start:end],
+                                             self._sensor_tfs[start:end].reshape((-1, 4)),
+                                             self.T_b_l_Dv.toExpression())
+            self.errors.append((start, end, err))
+            self.problem.addErrorTerm(err)
+
+        options = aopt.Optimizer2Options()
+        options.verbose = False
+        options.linearSolver = aopt.BlockCholeskyLinearSystemSolver()
+        options.nThreads = 2
+        options.convergenceDeltaX = 1e-4
+        options.convergenceJDescentRatioThreshold = 1e-6
+        options.maxIterations = 50
+        self.optimizer = aopt.Optimizer2(options)
+        self.optimizer.setProblem(self.problem)
 
     def maximization_step(self, t_source, target, estep_res, w=0.0,
                            objective_type='pt2pt'):
@@ -43,41 +91,20 @@ class LiDARToSensorCalibrator:
         m1m0 = np.divide(m1.T, m0).T
         m0m0 = m0 / (m0 + c)
         drxdx = m0m0
-        errs = []
-        self.problem.clearAllErrorTerms()
         if objective_type == 'pt2pt':
-            for i in xrange(m):
-                T_l_l = self.T_b_l_Dv.toExpression().inverse() * \
-                        aopt.TransformationExpression(self._sensor_tfs[i]) * \
-                        self.T_b_l_Dv.toExpression()
-                predicted = T_l_l.toRotationExpression() * t_source[i] + T_l_l.toEuclideanExpression()
-                err = ket.EuclideanError(m1m0[i], drxdx[i]*np.eye(3, dtype=np.float64), predicted)
-                errs.append(err)
-                self.problem.addErrorTerm(err)
+            for start, end, err in self.errors:
+                err.setTargets(m1m0[start:end].astype(np.float64), drxdx[start:end].astype(np.float64))
         else:
             raise ValueError('Unknown objective_type: %s.' % objective_type)
 
-        # define the optimization
-        options = aopt.Optimizer2Options()
-        options.verbose = False
-        options.linearSolver = aopt.BlockCholeskyLinearSystemSolver()
-        options.nThreads = 2
-        options.convergenceDeltaX = 1e-4
-        options.convergenceJDescentRatioThreshold = 1e-6
-        options.maxIterations = 50
-
-        # run the optimization
-        optimizer = aopt.Optimizer2(options)
-        optimizer.setProblem(self.problem)
-
         # get the prior
         try:
-            optimizer.optimize()
+            self.optimizer.optimize()
         except:
             sm.logFatal("Failed to obtain orientation prior!")
             sys.exit(-1)
 
-        q = np.array([np.linalg.norm(e.error()) for e in errs]).sum()
+        q = np.hstack([np.linalg.norm(err.error().reshape((-1, 3)), axis=1) for _, _, err in self.errors]).sum()
         return MstepResult(self.T_b_l_Dv.toExpression().toTransformationMatrix(), q)
 
     def set_target_normals(self, target_normals):
@@ -94,22 +121,31 @@ class LiDARToSensorCalibrator:
         fy = target
         zero_m1 = np.zeros((m, 1))
         zeros_md = np.zeros((m, y.shape[1]))
-        fin = np.r_[fx, fy]
-        ph = Permutohedral(fin)
-        if ph.get_lattice_size() < n * alpha:
-            ph = Permutohedral(fin, False)
-        vin0 = np.r_[zero_m1, np.ones((n, 1))]
-        vin1 = np.r_[zeros_md, y]
-        m0 = ph.filter(vin0, m).flatten()[:m]
-        m1 = ph.filter(vin1, m)[:m]
-
-        if objective_type == 'pt2pt':
-            nx = None
-        elif objective_type == 'pt2pl':
-            vin = np.r_[zeros_md, self._target_normals]
-            nx = ph.filter(vin, m)[:m]
+        # The lattice with blur is kept up to date even when it is too coarse
+        # to filter with, as its size decides about the blur as the source moves.
+        if self._ph is None:
+            self._ph = Permutohedral(np.r_[fx, fy], num_threads=self._num_threads)
         else:
+            # only the source moves between the iterations
+            self._ph.update(fx)
+        ph = self._ph
+        if self._ph.get_used_lattice_size() < n * alpha:
+            if self._ph_no_blur is None:
+                self._ph_no_blur = Permutohedral(np.r_[fx, fy], False, num_threads=self._num_threads)
+            else:
+                self._ph_no_blur.update(fx)
+            ph = self._ph_no_blur
+        vin = [np.r_[zero_m1, np.ones((n, 1))], np.r_[zeros_md, y]]
+        if objective_type == 'pt2pl':
+            vin.append(np.r_[zeros_md, self._target_normals])
+        elif objective_type != 'pt2pt':
             raise ValueError('Unknown objective_type: %s.' % objective_type)
+
+        # filter all channels in one pass over the lattice
+        vout = ph.filter(np.hstack(vin), m)[:m]
+        m0 = vout[:, 0]
+        m1 = vout[:, 1:1 + y.shape[1]]
+        nx = vout[:, 1 + y.shape[1]:] if objective_type == 'pt2pl' else None
         return EstepResult(m0, m1, nx)
 
     def registration(self, target, w=0.0,
@@ -120,25 +156,15 @@ class LiDARToSensorCalibrator:
         ftarget = feature_fn(target)
 
         # build the problem
-        self.problem = aopt.OptimizationProblem()
-        T_init = np.array([[-0.99813747, -0.05730897, -0.02091093, 0.03399231],
-                           [0.05726434, -0.99835533, 0.00272772, 0.31433327],
-                           [-0.02103286, 0.00152519, 0.99977762, 0.22997991],
-                           [0., 0., 0., 1.]])
-        self.T_b_l_Dv = aopt.TransformationDv(sm.Transformation(), rotationActive=True, translationActive=True)
-        for i in range(0, self.T_b_l_Dv.numDesignVariables()):
-            self.problem.addDesignVariable(self.T_b_l_Dv.getDesignVariable(i))
+        self.build_problem()
+        self._ph = None
+        self._ph_no_blur = None
 
         for _ in range(maxiter):
             T_b_l = self.T_b_l_Dv.toExpression().toTransformationMatrix()
             print("Inital laser to body transformation: T_b_l ")
             print(T_b_l)
-            T_l_b = np.linalg.inv(T_b_l)
-
-            numPoints = self._source.shape[0]
-            source = np.hstack([self._source, np.ones((numPoints, 1), dtype=self._source.dtype)])
-            t_source = np.array([np.dot(T_l_b, np.dot(self._sensor_tfs[i], np.dot(T_b_l, source[i]))) for i in xrange(numPoints)])
-            t_source = t_source[:, :3]
+            t_source = self.transform_source(T_b_l)
             util.showPointCloud([t_source, target])
             fsource = feature_fn(t_source)
             estep_res = self.expectation_step(fsource, ftarget, target, objective_type)
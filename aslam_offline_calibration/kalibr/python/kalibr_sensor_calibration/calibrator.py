@@ -24,7 +24,7 @@ def addSplineDesignVariables(problem, dvc, setActive=True, group_id=HELPER_GROUP
         problem.addDesignVariable(dv, group_id)
 
 
-def optimize(problem, options=None, maxIterations=30):
+def optimize(problem, options=None, maxIterations=30, linearSolver=None, telemetryFile=None):
     if options is None:
         options = aopt.Optimizer2Options()
         options.verbose = True
@@ -35,7 +35,14 @@ def optimize(problem, options=None, maxIterations=30):
         options.convergenceJDescentRatioThreshold = 1e-6
         options.maxIterations = maxIterations
         options.trustRegionPolicy = aopt.LevenbergMarquardtTrustRegionPolicy(options.levenbergMarquardtLambdaInit)
-        options.linearSolver = aopt.BlockCholeskyLinearSystemSolver()
+        # a solver reused between runs keeps its symbolic factorization
+        # as long as the sparsity of the problem does not grow
+        if linearSolver is None:
+            linearSolver = aopt.BlockCholeskyLinearSystemSolver()
+        options.linearSolver = linearSolver
+        # append the statistics of every iteration as JSON lines
+        if telemetryFile is not None:
+            options.telemetryFile = telemetryFile
 
     # run the optimization
     optimizer = aopt.Optimizer2(options)
@@ -63,33 +70,43 @@ class Calibrator(object):
         self.ImuList = []
         self.LiDARList = []
         self.reference_sensor = reference_sensor
+        self.linearSolver = aopt.BlockCholeskyLinearSystemSolver()
 
     def registerLiDAR(self, sensor):
         self.LiDARList.append(sensor)
 
-    def constructLiDARErrorTerms(self, threshold=0.1, noTimeCalibration=False):
+    def constructLiDARErrorTerms(self, threshold=0.1, noTimeCalibration=False, incremental=True):
+        # In incremental mode only the error terms whose points changed their
+        # association are replaced, otherwise all are rebuilt.
         for lidar in self.LiDARList:
             lidar.setTimeOffsetActive(noTimeCalibration)
             lidar.findPointsOnTarget(self.poseDv, threshold=threshold)
-            lidar.removeLiDARErrorTerms(self.problem)
-            lidar.addLiDARErrorTerms(self.problem, self.poseDv)
+            if incremental:
+                lidar.updateLiDARErrorTerms(self.problem, self.poseDv)
+            else:
+                lidar.removeLiDARErrorTerms(self.problem)
+                lidar.addLiDARErrorTerms(self.problem, self.poseDv)
 
-    def optimize(self, options=None, maxIterations=30, recoverCov=False):
-        optimize(self.problem, options, maxIterations=maxIterations)
+    def optimize(self, options=None, maxIterations=30, recoverCov=False, covarianceMethod="cholesky",
+                 telemetryFile=None):
+        optimize(self.problem, options, maxIterations=maxIterations,
+                 linearSolver=self.linearSolver, telemetryFile=telemetryFile)
 
         if self.LiDARList:
             num = 3
             for i in xrange(1, num):
                 self.constructLiDARErrorTerms(0.3 / i,
                                               self.noTimeCalibration or i == 1)
-                optimize(self.problem, maxIterations=maxIterations//i)
+                optimize(self.problem, maxIterations=maxIterations//i,
+                         linearSolver=self.linearSolver, telemetryFile=telemetryFile)
 
             for lidar in self.LiDARList:
-                lidar.filterLiDARErrorTerms(self.problem, 1.0)
-            optimize(self.problem, maxIterations=maxIterations)
+                lidar.filterLiDARErrorTerms(self.problem, self.poseDv, 1.0)
+            optimize(self.problem, maxIterations=maxIterations,
+                     linearSolver=self.linearSolver, telemetryFile=telemetryFile)
 
         if recoverCov:
-            self.recoverCovariance()
+            self.recoverCovariance(covarianceMethod)
 
     def initDesignVariables(self, problem, poseSpline, noTimeCalibration, \
                             estimateGravityLength=False, initialGravityEstimate=np.array([0.0, 9.81, 0.0])):
@@ -233,21 +250,45 @@ class Calibrator(object):
         # Add a gravity prior
         self.problem = problem
 
-    def recoverCovariance(self):
+    def recoverCovariance(self, method="cholesky"):
         # Covariance ordering (=dv ordering)
         # ORDERING:   N=num cams
         #            1. transformation imu-cam0 --> 6
         #            2. camera time2imu --> 1*numCams (only if enabled)
 
         print "Recovering covariance..."
-        estimator = inc.IncrementalEstimator(CALIBRATION_GROUP_ID)
-        rval = estimator.addBatch(self.problem, True)
-        est_stds = np.sqrt(estimator.getSigma2Theta().diagonal())
+        if method == "incremental":
+            estimator = inc.IncrementalEstimator(CALIBRATION_GROUP_ID)
+            rval = estimator.addBatch(self.problem, True)
+            est_stds = np.sqrt(estimator.getSigma2Theta().diagonal())
+        else:
+            est_stds = np.sqrt(self.calibrationCovariance().diagonal())
 
         # split and store the variance
         self.std_trafo_ic = np.array(est_stds[0:6])
         self.std_times = np.array(est_stds[6:])
 
+    def calibrationCovariance(self, lambdaConditioner=0.0):
+        # Only the blocks of the calibration group are recovered from the
+        # Cholesky factor of the Hessian (selected inversion).
+        calibrationDvs = []
+        for i in range(0, self.problem.numDesignVariables()):
+            dv = self.problem.designVariable(i)
+            if dv.isActive() and self.problem.getGroupId(dv) == CALIBRATION_GROUP_ID:
+                calibrationDvs.append(dv)
+
+        options = aopt.Optimizer2Options()
+        options.nThreads = max(1, multiprocessing.cpu_count() - 1)
+        options.linearSolver = self.linearSolver
+        optimizer = aopt.Optimizer2(options)
+        optimizer.setProblem(self.problem)
+        optimizer.initialize()
+        P = optimizer.computeMarginalCovariance(calibrationDvs, lambdaConditioner)
+
+        del optimizer
+        gc.collect()
+        return P
+
     def saveImuSetParametersYaml(self, resultFile):
         imuSetConfig = kc.ImuSetParameters(resultFile, self.reference_sensor, True)
         for imu in self.ImuList:
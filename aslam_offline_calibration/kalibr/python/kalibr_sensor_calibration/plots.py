@@ -92,7 +92,7 @@ def plotAccelBias(cself, imu_idx, fno=1, clearFigure=True, noShow=False):
     bias = imu.accelBiasDv.spline()
     times = np.array([im.stamp.toSec() for im in imu.imuData if im.stamp.toSec() > bias.t_min() \
                       and im.stamp.toSec() < bias.t_max() ])
-    acc_bias_spline = np.array([bias.evalD(t,0) for t in times]).T
+    acc_bias_spline = bias.evalDBatch(times, 0).T
     times = times - times[0]     #remove time offset
 
     plotVectorOverTime(times, acc_bias_spline, 
@@ -112,7 +112,7 @@ def plotAngularVelocityBias(cself, imu_idx, fno=1, clearFigure=True, noShow=Fals
     bias = imu.gyroBiasDv.spline()
     times = np.array([im.stamp.toSec() for im in imu.imuData if im.stamp.toSec() > bias.t_min() \
                       and im.stamp.toSec() < bias.t_max() ])
-    gyro_bias_spline = np.array([bias.evalD(t,0) for t in times]).T
+    gyro_bias_spline = bias.evalDBatch(times, 0).T
     times = times - times[0]     #remove time offset
     
     plotVectorOverTime(times, gyro_bias_spline, 
@@ -9,9 +9,11 @@ import kalibr_errorterms as ket
 import calibrator as ic
 from LiDARToSensorCalibration import *
 import util as util
-from FindTargetFromPointCloud import find_target_pose
+from FindTargetFromPointCloud import find_target_poses, extract_tape_points, show_target_pose, \
+    interpolate_target_position, downsample_point_cloud
 import cv2
 import sys
+import os
 import math
 import numpy as np
 import pylab as pl
@@ -22,6 +24,7 @@ import open3d as o3d
 import colorsys
 import random
 import Queue
+import multiprocessing
 # from matplotlib import rc
 # # make numpy print prettier
 # np.set_printoptions(suppress=True)
@@ -131,6 +134,40 @@ class CalibrationTarget(object):
         self.T_p_w_Dv = aopt.TransformationBasicDv(self.C_t_w_Dv.toExpression(), self.t_t_w_Dv.toExpression())
 
 
+class VoxelHash(object):
+    """The points of a 3 x N point cloud hashed into cubic voxels."""
+    def __init__(self, points, voxelSize):
+        self.voxelSize = voxelSize
+        if points.shape[1] == 0:
+            self.origin = np.zeros(3, dtype=np.int64)
+            self.shape = np.zeros(3, dtype=np.int64)
+            self.order = np.zeros(0, dtype=np.int64)
+            self.keys = np.zeros(0, dtype=np.int64)
+            return
+        cells = np.floor(points / voxelSize).astype(np.int64)
+        self.origin = cells.min(axis=1)
+        cells -= self.origin.reshape((3, 1))
+        self.shape = cells.max(axis=1) + 1
+        keys = np.ravel_multi_index(cells, self.shape)
+        self.order = np.argsort(keys, kind='mergesort')
+        self.keys = keys[self.order]
+
+    def queryBox(self, lower, upper):
+        """The indices of the points in the voxels overlapping an axis-aligned box, in ascending order."""
+        lo = np.maximum(np.floor(np.ravel(lower) / self.voxelSize).astype(np.int64) - self.origin, 0)
+        hi = np.minimum(np.floor(np.ravel(upper) / self.voxelSize).astype(np.int64) - self.origin, self.shape - 1)
+        if (hi < lo).any():
+            return np.zeros(0, dtype=np.int64)
+        # the voxels along the last axis of one column have consecutive keys
+        x, y = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1), indexing='ij')
+        first = np.ravel_multi_index((x.ravel(), y.ravel(), np.full(x.size, lo[2])), self.shape)
+        starts = np.searchsorted(self.keys, first, side='left')
+        ends = np.searchsorted(self.keys, first + (hi[2] - lo[2]), side='right')
+        lengths = ends - starts
+        positions = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return np.sort(self.order[positions])
+
+
 class LiDAR:
     def __init__(self, config, parsed, targets, distanceSigma=2e-2):
         self.dataset = initLiDARBagDataset(parsed.bagfile[0], config.getRosTopic(),
@@ -150,46 +187,80 @@ class LiDAR:
         self.invR = 1. / np.array([self.distanceUncertainty ** 2])
 
         self.timeOffsetPadding = parsed.timeoffset_padding
-
-        self.loadLiDARDataAndFindTarget(config.getReservedPointsPerFrame())
+        # the number of points per range error term
+        self.errorTermBlockSize = 64
+        # the size of the voxels the points off the targets are thinned out to
+        self.voxelSize = parsed.lidar_voxel_size
+        # the longest time between two tape detections the target position is interpolated over
+        self.maxTargetPositionGap = 1.0
+        # the size of the voxels the world-frame points are hashed into to find the points on the targets
+        self.associationVoxelSize = 0.25
+        # the world-frame points of the last association and how far each may have moved since
+        self.worldPoints = None
+        self.pointMotion = None
+        self.pointValid = None
+        # the interval the LiDAR-to-world transformation is sampled at to bound the motion of the points
+        self.motionSampleInterval = 0.01
+        self.motionSampleTimes = None
+        self.motionSamples = None
+
+        pointStoreFile = None
+        if parsed.lidar_point_cache is not None:
+            pointStoreFile = os.path.join(parsed.lidar_point_cache,
+                                          config.getRosTopic().strip('/').replace('/', '_') + '.points')
+        self.loadLiDARDataAndFindTarget(config.getReservedPointsPerFrame(), pointStoreFile)
 
     class TargetObservation(object):
         def __init__(self):
+            # the indices of the inliers into lidarPoints
             self.inliers = None
             self.errorTerms = []
+            # the inliers covered by each error term
+            self.blocks = []
+            # the time offset each error term was built with
+            self.blockOffsets = []
 
 
-    def loadLiDARDataAndFindTarget(self, reservedPointsPerFrame):
+    def loadLiDARDataAndFindTarget(self, reservedPointsPerFrame, pointStoreFile=None):
         print "Reading LiDAR data ({0})".format(self.dataset.topic)
 
+        # detect the target by tapes on every fifth frame while the extrinsics are unknown
+        self.targetPoses = []
+        if not self.hasInitializedExtrinsics:
+            detectionFrames = (self.dataset.getData(i) for i in self.dataset.indices[::5])
+            self.targetPoses = list(find_target_poses((timestamp.toSec(), extract_tape_points(cloud))
+                                                      for timestamp, cloud in detectionFrames))
+        poseTimes = np.array([time for _, _, time in self.targetPoses])
+        positions = np.array([position for position, _, _ in self.targetPoses])
+
         iProgress = sm.Progress2(self.dataset.numMessages())
         iProgress.sample()
-        self.targetPoses = []
-        reserved_num_points = self.dataset.numMessages()*reservedPointsPerFrame*2
-        self.lidarData = np.zeros((reserved_num_points, 4), dtype=float)
-        idx = 0
-        num_points = 0
-        for timestamp, cloud in self.dataset:
-            interval = max(1, cloud.shape[0] // reservedPointsPerFrame)
-            downsampled_cloud = cloud[::interval, 0:4]
-            num = downsampled_cloud.shape[0]
-            self.lidarData[num_points:num_points+num] = downsampled_cloud
-            num_points += num
-            if not self.hasInitializedExtrinsics and idx % 5 == 0:
-                targetPose = find_target_pose(cloud, self.showPointCloud)
-                if targetPose is not None:
-                    self.targetPoses.append(targetPose)
-
-            idx += 1
+        self.lidarPoints = kc.LiDARPointStore(backingFile=pointStoreFile)
+        # The whole target lies within its diagonal of its position. The position is only known
+        # between the tape detections. With given extrinsics there are none, as the pose spline
+        # that would predict it is not built yet, and the frames are voxel-downsampled only.
+        roiRadius = max(np.linalg.norm(plane.range[1] - plane.range[0]) for plane in self.planes)
+        for idx, (timestamp, cloud) in enumerate(self.dataset):
+            targetPosition = interpolate_target_position(timestamp.toSec(), poseTimes, positions,
+                                                         self.maxTargetPositionGap)
+            self.lidarPoints.append(downsample_point_cloud(cloud, reservedPointsPerFrame, self.voxelSize,
+                                                           targetPosition, roiRadius)[:, 0:4])
+            if self.showPointCloud and idx % 5 == 0:
+                # show the detection of this frame, if any, on its full cloud
+                k = np.searchsorted(poseTimes, cloud[:, 3].min())
+                if k < poseTimes.size and poseTimes[k] <= cloud[:, 3].max():
+                    position, orientation, _ = self.targetPoses[k]
+                    show_target_pose(cloud, extract_tape_points(cloud), position, orientation)
+
             iProgress.sample()
 
-        np.resize(self.lidarData, (num_points, 4))
+        self.lidarPoints.finalize()
         numFrames = self.dataset.numMessages()
-        numPoints = self.lidarData.shape[0]
+        numPoints = len(self.lidarPoints)
         numFramesWithTapes = len(self.targetPoses)
-        timeSpan = self.lidarData[-1, 3] - self.lidarData[0, 3]
 
         if numPoints > 100:
+            timeSpan = self.lidarPoints.stamps[-1] - self.lidarPoints.stamps[0]
             print "\r  Read %d LiDAR readings from %d frames over %.1f seconds, and " \
                   "detect target by tapes from %d frames                    " \
                   % (numPoints, numFrames, timeSpan, numFramesWithTapes)
@@ -197,44 +268,121 @@ class LiDAR:
             sm.logFatal("Could not find any LiDAR messages. Please check the dataset.")
             sys.exit(-1)
 
-    def transformMeasurementsToWorldFrame(self, poseSplineDv):
-        t_min = poseSplineDv.spline().t_min()
-        t_max = poseSplineDv.spline().t_max()
-        tk = self.lidarData[:, 3] + self.lidarOffsetDv.toScalar()
-        indices = np.bitwise_and(tk > t_min, tk < t_max)
-        lidarData = self.lidarData[indices, :]
-        tk = tk[indices]
+    def _validIndices(self, poseSplineDv):
+        # the points whose shifted time stamps lie within the spline
+        tk = self.lidarPoints.stamps + self.lidarOffsetDv.toScalar()
+        return np.flatnonzero(np.bitwise_and(tk > poseSplineDv.spline().t_min(),
+                                             tk < poseSplineDv.spline().t_max()))
+
+    def _transformToWorldFrame(self, poseSplineDv, indices):
+        tk = self.lidarPoints.stamps[indices] + self.lidarOffsetDv.toScalar()
         T_b_l = np.linalg.inv(self.T_l_b_Dv.T())
         C_b_l = T_b_l[0:3, 0:3]
         t_b_l = T_b_l[0:3, 3:]
-        points = lidarData[:, 0:3].T
+        points = self.lidarPoints.xyz[indices].T
         points = C_b_l.dot(points) + t_b_l
 
-        pointsInWorldFrame = []
-        for i, time in enumerate(tk):
-            T_w_b = poseSplineDv.transformation(time).toTransformationMatrix()
-            p_l = np.append(points[:, i], 1.0)
-            p_w = np.dot(T_w_b, p_l)
-            pointsInWorldFrame.append(p_w[0:3])
+        # transform the points in time order and scatter them back
+        order = np.argsort(tk, kind='mergesort')
+        nThreads = max(1, multiprocessing.cpu_count() - 1)
+        pointsInWorldFrame = np.empty(points.shape)
+        pointsInWorldFrame[:, order] = poseSplineDv.transformPointsBatch(tk[order], points[:, order], nThreads)
+        return pointsInWorldFrame
 
-        return lidarData, np.asarray(pointsInWorldFrame).T
+    def transformMeasurementsToWorldFrame(self, poseSplineDv):
+        indices = self._validIndices(poseSplineDv)
+        return indices, self._transformToWorldFrame(poseSplineDv, indices)
+
+    def _updateMotionBound(self, poseSplineDv):
+        """Grow the bound on how far each stored world-frame point may have moved.
+
+        The LiDAR-to-world transformation is sampled on a fixed time grid. A
+        point moves at most by the change of the rotation times its range plus
+        the change of the translation at the samples around its time stamp.
+        """
+        stamps = self.lidarPoints.stamps
+        if self.motionSampleTimes is None:
+            t0 = stamps.min()
+            numBins = int(np.floor((stamps.max() - t0) / self.motionSampleInterval)) + 1
+            self.motionSampleTimes = t0 + self.motionSampleInterval * np.arange(numBins + 1)
+            self.motionBins = np.minimum(((stamps - t0) / self.motionSampleInterval).astype(np.int64),
+                                         numBins - 1)
+            self.pointRanges = np.linalg.norm(self.lidarPoints.xyz, axis=1)
+        spline = poseSplineDv.spline()
+        times = np.clip(self.motionSampleTimes + self.lidarOffsetDv.toScalar(), spline.t_min(), spline.t_max())
+        T_w_b = spline.transformationBatch(times).reshape((-1, 4, 4))
+        T_w_l = np.einsum('nij,jk->nik', T_w_b, np.linalg.inv(self.T_l_b_Dv.T()))
+        if self.motionSamples is not None:
+            rotation = np.linalg.norm(T_w_l[:, 0:3, 0:3] - self.motionSamples[:, 0:3, 0:3], ord=2, axis=(1, 2))
+            translation = np.linalg.norm(T_w_l[:, 0:3, 3] - self.motionSamples[:, 0:3, 3], axis=1)
+            rotation = np.maximum(rotation[:-1], rotation[1:])
+            translation = np.maximum(translation[:-1], translation[1:])
+            self.pointMotion += rotation[self.motionBins] * self.pointRanges + translation[self.motionBins]
+        self.motionSamples = T_w_l
+
+    def _refreshWorldPoints(self, poseSplineDv, indices):
+        if indices.size > 0:
+            self.worldPoints[:, indices] = self._transformToWorldFrame(poseSplineDv, indices)
+            self.pointMotion[indices] = 0.0
+
+    def _boxCorners(self, plane, threshold):
+        # the corners of the bounding box of a target in the world frame
+        min_range = plane.range[0] - np.array([[0], [0], [threshold]])
+        max_range = plane.range[1] + np.array([[0], [0], [threshold]])
+        corners = np.array([[x, y, z] for x in (min_range[0, 0], max_range[0, 0])
+                            for y in (min_range[1, 0], max_range[1, 0])
+                            for z in (min_range[2, 0], max_range[2, 0])]).T
+        C_p_w = plane.C_t_w_Dv.toRotationMatrix()
+        t_p_w = plane.t_t_w_Dv.toEuclidean().reshape((3, 1))
+        return np.dot(C_p_w.T, corners - t_p_w)
 
-    def _onPlane(self, plane, points, threshold=0.1):
+    def _boxMargins(self, plane, points, threshold):
+        # the distance of each point inside the box to its faces, negative outside
         min_range = plane.range[0] - np.array([[0], [0], [threshold]])
         max_range = plane.range[1] + np.array([[0], [0], [threshold]])
         C_p_w = plane.C_t_w_Dv.toRotationMatrix()
         t_p_w = plane.t_t_w_Dv.toEuclidean()
         p = np.dot(C_p_w, points) + t_p_w.reshape((3, 1))
-        return np.where(np.alltrue(np.logical_and(p > min_range, p < max_range), axis=0))[0]
+        return np.minimum(p - min_range, max_range - p).min(axis=0)
 
     def findPointsOnTarget(self, poseSplineDv, threshold=0.1):
-
-        self.lidarData, self.pointCloud = self.transformMeasurementsToWorldFrame(poseSplineDv)
+        """Find the inliers of each target.
+
+        The world-frame points of the last call are kept. Only the points that
+        entered the spline and those that could have crossed a face of a target
+        box since their last transformation are transformed and tested again.
+        """
+        valid = self._validIndices(poseSplineDv)
+        if self.worldPoints is None:
+            self.worldPoints = np.zeros((3, len(self.lidarPoints)))
+            self.pointMotion = np.zeros(len(self.lidarPoints))
+            self.pointValid = np.zeros(len(self.lidarPoints), dtype=bool)
+        self._updateMotionBound(poseSplineDv)
+        self._refreshWorldPoints(poseSplineDv, valid[~self.pointValid[valid]])
+        self.pointValid[:] = False
+        self.pointValid[valid] = True
+
+        voxelHash = VoxelHash(self.worldPoints[:, valid], self.associationVoxelSize)
+        maxMotion = self.pointMotion[valid].max() if valid.size > 0 else 0.0
+        inliers = []
+        uncertain = []
+        for plane in self.planes:
+            corners = self._boxCorners(plane, threshold)
+            candidates = valid[voxelHash.queryBox(corners.min(axis=1) - maxMotion, corners.max(axis=1) + maxMotion)]
+            margins = self._boxMargins(plane, self.worldPoints[:, candidates], threshold)
+            inliers.append(candidates[margins > self.pointMotion[candidates]])
+            uncertain.append(candidates[np.fabs(margins) <= self.pointMotion[candidates]])
+
+        # the points close to a face are transformed and tested exactly
+        self._refreshWorldPoints(poseSplineDv, np.unique(np.concatenate(uncertain)))
+        for obs, plane, certain, candidates in zip(self.targetObs, self.planes, inliers, uncertain):
+            margins = self._boxMargins(plane, self.worldPoints[:, candidates], threshold)
+            obs.inliers = np.union1d(certain, candidates[margins > 0])
+
+        self.pointCloud = self.worldPoints[:, valid]
         geometries = []
         interval = 1.0 / len(self.planes)
         for idx, plane in enumerate(self.planes):
-            self.targetObs[idx].inliers = self._onPlane(plane, self.pointCloud, threshold)
-
             if self.showPointCloud:
                 min_range = plane.range[0] - np.array([[0], [0], [threshold]])
                 max_range = plane.range[1] + np.array([[0], [0], [threshold]])
@@ -268,51 +416,84 @@ class LiDAR:
             problem.addDesignVariable(self.T_l_b_Dv.getDesignVariable(i), ic.CALIBRATION_GROUP_ID)
 
     def removeLiDARErrorTerms(self, problem):
+        errorTerms = [error for obs in self.targetObs for error in obs.errorTerms]
+        problem.removeErrorTerms(errorTerms)
         for obs in self.targetObs:
-            for error in obs.errorTerms:
-                problem.removeErrorTerm(error)
+            obs.errorTerms = []
+            obs.blocks = []
+            obs.blockOffsets = []
+
+    def _buildLiDARErrorTerms(self, problem, builder, plane, inliers):
+        # the error terms cover runs of consecutive points, so build them in time order
+        inliers = inliers[np.argsort(self.lidarPoints.stamps[inliers], kind='mergesort')]
+        errorTerms = builder.build(problem, self.lidarPoints.xyz[inliers].astype(float),
+                                   self.lidarPoints.stamps[inliers], float(self.invR[0]),
+                                   plane.T_p_w_Dv.toExpression())
+        ends = np.cumsum([error.dimension() for error in errorTerms])
+        return errorTerms, np.split(inliers, ends[:-1])
+
+    def _createBuilder(self, poseSplineDv):
+        return ket.LiDARPlaneRangeErrorBuilder(poseSplineDv, self.lidarOffsetDv.toExpression(),
+                                               self.timeOffsetPadding, self.timeOffsetPadding,
+                                               self.T_l_b_Dv.toExpression(), self.errorTermBlockSize)
 
     def addLiDARErrorTerms(self, problem, poseSplineDv):
+        builder = self._createBuilder(poseSplineDv)
+        offset = self.lidarOffsetDv.toScalar()
         for idx, obs in enumerate(self.targetObs):
-            obs.errorTerms = []
-            plane_normal = aopt.EuclideanExpression(np.array([0.0, 0.0, 1.0]))
-
-            for i in obs.inliers:
-                tk = self.lidarOffsetDv.toExpression() + self.lidarData[i, 3]
-                T_w_b = poseSplineDv.transformationAtTime(tk, self.timeOffsetPadding, self.timeOffsetPadding)
-
-                point = self.lidarData[i, 0:3]
-                distance = np.linalg.norm(point)
-                dir_l = point / distance
-                T_b_l = self.T_l_b_Dv.toExpression().inverse()
-                T_w_l = T_w_b * T_b_l
-                T_p_l = self.planes[idx].T_p_w_Dv.toExpression() * T_w_l
-                C_p_l = T_p_l.toRotationExpression()
-                t_p = T_p_l.toEuclideanExpression()
-
-                d = plane_normal.dot(t_p)
-                theta = plane_normal.dot(C_p_l * dir_l)
-
-                predictedMeasurement = d / theta * -1.0
-
-                if predictedMeasurement.toScalar() < 0.:
-                    predictedMeasurement = predictedMeasurement * -1.0
-                    print "Swapped sign! This should not happen normally!"
-
-                error = ket.ScalarError(distance, self.invR,
-                                       predictedMeasurement)
-
-                obs.errorTerms.append(error)
-                problem.addErrorTerm(error)
-
-    def filterLiDARErrorTerms(self, problem, threshold_scale_factor):
+            obs.errorTerms, obs.blocks = self._buildLiDARErrorTerms(problem, builder, self.planes[idx], obs.inliers)
+            obs.blockOffsets = [offset] * len(obs.errorTerms)
+            obs.inliers = np.concatenate(obs.blocks) if obs.blocks else obs.inliers[:0]
+
+    def updateLiDARErrorTerms(self, problem, poseSplineDv):
+        """Bring the error terms in line with the current inliers of each target.
+
+        Only the error terms covering points that are no longer inliers are
+        removed. Their remaining points and the new inliers are added as new
+        error terms, while all other error terms stay in the problem.
+
+        An error term only connects the spline coefficients within the time
+        offset padding around the offset it was built with, so a term is
+        rebuilt once the offset has moved by half the padding since then.
+        """
+        builder = self._createBuilder(poseSplineDv)
+        offset = self.lidarOffsetDv.toScalar()
+        removed = []
+        for idx, obs in enumerate(self.targetObs):
+            keep = np.zeros(len(obs.blocks), dtype=bool)
+            if obs.blocks:
+                # the blocks all of whose points are still inliers
+                lengths = np.array([len(block) for block in obs.blocks])
+                isInlier = np.in1d(np.concatenate(obs.blocks), obs.inliers)
+                keep = np.add.reduceat(isInlier, np.cumsum(lengths) - lengths) == lengths
+                keep &= np.fabs(offset - np.array(obs.blockOffsets)) < 0.5 * self.timeOffsetPadding
+            removed.extend(error for error, k in zip(obs.errorTerms, keep) if not k)
+            errorTerms = [error for error, k in zip(obs.errorTerms, keep) if k]
+            blocks = [block for block, k in zip(obs.blocks, keep) if k]
+            blockOffsets = [blockOffset for blockOffset, k in zip(obs.blockOffsets, keep) if k]
+            covered = np.concatenate(blocks) if blocks else obs.inliers[:0]
+            newErrorTerms, newBlocks = self._buildLiDARErrorTerms(problem, builder, self.planes[idx],
+                                                                  np.setdiff1d(obs.inliers, covered))
+            obs.errorTerms = errorTerms + newErrorTerms
+            obs.blocks = blocks + newBlocks
+            obs.blockOffsets = blockOffsets + [offset] * len(newErrorTerms)
+            # keep the inliers in the order of the residuals
+            obs.inliers = np.concatenate(obs.blocks) if obs.blocks else obs.inliers[:0]
+        problem.removeErrorTerms(removed)
+
+    def lidarResiduals(self, obs):
+        """The range residual of each inlier of a target observation."""
+        if not obs.errorTerms:
+            return np.array([])
+        return np.hstack([error.error() for error in obs.errorTerms])
+
+    def filterLiDARErrorTerms(self, problem, poseSplineDv, threshold_scale_factor):
         for obs in self.targetObs:
-            residuals = np.hstack([error_terms.error() for error_terms in obs.errorTerms])
+            residuals = self.lidarResiduals(obs)
             residual_threshold = threshold_scale_factor * np.std(residuals)
-            inliers = np.where(np.fabs(residuals) <= residual_threshold)[0]
-            obs.inliers = obs.inliers[inliers]
-            for inlier in inliers:
-                problem.removeErrorTerm(obs.errorTerms[inlier])
+            obs.inliers = obs.inliers[np.fabs(residuals) <= residual_threshold]
+        # an error term covers several points, so rebuild the terms that lost points
+        self.updateLiDARErrorTerms(problem, poseSplineDv)
 
     def getTransformationReferenceToLiDAR(self):
         return sm.Transformation(self.T_l_b_Dv.T())
@@ -429,22 +610,14 @@ class Camera():
         poseSpline = self.initPoseSplineFromCamera(timeOffsetPadding=0.0)
 
         # predict time shift prior
-        t = []
-        omega_measured_norm = []
-        omega_predicted_norm = []
-
-        for im in imu.imuData:
-            tk = im.stamp.toSec()
-            if tk > poseSpline.t_min() and tk < poseSpline.t_max():
-                # get imu measurements and spline from camera
-                omega_measured = im.omega
-                omega_predicted = aopt.EuclideanExpression(
-                    np.matrix(poseSpline.angularVelocityBodyFrame(tk)).transpose())
+        imuTimes = np.array([im.stamp.toSec() for im in imu.imuData])
+        inRange = np.logical_and(imuTimes > poseSpline.t_min(), imuTimes < poseSpline.t_max())
+        t = imuTimes[inRange]
 
-                # calc norm
-                t = np.hstack((t, tk))
-                omega_measured_norm = np.hstack((omega_measured_norm, np.linalg.norm(omega_measured)))
-                omega_predicted_norm = np.hstack((omega_predicted_norm, np.linalg.norm(omega_predicted.toEuclidean())))
+        # get imu measurements and spline from camera and calc the norms
+        omega_measured_norm = np.array([np.linalg.norm(im.omega) \
+                                        for im, valid in zip(imu.imuData, inRange) if valid])
+        omega_predicted_norm = np.sqrt(np.sum(poseSpline.angularVelocityBodyFrameBatch(t) ** 2, axis=1))
 
         if len(omega_predicted_norm) == 0 or len(omega_measured_norm) == 0:
             sm.logFatal("The time ranges of the camera and IMU do not overlap. " \
@@ -568,13 +741,6 @@ class Camera():
         print
         print "Adding camera error terms ({0})".format(self.dataset.topic)
 
-        # progress bar
-        iProgress = sm.Progress2(len(self.targetObservations))
-        iProgress.sample()
-
-        allReprojectionErrors = list()
-        error_t = self.camera.reprojectionErrorType
-
         if not self.use_fixed_baseline:
             T_c_b = self.T_c_b_Dv.toExpression()
         else:
@@ -582,69 +748,41 @@ class Camera():
             T_c_cm1 = self.fixed_baseline_travo_Dv.toExpression()
             T_c_b =  T_c_cm1 * T_cm1_b
 
+        # gather all observations as columnar arrays for the native builder
+        imageCorners = []
+        targetCorners = []
+        cornerCounts = []
+        stamps = []
+        targetIds = []
         for obs in self.targetObservations:
             for obsPerTarget in obs:
-                # Build a transformation expression for the time.
-                frameTime = self.cameraTimeToReferenceTimeDv.toExpression() + obsPerTarget.time().toSec() + self.timeshiftCamToReferencePrior
-                frameTimeScalar = frameTime.toScalar()
-
-                # as we are applying an initial time shift outside the optimization so
-                # we need to make sure that we dont add data outside the spline definition
-                if frameTimeScalar <= poseSplineDv.spline().t_min() or frameTimeScalar >= poseSplineDv.spline().t_max():
-                    continue
-
-                T_w_b = poseSplineDv.transformationAtTime(frameTime, timeOffsetPadding, timeOffsetPadding)
-                T_b_w = T_w_b.inverse()
-
-                # calibration target coords to camera N coords
-                # T_b_w: from world to imu coords
-                # T_cN_b: from imu to camera N coords
-                T_w_p = self.target[obsPerTarget.targetId()].T_p_w_Dv.toExpression().inverse()
-                T_c_p = T_c_b * T_b_w * T_w_p
-
-                # get the image and target points corresponding to the frame
-                imageCornerPoints = np.array(obsPerTarget.getCornersImageFrame()).T
-                targetCornerPoints = np.array(obsPerTarget.getCornersTargetFrame()).T
-
-                # setup an aslam frame (handles the distortion)
-                frame = self.camera.frameType()
-                frame.setGeometry(self.camera.geometry)
-
-                # corner uncertainty
-                R = np.eye(2) * self.cornerUncertainty * self.cornerUncertainty
-                invR = np.linalg.inv(R)
-
-                for pidx in range(0, imageCornerPoints.shape[1]):
-                    # add all image points
-                    k = self.camera.keypointType()
-                    k.setMeasurement(imageCornerPoints[:, pidx])
-                    k.setInverseMeasurementCovariance(invR)
-                    frame.addKeypoint(k)
-
-                reprojectionErrors = list()
-                for pidx in range(0, imageCornerPoints.shape[1]):
-                    # add all target points
-                    targetPoint = np.insert(targetCornerPoints.transpose()[pidx], 3, 1)
-                    p = T_c_p * aopt.HomogeneousExpression(targetPoint)
-
-                    # build and append the error term
-                    rerr = error_t(frame, pidx, p)
-
-                    # add blake-zisserman m-estimator
-                    if blakeZissermanDf > 0.0:
-                        mest = aopt.BlakeZissermanMEstimator(blakeZissermanDf)
-                        rerr.setMEstimatorPolicy(mest)
-
-                    problem.addErrorTerm(rerr)
-                    reprojectionErrors.append(rerr)
-
-                allReprojectionErrors.append(reprojectionErrors)
-
-            # update progress bar
-            iProgress.sample()
-
-        print "\r  Added {0} camera error terms                      ".format(len(self.targetObservations))
-        self.allReprojectionErrors = allReprojectionErrors
+                corners = np.array(obsPerTarget.getCornersImageFrame()).reshape((-1, 2))
+                imageCorners.append(corners)
+                targetCorners.append(np.array(obsPerTarget.getCornersTargetFrame()).reshape((-1, 3)))
+                cornerCounts.append(corners.shape[0])
+                stamps.append(obsPerTarget.time().toSec() + self.timeshiftCamToReferencePrior)
+                targetIds.append(obsPerTarget.targetId())
+
+        # the builder evaluates T_c_b * T_w_b(t).inverse() * T_p_w.inverse() per observation
+        # and adds one reprojection error per corner to the problem
+        builder = self.camera.reprojectionErrorBuilderType(self.camera.geometry, poseSplineDv, T_c_b,
+                                                           self.cameraTimeToReferenceTimeDv.toExpression(),
+                                                           self.cornerUncertainty, timeOffsetPadding)
+        for targetId, target in enumerate(self.target):
+            builder.setTargetTransformation(targetId, target.T_p_w_Dv.toExpression())
+
+        # add blake-zisserman m-estimator
+        if blakeZissermanDf > 0.0:
+            builder.setMEstimatorPolicy(aopt.BlakeZissermanMEstimator(blakeZissermanDf))
+
+        if stamps:
+            builder.build(problem, np.vstack(imageCorners), np.vstack(targetCorners),
+                          np.array(cornerCounts, dtype=np.int32), np.array(stamps),
+                          np.array(targetIds, dtype=np.int32))
+
+        self.reprojectionErrorBuilder = builder
+        self.allReprojectionErrors = [builder.observationErrorTerms(i) for i in xrange(builder.numObservations())]
+        print "  Added {0} camera error terms".format(builder.numErrorTerms())
 
 
 # pair of cameras with overlapping field of view (perfectly synced cams required!!)
@@ -1106,6 +1244,9 @@ class Imu(object):
 
         self.staticBias = parsed.static_bias
 
+        # builder for the imu error terms of the current problem
+        self.errorBuilder = None
+
     # omega -- angular_velocity
     # alpha -- linear_acceleration
     class ImuMeasurement(object):
@@ -1147,6 +1288,7 @@ class Imu(object):
             sys.exit(-1)
 
     def addDesignVariables(self, problem):
+        self.errorBuilder = None
         if self.staticBias:
             self.gyroBiasDv = aopt.EuclideanPointDv(self.GyroBiasPrior)
             self.gyroBiasDv.setActive(True)
@@ -1176,95 +1318,95 @@ class Imu(object):
             self.q_i_b_Dv.setActive(True)
             self.r_b_i_Dv.setActive(True)
 
+    def createErrorBuilder(self, poseSplineDv):
+        builder = ket.ImuErrorBuilder(poseSplineDv, self.q_i_b_Dv.toExpression(), self.r_b_i_Dv.toExpression())
+        self.setBuilderBias(builder)
+        return builder
+
+    def setBuilderBias(self, builder):
+        if self.staticBias:
+            builder.setStaticBias(self.gyroBiasDv.toExpression(), self.accelBiasDv.toExpression())
+        else:
+            builder.setBiasSplines(self.gyroBiasDv, self.accelBiasDv)
+
+    def getErrorBuilder(self, poseSplineDv):
+        # the gyroscope and accelerometer terms share one builder per problem
+        if self.errorBuilder is None:
+            self.errorBuilder = self.createErrorBuilder(poseSplineDv)
+        return self.errorBuilder
+
+    def getInvR(self, name):
+        # one 3x3 matrix if all measurements share the noise model,
+        # otherwise the matrices of the measurements stacked into a 3N x 3 array
+        invR = getattr(self.imuData[0], name)
+        for im in self.imuData[1:]:
+            if not np.array_equal(getattr(im, name), invR):
+                return np.vstack([getattr(im, name) for im in self.imuData])
+        return invR
+
+    def getMeasurementArrays(self):
+        stamps = np.array([im.stamp.toSec() for im in self.imuData]) + self.timeOffset
+        omegas = np.array([im.omega for im in self.imuData])
+        alphas = np.array([im.alpha for im in self.imuData])
+        return stamps, omegas, alphas
+
     def addAccelerometerErrorTerms(self, problem, poseSplineDv, g_w, mSigma=0.0, \
                                    accelNoiseScale=1.0):
         print
         print "Adding accelerometer error terms ({0})".format(self.dataset.topic)
 
-        # progress bar
-        iProgress = sm.Progress2(len(self.imuData))
-        iProgress.sample()
-
         # AccelerometerError(measurement,  invR,  C_b_w,  acceleration_w,  bias,  g_w)
         weight = 1.0 / accelNoiseScale
-        accelErrors = []
-        num_skipped = 0
 
         if mSigma > 0.0:
             mest = aopt.HuberMEstimator(mSigma)
         else:
             mest = aopt.NoMEstimator()
 
-        for im in self.imuData:
-            tk = im.stamp.toSec() + self.timeOffset
-            if tk > poseSplineDv.spline().t_min() and tk < poseSplineDv.spline().t_max():
-                C_b_w = poseSplineDv.orientation(tk).inverse()
-                a_w = poseSplineDv.linearAcceleration(tk)
-                if self.staticBias:
-                    b_i = self.accelBiasDv.toExpression()
-                else:
-                    b_i = self.accelBiasDv.toEuclideanExpression(tk, 0)
-                w_b = poseSplineDv.angularVelocityBodyFrame(tk)
-                w_dot_b = poseSplineDv.angularAccelerationBodyFrame(tk)
-                C_i_b = self.q_i_b_Dv.toExpression()
-                r_b = self.r_b_i_Dv.toExpression()
-                a = C_i_b * (C_b_w * (a_w - g_w) + \
-                             w_dot_b.cross(r_b) + w_b.cross(w_b.cross(r_b)))
-                aerr = ket.EuclideanError(im.alpha, im.alphaInvR * weight, a + b_i)
-                aerr.setMEstimatorPolicy(mest)
-                accelErrors.append(aerr)
-                problem.addErrorTerm(aerr)
-            else:
-                num_skipped = num_skipped + 1
+        self.accelErrors = []
+        if len(self.imuData) == 0:
+            print "  No IMU measurements, no accelerometer error terms added"
+            return
 
-            # update progress bar
-            iProgress.sample()
+        stamps, omegas, alphas = self.getMeasurementArrays()
+        builder = self.getErrorBuilder(poseSplineDv)
+        numAdded = builder.buildAccelerometerErrors(problem, stamps, alphas, self.getInvR("alphaInvR") * weight, \
+                                                    g_w, mest)
+        num_skipped = len(self.imuData) - numAdded
 
         print "\r  Added {0} of {1} accelerometer error terms (skipped {2} out-of-bounds measurements)".format(
-            len(self.imuData) - num_skipped, len(self.imuData), num_skipped)
-        self.accelErrors = accelErrors
+            numAdded, len(self.imuData), num_skipped)
+        self.accelErrors = builder.accelerometerErrors()
 
     def addGyroscopeErrorTerms(self, problem, poseSplineDv, mSigma=0.0, gyroNoiseScale=1.0, \
                                g_w=None):
         print
         print "Adding gyroscope error terms ({0})".format(self.dataset.topic)
 
-        # progress bar
-        iProgress = sm.Progress2(len(self.imuData))
-        iProgress.sample()
-
-        num_skipped = 0
-        gyroErrors = []
         weight = 1.0 / gyroNoiseScale
         if mSigma > 0.0:
             mest = aopt.HuberMEstimator(mSigma)
         else:
             mest = aopt.NoMEstimator()
 
-        for im in self.imuData:
-            tk = im.stamp.toSec() + self.timeOffset
-            if tk > poseSplineDv.spline().t_min() and tk < poseSplineDv.spline().t_max():
-                # GyroscopeError(measurement, invR, angularVelocity, bias)
-                w_b = poseSplineDv.angularVelocityBodyFrame(tk)
-                if self.staticBias:
-                    b_i = self.gyroBiasDv.toExpression()
-                else:
-                    b_i = self.gyroBiasDv.toEuclideanExpression(tk, 0)
-                C_i_b = self.q_i_b_Dv.toExpression()
-                w = C_i_b * w_b
-                gerr = ket.EuclideanError(im.omega, im.omegaInvR * weight, w + b_i)
-                gerr.setMEstimatorPolicy(mest)
-                gyroErrors.append(gerr)
-                problem.addErrorTerm(gerr)
-            else:
-                num_skipped = num_skipped + 1
+        # the plain imu model does not depend on gravity
+        if g_w is None:
+            g_w = aopt.EuclideanExpression(np.zeros(3))
 
-            # update progress bar
-            iProgress.sample()
+        self.gyroErrors = []
+        if len(self.imuData) == 0:
+            print "  No IMU measurements, no gyroscope error terms added"
+            return
+
+        stamps, omegas, alphas = self.getMeasurementArrays()
+        builder = self.getErrorBuilder(poseSplineDv)
+        numAdded = builder.buildGyroscopeErrors(problem, stamps, omegas, self.getInvR("omegaInvR") * weight, \
+                                                g_w, mest)
+        num_skipped = len(self.imuData) - numAdded
 
         print "\r  Added {0} of {1} gyroscope error terms (skipped {2} out-of-bounds measurements)".format(
-            len(self.imuData) - num_skipped, len(self.imuData), num_skipped)
-        self.gyroErrors = gyroErrors
+            numAdded, len(self.imuData), num_skipped)
+        self.gyroErrors = builder.gyroscopeErrors()
 
     def initBiasSplines(self, poseSpline, splineOrder, biasKnotsPerSecond):
         start = poseSpline.t_min();
@@ -1362,15 +1504,16 @@ class Imu(object):
             sm.logFatal("Failed to obtain initial guess for the relative orientation!")
             sys.exit(-1)
 
+        # evaluate the optimized spline at all imu times at once
+        angularVelocitySpline = angularVelocityDv.spline()
+        imuTimes = np.array([im.stamp.toSec() for im in self.imuData])
+        imuOmegaNorms = np.array([np.linalg.norm(im.omega) for im in self.imuData])
+        inRange = lambda dt: np.logical_and(imuTimes + dt[0] > angularVelocitySpline.t_min(),
+                                            imuTimes + dt[0] < angularVelocitySpline.t_max())
+
         referenceAbsoluteOmega = lambda dt=np.array([0.]): \
-            np.asarray([np.linalg.norm(angularVelocityDv.toEuclidean(im.stamp.toSec() + dt[0], 0)) \
-                        for im in self.imuData \
-                        if (im.stamp.toSec() + dt[0] > angularVelocity.t_min() \
-                            and im.stamp.toSec() + dt[0] < angularVelocity.t_max())])
-        absoluteOmega = lambda dt=np.array([0.]): \
-            np.asarray([np.linalg.norm(im.omega) for im in self.imuData \
-                        if (im.stamp.toSec() + dt[0] > angularVelocity.t_min() \
-                            and im.stamp.toSec() + dt[0] < angularVelocity.t_max())])
+            np.sqrt(np.sum(angularVelocitySpline.evalDBatch(imuTimes[inRange(dt)] + dt[0], 0) ** 2, axis=1))
+        absoluteOmega = lambda dt=np.array([0.]): imuOmegaNorms[inRange(dt)]
 
         if len(referenceAbsoluteOmega()) == 0 or len(absoluteOmega()) == 0:
             sm.logFatal("The time ranges of the IMUs published as topics {0} and {1} do not overlap. " \
@@ -1492,108 +1635,15 @@ class ScaledMisalignedImu(Imu):
         problem.addDesignVariable(self.M_accel_gyro_Dv, ic.HELPER_GROUP_ID)
         self.M_accel_gyro_Dv.setActive(True)
 
-    def addAccelerometerErrorTerms(self, problem, poseSplineDv, g_w, mSigma=0.0, \
-                                   accelNoiseScale=1.0):
-        print
-        print "Adding accelerometer error terms ({0})".format(self.dataset.topic)
-
-        # progress bar
-        iProgress = sm.Progress2(len(self.imuData))
-        iProgress.sample()
-
-        # AccelerometerError(measurement,  invR,  C_b_w,  acceleration_w,  bias,  g_w)
-        weight = 1.0 / accelNoiseScale
-        accelErrors = []
-        num_skipped = 0
-
-        if mSigma > 0.0:
-            mest = aopt.HuberMEstimator(mSigma)
-        else:
-            mest = aopt.NoMEstimator()
-
-        for im in self.imuData:
-            tk = im.stamp.toSec() + self.timeOffset
-            if tk > poseSplineDv.spline().t_min() and tk < poseSplineDv.spline().t_max():
-                C_b_w = poseSplineDv.orientation(tk).inverse()
-                a_w = poseSplineDv.linearAcceleration(tk)
-                if self.staticBias:
-                    b_i = self.accelBiasDv.toExpression()
-                else:
-                    b_i = self.accelBiasDv.toEuclideanExpression(tk, 0)
-                M = self.M_accel_Dv.toExpression()
-                w_b = poseSplineDv.angularVelocityBodyFrame(tk)
-                w_dot_b = poseSplineDv.angularAccelerationBodyFrame(tk)
-                C_i_b = self.q_i_b_Dv.toExpression()
-                r_b = self.r_b_i_Dv.toExpression()
-                a = M * (C_i_b * (C_b_w * (a_w - g_w) + \
-                                  w_dot_b.cross(r_b) + w_b.cross(w_b.cross(r_b))))
-
-                aerr = ket.EuclideanError(im.alpha, im.alphaInvR * weight, a + b_i)
-                aerr.setMEstimatorPolicy(mest)
-                accelErrors.append(aerr)
-                problem.addErrorTerm(aerr)
-            else:
-                num_skipped = num_skipped + 1
-
-            # update progress bar
-            iProgress.sample()
-
-        print "\r  Added {0} of {1} accelerometer error terms (skipped {2} out-of-bounds measurements)".format(
-            len(self.imuData) - num_skipped, len(self.imuData), num_skipped)
-        self.accelErrors = accelErrors
-
-    def addGyroscopeErrorTerms(self, problem, poseSplineDv, mSigma=0.0, gyroNoiseScale=1.0, g_w=None):
-        print
-        print "Adding gyroscope error terms ({0})".format(self.dataset.topic)
-
-        # progress bar
-        iProgress = sm.Progress2(len(self.imuData))
-        iProgress.sample()
-
-        num_skipped = 0
-        gyroErrors = []
-        weight = 1.0 / gyroNoiseScale
-        if mSigma > 0.0:
-            mest = aopt.HuberMEstimator(mSigma)
-        else:
-            mest = aopt.NoMEstimator()
-
-        for im in self.imuData:
-            tk = im.stamp.toSec() + self.timeOffset
-            if tk > poseSplineDv.spline().t_min() and tk < poseSplineDv.spline().t_max():
-                # GyroscopeError(measurement, invR, angularVelocity, bias)
-                w_b = poseSplineDv.angularVelocityBodyFrame(tk)
-                w_dot_b = poseSplineDv.angularAccelerationBodyFrame(tk)
-                if self.staticBias:
-                    b_i = self.gyroBiasDv.toExpression()
-                else:
-                    b_i = self.gyroBiasDv.toEuclideanExpression(tk, 0)
-                C_b_w = poseSplineDv.orientation(tk).inverse()
-                a_w = poseSplineDv.linearAcceleration(tk)
-                r_b = self.r_b_i_Dv.toExpression()
-                a_b = C_b_w * (a_w - g_w) + w_dot_b.cross(r_b) + w_b.cross(w_b.cross(r_b))
-
-                C_i_b = self.q_i_b_Dv.toExpression()
-                C_gyro_i = self.q_gyro_i_Dv.toExpression()
-                C_gyro_b = C_gyro_i * C_i_b
-                M = self.M_gyro_Dv.toExpression()
-                Ma = self.M_accel_gyro_Dv.toExpression()
-
-                w = M * (C_gyro_b * w_b) + Ma * (C_gyro_b * a_b)
-
-                gerr = ket.EuclideanError(im.omega, im.omegaInvR * weight, w + b_i)
-                gerr.setMEstimatorPolicy(mest)
-                gyroErrors.append(gerr)
-                problem.addErrorTerm(gerr)
-            else:
-                num_skipped = num_skipped + 1
-
-            # update progress bar
-            iProgress.sample()
-
-        print "\r  Added {0} of {1} gyroscope error terms (skipped {2} out-of-bounds measurements)".format(
-            len(self.imuData) - num_skipped, len(self.imuData), num_skipped)
-        self.gyroErrors = gyroErrors
+    def createErrorBuilder(self, poseSplineDv):
+        builder = ket.ScaledMisalignedImuErrorBuilder(poseSplineDv, self.q_i_b_Dv.toExpression(), \
+                                                      self.r_b_i_Dv.toExpression(), \
+                                                      self.M_accel_Dv.toExpression(), \
+                                                      self.q_gyro_i_Dv.toExpression(), \
+                                                      self.M_gyro_Dv.toExpression(), \
+                                                      self.M_accel_gyro_Dv.toExpression())
+        self.setBuilderBias(builder)
+        return builder
 
 
 class ScaledMisalignedSizeEffectImu(ScaledMisalignedImu):
@@ -1651,57 +1701,20 @@ class ScaledMisalignedSizeEffectImu(ScaledMisalignedImu):
         problem.addDesignVariable(self.Iz_Dv, ic.HELPER_GROUP_ID)
         self.Iz_Dv.setActive(False)
 
-    def addAccelerometerErrorTerms(self, problem, poseSplineDv, g_w, mSigma=0.0, \
-                                   accelNoiseScale=1.0):
-        print
-        print "Adding accelerometer error terms ({0})".format(self.dataset.topic)
-
-        # progress bar
-        iProgress = sm.Progress2(len(self.imuData))
-        iProgress.sample()
-
-        # AccelerometerError(measurement,  invR,  C_b_w,  acceleration_w,  bias,  g_w)
-        weight = 1.0 / accelNoiseScale
-        accelErrors = []
-        num_skipped = 0
-
-        if mSigma > 0.0:
-            mest = aopt.HuberMEstimator(mSigma)
-        else:
-            mest = aopt.NoMEstimator()
-
-        for im in self.imuData:
-            tk = im.stamp.toSec() + self.timeOffset
-            if tk > poseSplineDv.spline().t_min() and tk < poseSplineDv.spline().t_max():
-                C_b_w = poseSplineDv.orientation(tk).inverse()
-                a_w = poseSplineDv.linearAcceleration(tk)
-                b_i = self.accelBiasDv.toEuclideanExpression(tk, 0)
-                M = self.M_accel_Dv.toExpression()
-                w_b = poseSplineDv.angularVelocityBodyFrame(tk)
-                w_dot_b = poseSplineDv.angularAccelerationBodyFrame(tk)
-                C_i_b = self.q_i_b_Dv.toExpression()
-                rx_b = self.r_b_i_Dv.toExpression() + C_i_b.inverse() * self.rx_i_Dv.toExpression()
-                ry_b = self.r_b_i_Dv.toExpression() + C_i_b.inverse() * self.ry_i_Dv.toExpression()
-                rz_b = self.r_b_i_Dv.toExpression() + C_i_b.inverse() * self.rz_i_Dv.toExpression()
-                Ix = self.Ix_Dv.toExpression()
-                Iy = self.Iy_Dv.toExpression()
-                Iz = self.Iz_Dv.toExpression()
-
-                a = M * (C_i_b * (C_b_w * (a_w - g_w)) + \
-                         Ix * (C_i_b * (w_dot_b.cross(rx_b) + w_b.cross(w_b.cross(rx_b)))) + \
-                         Iy * (C_i_b * (w_dot_b.cross(ry_b) + w_b.cross(w_b.cross(ry_b)))) + \
-                         Iz * (C_i_b * (w_dot_b.cross(rz_b) + w_b.cross(w_b.cross(rz_b)))))
-
-                aerr = ket.EuclideanError(im.alpha, im.alphaInvR * weight, a + b_i)
-                aerr.setMEstimatorPolicy(mest)
-                accelErrors.append(aerr)
-                problem.addErrorTerm(aerr)
-            else:
-                num_skipped = num_skipped + 1
-
-            # update progress bar
-            iProgress.sample()
-
-        print "\r  Added {0} of {1} accelerometer error terms (skipped {2} out-of-bounds measurements)".format(
-            len(self.imuData) - num_skipped, len(self.imuData), num_skipped)
-        self.accelErrors = accelErrors
+    def createErrorBuilder(self, poseSplineDv):
+        # Unlike the former per-sample loop, which always evaluated the bias spline,
+        # the accelerometer bias of this model follows --static-bias as in the other models.
+        builder = ket.ScaledMisalignedSizeEffectImuErrorBuilder(poseSplineDv, self.q_i_b_Dv.toExpression(), \
+                                                                self.r_b_i_Dv.toExpression(), \
+                                                                self.M_accel_Dv.toExpression(), \
+                                                                self.q_gyro_i_Dv.toExpression(), \
+                                                                self.M_gyro_Dv.toExpression(), \
+                                                                self.M_accel_gyro_Dv.toExpression(), \
+                                                                self.rx_i_Dv.toExpression(), \
+                                                                self.ry_i_Dv.toExpression(), \
+                                                                self.rz_i_Dv.toExpression(), \
+                                                                self.Ix_Dv.toExpression(), \
+                                                                self.Iy_Dv.toExpression(), \
+                                                                self.Iz_Dv.toExpression())
+        self.setBuilderBias(builder)
+        return builder
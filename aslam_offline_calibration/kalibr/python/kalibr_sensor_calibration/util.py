@@ -17,9 +17,8 @@ def printErrorStatistics(cself, dest=sys.stdout):
     print >> dest, "Normalized Residuals\n----------------------------"
     try:
         for lidarIdx, lidar in enumerate(cself.LiDARList):
-            e2 = np.array(
-                [np.sqrt(e.evaluateError()) for p in lidar.targetObs for e in
-                 p.errorTerms])
+            e2 = np.fabs(np.hstack([lidar.lidarResiduals(p) for p in lidar.targetObs])) \
+                * np.sqrt(lidar.invR[0])
             if e2.size:
                 print >> dest, "Distance error (LiDAR{0}):    count: {1}," \
                                " mean: {2}, median: {3}, std: {4}".format(
@@ -71,7 +70,7 @@ def printErrorStatistics(cself, dest=sys.stdout):
     print >> dest, "Residuals\n----------------------------"
     try:
         for lidarIdx, lidar in enumerate(cself.LiDARList):
-            e2 = np.array([np.linalg.norm(e.error()) for p in lidar.targetObs for e in p.errorTerms])
+            e2 = np.fabs(np.hstack([lidar.lidarResiduals(p) for p in lidar.targetObs]))
             if e2.size:
                 print >> dest, "Distance error (LiDAR{0}) [m]:    count: {1}, " \
                                "mean: {2}, median: {3}, std: {4}".format(
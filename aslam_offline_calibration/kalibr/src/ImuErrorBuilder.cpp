@@ -0,0 +1,205 @@
+#include <kalibr_errorterms/ImuErrorBuilder.hpp>
+#include <aslam/Exceptions.hpp>
+
+namespace kalibr_errorterms {
+
+using aslam::backend::EuclideanExpression;
+using aslam::backend::RotationExpression;
+using aslam::backend::MatrixExpression;
+
+ImuErrorBuilder::ImuErrorBuilder(aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+                                 const RotationExpression & C_i_b,
+                                 const EuclideanExpression & r_b)
+    : _poseSplineDv(poseSplineDv),
+      _C_i_b(C_i_b),
+      _r_b(r_b),
+      _gyroBias(Eigen::Vector3d::Zero()),
+      _accelBias(Eigen::Vector3d::Zero()),
+      _gyroBiasSpline(NULL),
+      _accelBiasSpline(NULL) {
+  SM_ASSERT_TRUE(aslam::Exception, _poseSplineDv != NULL, "The pose spline must not be null");
+}
+
+ImuErrorBuilder::~ImuErrorBuilder() {
+
+}
+
+void ImuErrorBuilder::setStaticBias(const EuclideanExpression & gyroBias,
+                                    const EuclideanExpression & accelBias) {
+  _gyroBias = gyroBias;
+  _accelBias = accelBias;
+  _gyroBiasSpline = NULL;
+  _accelBiasSpline = NULL;
+}
+
+void ImuErrorBuilder::setBiasSplines(aslam::splines::EuclideanBSplineDesignVariable * gyroBias,
+                                     aslam::splines::EuclideanBSplineDesignVariable * accelBias) {
+  SM_ASSERT_TRUE(aslam::Exception, gyroBias != NULL && accelBias != NULL,
+                 "The bias splines must not be null");
+  _gyroBiasSpline = gyroBias;
+  _accelBiasSpline = accelBias;
+}
+
+size_t ImuErrorBuilder::buildGyroscopeErrors(
+    aslam::calibration::OptimizationProblem & problem,
+    const Eigen::VectorXd & stamps, const Eigen::MatrixXd & omegas,
+    const Eigen::MatrixXd & invR, const EuclideanExpression & g_w,
+    const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator) {
+  return build(problem, stamps, omegas, invR, g_w, mEstimator, true, _gyroErrors);
+}
+
+size_t ImuErrorBuilder::buildAccelerometerErrors(
+    aslam::calibration::OptimizationProblem & problem,
+    const Eigen::VectorXd & stamps, const Eigen::MatrixXd & alphas,
+    const Eigen::MatrixXd & invR, const EuclideanExpression & g_w,
+    const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator) {
+  return build(problem, stamps, alphas, invR, g_w, mEstimator, false, _accelErrors);
+}
+
+size_t ImuErrorBuilder::build(aslam::calibration::OptimizationProblem & problem,
+                              const Eigen::VectorXd & stamps,
+                              const Eigen::MatrixXd & measurements,
+                              const Eigen::MatrixXd & invR,
+                              const EuclideanExpression & g_w,
+                              const boost::shared_ptr<aslam::backend::MEstimator> & mEstimator,
+                              bool gyroscope,
+                              std::vector<error_ptr_t> & errors) {
+  SM_ASSERT_EQ(aslam::Exception, measurements.cols(), 3,
+               "The measurements must be given as N x 3 array");
+  SM_ASSERT_EQ(aslam::Exception, measurements.rows(), stamps.size(),
+               "One stamp per measurement is required");
+  SM_ASSERT_EQ(aslam::Exception, invR.cols(), 3, "The inverse covariance must have 3 columns");
+  SM_ASSERT_TRUE(aslam::Exception, invR.rows() == 3 || invR.rows() == 3 * stamps.size(),
+                 "The inverse covariance must be one 3 x 3 matrix or one per measurement stacked into a 3N x 3 array");
+  const bool uniformInvR = invR.rows() == 3;
+
+  const double tMin = _poseSplineDv->spline().t_min();
+  const double tMax = _poseSplineDv->spline().t_max();
+  const size_t numErrorsBefore = errors.size();
+  errors.reserve(numErrorsBefore + stamps.size());
+
+  for (int k = 0; k < stamps.size(); ++k) {
+    const double tk = stamps[k];
+    if (tk <= tMin || tk >= tMax) {
+      continue;
+    }
+
+    EuclideanExpression predicted = gyroscope ?
+        predictAngularVelocity(tk, g_w) + gyroBias(tk) :
+        predictAcceleration(tk, g_w) + accelBias(tk);
+
+    Eigen::Vector3d measurement = measurements.row(k).transpose();
+    const Eigen::Matrix3d invRk = invR.block<3, 3>(uniformInvR ? 0 : 3 * k, 0);
+    error_ptr_t err(new EuclideanError(measurement, invRk, predicted));
+    if (mEstimator) {
+      err->setMEstimatorPolicy(mEstimator);
+    }
+    problem.addErrorTerm(err);
+    errors.push_back(err);
+  }
+
+  return errors.size() - numErrorsBefore;
+}
+
+EuclideanExpression ImuErrorBuilder::predictAngularVelocity(double tk,
+                                                            const EuclideanExpression & /* g_w */) {
+  return _C_i_b * _poseSplineDv->angularVelocityBodyFrame(tk);
+}
+
+EuclideanExpression ImuErrorBuilder::predictAcceleration(double tk,
+                                                         const EuclideanExpression & g_w) {
+  return _C_i_b * (specificForce(tk, g_w) + leverArmAcceleration(tk, _r_b));
+}
+
+EuclideanExpression ImuErrorBuilder::specificForce(double tk, const EuclideanExpression & g_w) {
+  RotationExpression C_b_w = _poseSplineDv->orientation(tk).inverse();
+  return C_b_w * (_poseSplineDv->linearAcceleration(tk) - g_w);
+}
+
+EuclideanExpression ImuErrorBuilder::leverArmAcceleration(double tk, const EuclideanExpression & r_b) {
+  EuclideanExpression w_b = _poseSplineDv->angularVelocityBodyFrame(tk);
+  EuclideanExpression w_dot_b = _poseSplineDv->angularAccelerationBodyFrame(tk);
+  return w_dot_b.cross(r_b) + w_b.cross(w_b.cross(r_b));
+}
+
+EuclideanExpression ImuErrorBuilder::gyroBias(double tk) {
+  if (_gyroBiasSpline) {
+    return _gyroBiasSpline->toEuclideanExpression(tk, 0);
+  }
+  return _gyroBias;
+}
+
+EuclideanExpression ImuErrorBuilder::accelBias(double tk) {
+  if (_accelBiasSpline) {
+    return _accelBiasSpline->toEuclideanExpression(tk, 0);
+  }
+  return _accelBias;
+}
+
+ScaledMisalignedImuErrorBuilder::ScaledMisalignedImuErrorBuilder(
+    aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+    const RotationExpression & C_i_b, const EuclideanExpression & r_b,
+    const MatrixExpression & M_accel, const RotationExpression & C_gyro_i,
+    const MatrixExpression & M_gyro, const MatrixExpression & M_accel_gyro)
+    : ImuErrorBuilder(poseSplineDv, C_i_b, r_b),
+      _M_accel(M_accel),
+      _C_gyro_i(C_gyro_i),
+      _M_gyro(M_gyro),
+      _M_accel_gyro(M_accel_gyro) {
+
+}
+
+ScaledMisalignedImuErrorBuilder::~ScaledMisalignedImuErrorBuilder() {
+
+}
+
+EuclideanExpression ScaledMisalignedImuErrorBuilder::predictAngularVelocity(
+    double tk, const EuclideanExpression & g_w) {
+  EuclideanExpression w_b = _poseSplineDv->angularVelocityBodyFrame(tk);
+  EuclideanExpression a_b = specificForce(tk, g_w) + leverArmAcceleration(tk, _r_b);
+  RotationExpression C_gyro_b = _C_gyro_i * _C_i_b;
+  return _M_gyro * (C_gyro_b * w_b) + _M_accel_gyro * (C_gyro_b * a_b);
+}
+
+EuclideanExpression ScaledMisalignedImuErrorBuilder::predictAcceleration(
+    double tk, const EuclideanExpression & g_w) {
+  return _M_accel * ImuErrorBuilder::predictAcceleration(tk, g_w);
+}
+
+ScaledMisalignedSizeEffectImuErrorBuilder::ScaledMisalignedSizeEffectImuErrorBuilder(
+    aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+    const RotationExpression & C_i_b, const EuclideanExpression & r_b,
+    const MatrixExpression & M_accel, const RotationExpression & C_gyro_i,
+    const MatrixExpression & M_gyro, const MatrixExpression & M_accel_gyro,
+    const EuclideanExpression & rx_i, const EuclideanExpression & ry_i,
+    const EuclideanExpression & rz_i, const MatrixExpression & Ix,
+    const MatrixExpression & Iy, const MatrixExpression & Iz)
+    : ScaledMisalignedImuErrorBuilder(poseSplineDv, C_i_b, r_b, M_accel, C_gyro_i, M_gyro, M_accel_gyro),
+      _rx_i(rx_i),
+      _ry_i(ry_i),
+      _rz_i(rz_i),
+      _Ix(Ix),
+      _Iy(Iy),
+      _Iz(Iz) {
+
+}
+
+ScaledMisalignedSizeEffectImuErrorBuilder::~ScaledMisalignedSizeEffectImuErrorBuilder() {
+
+}
+
+EuclideanExpression ScaledMisalignedSizeEffectImuErrorBuilder::predictAcceleration(
+    double tk, const EuclideanExpression & g_w) {
+  // lever arms of the individual accelerometer axes in the reference frame
+  RotationExpression C_b_i = _C_i_b.inverse();
+  EuclideanExpression rx_b = _r_b + C_b_i * _rx_i;
+  EuclideanExpression ry_b = _r_b + C_b_i * _ry_i;
+  EuclideanExpression rz_b = _r_b + C_b_i * _rz_i;
+
+  return _M_accel * (_C_i_b * specificForce(tk, g_w) +
+                     _Ix * (_C_i_b * leverArmAcceleration(tk, rx_b)) +
+                     _Iy * (_C_i_b * leverArmAcceleration(tk, ry_b)) +
+                     _Iz * (_C_i_b * leverArmAcceleration(tk, rz_b)));
+}
+
+}  // namespace kalibr_errorterms
@@ -0,0 +1,210 @@
+#include <kalibr_errorterms/LiDARPlaneRangeError.hpp>
+#include <aslam/Exceptions.hpp>
+#include <sm/kinematics/transformations.hpp>
+#include <cmath>
+
+namespace kalibr_errorterms {
+
+LiDARPlaneRangeError::LiDARPlaneRangeError(
+    const Eigen::MatrixXd & points, const Eigen::VectorXd & stamps, double invR,
+    aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+    const aslam::backend::ScalarExpression & timeOffset,
+    double leftBuffer, double rightBuffer,
+    const aslam::backend::TransformationExpression & T_l_b,
+    const aslam::backend::TransformationExpression & T_p_w)
+    : _stamps(stamps),
+      _sqrtInvR(std::sqrt(invR)),
+      _spline(poseSplineDv),
+      _timeOffset(timeOffset),
+      _T_l_b(T_l_b),
+      _T_p_w(T_p_w) {
+  SM_ASSERT_TRUE(aslam::Exception, poseSplineDv != NULL, "The pose spline must not be null");
+  SM_ASSERT_EQ(aslam::Exception, points.cols(), 3, "The points must be given as N x 3 array");
+  SM_ASSERT_GT(aslam::Exception, points.rows(), 0, "At least one point is required");
+  SM_ASSERT_EQ(aslam::Exception, points.rows(), stamps.size(), "One stamp per point is required");
+  SM_ASSERT_GT(aslam::Exception, invR, 0.0, "The inverse variance must be positive");
+
+  _ranges = points.rowwise().norm();
+  _directions = (points.array().colwise() / _ranges.array()).matrix().transpose();
+
+  // Take the full time span of the segments within the buffers around the initial times,
+  // exactly as BSplinePoseDesignVariable::transformationAtTime() does.
+  const bsplines::BSplinePose & bsplinePose = _spline->spline();
+  const double offset = _timeOffset.toScalar();
+  const double tFirst = stamps.minCoeff() + offset;
+  const double tLast = stamps.maxCoeff() + offset;
+  int bufferRight = bsplinePose.numValidTimeSegments() - 1;
+  if (tLast + rightBuffer <= bsplinePose.t_max())
+    bufferRight = bsplinePose.segmentIndex(tLast + rightBuffer);
+  int bufferLeft = 0;
+  if (tFirst - leftBuffer >= bsplinePose.t_min())
+    bufferLeft = bsplinePose.segmentIndex(tFirst - leftBuffer);
+  _bufferTmax = bsplinePose.timeInterval(bufferRight).second;
+  _bufferTmin = bsplinePose.timeInterval(bufferLeft).first;
+  const std::pair<double, double> left = bsplinePose.timeInterval(bufferLeft);
+  const std::pair<double, double> right = bsplinePose.timeInterval(bufferRight);
+  Eigen::VectorXi leftCoeff = bsplinePose.localVvCoefficientVectorIndices((left.first + left.second) / 2.0);
+  Eigen::VectorXi rightCoeff = bsplinePose.localVvCoefficientVectorIndices((right.first + right.second) / 2.0);
+  _bufferedMinIndex = leftCoeff(0);
+  for (int i = leftCoeff(0); i <= rightCoeff(rightCoeff.size() - 1); ++i) {
+    _bufferedDesignVariables.push_back(_spline->designVariable(i));
+  }
+
+  // Flip the sign of points whose initial prediction is behind the sensor, as the
+  // expression based error terms did.
+  const Eigen::Matrix4d T_p_w0 = _T_p_w.toTransformationMatrix();
+  const Eigen::Matrix4d T_b_l0 = _T_l_b.toTransformationMatrix().inverse();
+  _signs.resize(_ranges.size());
+  for (int i = 0; i < _ranges.size(); ++i) {
+    const Eigen::Matrix4d T_p_l = T_p_w0 * bsplinePose.transformation(pointTime(i, offset)) * T_b_l0;
+    _signs[i] = predictRange(T_p_l, _directions.col(i)) < 0.0 ? -1.0 : 1.0;
+  }
+
+  aslam::backend::DesignVariable::set_t dvs;
+  dvs.insert(_bufferedDesignVariables.begin(), _bufferedDesignVariables.end());
+  _timeOffset.getDesignVariables(dvs);
+  _T_l_b.getDesignVariables(dvs);
+  _T_p_w.getDesignVariables(dvs);
+  setDesignVariablesIterator(dvs.begin(), dvs.end());
+  //Perform an initial error evaluation so that reasonable a priori errors can be retrieved.
+  evaluateError();
+}
+
+LiDARPlaneRangeError::~LiDARPlaneRangeError() {
+
+}
+
+double LiDARPlaneRangeError::pointTime(int i, double timeOffset) const {
+  const double t = _stamps[i] + timeOffset;
+  SM_ASSERT_GE_LT(aslam::Exception, t, _bufferTmin, _bufferTmax, "Spline Coefficient Buffer Exceeded. Set larger buffer margins!");
+  return t;
+}
+
+double LiDARPlaneRangeError::predictRange(const Eigen::Matrix4d & T_p_l, const Eigen::Vector3d & direction) {
+  return -T_p_l(2, 3) / (T_p_l.topLeftCorner<3, 3>() * direction)[2];
+}
+
+Eigen::VectorXd LiDARPlaneRangeError::getPredictedMeasurement() {
+  const double offset = _timeOffset.toScalar();
+  const Eigen::Matrix4d T_p_w = _T_p_w.toTransformationMatrix();
+  const Eigen::Matrix4d T_b_l = _T_l_b.toTransformationMatrix().inverse();
+  const bsplines::BSplinePose & bsplinePose = _spline->spline();
+  Eigen::VectorXd predicted(_ranges.size());
+  for (int i = 0; i < _ranges.size(); ++i) {
+    const Eigen::Matrix4d T_p_l = T_p_w * bsplinePose.transformation(pointTime(i, offset)) * T_b_l;
+    predicted[i] = _signs[i] * predictRange(T_p_l, _directions.col(i));
+  }
+  return predicted;
+}
+
+double LiDARPlaneRangeError::evaluateErrorImplementation() {
+  _error = getPredictedMeasurement() - _ranges;
+  return _sqrtInvR * _sqrtInvR * _error.squaredNorm();
+}
+
+void LiDARPlaneRangeError::buildHessianImplementation(aslam::backend::SparseBlockMatrix & outHessian,
+                                                      Eigen::VectorXd & outRhs, bool useMEstimator) {
+  aslam::backend::JacobianContainer::ThreadLocalScratch scratch(dimension());
+  aslam::backend::JacobianContainer & J = scratch.container();
+  evaluateJacobians(J);
+  double sqrtWeight = 1.0;
+  if (useMEstimator)
+    sqrtWeight = std::sqrt(_mEstimatorPolicy->getWeight(getRawSquaredError()));
+  J.evaluateHessian(_error, sqrtWeight * _sqrtInvR, outHessian, outRhs);
+}
+
+void LiDARPlaneRangeError::getWeightedJacobians(aslam::backend::JacobianContainer & outJc, bool useMEstimator) {
+  evaluateJacobians(outJc);
+  double sqrtWeight = 1.0;
+  if (useMEstimator)
+    sqrtWeight = std::sqrt(_mEstimatorPolicy->getWeight(getRawSquaredError()));
+  for (aslam::backend::JacobianContainer::map_t::iterator it = outJc.begin(); it != outJc.end(); ++it) {
+    it->second *= sqrtWeight * _sqrtInvR * it->first->scaling();
+  }
+}
+
+void LiDARPlaneRangeError::getWeightedError(Eigen::VectorXd & e, bool useMEstimator) const {
+  double sqrtWeight = 1.0;
+  if (useMEstimator)
+    sqrtWeight = std::sqrt(_mEstimatorPolicy->getWeight(getRawSquaredError()));
+  e = _error * (sqrtWeight * _sqrtInvR);
+}
+
+void LiDARPlaneRangeError::getInvR(Eigen::MatrixXd & invR) const {
+  invR = Eigen::MatrixXd::Identity(_ranges.size(), _ranges.size()) * (_sqrtInvR * _sqrtInvR);
+}
+
+Eigen::MatrixXd LiDARPlaneRangeError::vsInvR() const {
+  Eigen::MatrixXd invR;
+  getInvR(invR);
+  return invR;
+}
+
+void LiDARPlaneRangeError::vsSetInvR(const Eigen::MatrixXd & invR) {
+  SM_ASSERT_EQ(aslam::Exception, invR.rows(), _ranges.size(), "The covariance matrix does not match the size of the error");
+  SM_ASSERT_EQ(aslam::Exception, invR.cols(), _ranges.size(), "The covariance matrix does not match the size of the error");
+  SM_ASSERT_TRUE(aslam::Exception, invR.isApprox(invR(0, 0) * Eigen::MatrixXd::Identity(invR.rows(), invR.cols())),
+                 "All ranges share one variance, so the inverse covariance must be a multiple of the identity");
+  SM_ASSERT_GT(aslam::Exception, invR(0, 0), 0.0, "The inverse variance must be positive");
+  _sqrtInvR = std::sqrt(invR(0, 0));
+}
+
+void LiDARPlaneRangeError::evaluateJacobiansImplementation(
+    aslam::backend::JacobianContainer & _jacobians) const {
+  typedef Eigen::Matrix<double, 1, 6> chain_t;
+  const int numPoints = _ranges.size();
+  const double offset = _timeOffset.toScalar();
+  const Eigen::Matrix4d T_p_w = _T_p_w.toTransformationMatrix();
+  const Eigen::Matrix4d T_b_l = _T_l_b.toTransformationMatrix().inverse();
+  const Eigen::Matrix<double, 6, 6> Ad_p_w = sm::kinematics::boxTimes(T_p_w);
+  const bsplines::BSplinePose & bsplinePose = _spline->spline();
+
+  Eigen::MatrixXd C_p_w(numPoints, 6);
+  Eigen::MatrixXd C_l_b(numPoints, 6);
+  Eigen::MatrixXd C_time(numPoints, 1);
+  std::vector<Eigen::MatrixXd> C_coefficients(_bufferedDesignVariables.size(),
+                                              Eigen::MatrixXd::Zero(numPoints, 6));
+  Eigen::MatrixXd JS;
+  Eigen::MatrixXd JT;
+  for (int i = 0; i < numPoints; ++i) {
+    const double t = pointTime(i, offset);
+    const Eigen::VectorXd c = bsplinePose.evalDAndJacobian(t, 0, &JS, NULL);
+    const Eigen::Matrix4d T_w_b = bsplinePose.curveValueToTransformationAndJacobian(c, &JT);
+    const Eigen::Matrix4d T_p_l = T_p_w * T_w_b * T_b_l;
+
+    // The derivatives of the plane distance d = n^T t_p_l and the cosine theta = n^T C_p_l v
+    // wrt. a perturbation of T_p_l on the left.
+    const Eigen::Vector3d u = T_p_l.topLeftCorner<3, 3>() * _directions.col(i);
+    const double d = T_p_l(2, 3);
+    const double theta = u[2];
+    Eigen::Vector4d t_p_l = T_p_l.col(3);
+    const chain_t Jd = sm::kinematics::boxMinus(t_p_l).row(2);
+    const chain_t Jtheta = sm::kinematics::boxMinus(Eigen::Vector4d(u[0], u[1], u[2], 0.0)).row(2);
+    const chain_t C_p_l = -_signs[i] * (Jd * theta - d * Jtheta) / (theta * theta);
+
+    // Perturbing T_p_w on the left perturbs T_p_l the same way. Perturbing T_w_b on the left
+    // perturbs T_p_l by the adjoint of T_p_w. Perturbing T_l_b on the left perturbs T_p_l
+    // by minus the adjoint of T_p_l.
+    C_p_w.row(i) = C_p_l;
+    C_l_b.row(i) = -C_p_l * sm::kinematics::boxTimes(T_p_l);
+    const chain_t C_curve = C_p_l * Ad_p_w * JT;
+
+    // The spline Jacobian is kron(basis^T, I), so each coefficient block is the chain
+    // through the curve value scaled by its basis function value.
+    const int minIdx = bsplinePose.localVvCoefficientVectorIndices(t)(0) - _bufferedMinIndex;
+    for (int j = 0; j < JS.cols() / 6; ++j) {
+      C_coefficients[minIdx + j].row(i) = C_curve * JS(0, j * 6);
+    }
+    C_time(i, 0) = (C_curve * bsplinePose.evalD(t, 1))(0);
+  }
+
+  _T_p_w.evaluateJacobians(_jacobians, C_p_w);
+  _T_l_b.evaluateJacobians(_jacobians, C_l_b);
+  _timeOffset.evaluateJacobians(_jacobians, C_time);
+  // Keep the buffered coefficients in the Jacobian so its structure does not change with the time offset.
+  for (size_t j = 0; j < _bufferedDesignVariables.size(); ++j) {
+    _jacobians.add(_bufferedDesignVariables[j], C_coefficients[j]);
+  }
+}
+
+}  // namespace kalibr_errorterms
@@ -0,0 +1,63 @@
+#include <kalibr_errorterms/LiDARPlaneRangeErrorBuilder.hpp>
+#include <aslam/Exceptions.hpp>
+#include <algorithm>
+
+namespace kalibr_errorterms {
+
+LiDARPlaneRangeErrorBuilder::LiDARPlaneRangeErrorBuilder(
+    aslam::splines::BSplinePoseDesignVariable * poseSplineDv,
+    const aslam::backend::ScalarExpression & timeOffset,
+    double leftBuffer, double rightBuffer,
+    const aslam::backend::TransformationExpression & T_l_b,
+    size_t maxBlockSize)
+    : _poseSplineDv(poseSplineDv),
+      _timeOffset(timeOffset),
+      _leftBuffer(leftBuffer),
+      _rightBuffer(rightBuffer),
+      _T_l_b(T_l_b),
+      _maxBlockSize(maxBlockSize) {
+  SM_ASSERT_TRUE(aslam::Exception, _poseSplineDv != NULL, "The pose spline must not be null");
+  SM_ASSERT_GT(aslam::Exception, _maxBlockSize, 0u, "The blocks must hold at least one point");
+}
+
+LiDARPlaneRangeErrorBuilder::~LiDARPlaneRangeErrorBuilder() {
+
+}
+
+std::vector<LiDARPlaneRangeErrorBuilder::error_ptr_t> LiDARPlaneRangeErrorBuilder::build(
+    aslam::calibration::OptimizationProblem & problem,
+    const Eigen::MatrixXd & points, const Eigen::VectorXd & stamps, double invR,
+    const aslam::backend::TransformationExpression & T_p_w) {
+  SM_ASSERT_EQ(aslam::Exception, points.cols(), 3, "The points must be given as N x 3 array");
+  SM_ASSERT_EQ(aslam::Exception, points.rows(), stamps.size(), "One stamp per point is required");
+
+  const bsplines::BSplinePose & bsplinePose = _poseSplineDv->spline();
+  const double offset = _timeOffset.toScalar();
+  const int numPoints = stamps.size();
+  std::vector<error_ptr_t> errors;
+  int start = 0;
+  while (start < numPoints) {
+    const double tStart = std::min(std::max(stamps[start] + offset, bsplinePose.t_min()), bsplinePose.t_max());
+    const int segment = bsplinePose.segmentIndex(tStart);
+    const std::pair<double, double> interval = bsplinePose.timeInterval(segment);
+    int end = start + 1;
+    while (end < numPoints && end - start < (int) _maxBlockSize) {
+      const double t = stamps[end] + offset;
+      if (t < interval.first || t >= interval.second) {
+        break;
+      }
+      ++end;
+    }
+
+    error_ptr_t error(new LiDARPlaneRangeError(points.middleRows(start, end - start),
+                                               stamps.segment(start, end - start), invR,
+                                               _poseSplineDv, _timeOffset,
+                                               _leftBuffer, _rightBuffer, _T_l_b, T_p_w));
+    problem.addErrorTerm(error);
+    errors.push_back(error);
+    start = end;
+  }
+  return errors;
+}
+
+}  // namespace kalibr_errorterms
@@ -0,0 +1,82 @@
+#include <kalibr_errorterms/LiDARRegistrationError.hpp>
+#include <aslam/Exceptions.hpp>
+#include <sm/kinematics/transformations.hpp>
+#include <cmath>
+
+namespace kalibr_errorterms {
+
+LiDARRegistrationError::LiDARRegistrationError(
+    const Eigen::MatrixXd & points, const Eigen::MatrixXd & sensorTransforms,
+    const aslam::backend::TransformationExpression & T_b_l)
+    : aslam::backend::ErrorTermDs(3 * points.rows()),
+      _T_b_l(T_b_l) {
+  SM_ASSERT_EQ(aslam::Exception, points.cols(), 3, "The points must be given as N x 3 array");
+  SM_ASSERT_GT(aslam::Exception, points.rows(), 0, "At least one point is required");
+  SM_ASSERT_EQ(aslam::Exception, sensorTransforms.cols(), 4, "The sensor motions must be given as 4N x 4 array");
+  SM_ASSERT_EQ(aslam::Exception, sensorTransforms.rows(), 4 * points.rows(), "One sensor motion per point is required");
+
+  const int numPoints = points.rows();
+  _points.resize(4, numPoints);
+  _points.topRows<3>() = points.transpose();
+  _points.row(3).setOnes();
+  _sensorTransforms.resize(numPoints);
+  for (int i = 0; i < numPoints; ++i) {
+    _sensorTransforms[i] = sensorTransforms.block<4, 4>(4 * i, 0);
+  }
+  setTargets(points, Eigen::VectorXd::Ones(numPoints));
+
+  aslam::backend::DesignVariable::set_t dvs;
+  _T_b_l.getDesignVariables(dvs);
+  setDesignVariablesIterator(dvs.begin(), dvs.end());
+}
+
+LiDARRegistrationError::~LiDARRegistrationError() {
+
+}
+
+void LiDARRegistrationError::setTargets(const Eigen::MatrixXd & targets, const Eigen::VectorXd & weights) {
+  SM_ASSERT_EQ(aslam::Exception, targets.rows(), _points.cols(), "One target per point is required");
+  SM_ASSERT_EQ(aslam::Exception, targets.cols(), 3, "The targets must be given as N x 3 array");
+  SM_ASSERT_EQ(aslam::Exception, weights.size(), _points.cols(), "One weight per point is required");
+  SM_ASSERT_TRUE(aslam::Exception, (weights.array() >= 0.0).all(), "The weights must not be negative");
+  _targets = targets;
+  Eigen::VectorXd sqrtWeights(3 * weights.size());
+  for (int i = 0; i < weights.size(); ++i) {
+    sqrtWeights.segment<3>(3 * i).setConstant(std::sqrt(weights[i]));
+  }
+  setSqrtInvR(sqrtWeights.asDiagonal().toDenseMatrix());
+}
+
+Eigen::MatrixXd LiDARRegistrationError::getPredictedMeasurement() {
+  const Eigen::Matrix4d T_b_l = _T_b_l.toTransformationMatrix();
+  const Eigen::Matrix4d T_l_b = T_b_l.inverse();
+  Eigen::MatrixXd predicted(_points.cols(), 3);
+  for (int i = 0; i < _points.cols(); ++i) {
+    predicted.row(i) = (T_l_b * (_sensorTransforms[i] * (T_b_l * _points.col(i)))).head<3>().transpose();
+  }
+  return predicted;
+}
+
+double LiDARRegistrationError::evaluateErrorImplementation() {
+  const Eigen::MatrixXd residuals = (getPredictedMeasurement() - _targets).transpose();
+  setError(Eigen::Map<const Eigen::VectorXd>(residuals.data(), residuals.size()));
+  return evaluateChiSquaredError();
+}
+
+void LiDARRegistrationError::evaluateJacobiansImplementation(
+    aslam::backend::JacobianContainer & _jacobians) const {
+  const Eigen::Matrix4d T_b_l = _T_b_l.toTransformationMatrix();
+  const Eigen::Matrix4d T_l_b = T_b_l.inverse();
+  Eigen::MatrixXd C_b_l(3 * _points.cols(), 6);
+  for (int i = 0; i < _points.cols(); ++i) {
+    // Perturbing T_b_l on the left moves the point before and, inversely, after the sensor motion.
+    const Eigen::Vector4d q = T_b_l * _points.col(i);
+    const Eigen::Vector4d r = _sensorTransforms[i] * q;
+    const Eigen::Matrix<double, 4, 6> J = T_l_b * (_sensorTransforms[i] * sm::kinematics::boxMinus(q)
+                                                    - sm::kinematics::boxMinus(r));
+    C_b_l.block<3, 6>(3 * i, 0) = J.topRows<3>();
+  }
+  _T_b_l.evaluateJacobians(_jacobians, C_b_l);
+}
+
+}  // namespace kalibr_errorterms
@@ -0,0 +1,60 @@
+// It is extremely important to use this header
+// if you are using the numpy_eigen interface
+#include <numpy_eigen/boost_python_headers.hpp>
+#include <aslam/cameras.hpp>
+#include <kalibr_errorterms/ReprojectionErrorBuilder.hpp>
+
+namespace {
+
+template<typename CAMERA_GEOMETRY_T>
+boost::python::list observationErrorTerms(
+    const kalibr_errorterms::ReprojectionErrorBuilder<CAMERA_GEOMETRY_T> & builder, size_t i) {
+  boost::python::list errorTerms;
+  for (size_t k = builder.observationBegin(i); k < builder.observationEnd(i); ++k) {
+    errorTerms.append(builder.errorTerm(k));
+  }
+  return errorTerms;
+}
+
+template<typename CAMERA_GEOMETRY_T>
+void exportReprojectionErrorBuilder(const std::string & camName) {
+  using namespace boost::python;
+  using namespace kalibr_errorterms;
+  typedef CAMERA_GEOMETRY_T geometry_t;
+  typedef ReprojectionErrorBuilder<geometry_t> builder_t;
+
+  std::string name = camName + "ReprojectionErrorBuilder";
+  class_<builder_t, boost::shared_ptr<builder_t>, boost::noncopyable>(
+      name.c_str(),
+      init<const boost::shared_ptr<geometry_t> &, aslam::splines::BSplinePoseDesignVariable *,
+          const aslam::backend::TransformationExpression &, const aslam::backend::ScalarExpression &,
+          double, double>(
+          (name + "(geometry, poseSplineDv, T_c_b, timeOffset, cornerSigma, timeOffsetPadding)").c_str()))
+    .def("setTargetTransformation", &builder_t::setTargetTransformation,
+         "setTargetTransformation(targetId, T_p_w)")
+    .def("setMEstimatorPolicy", &builder_t::setMEstimatorPolicy)
+    .def("build", &builder_t::build,
+         "build(problem, imageCorners, targetCorners, cornerCounts, stamps, targetIds)")
+    .def("numErrorTerms", &builder_t::numErrorTerms)
+    .def("errorTerm", &builder_t::errorTerm)
+    .def("numObservations", &builder_t::numObservations)
+    .def("observationIndex", &builder_t::observationIndex)
+    .def("observationErrorTerms", &observationErrorTerms<geometry_t>)
+    .def("evaluateErrors", &builder_t::evaluateErrors)
+    .def("errors", &builder_t::errors);
+}
+
+}  // namespace
+
+void exportReprojectionErrorBuilders() {
+  using namespace aslam::cameras;
+  exportReprojectionErrorBuilder<PinholeCameraGeometry>("Pinhole");
+  exportReprojectionErrorBuilder<DistortedPinholeCameraGeometry>("DistortedPinhole");
+  exportReprojectionErrorBuilder<EquidistantDistortedPinholeCameraGeometry>("EquidistantDistortedPinhole");
+  exportReprojectionErrorBuilder<FovDistortedPinholeCameraGeometry>("FovDistortedPinhole");
+  exportReprojectionErrorBuilder<OmniCameraGeometry>("Omni");
+  exportReprojectionErrorBuilder<DistortedOmniCameraGeometry>("DistortedOmni");
+  exportReprojectionErrorBuilder<EquidistantDistortedOmniCameraGeometry>("EquidistantDistortedOmni");
+  exportReprojectionErrorBuilder<ExtendedUnifiedCameraGeometry>("ExtendedUnified");
+  exportReprojectionErrorBuilder<DoubleSphereCameraGeometry>("DoubleSphere");
+}
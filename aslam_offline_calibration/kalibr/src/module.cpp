@@ -6,6 +6,37 @@
 #include <kalibr_errorterms/GyroscopeError.hpp>
 #include <kalibr_errorterms/AccelerometerError.hpp>
 #include <kalibr_errorterms/ScalarError.hpp>
+#include <kalibr_errorterms/ImuErrorBuilder.hpp>
+#include <kalibr_errorterms/LiDARPlaneRangeError.hpp>
+#include <kalibr_errorterms/LiDARPlaneRangeErrorBuilder.hpp>
+#include <kalibr_errorterms/LiDARRegistrationError.hpp>
+#include <sm/python/stl_converters.hpp>
+
+void exportReprojectionErrorBuilders();
+
+boost::python::list gyroscopeErrors(const kalibr_errorterms::ImuErrorBuilder & builder) {
+  boost::python::list errors;
+  sm::python::stlToList(builder.gyroscopeErrors().begin(), builder.gyroscopeErrors().end(), errors);
+  return errors;
+}
+
+boost::python::list accelerometerErrors(const kalibr_errorterms::ImuErrorBuilder & builder) {
+  boost::python::list errors;
+  sm::python::stlToList(builder.accelerometerErrors().begin(), builder.accelerometerErrors().end(), errors);
+  return errors;
+}
+
+boost::python::list buildLiDARPlaneRangeErrors(kalibr_errorterms::LiDARPlaneRangeErrorBuilder & builder,
+                                               aslam::calibration::OptimizationProblem & problem,
+                                               const Eigen::MatrixXd & points, const Eigen::VectorXd & stamps,
+                                               double invR, const aslam::backend::TransformationExpression & T_p_w) {
+  std::vector<kalibr_errorterms::LiDARPlaneRangeErrorBuilder::error_ptr_t> built =
+      builder.build(problem, points, stamps, invR, T_p_w);
+  boost::python::list errors;
+  sm::python::stlToList(built.begin(), built.end(), errors);
+  return errors;
+}
+
 // The title of this library must match exactly
 BOOST_PYTHON_MODULE(libkalibr_errorterms_python)
 {
@@ -77,4 +108,55 @@ BOOST_PYTHON_MODULE(libkalibr_errorterms_python)
             init<const double & , const Eigen::Matrix<double,1,1> &, const aslam::backend::ScalarExpression & >
             ("ScalarError(measurement, invR, predictedMeasurement)"));
 
+    class_<ImuErrorBuilder, boost::shared_ptr<ImuErrorBuilder>, boost::noncopyable>("ImuErrorBuilder",
+            init<aslam::splines::BSplinePoseDesignVariable *, const RotationExpression &, const EuclideanExpression &>
+            ("ImuErrorBuilder(poseSplineDv, C_i_b, r_b)"))
+    .def("setStaticBias", &ImuErrorBuilder::setStaticBias, "setStaticBias(gyroBias, accelBias)")
+    .def("setBiasSplines", &ImuErrorBuilder::setBiasSplines, "setBiasSplines(gyroBiasDv, accelBiasDv)")
+    .def("buildGyroscopeErrors", &ImuErrorBuilder::buildGyroscopeErrors,
+         "buildGyroscopeErrors(problem, stamps, omegas, invR, g_w, mEstimator): invR is 3x3 or 3Nx3")
+    .def("buildAccelerometerErrors", &ImuErrorBuilder::buildAccelerometerErrors,
+         "buildAccelerometerErrors(problem, stamps, alphas, invR, g_w, mEstimator): invR is 3x3 or 3Nx3")
+    .def("gyroscopeErrors", &gyroscopeErrors)
+    .def("accelerometerErrors", &accelerometerErrors);
+
+    class_<ScaledMisalignedImuErrorBuilder, boost::shared_ptr<ScaledMisalignedImuErrorBuilder>,
+    bases<ImuErrorBuilder>, boost::noncopyable>("ScaledMisalignedImuErrorBuilder",
+            init<aslam::splines::BSplinePoseDesignVariable *, const RotationExpression &, const EuclideanExpression &,
+            const MatrixExpression &, const RotationExpression &, const MatrixExpression &, const MatrixExpression &>
+            ("ScaledMisalignedImuErrorBuilder(poseSplineDv, C_i_b, r_b, M_accel, C_gyro_i, M_gyro, M_accel_gyro)"));
+
+    class_<ScaledMisalignedSizeEffectImuErrorBuilder, boost::shared_ptr<ScaledMisalignedSizeEffectImuErrorBuilder>,
+    bases<ScaledMisalignedImuErrorBuilder>, boost::noncopyable>("ScaledMisalignedSizeEffectImuErrorBuilder",
+            init<aslam::splines::BSplinePoseDesignVariable *, const RotationExpression &, const EuclideanExpression &,
+            const MatrixExpression &, const RotationExpression &, const MatrixExpression &, const MatrixExpression &,
+            const EuclideanExpression &, const EuclideanExpression &, const EuclideanExpression &,
+            const MatrixExpression &, const MatrixExpression &, const MatrixExpression &>
+            ("ScaledMisalignedSizeEffectImuErrorBuilder(poseSplineDv, C_i_b, r_b, M_accel, C_gyro_i, M_gyro, M_accel_gyro, "
+             "rx_i, ry_i, rz_i, Ix, Iy, Iz)"));
+
+    class_<LiDARPlaneRangeError, boost::shared_ptr<LiDARPlaneRangeError>, bases< ErrorTerm >, boost::noncopyable>("LiDARPlaneRangeError",
+            init<const Eigen::MatrixXd &, const Eigen::VectorXd &, double, aslam::splines::BSplinePoseDesignVariable *,
+            const ScalarExpression &, double, double, const TransformationExpression &, const TransformationExpression &>
+            ("LiDARPlaneRangeError(points, stamps, invR, poseSplineDv, timeOffset, leftBuffer, rightBuffer, T_l_b, T_p_w)"))
+    .def("getMeasurement", &LiDARPlaneRangeError::getMeasurement, return_value_policy<copy_const_reference>())
+    .def("getPredictedMeasurement", &LiDARPlaneRangeError::getPredictedMeasurement);
+
+    class_<LiDARPlaneRangeErrorBuilder, boost::shared_ptr<LiDARPlaneRangeErrorBuilder>, boost::noncopyable>("LiDARPlaneRangeErrorBuilder",
+            init<aslam::splines::BSplinePoseDesignVariable *, const ScalarExpression &, double, double,
+            const TransformationExpression &, size_t>
+            ("LiDARPlaneRangeErrorBuilder(poseSplineDv, timeOffset, leftBuffer, rightBuffer, T_l_b, maxBlockSize)"))
+    .def("build", &buildLiDARPlaneRangeErrors,
+         "build(problem, points, stamps, invR, T_p_w) -> list of error terms");
+
+    class_<LiDARRegistrationError, boost::shared_ptr<LiDARRegistrationError>, bases< ErrorTerm >, boost::noncopyable>("LiDARRegistrationError",
+            init<const Eigen::MatrixXd &, const Eigen::MatrixXd &, const TransformationExpression &>
+            ("LiDARRegistrationError(points, sensorTransforms, T_b_l)"))
+    .def("setTargets", &LiDARRegistrationError::setTargets,
+         "setTargets(targets, weights)")
+    .def("getMeasurement", &LiDARRegistrationError::getMeasurement, return_value_policy<copy_const_reference>())
+    .def("getPredictedMeasurement", &LiDARRegistrationError::getPredictedMeasurement);
+
+    exportReprojectionErrorBuilders();
+
 }
@@ -1,9 +1,16 @@
 #include <kalibr_errorterms/AccelerometerError.hpp>
 #include <kalibr_errorterms/GyroscopeError.hpp>
+#include <kalibr_errorterms/ImuErrorBuilder.hpp>
+#include <kalibr_errorterms/LiDARPlaneRangeError.hpp>
+#include <kalibr_errorterms/LiDARRegistrationError.hpp>
 #include <aslam/backend/test/ErrorTermTestHarness.hpp>
 #include <aslam/backend/RotationQuaternion.hpp>
 #include <aslam/backend/EuclideanPoint.hpp>
+#include <aslam/backend/Scalar.hpp>
+#include <aslam/backend/TransformationBasic.hpp>
 #include <sm/kinematics/quaternion_algebra.hpp>
+#include <sm/kinematics/EulerRodriguez.hpp>
+#include <sm/eigen/gtest.hpp>
 
 // GyroscopeError(const Eigen::Vector3d & measurement, const Eigen::Matrix3d & invR, const aslam::backend::EuclideanExpression & angularVelocity, const aslam::backend::EuclideanExpression & bias );
 
@@ -102,3 +109,159 @@ TEST(ImuCameraTests, testEccentricAccelerometer) {
 
 	harness.testAll(1e-5);
 }
+
+TEST(ImuCameraTests, testImuErrorsShareSplineEvaluations) {
+	using namespace aslam::backend;
+	using namespace aslam::splines;
+	using namespace kalibr_errorterms;
+
+	boost::shared_ptr<sm::kinematics::EulerRodriguez> rk(new sm::kinematics::EulerRodriguez);
+	bsplines::BSplinePose bsplinePose(4, rk);
+	const int N = 10;
+	Eigen::VectorXd times(N);
+	for (int i = 0; i < N; ++i) {
+		times(i) = i;
+	}
+	Eigen::Matrix<double, 6, Eigen::Dynamic> K(6, N);
+	K.setRandom();
+	bsplinePose.initPoseSpline3(times, K, 6, 1e-4);
+
+	BSplinePoseDesignVariable bdv(bsplinePose);
+	for (size_t i = 0; i < bdv.numDesignVariables(); ++i) {
+		bdv.designVariable(i)->setActive(true);
+		bdv.designVariable(i)->setBlockIndex(i);
+	}
+
+	RotationQuaternion q_i_b(sm::kinematics::quatRandom());
+	EuclideanPoint r_b(Eigen::Vector3d::Random());
+	EuclideanPoint g_w(Eigen::Vector3d(0.0, 0.0, -9.81));
+	ImuErrorBuilder builder(&bdv, q_i_b.toExpression(), r_b.toExpression());
+
+	aslam::calibration::OptimizationProblem problem;
+	Eigen::VectorXd stamps(1);
+	stamps << 4.3;
+	Eigen::MatrixXd omegas = Eigen::MatrixXd::Random(1, 3);
+	Eigen::MatrixXd alphas = Eigen::MatrixXd::Random(1, 3);
+	boost::shared_ptr<MEstimator> noMEstimator;
+	ASSERT_EQ(1u, builder.buildGyroscopeErrors(problem, stamps, omegas, Eigen::Matrix3d::Identity(),
+			g_w.toExpression(), noMEstimator));
+	ASSERT_EQ(1u, builder.buildAccelerometerErrors(problem, stamps, alphas, Eigen::Matrix3d::Identity(),
+			g_w.toExpression(), noMEstimator));
+
+	// evaluate twice, the second time after a spline update to check the cache invalidation
+	for (int pass = 0; pass < 2; ++pass) {
+		const size_t evaluationsBefore = bdv.numEvaluations();
+		JacobianContainer Jg(3), Ja(3);
+		builder.gyroscopeErrors()[0]->evaluateError();
+		builder.accelerometerErrors()[0]->evaluateError();
+		builder.gyroscopeErrors()[0]->evaluateJacobians(Jg);
+		builder.accelerometerErrors()[0]->evaluateJacobians(Ja);
+		// both terms evaluate the spline and its first two derivatives once in total
+		ASSERT_EQ(evaluationsBefore + 3, bdv.numEvaluations());
+
+		Eigen::VectorXd dx = 0.1 * Eigen::VectorXd::Random(6);
+		std::vector<DesignVariable *> dvs = bdv.getDesignVariables(stamps[0]);
+		dvs[1]->update(dx.data(), 6);
+	}
+}
+
+TEST(LiDARErrorTermTests, testLiDARPlaneRangeError) {
+	using namespace aslam::backend;
+	using namespace aslam::splines;
+	using namespace kalibr_errorterms;
+
+	boost::shared_ptr<sm::kinematics::EulerRodriguez> rk(new sm::kinematics::EulerRodriguez);
+	bsplines::BSplinePose bsplinePose(4, rk);
+	const int N = 10;
+	Eigen::VectorXd times(N);
+	for (int i = 0; i < N; ++i) {
+		times(i) = i;
+	}
+	Eigen::Matrix<double, 6, Eigen::Dynamic> K(6, N);
+	K.setRandom();
+	bsplinePose.initPoseSpline3(times, K, 6, 1e-4);
+	BSplinePoseDesignVariable bdv(bsplinePose);
+
+	Scalar timeOffset(0.01);
+	RotationQuaternion q_l_b(sm::kinematics::quatRandom());
+	EuclideanPoint t_l_b(Eigen::Vector3d::Random());
+	RotationQuaternion q_p_w(sm::kinematics::quatRandom());
+	EuclideanPoint t_p_w(Eigen::Vector3d::Random());
+	TransformationExpression T_l_b(boost::shared_ptr<TransformationExpressionNode>(
+			new TransformationBasic(q_l_b.toExpression(), t_l_b.toExpression())));
+	TransformationExpression T_p_w(boost::shared_ptr<TransformationExpressionNode>(
+			new TransformationBasic(q_p_w.toExpression(), t_p_w.toExpression())));
+
+	// Measure noisy ranges to the plane along directions that are not parallel to it.
+	const int numPoints = 20;
+	Eigen::VectorXd stamps = Eigen::VectorXd::LinSpaced(numPoints, 4.0, 4.3);
+	Eigen::MatrixXd points(numPoints, 3);
+	Eigen::VectorXd expectedPredictions(numPoints);
+	for (int i = 0; i < numPoints; ++i) {
+		const Eigen::Matrix4d T_p_l = T_p_w.toTransformationMatrix()
+				* bsplinePose.transformation(stamps[i] + timeOffset.toScalar())
+				* T_l_b.toTransformationMatrix().inverse();
+		Eigen::Vector3d direction;
+		do {
+			direction = Eigen::Vector3d::Random().normalized();
+		} while (std::fabs((T_p_l.topLeftCorner<3, 3>() * direction)[2]) < 0.3);
+		expectedPredictions[i] = std::fabs(T_p_l(2, 3) / (T_p_l.topLeftCorner<3, 3>() * direction)[2]);
+		points.row(i) = (expectedPredictions[i] + 0.01 * Eigen::VectorXd::Random(1)[0]) * direction.transpose();
+	}
+
+	LiDARPlaneRangeError error(points, stamps, 4.0, &bdv, timeOffset.toExpression(), 0.1, 0.1, T_l_b, T_p_w);
+	ASSERT_EQ(numPoints, (int) error.dimension());
+	sm::eigen::assertNear(error.getPredictedMeasurement(), expectedPredictions, 1e-9,
+			SM_SOURCE_FILE_POS, "The predicted ranges differ from the plane intersections");
+	sm::eigen::assertNear(error.vsError(), expectedPredictions - points.rowwise().norm(), 1e-9,
+			SM_SOURCE_FILE_POS, "The error is not the predicted minus the measured range");
+	ASSERT_NEAR(4.0 * error.vsError().squaredNorm(), error.evaluateError(), 1e-9);
+	Eigen::VectorXd weightedError;
+	error.getWeightedError(weightedError, false);
+	sm::eigen::assertNear(weightedError, 2.0 * error.vsError(), 1e-9,
+			SM_SOURCE_FILE_POS, "The error is not weighted by the square root of the inverse variance");
+	sm::eigen::assertNear(error.vsInvR(), 4.0 * Eigen::MatrixXd::Identity(numPoints, numPoints), 1e-9,
+			SM_SOURCE_FILE_POS, "The inverse covariance is not the inverse variance times the identity");
+
+	ErrorTermTestHarness<1> harness(&error);
+	harness.testAll(1e-5);
+}
+
+TEST(LiDARErrorTermTests, testLiDARRegistrationError) {
+	using namespace aslam::backend;
+	using namespace kalibr_errorterms;
+
+	RotationQuaternion q_b_l(sm::kinematics::quatRandom());
+	EuclideanPoint t_b_l(Eigen::Vector3d::Random());
+	TransformationExpression T_b_l(boost::shared_ptr<TransformationExpressionNode>(
+			new TransformationBasic(q_b_l.toExpression(), t_b_l.toExpression())));
+
+	const int numPoints = 10;
+	Eigen::MatrixXd points = Eigen::MatrixXd::Random(numPoints, 3);
+	Eigen::MatrixXd sensorTransforms(4 * numPoints, 4);
+	Eigen::MatrixXd expectedPredictions(numPoints, 3);
+	for (int i = 0; i < numPoints; ++i) {
+		Eigen::Matrix4d T = Eigen::Matrix4d::Identity();
+		T.topLeftCorner<3, 3>() = sm::kinematics::quat2r(sm::kinematics::quatRandom());
+		T.topRightCorner<3, 1>() = Eigen::Vector3d::Random();
+		sensorTransforms.block<4, 4>(4 * i, 0) = T;
+		const Eigen::Vector4d p(points(i, 0), points(i, 1), points(i, 2), 1.0);
+		expectedPredictions.row(i) = (T_b_l.toTransformationMatrix().inverse() * T
+				* T_b_l.toTransformationMatrix() * p).head<3>().transpose();
+	}
+
+	LiDARRegistrationError error(points, sensorTransforms, T_b_l);
+	ASSERT_EQ(3 * numPoints, (int) error.dimension());
+	sm::eigen::assertNear(error.getPredictedMeasurement(), expectedPredictions, 1e-9,
+			SM_SOURCE_FILE_POS, "The predicted points differ from the moved points");
+
+	Eigen::MatrixXd targets = expectedPredictions + 0.01 * Eigen::MatrixXd::Random(numPoints, 3);
+	error.setTargets(targets, Eigen::VectorXd::Random(numPoints).cwiseAbs());
+	error.evaluateError();
+	Eigen::MatrixXd residuals = (expectedPredictions - targets).transpose();
+	sm::eigen::assertNear(error.vsError(), Eigen::Map<Eigen::VectorXd>(residuals.data(), residuals.size()), 1e-9,
+			SM_SOURCE_FILE_POS, "The error is not the predicted minus the target point");
+
+	ErrorTermTestHarness<1> harness(&error);
+	harness.testAll(1e-5);
+}
@@ -39,6 +39,12 @@ namespace aslam {
 
       virtual std::string name() const { return "block_" + _solverType; }
 
+      /// \brief the number of non-zero entries of the upper triangle of the Hessian.
+      virtual size_t hessianNonZeros() const;
+
+      /// \brief the number of non-zero entries of the last factorization. 0 if not available.
+      virtual size_t factorNonZeros() const;
+
       /// \brief compute only the covariance blocks associated with the block indices passed as an argument
       void computeCovarianceBlocks(const std::vector<std::pair<int, int> >& blockIndices, SparseBlockMatrix& outP);
 
@@ -53,6 +59,10 @@ namespace aslam {
 
       /// Helper Function for DogLeg implementation; returns parts required for the steepest descent solution
       double rhsJtJrhs();
+
+      /// \brief true if the last call to initMatrixStructure() kept the Hessian structure and the
+      ///        symbolic factorization of the previous problem.
+      bool isMatrixStructureReused() const { return _matrixStructureReused; }
         
     private:
 
@@ -61,10 +71,34 @@ namespace aslam {
       /// \brief initialized the matrix structure for the problem with these error terms and errors.
       virtual void initMatrixStructureImplementation(const std::vector<DesignVariable*>& dvs, const std::vector<ErrorTerm*>& errors, bool useDiagonalConditioner);
 
+      /// \brief compute the upper triangular block pattern of the Hessian as a sorted list of row blocks per block column.
+      static void computeBlockPattern(const std::vector<DesignVariable*>& dvs, const std::vector<ErrorTerm*>& errors, std::vector< std::vector<int> >& outPattern);
+
+      /// \brief a function for one thread to build the Hessian of its contiguous range of error terms.
+      ///        Thread 0 builds into the full Hessian, the other threads into their thread-local systems.
+      void buildThreadLocalSystem(size_t threadId, bool useMEstimator);
+
+      /// \brief a function for one thread to add the thread-local Hessian blocks of every nThreads-th block column to the full Hessian.
+      void mergeThreadLocalSystems(size_t threadId, size_t nThreads);
+
 
       /// \brief The full Hessian matrix.
       SparseBlockMatrixWrapper _H;
 
+      /// \brief The partial Hessian matrices and right-hand sides built by the threads other than thread 0.
+      ///        Each thread builds a contiguous range of error terms, so its matrix only holds the blocks
+      ///        of that range. The matrices are freed after they are merged into the full Hessian.
+      std::vector<SparseBlockMatrix> _threadLocalH;
+      std::vector<Eigen::VectorXd> _threadLocalRhs;
+
+      /// \brief The first error term of each thread's range, and the end of the last range.
+      std::vector<size_t> _threadStarts;
+
+      /// \brief The block sizes and block pattern the Hessian and the symbolic factorization were set up for.
+      std::vector<int> _blockSizes;
+      std::vector< std::vector<int> > _blockPattern;
+      bool _matrixStructureReused;
+
       /// \brief the linear solver
       boost::shared_ptr<LinearSolver> _solver;
 
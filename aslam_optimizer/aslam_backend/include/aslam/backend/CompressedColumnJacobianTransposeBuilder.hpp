@@ -59,10 +59,13 @@ namespace aslam {
           jcp = j;
           errorTerm = e;
           eRow = er;
+          hasJacobians = e->hasActiveDesignVariables();
         }
         JacobianColumnPointer jcp;
         size_t eRow;
         ErrorTerm* errorTerm;
+        /// \brief false if the error term has no active design variables and only adds to the cost.
+        bool hasJacobians;
       };
 
       /// \brief An array parallel to the error term array that maps error terms to parts of the Jacobian.
@@ -112,6 +112,9 @@ namespace aslam {
       /// \brief Get the design variables
       const std::vector<DesignVariable*> & designVariables() const;
 
+      /// \brief Is any design variable of this error term active? If not, the error term only adds to the cost.
+      bool hasActiveDesignVariables() const;
+
       /// \brief Get the column base of this error term in the Jacobian matrix.
       size_t rowBase() const;
 
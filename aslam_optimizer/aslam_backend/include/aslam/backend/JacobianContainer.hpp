@@ -3,8 +3,9 @@
 
 #include <sparse_block_matrix/sparse_block_matrix.h>
 #include <aslam/Exceptions.hpp>
-#include <map>
+#include <algorithm>
 #include <set>
+#include <vector>
 #include "DesignVariable.hpp"
 #include "backend.hpp"
 
@@ -15,9 +16,9 @@ namespace aslam {
     public:
       SM_DEFINE_EXCEPTION(Exception, aslam::Exception);
 
-      /// \brief The map type for storing Jacobians. Sorting the list by block index
+      /// \brief The flat list type for storing Jacobians. Sorting the list by block index
       ///        simplifies computing the upper-diagonal of the Hessian matrix.
-      typedef std::map<DesignVariable*, Eigen::MatrixXd, DesignVariable::BlockIndexOrdering> map_t;
+      typedef std::vector< std::pair<DesignVariable*, Eigen::MatrixXd> > map_t;
       typedef DesignVariable::set_t set_t;
 
       JacobianContainer(int rows);
@@ -37,6 +38,16 @@ namespace aslam {
        */
       void evaluateHessian(const Eigen::VectorXd& e, const Eigen::MatrixXd& invR, SparseBlockMatrix& outHessian, Eigen::VectorXd& outRhs) const;
 
+      /// \brief Evaluate the Hessian and the RHS of Gauss-Newton for an error whose rows are
+      ///        independent and have the same uncertainty, \f$ \mathbf R^{-1} = s^2 \mathbf 1 \f$.
+      ///        This does not need the dense square root of the inverse covariance.
+      ///
+      /// @param e          The error used for evaluation of the Hessian
+      /// @param sqrtInvR   The square root s of the inverse variance of each row of the error
+      /// @param outHessian After evaluation this Hessian matrix will be filled in with s^2 J^T J
+      /// @param outRhs     After evaluation this vector will be filled in with s^2 J^T e
+      void evaluateHessian(const Eigen::VectorXd& e, double sqrtInvR, SparseBlockMatrix& outHessian, Eigen::VectorXd& outRhs) const;
+
       /// \brief Add the rhs container to this one.
       void add(const JacobianContainer& rhs);
 
@@ -95,7 +106,31 @@ namespace aslam {
 
       /// The number of columns in the compressed Jacobian. Warning: this is expensive.
       int cols() const;
+
+      /// \brief Borrows the container owned by the calling thread, reset to the given number of rows,
+      ///        for the lifetime of this object. Its storage is kept between borrows, so evaluating the
+      ///        Jacobians of one error term after another does not allocate once the matrices have their sizes.
+      ///        The container is not reentrant: borrowing it again on the same thread while it is borrowed throws.
+      class ThreadLocalScratch {
+      public:
+        explicit ThreadLocalScratch(int rows);
+        ~ThreadLocalScratch();
+
+        JacobianContainer& container();
+      private:
+        ThreadLocalScratch(const ThreadLocalScratch&);
+        ThreadLocalScratch& operator=(const ThreadLocalScratch&);
+
+        JacobianContainer* _container;
+        bool* _inUse;
+      };
     private:
+      /// \brief Orders the list entries by the block index of their design variable.
+      struct BlockIndexLess {
+        bool operator()(const map_t::value_type& entry, const DesignVariable* dv) const {
+          return entry.first->blockIndex() < dv->blockIndex();
+        }
+      };
 
       void buildCorrelatedHessianBlock(const Eigen::VectorXd& e,
                                        const Eigen::MatrixXd& J1, int j1_block,
@@ -111,8 +146,16 @@ namespace aslam {
       /// \brief The number of rows for this set of Jacobians
       int _rows;
 
-      /// \brief The list of design variables.
-      map_t _jacobianMap;
+      /// \brief The list of design variables and their Jacobians. Only the first
+      ///        _numJacobians entries are in use. The entries past them are kept after
+      ///        clear() so that their matrices can be reused by an add() of the same size.
+      map_t _jacobians;
+      size_t _numJacobians;
+
+      /// \brief Scratch storage for applyChainRule() and evaluateHessian().
+      Eigen::MatrixXd _chainRuleScratch;
+      mutable map_t _scaledJacobians;
+      mutable Eigen::VectorXd _scaledError;
     };
 
 
@@ -125,13 +168,31 @@ namespace aslam {
       if (! dv->isActive())
         return;
       SM_ASSERT_GE_DBG(Exception, dv->blockIndex(), 0, "The design variable is active but the block index is less than zero.");
-      map_t::iterator it = _jacobianMap.find(dv);
-      if (it == _jacobianMap.end()) {
-        _jacobianMap.insert(_jacobianMap.end(), std::make_pair(dv, Eigen::MatrixXd(Jacobian.template cast<double>())));
-      } else {
+      map_t::iterator it = std::lower_bound(begin(), end(), dv, BlockIndexLess());
+      if (it != end() && it->first->blockIndex() == dv->blockIndex()) {
         SM_ASSERT_TRUE_DBG(Exception, it->first == dv, "Two design variables had the same block index but different pointer values");
         it->second += Jacobian.template cast<double>();
+        return;
+      }
+      const size_t position = it - begin();
+      // Prefer a spare entry whose matrix already has the size of the Jacobian, so that the
+      // Jacobians of 1, 3, 4 or 6 dimensional design variables keep their own matrices.
+      map_t::iterator spare = end();
+      for (map_t::iterator st = end(); st != _jacobians.end(); ++st) {
+        if (st->second.rows() == Jacobian.rows() && st->second.cols() == Jacobian.cols()) {
+          std::iter_swap(spare, st);
+          break;
+        }
+      }
+      if (_numJacobians == _jacobians.size()) {
+        _jacobians.push_back(map_t::value_type(NULL, Eigen::MatrixXd()));
+        spare = _jacobians.begin() + _numJacobians;
       }
+      // Fill the spare entry, reusing its matrix, and rotate it into place.
+      spare->first = dv;
+      spare->second = Jacobian.template cast<double>();
+      std::rotate(_jacobians.begin() + position, spare, spare + 1);
+      ++_numJacobians;
     }
 
 
@@ -33,6 +33,7 @@ namespace aslam {
             virtual std::ostream & printState(std::ostream & out) const;
           virtual bool requiresAugmentedDiagonal() const;
           virtual std::string name() const { return "levenberg_marquardt"; }
+          virtual double lambda() const { return _lambda; }
         private:
           double getLmRho();
           double _lambdaInit;
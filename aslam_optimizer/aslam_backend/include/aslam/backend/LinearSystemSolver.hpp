@@ -4,6 +4,8 @@
 #include <vector>
 #include <Eigen/Core>
 #include <boost/function.hpp>
+#include <boost/shared_ptr.hpp>
+#include <boost/thread/mutex.hpp>
 #include <sm/assert_macros.hpp>
 
 namespace aslam {
@@ -12,6 +14,7 @@ namespace aslam {
     class DesignVariable;
     class ErrorTerm;
     class Matrix;
+    class ThreadPool;
 
     class LinearSystemSolver {
     public:
@@ -68,6 +71,23 @@ namespace aslam {
       // helper function for dog leg implementation / steepest descent solution
       virtual double rhsJtJrhs() = 0;
 
+      /// \brief the number of non-zero entries stored for the Hessian matrix. 0 if the Hessian is not formed.
+      virtual size_t hessianNonZeros() const {
+        return 0;
+      }
+
+      /// \brief the number of non-zero entries of the last matrix factorization. 0 if not available.
+      virtual size_t factorNonZeros() const {
+        return 0;
+      }
+
+      /// \brief Set the worker threads used for the multithreaded jobs.
+      ///        This allows the threads to be shared between solvers and kept alive between calls.
+      void setThreadPool(const boost::shared_ptr<ThreadPool>& threadPool);
+
+      /// \brief the worker threads used for the multithreaded jobs. They are created on first use if none were set.
+      boost::shared_ptr<ThreadPool> threadPool();
+
     protected:
       /// \brief initialized the matrix structure for the problem with these error terms and errors.
       virtual void initMatrixStructureImplementation(const std::vector<DesignVariable*>& dvs, const std::vector<ErrorTerm*>& errors, bool useDiagonalConditioner) = 0;
@@ -80,14 +100,40 @@ namespace aslam {
       void evaluateErrors(size_t threadId, size_t startIdx, size_t endIdx, bool useMEstimator);
 
       /// \brief a function to split a multi-threaded job across all error term indices.
+      ///        The error terms are split into chunks of similar estimated cost that the threads
+      ///        take in turn until all chunks are processed, so the job may be called several
+      ///        times with the same threadId.
       void setupThreadedJob(boost::function<void(size_t, size_t, size_t, bool)> job, size_t nThreads, bool useMEstimator);
 
+      /// \brief the loop of one thread taking chunks of error terms for a threaded job.
+      void runThreadedJobChunks(const boost::function<void(size_t, size_t, size_t, bool)>& job, size_t threadId, bool useMEstimator);
+
+      /// \brief an estimate of the relative cost of evaluating an error term and its Jacobians.
+      virtual double errorTermCost(const ErrorTerm* errorTerm) const;
+
       /// \brief the vector of error terms.
       std::vector<ErrorTerm*> _errorTerms;
 
       /// \brief The squared error values calculated locally for a single thread.
       std::vector<double> _threadLocalErrors;
 
+      /// \brief for each error term, true if it has active design variables and therefore Jacobians.
+      ///        The other error terms only add to the cost and are skipped when building the system.
+      std::vector<bool> _hasJacobians;
+
+      /// \brief the cumulative estimated cost of the error terms, used to split the threaded jobs.
+      std::vector<double> _cumulativeErrorTermCost;
+
+      /// \brief the first error term index of each chunk of the current threaded job, followed by the number of error terms.
+      std::vector<size_t> _chunkStarts;
+
+      /// \brief the next chunk of the current threaded job to be processed.
+      size_t _nextChunk;
+      boost::mutex _nextChunkMutex;
+
+      /// \brief the worker threads.
+      boost::shared_ptr<ThreadPool> _threadPool;
+
       /// \brief the error vector;
       Eigen::VectorXd _e;
 
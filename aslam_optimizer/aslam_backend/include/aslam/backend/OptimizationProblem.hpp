@@ -45,6 +45,14 @@ namespace aslam {
       /// \brief Remove the error term
       void removeErrorTerm(const ErrorTerm* dv);
 
+      /// \brief Remove a set of error terms. This takes a single pass over the
+      ///        error terms instead of one per removed error term. Throws, and
+      ///        removes nothing, if any of the error terms is not in the problem.
+      void removeErrorTerms(const std::vector<const ErrorTerm*>& errorTerms);
+
+      /// \brief Keep only the error terms i for which keep[i] is true, in their order.
+      void retainErrorTerms(const std::vector<bool>& keep);
+
       /// \brief clear the design variables and error terms.
       void clear();
 
@@ -17,6 +17,7 @@
 #include <aslam/backend/LevenbergMarquardtTrustRegionPolicy.hpp>
 #include <aslam/backend/GaussNewtonTrustRegionPolicy.hpp>
 #include <aslam/backend/DogLegTrustRegionPolicy.hpp>
+#include <aslam/backend/ThreadPool.hpp>
 
 namespace sm {
 
@@ -26,6 +27,7 @@ namespace sm {
 namespace aslam {
   namespace backend {
     class LinearSystemSolver;
+    class BlockCholeskyLinearSystemSolver;
 
     /**
      * \class Optimizer2
@@ -93,6 +95,11 @@ namespace aslam {
       /// \brief compute only the covariance blocks associated with the block indices passed as an argument
       void computeCovarianceBlocks(const std::vector<std::pair<int, int> >& blockIndices, SparseBlockMatrix& outP, double lambda);
 
+      /// \brief compute the joint covariance of the design variables passed as an argument, in their order.
+      ///        Only the blocks between these design variables are recovered from the Cholesky factor
+      ///        of the Hessian, the full inverse is never formed. The problem has to be initialized.
+      Eigen::MatrixXd computeMarginalCovariance(const std::vector<DesignVariable*>& designVariables, double lambda);
+
       void computeHessian(SparseBlockMatrix& outH, double lambda);
 
       /// \brief Evaluate the error at the current state.
@@ -107,6 +114,9 @@ namespace aslam {
       /// \brief print the internal timing information.
       void printTiming() const;
 
+      /// \brief the statistics of every iteration of the last call to optimize().
+      const std::vector<IterationStatistics>& iterationStatistics() const;
+
       /// \brief Do a bunch of checks to see if the problem is well-defined. This includes checking that every error term is
       ///        hooked up to design variables and running finite differences on error terms where this is possible.
       void checkProblemSetup();
@@ -125,6 +135,11 @@ namespace aslam {
 
     private:
 
+      /// \brief Build the Hessian without M-estimators and with the constant conditioner lambda at the
+      ///        current state. The optimizer's own solver is reused if it is a BlockCholeskyLinearSystemSolver,
+      ///        which keeps its matrix structure and symbolic factorization, otherwise a new one is created.
+      boost::shared_ptr<BlockCholeskyLinearSystemSolver> buildConditionedHessian(double lambda);
+
       /// \brief Zero the Gauss-Newton matrices.
       void zeroMatrices();
 
@@ -145,6 +160,9 @@ namespace aslam {
 
       boost::shared_ptr<LinearSystemSolver> _solver;
 
+      /// \brief The worker threads shared by the linear system solvers. They live as long as the optimizer.
+      boost::shared_ptr<ThreadPool> _threadPool;
+
       boost::shared_ptr<TrustRegionPolicy> _trustRegionPolicy;
 
       /// \brief The current optimization problem.
@@ -159,6 +177,9 @@ namespace aslam {
       /// \brief the current set of options
       Optimizer2Options _options;
 
+      /// \brief the statistics of every iteration of the last call to optimize().
+      std::vector<IterationStatistics> _iterationStatistics;
+
     };
 
   } // namespace backend
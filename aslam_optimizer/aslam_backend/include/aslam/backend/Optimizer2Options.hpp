@@ -1,6 +1,8 @@
 #ifndef ASLAM_BACKEND_OPTIMIZER_2_OPTIONS_HPP
 #define ASLAM_BACKEND_OPTIMIZER_2_OPTIONS_HPP
 
+#include <string>
+
 namespace aslam {
   namespace backend {
   class LinearSystemSolver;
@@ -37,6 +39,9 @@ namespace aslam {
       /// \brief The number of threads to use
       int nThreads;
 
+      /// \brief if not empty, the statistics of every iteration are appended to this file as JSON lines.
+      std::string telemetryFile;
+
       boost::shared_ptr<LinearSystemSolver> linearSystemSolver;
       boost::shared_ptr<TrustRegionPolicy> trustRegionPolicy;
     };
@@ -59,6 +64,8 @@ namespace aslam {
       out << "\tlinearSolverMaximumFails: " << options.linearSolverMaximumFails << std::endl;
       /// \brief The number of threads to use
       out << "\tnThreads: " << options.nThreads << std::endl;
+      /// \brief The file the iteration statistics are appended to
+      out << "\ttelemetryFile: " << options.telemetryFile << std::endl;
       return out;
     }
 
@@ -0,0 +1,51 @@
+/** \file PcgLinearSolverOptions.h
+    \brief This file defines the PcgLinearSolverOptions class which
+           contains specific options for the preconditioned conjugate gradient
+           linear solver.
+  */
+
+#ifndef ASLAM_BACKEND_PCG_LINEAR_SOLVER_OPTIONS_H
+#define ASLAM_BACKEND_PCG_LINEAR_SOLVER_OPTIONS_H
+
+namespace aslam {
+  namespace backend {
+
+    /** The class PcgLinearSolverOptions contains specific options for the
+        preconditioned conjugate gradient linear solver.
+        \brief PCG linear solver options
+      */
+    class PcgLinearSolverOptions {
+    public:
+      /** \name Constructors/destructor
+        @{
+        */
+      /// Default constructor
+      PcgLinearSolverOptions();
+      /// Copy constructor
+      PcgLinearSolverOptions(const PcgLinearSolverOptions& other);
+      /// Assignment operator
+      PcgLinearSolverOptions& operator =
+        (const PcgLinearSolverOptions& other);
+      /// Destructor
+      virtual ~PcgLinearSolverOptions();
+      /** @}
+        */
+
+      /** \name Members
+        @{
+        */
+      /// Maximum number of iterations, the number of unknowns if negative
+      int maxIterations;
+      /// Stop when the residual norm drops below this fraction of the norm of the right-hand side
+      double tolerance;
+      /// Verbose mode
+      bool verbose;
+      /** @}
+        */
+
+    };
+
+  }
+}
+
+#endif // ASLAM_BACKEND_PCG_LINEAR_SOLVER_OPTIONS_H
@@ -0,0 +1,114 @@
+#ifndef ASLAM_BACKEND_PCG_LINEAR_SYSTEM_SOLVER_HPP
+#define ASLAM_BACKEND_PCG_LINEAR_SYSTEM_SOLVER_HPP
+
+#include "LinearSystemSolver.hpp"
+#include <Eigen/Cholesky>
+
+#include "aslam/backend/PcgLinearSolverOptions.h"
+
+namespace sm {
+
+  class PropertyTree;
+
+}
+namespace aslam {
+  namespace backend {
+
+    /// \brief Solves the normal equations (J^T J + D^2) dx = J^T e with the preconditioned conjugate gradient method.
+    ///
+    /// Neither the Hessian nor a factorization is formed. The weighted Jacobian blocks of every
+    /// error term are stored and the products J^T J x are evaluated in parallel, so the memory
+    /// grows with the number of Jacobian entries only. The preconditioner is the inverse of the
+    /// diagonal blocks of J^T J + D^2, one block per design variable.
+    class PcgLinearSystemSolver : public LinearSystemSolver {
+    public:
+      PcgLinearSystemSolver(const PcgLinearSolverOptions& options = PcgLinearSolverOptions());
+      PcgLinearSystemSolver(const sm::PropertyTree& config);
+      virtual ~PcgLinearSystemSolver();
+
+      /// \brief build the system of equations.
+      virtual void buildSystem(size_t nThreads, bool useMEstimator);
+
+      /// \brief solve the system storing the solution in outDx and returning true on success.
+      virtual bool solveSystem(Eigen::VectorXd& outDx);
+
+      virtual std::string name() const { return "pcg"; }
+
+      /// Returns the options
+      const PcgLinearSolverOptions& getOptions() const;
+      /// Returns the options
+      PcgLinearSolverOptions& getOptions();
+      /// Sets the options
+      void setOptions(const PcgLinearSolverOptions& options);
+
+      /// Helper Function for DogLeg implementation; returns parts required for the steepest descent solution
+      double rhsJtJrhs();
+
+      /// \brief the number of iterations of the last solve.
+      int getIterations() const { return _iterations; }
+
+      /// \brief the residual norm relative to the norm of the right-hand side after the last solve.
+      double getRelativeResidual() const { return _relativeResidual; }
+
+    private:
+      /// \brief one weighted Jacobian block of an error term.
+      struct JacobianBlock {
+        int blockIndex;
+        Eigen::MatrixXd J;
+      };
+
+      /// \brief initialized the matrix structure for the problem with these error terms and errors.
+      virtual void initMatrixStructureImplementation(const std::vector<DesignVariable*>& dvs, const std::vector<ErrorTerm*>& errors, bool useDiagonalConditioner);
+
+      /// \brief a method for a thread to evaluate and store the Jacobians and accumulate the diagonal blocks and J^T e.
+      void evaluateJacobians(size_t threadId, size_t startIdx, size_t endIdx, bool useMEstimator);
+
+      /// \brief a method for a thread to accumulate J^T J x for a set of error terms.
+      void multiplyJacobians(size_t threadId, size_t startIdx, size_t endIdx, bool useMEstimator);
+
+      /// \brief compute (J^T J + D^2) x, leaving out D^2 if addConditioner is false.
+      void multiplyNormalEquations(const Eigen::VectorXd& x, Eigen::VectorXd& outProduct, bool addConditioner);
+
+      /// \brief factor the diagonal blocks of J^T J + D^2.
+      void computePreconditioner();
+
+      /// \brief apply the inverse of the diagonal blocks to r.
+      void applyPreconditioner(const Eigen::VectorXd& r, Eigen::VectorXd& outZ) const;
+
+      /// \brief the stored Jacobian blocks of each error term.
+      std::vector< std::vector<JacobianBlock> > _jacobians;
+
+      /// \brief the column base and size of each design variable block.
+      std::vector<int> _blockColumnBase;
+      std::vector<int> _blockSizes;
+
+      /// \brief the offset of each diagonal block in the flat diagonal block storage.
+      std::vector<int> _blockOffsets;
+
+      /// \brief the diagonal blocks of J^T J accumulated by each thread, stored column-major one after another.
+      std::vector<Eigen::VectorXd> _threadLocalBlockDiagonal;
+
+      /// \brief the right hand side J^T e accumulated by each thread.
+      std::vector<Eigen::VectorXd> _threadLocalRhs;
+
+      /// \brief the factored diagonal blocks of J^T J + D^2.
+      std::vector< Eigen::LDLT<Eigen::MatrixXd> > _preconditioner;
+
+      /// \brief the products accumulated by each thread and the vector being multiplied.
+      std::vector<Eigen::VectorXd> _threadLocalProducts;
+      const Eigen::VectorXd* _productInput;
+
+      /// \brief the number of threads passed to the last call of buildSystem.
+      size_t _nThreads;
+
+      int _iterations;
+      double _relativeResidual;
+
+      /// Options
+      PcgLinearSolverOptions _options;
+    };
+
+  } // namespace backend
+} // namespace aslam
+
+#endif /* ASLAM_BACKEND_PCG_LINEAR_SYSTEM_SOLVER_HPP */
@@ -32,6 +32,9 @@ namespace aslam {
       void setOptions(const SparseCholeskyLinearSolverOptions& options);
 
       virtual std::string name() const {  return "sparse_cholesky"; };        
+
+      /// \brief the number of entries of the last factorization. 0 if not available.
+      virtual size_t factorNonZeros() const;
       /// Helper Function for DogLeg implementation; returns parts required for the steepest descent solution
       double rhsJtJrhs();
    
@@ -0,0 +1,63 @@
+#ifndef ASLAM_BACKEND_THREAD_POOL_HPP
+#define ASLAM_BACKEND_THREAD_POOL_HPP
+
+#include <string>
+#include <boost/function.hpp>
+#include <boost/thread.hpp>
+#include <sm/assert_macros.hpp>
+
+namespace aslam {
+  namespace backend {
+
+    /// \brief A set of long-lived worker threads for the parallel parts of the optimizer.
+    ///
+    /// The workers are created on first use and sleep between jobs, so running
+    /// a job does not pay for thread creation. Only one job runs at a time and a
+    /// job must not call run() on the same pool.
+    class ThreadPool {
+    public:
+      SM_DEFINE_EXCEPTION(Exception, std::runtime_error);
+
+      ThreadPool();
+
+      /// \brief stops and joins all worker threads.
+      ~ThreadPool();
+
+      /// \brief Run job(threadId) for threadId = 0 ... nThreads - 1 and wait for all of them to finish.
+      ///        The calling thread runs threadId 0. If a job throws, an Exception with the
+      ///        message of the first failure is thrown after all threads have finished.
+      void run(size_t nThreads, const boost::function<void(size_t)>& job);
+
+      /// \brief the number of worker threads created so far.
+      size_t numWorkers() const;
+
+    private:
+      /// \brief the main loop of worker thread threadId.
+      void workerLoop(size_t threadId);
+
+      /// \brief run the current job for threadId and record its exception.
+      void runJob(size_t threadId);
+
+      boost::thread_group _threads;
+
+      /// \brief serializes calls to run().
+      boost::mutex _runMutex;
+
+      /// \brief protects the job state below.
+      mutable boost::mutex _mutex;
+      boost::condition_variable _jobAvailable;
+      boost::condition_variable _jobFinished;
+
+      boost::function<void(size_t)> _job;
+      size_t _nWorkers;
+      size_t _nThreads;
+      size_t _nPending;
+      size_t _generation;
+      bool _stop;
+      std::string _error;
+    };
+
+  } // namespace backend
+} // namespace aslam
+
+#endif /* ASLAM_BACKEND_THREAD_POOL_HPP */
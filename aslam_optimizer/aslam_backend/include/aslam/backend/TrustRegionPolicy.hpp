@@ -35,10 +35,25 @@ namespace aslam {
           virtual std::ostream & printState(std::ostream & out) const = 0;
           virtual std::string name() const = 0;
           virtual bool requiresAugmentedDiagonal() const = 0;
+
+          /// \brief the damping added to the diagonal of the normal equations by the last solve. 0 for undamped policies.
+          virtual double lambda() const { return 0.0; }
+
+          /// \brief the wall time in seconds spent building the linear system during the last call to solveSystem().
+          double buildSystemTime() const { return _buildSystemTime; }
+
+          /// \brief the wall time in seconds spent solving the linear system during the last call to solveSystem().
+          double solveLinearSystemTime() const { return _solveLinearSystemTime; }
         protected:
             double get_dJ();
             bool isFirstIteration(){ return _isFirstIteration; }
 
+            /// \brief build the system of the linear solver, recording the time spent.
+            void buildSystem(int nThreads, bool useMEstimator);
+
+            /// \brief solve the system of the linear solver, recording the time spent.
+            bool solveLinearSystem(Eigen::VectorXd& outDx);
+
             /// \brief called by the optimizer when an optimization is starting
             virtual void optimizationStartingImplementation(double J) = 0;
             
@@ -55,6 +70,8 @@ namespace aslam {
             // cost of the last successful step
             double _last_successful_J;
             bool _isFirstIteration;
+            double _buildSystemTime;
+            double _solveLinearSystemTime;
         };
 
     } // namespace backend
@@ -26,6 +26,36 @@ namespace aslam {
       bool linearSolverFailure;
     };
 
+    /// \brief What happened in one iteration of the optimizer. The times are wall times in seconds.
+    struct IterationStatistics {
+      IterationStatistics() :
+        iteration(0), accepted(false), linearSolverFailure(false), J(0.0), dJ(0.0), dX(0.0), lambda(0.0),
+        timeBuildSystem(0.0), timeSolveSystem(0.0), timeStateUpdate(0.0), timeEvaluateError(0.0), timeTotal(0.0),
+        hessianNonZeros(0), factorNonZeros(0), peakMemory(0) {}
+
+      /// \brief the number of successful iterations so far, including this one.
+      int iteration;
+      /// \brief false if the step was rejected or the linear solver failed.
+      bool accepted;
+      bool linearSolverFailure;
+      /// \brief the objective function after the step, its decrease and the largest update of a state variable.
+      double J;
+      double dJ;
+      double dX;
+      /// \brief the damping of the trust region policy. 0 for undamped policies.
+      double lambda;
+      double timeBuildSystem;
+      double timeSolveSystem;
+      double timeStateUpdate;
+      double timeEvaluateError;
+      double timeTotal;
+      /// \brief the number of non-zero entries of the Hessian and its factor, 0 if the linear solver doesn't form them.
+      size_t hessianNonZeros;
+      size_t factorNonZeros;
+      /// \brief the peak resident memory of the process in bytes.
+      size_t peakMemory;
+    };
+
 
   } // namespace backend
 } // namespace aslam
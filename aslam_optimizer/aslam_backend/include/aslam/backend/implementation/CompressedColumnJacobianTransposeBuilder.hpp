@@ -94,7 +94,11 @@ namespace aslam {
     {
       Eigen::VectorXd ee;
       for (int i = startIdx; i < endIdx; ++i) {
-        JacobianContainer jc(_jacobianPointers[i].errorTerm->dimension());
+        if (!_jacobianPointers[i].hasJacobians) {
+          continue;
+        }
+        JacobianContainer::ThreadLocalScratch scratch(_jacobianPointers[i].errorTerm->dimension());
+        JacobianContainer& jc = scratch.container();
         _jacobianPointers[i].errorTerm->getWeightedJacobians(jc, useMEstimator);
         _J_transpose.writeJacobians(jc, _jacobianPointers[i].jcp);
       }
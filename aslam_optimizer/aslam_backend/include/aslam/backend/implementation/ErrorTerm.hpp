@@ -97,7 +97,8 @@ namespace aslam {
     void ErrorTermFs<C>::buildHessianImplementation(SparseBlockMatrix& outHessian, Eigen::VectorXd& outRhs, bool useMEstimator)
     {
       _evalJacobianTimer.start();
-      JacobianContainer J(C);
+      JacobianContainer::ThreadLocalScratch scratch(C);
+      JacobianContainer& J = scratch.container();
       evaluateJacobians(J);
       _evalJacobianTimer.stop();
       _buildHessianTimer.start();
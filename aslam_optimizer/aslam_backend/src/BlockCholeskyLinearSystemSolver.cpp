@@ -3,16 +3,21 @@
 #include <sparse_block_matrix/linear_solver_spqr.h>
 #include <aslam/backend/ErrorTerm.hpp>
 #include <sm/PropertyTree.hpp>
+#include <aslam/backend/ThreadPool.hpp>
+#include <boost/bind.hpp>
+#include <algorithm>
 
 namespace aslam {
   namespace backend {
   BlockCholeskyLinearSystemSolver::BlockCholeskyLinearSystemSolver(const std::string & solver, const BlockCholeskyLinearSolverOptions& options) :
       _options(options),
-      _solverType(solver) {
+      _solverType(solver),
+      _matrixStructureReused(false) {
     initSolver();
   }
 
-    BlockCholeskyLinearSystemSolver::BlockCholeskyLinearSystemSolver(const sm::PropertyTree& config) {
+    BlockCholeskyLinearSystemSolver::BlockCholeskyLinearSystemSolver(const sm::PropertyTree& config) :
+      _matrixStructureReused(false) {
       _solverType = config.getString("solverType", "cholesky");
       // NO OPTIONS CURRENTLY IMPLEMENTED
       // USING C++11 would allow to do constructor delegation and more elegant code
@@ -33,48 +38,145 @@ namespace aslam {
 
     void BlockCholeskyLinearSystemSolver::initMatrixStructureImplementation(const std::vector<DesignVariable*>& dvs, const std::vector<ErrorTerm*>& errors, bool useDiagonalConditioner)
     {
-      if(_solverType == "cholesky") {
-        _solver.reset(new sparse_block_matrix::LinearSolverCholmod<Eigen::MatrixXd>());
-      } else if(_solverType == "spqr") {
-        _solver.reset(new sparse_block_matrix::LinearSolverQr<Eigen::MatrixXd>());
-      } else {
-        std::cout << "Unknown block solver type " << _solverType << ". Try \"cholesky\" or \"spqr\"\nDefaulting to cholesky.\n";
-        _solver.reset(new sparse_block_matrix::LinearSolverCholmod<Eigen::MatrixXd>());
-      }
-      _solver->init();
       _useDiagonalConditioner = useDiagonalConditioner;
       _errorTerms = errors;
-      std::vector<int> blocks;
+      std::vector<int> blockSizes;
       for (size_t i = 0; i < dvs.size(); ++i) {
         dvs[i]->setBlockIndex(i);
-        blocks.push_back(dvs[i]->minimalDimensions());
+        blockSizes.push_back(dvs[i]->minimalDimensions());
+      }
+      std::vector< std::vector<int> > pattern;
+      computeBlockPattern(dvs, errors, pattern);
+
+      // If the design variables are the same and every block of the new Hessian already exists,
+      // the Hessian keeps its blocks and the solver keeps its symbolic factorization.
+      // Blocks no longer touched by an error term stay in the structure and are zero.
+      _matrixStructureReused = _solver && !blockSizes.empty() && blockSizes == _blockSizes && pattern.size() == _blockPattern.size();
+      for (size_t c = 0; _matrixStructureReused && c < pattern.size(); ++c) {
+        _matrixStructureReused = std::includes(_blockPattern[c].begin(), _blockPattern[c].end(), pattern[c].begin(), pattern[c].end());
+      }
+      if (_matrixStructureReused) {
+        return;
       }
+
+      initSolver();
+      _solver->init();
+      _blockSizes = blockSizes;
+      _blockPattern.swap(pattern);
+      std::vector<int> blocks = blockSizes;
       std::partial_sum(blocks.begin(), blocks.end(), blocks.begin());
       // Now we can initialized the sparse Hessian matrix.
       _H._M = SparseBlockMatrix(blocks, blocks);
+      _threadLocalH.clear();
+      _threadLocalRhs.clear();
     }
 
+    void BlockCholeskyLinearSystemSolver::computeBlockPattern(const std::vector<DesignVariable*>& dvs, const std::vector<ErrorTerm*>& errors, std::vector< std::vector<int> >& outPattern)
+    {
+      outPattern.clear();
+      outPattern.resize(dvs.size());
+      // The diagonal blocks are always allocated for the conditioner.
+      for (size_t c = 0; c < dvs.size(); ++c) {
+        outPattern[c].push_back(c);
+      }
+      std::vector<int> blockIndices;
+      for (size_t i = 0; i < errors.size(); ++i) {
+        blockIndices.clear();
+        for (size_t j = 0; j < errors[i]->numDesignVariables(); ++j) {
+          const DesignVariable* dv = errors[i]->designVariable(j);
+          if (dv->isActive()) {
+            blockIndices.push_back(dv->blockIndex());
+          }
+        }
+        for (size_t a = 0; a < blockIndices.size(); ++a) {
+          for (size_t b = 0; b < blockIndices.size(); ++b) {
+            if (blockIndices[a] <= blockIndices[b]) {
+              outPattern[blockIndices[b]].push_back(blockIndices[a]);
+            }
+          }
+        }
+      }
+      for (size_t c = 0; c < outPattern.size(); ++c) {
+        std::sort(outPattern[c].begin(), outPattern[c].end());
+        outPattern[c].erase(std::unique(outPattern[c].begin(), outPattern[c].end()), outPattern[c].end());
+      }
+    }
 
-  void BlockCholeskyLinearSystemSolver::buildSystem(size_t /* nThreads */, bool useMEstimator)
+
+  void BlockCholeskyLinearSystemSolver::buildSystem(size_t nThreads, bool useMEstimator)
     {
-      // \todo make multithreaded. This is complicated as it requires synchronized access to the block matrix.
-      //       A little bit of effort should make this possible by initializing the structure and adding
-      //       a mutex for each block and having writers for each jacobian that have a list of mutexes.
-      //       Save it for later.
       _H._M.clear(false);
       _rhs.setZero();
-      std::vector<ErrorTerm*>::iterator it, it_end;
-      it = _errorTerms.begin();
-      it_end = _errorTerms.end();
-      for (; it != it_end; ++it) {
-        (*it)->buildHessian(_H._M, _rhs, useMEstimator);
+      nThreads = std::min(nThreads, _errorTerms.size());
+      if (nThreads <= 1) {
+        for (size_t i = 0; i < _errorTerms.size(); ++i) {
+          if (_hasJacobians[i]) {
+            _errorTerms[i]->buildHessian(_H._M, _rhs, useMEstimator);
+          }
+        }
+        return;
+      }
+
+      // Every thread builds a contiguous range of error terms of equal estimated cost. The error terms
+      // are added sensor by sensor in time order, so each range touches a compact part of the Hessian.
+      // Thread 0 builds into the full Hessian and the others into partial systems that only allocate
+      // the blocks of their own range, so no synchronization on the block matrix is needed.
+      const double totalCost = _cumulativeErrorTermCost.back();
+      _threadStarts.resize(nThreads + 1);
+      _threadStarts[0] = 0;
+      for (size_t i = 1; i < nThreads; ++i) {
+        size_t start = std::upper_bound(_cumulativeErrorTermCost.begin(), _cumulativeErrorTermCost.end(), totalCost * i / nThreads) - _cumulativeErrorTermCost.begin();
+        _threadStarts[i] = std::max(start, _threadStarts[i - 1]);
+      }
+      _threadStarts.back() = _errorTerms.size();
+      _threadLocalH.resize(nThreads - 1);
+      _threadLocalRhs.resize(nThreads - 1);
+      for (size_t i = 0; i + 1 < nThreads; ++i) {
+        _threadLocalH[i] = SparseBlockMatrix(_H._M.rowBlockIndices(), _H._M.colBlockIndices());
+        _threadLocalRhs[i] = Eigen::VectorXd::Zero(_rhs.size());
+      }
+      threadPool()->run(nThreads, boost::bind(&BlockCholeskyLinearSystemSolver::buildThreadLocalSystem, this, _1, useMEstimator));
+
+      // Sum the partial systems. The block columns are split between the threads
+      // so every thread allocates and writes only its own columns of the Hessian.
+      threadPool()->run(nThreads, boost::bind(&BlockCholeskyLinearSystemSolver::mergeThreadLocalSystems, this, _1, nThreads));
+      for (size_t i = 0; i < _threadLocalRhs.size(); ++i) {
+        _rhs += _threadLocalRhs[i];
+      }
+      // Free the partial Hessians so that only the full Hessian is kept between iterations.
+      _threadLocalH.clear();
+    }
+
+    void BlockCholeskyLinearSystemSolver::buildThreadLocalSystem(size_t threadId, bool useMEstimator)
+    {
+      SM_ASSERT_LT_DBG(Exception, threadId + 1, _threadStarts.size(), "Index out of bounds in thread " << threadId);
+      SparseBlockMatrix& H = threadId == 0 ? _H._M : _threadLocalH[threadId - 1];
+      Eigen::VectorXd& rhs = threadId == 0 ? _rhs : _threadLocalRhs[threadId - 1];
+      for (size_t i = _threadStarts[threadId]; i < _threadStarts[threadId + 1]; ++i) {
+        if (_hasJacobians[i]) {
+          _errorTerms[i]->buildHessian(H, rhs, useMEstimator);
+        }
+      }
+    }
+
+    void BlockCholeskyLinearSystemSolver::mergeThreadLocalSystems(size_t threadId, size_t nThreads)
+    {
+      for (size_t c = threadId; c < _H._M.blockCols().size(); c += nThreads) {
+        for (size_t t = 0; t < _threadLocalH.size(); ++t) {
+          const SparseBlockMatrix::IntBlockMap& column = _threadLocalH[t].blockCols()[c];
+          SparseBlockMatrix::IntBlockMap::const_iterator it = column.begin();
+          for (; it != column.end(); ++it) {
+            *_H._M.block(it->first, c, true) += *it->second;
+          }
+        }
       }
     }
 
     bool BlockCholeskyLinearSystemSolver::solveSystem(Eigen::VectorXd& outDx)
     {
+      Eigen::VectorXd d;
       if (_useDiagonalConditioner) {
-        Eigen::VectorXd d = _diagonalConditioner.cwiseProduct(_diagonalConditioner);
+        d = _diagonalConditioner.cwiseProduct(_diagonalConditioner);
         // Augment the diagonal
         int rowBase = 0;
         for (int i = 0; i < _H._M.bRows(); ++i) {
@@ -92,7 +194,7 @@ namespace aslam {
         int rowBase = 0;
         for (int i = 0; i < _H._M.bRows(); ++i) {
           Eigen::MatrixXd& block = *_H._M.block(i, i, true);
-          block.diagonal() -= _diagonalConditioner.segment(rowBase, block.rows());
+          block.diagonal() -= d.segment(rowBase, block.rows());
           rowBase += block.rows();
         }
       }
@@ -123,8 +225,9 @@ namespace aslam {
     {
       // Not sure why I have to do this.
       //_solver->init();
+      Eigen::VectorXd d;
       if (_useDiagonalConditioner) {
-        Eigen::VectorXd d = _diagonalConditioner.cwiseProduct(_diagonalConditioner);
+        d = _diagonalConditioner.cwiseProduct(_diagonalConditioner);
         // Augment the diagonal
         int rowBase = 0;
         for (int i = 0; i < _H._M.bRows(); ++i) {
@@ -135,16 +238,26 @@ namespace aslam {
         }
       }
       bool success = _solver->solvePattern(outP, blockIndices, _H._M);
-      SM_ASSERT_TRUE(Exception, success, "Unable to retrieve covariance");
       if (_useDiagonalConditioner) {
-        // Un-augment the diagonal
+        // Un-augment the diagonal by the same amount, also if the factorization failed.
         int rowBase = 0;
         for (int i = 0; i < _H._M.bRows(); ++i) {
           Eigen::MatrixXd& block = *_H._M.block(i, i, true);
-          block.diagonal() -= _diagonalConditioner.segment(rowBase, block.rows());
+          block.diagonal() -= d.segment(rowBase, block.rows());
           rowBase += block.rows();
         }
       }
+      SM_ASSERT_TRUE(Exception, success, "Unable to retrieve covariance. Is the Hessian positive definite?");
+    }
+
+    size_t BlockCholeskyLinearSystemSolver::hessianNonZeros() const
+    {
+      return _H._M.nonZeros();
+    }
+
+    size_t BlockCholeskyLinearSystemSolver::factorNonZeros() const
+    {
+      return _solver ? _solver->factorNonZeros() : 0;
     }
 
     void BlockCholeskyLinearSystemSolver::copyHessian(SparseBlockMatrix& H)
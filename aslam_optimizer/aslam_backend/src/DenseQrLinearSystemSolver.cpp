@@ -61,7 +61,11 @@ namespace aslam {
   void DenseQrLinearSystemSolver::evaluateJacobians(size_t /* threadId */, size_t startIdx, size_t endIdx, bool useMEstimator)
     {
       for (size_t i = startIdx; i < endIdx; ++i) {
-        JacobianContainer jc(_errorTerms[i]->dimension());
+        if (!_hasJacobians[i]) {
+          continue;
+        }
+        JacobianContainer::ThreadLocalScratch scratch(_errorTerms[i]->dimension());
+        JacobianContainer& jc = scratch.container();
         ErrorTerm* e = _errorTerms[i];
         e->getWeightedJacobians(jc, useMEstimator);
         JacobianContainer::map_t::iterator it = jc.begin();
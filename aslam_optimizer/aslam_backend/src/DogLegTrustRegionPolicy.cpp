@@ -63,7 +63,7 @@ namespace aslam {
             if(!previousIterationFailed) {
                 // update GN matrices:
                 // std::cout << "Building system\n";
-                _solver->buildSystem(nThreads, true);
+                buildSystem(nThreads, true);
 
                 // calculate steepest descent step:
 
@@ -91,7 +91,7 @@ namespace aslam {
                 // calculate the GN step.
                 if(!gnComputed)
                 {
-                    solutionSuccess = _solver->solveSystem(_dx_gn);
+                    solutionSuccess = solveLinearSystem(_dx_gn);
 
                     if(!solutionSuccess)
                         return solutionSuccess;
@@ -90,6 +90,16 @@ namespace aslam {
       return _designVariables[i];
     }
 
+    bool ErrorTerm::hasActiveDesignVariables() const
+    {
+      for (size_t i = 0; i < _designVariables.size(); ++i) {
+        if (_designVariables[i]->isActive()) {
+          return true;
+        }
+      }
+      return false;
+    }
+
     void ErrorTerm::setDesignVariables(const std::vector<DesignVariable*>& designVariables)
     {
       /// \todo Set the back link to the error term in the design variable.
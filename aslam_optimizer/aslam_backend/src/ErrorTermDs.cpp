@@ -76,7 +76,8 @@ namespace aslam {
 
     void ErrorTermDs::buildHessianImplementation(SparseBlockMatrix& outHessian, Eigen::VectorXd& outRhs, bool useMEstimator)
     {
-      JacobianContainer J(dimension());
+      JacobianContainer::ThreadLocalScratch scratch(dimension());
+      JacobianContainer& J = scratch.container();
       _evalJacobianTimer.start();
       evaluateJacobians(J);
       _evalJacobianTimer.stop();
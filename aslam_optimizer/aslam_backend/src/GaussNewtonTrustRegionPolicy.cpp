@@ -17,8 +17,8 @@ namespace aslam {
         // Returns true if the solution was successful
     bool GaussNewtonTrustRegionPolicy::solveSystemImplementation(double /* J */, bool /* previousIterationFailed */, int nThreads, Eigen::VectorXd& outDx)
         {
-            _solver->buildSystem(nThreads, true);
-            return _solver->solveSystem(outDx);
+            buildSystem(nThreads, true);
+            return solveLinearSystem(outDx);
         }
         
         /// \brief print the current state to a stream (no newlines).
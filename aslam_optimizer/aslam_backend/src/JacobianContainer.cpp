@@ -1,12 +1,13 @@
 #include <aslam/backend/JacobianContainer.hpp>
 #include <sm/assert_macros.hpp>
+#include <boost/thread/tss.hpp>
 
 namespace aslam {
   namespace backend {
 
 
 
-    JacobianContainer::JacobianContainer(int rows) : _rows(rows)
+    JacobianContainer::JacobianContainer(int rows) : _rows(rows), _numJacobians(0)
     {
     }
 
@@ -20,39 +21,18 @@ namespace aslam {
     void JacobianContainer::add(const JacobianContainer& rhs)
     {
       SM_ASSERT_EQ(Exception, _rows, rhs._rows, "The JacobianContainers cannot be added. They don't have the same number of rows.");
-      // Merge the two maps.
-      // They are sorted by block it->first->blockIndex() so we can be smart about this.
-      map_t::iterator lt = _jacobianMap.begin();
-      const map_t::iterator lt_end = _jacobianMap.end();
-      map_t::const_iterator rt = rhs._jacobianMap.begin();
-      map_t::const_iterator rt_end = rhs._jacobianMap.end();
-      bool done = rt == rt_end;
-      for (; lt != lt_end && !done; ++lt) {
-        // The maps are sorted by block index. FFWD the rhs map
-        // inserting elements until we find the next possible
-        // equal element.
-        while (!done && rt->first->blockIndex() < lt->first->blockIndex()) {
-          _jacobianMap.insert(lt, *rt);
-          ++rt;
-          done = (rt == rt_end);
-        }
-        // If these keys match the Jacobians add
-        if (!done && rt->first->blockIndex() == lt->first->blockIndex()) {
-          SM_ASSERT_TRUE_DBG(Exception, rt->first == lt->first, "Two design variables had the same block index but different pointer values");
-          // add the Jacobians.
-          lt->second += rt->second;
-        }
-      }
-      // Now the lhs list is done...add the remaining elements of the rhs list.
-      for (; rt != rt_end; rt++) {
-        _jacobianMap.insert(lt, *rt);
+      // The rhs list is sorted by block index, so each entry is either added
+      // to a matching entry or rotated into place by add().
+      map_t::const_iterator rt = rhs.begin();
+      for (; rt != rhs.end(); ++rt) {
+        add(rt->first, rt->second);
       }
     }
 
     /// \brief how many design variables does this jacobian container represent.
     size_t JacobianContainer::numDesignVariables() const
     {
-      return _jacobianMap.size();
+      return _numJacobians;
     }
 
 
@@ -65,22 +45,22 @@ namespace aslam {
 
     JacobianContainer::map_t::const_iterator JacobianContainer::begin() const
     {
-      return _jacobianMap.begin();
+      return _jacobians.begin();
     }
 
     JacobianContainer::map_t::const_iterator JacobianContainer::end() const
     {
-      return _jacobianMap.end();
+      return _jacobians.begin() + _numJacobians;
     }
 
     JacobianContainer::map_t::iterator JacobianContainer::begin()
     {
-      return _jacobianMap.begin();
+      return _jacobians.begin();
     }
 
     JacobianContainer::map_t::iterator JacobianContainer::end()
     {
-      return _jacobianMap.end();
+      return _jacobians.begin() + _numJacobians;
     }
 
 
@@ -90,10 +70,12 @@ namespace aslam {
     void JacobianContainer::applyChainRule(const Eigen::MatrixXd& df_dx)
     {
       SM_ASSERT_EQ(Exception, df_dx.cols(), _rows, "Invalid matrix multiplication");
-      map_t::iterator it = _jacobianMap.begin(),
-                      it_end = _jacobianMap.end();
-      for (; it != it_end; ++it)
-        it->second = df_dx * it->second;
+      map_t::iterator it = begin(),
+                      it_end = end();
+      for (; it != it_end; ++it) {
+        _chainRuleScratch.noalias() = df_dx * it->second;
+        it->second.swap(_chainRuleScratch);
+      }
       _rows = df_dx.rows();
     }
 
@@ -153,23 +135,40 @@ namespace aslam {
       SM_ASSERT_EQ_DBG(Exception, e.size(), _rows, "The error and this Jacobian container should have the same size");
       SM_ASSERT_EQ_DBG(Exception, e.size(), sqrtInvR.rows(), "The error and the covariance matrix don't have compatible sizes");
       //SparseMatrixBlock * block = outHessian.block(int r, int c, allocIfMissing);
-      // This sucks but I'll have to take a copy of the map to keep this function const.
-      map_t mapCopy = _jacobianMap;
-      // Scale each Jacobian.
-      map_t::iterator itt = mapCopy.begin();
-      for (; itt != mapCopy.end(); ++itt) {
-        itt->second = (itt->first->scaling() * sqrtInvR.transpose() * itt->second).eval();
+      // Scale each Jacobian into the scratch list to keep this function const.
+      if (_scaledJacobians.size() < _numJacobians)
+        _scaledJacobians.resize(_numJacobians);
+      for (size_t i = 0; i < _numJacobians; ++i) {
+        _scaledJacobians[i].first = _jacobians[i].first;
+        _scaledJacobians[i].second.noalias() = sqrtInvR.transpose() * _jacobians[i].second;
+        _scaledJacobians[i].second *= _jacobians[i].first->scaling();
       }
-      map_t::const_iterator it = mapCopy.begin();
-      map_t::const_iterator it_end = mapCopy.end();
+      _scaledError.noalias() = sqrtInvR.transpose() * e;
+      map_t::const_iterator it = _scaledJacobians.begin();
+      map_t::const_iterator it_end = _scaledJacobians.begin() + _numJacobians;
       // Start the recursion
-      buildHessianBlock(sqrtInvR.transpose() * e, outHessian, outRhs, it, it_end);
+      buildHessianBlock(_scaledError, outHessian, outRhs, it, it_end);
+    }
+
+    void JacobianContainer::evaluateHessian(const Eigen::VectorXd& e, double sqrtInvR, SparseBlockMatrix& outHessian, Eigen::VectorXd& outRhs) const
+    {
+      SM_ASSERT_EQ_DBG(Exception, e.size(), _rows, "The error and this Jacobian container should have the same size");
+      if (_scaledJacobians.size() < _numJacobians)
+        _scaledJacobians.resize(_numJacobians);
+      for (size_t i = 0; i < _numJacobians; ++i) {
+        _scaledJacobians[i].first = _jacobians[i].first;
+        _scaledJacobians[i].second = (sqrtInvR * _jacobians[i].first->scaling()) * _jacobians[i].second;
+      }
+      _scaledError = sqrtInvR * e;
+      map_t::const_iterator it = _scaledJacobians.begin();
+      map_t::const_iterator it_end = _scaledJacobians.begin() + _numJacobians;
+      buildHessianBlock(_scaledError, outHessian, outRhs, it, it_end);
     }
 
     const Eigen::MatrixXd& JacobianContainer::Jacobian(const DesignVariable* dv) const
     {
-      map_t::const_iterator it = _jacobianMap.find(const_cast<DesignVariable* >(dv));
-      SM_ASSERT_TRUE(Exception, it != _jacobianMap.end(), "The design variable does not exist in the container");
+      map_t::const_iterator it = std::lower_bound(begin(), end(), dv, BlockIndexLess());
+      SM_ASSERT_TRUE(Exception, it != end() && it->first == dv, "The design variable does not exist in the container");
       return it->second;
     }
 
@@ -177,20 +176,14 @@ namespace aslam {
     DesignVariable* JacobianContainer::designVariable(size_t i)
     {
       SM_ASSERT_LT(Exception, i, numDesignVariables(), "Index out of range");
-      map_t::iterator it = _jacobianMap.begin();
-      for (size_t ii = 0; ii < i; ++ii)
-        it++;
-      return it->first;
+      return _jacobians[i].first;
     }
 
     /// \brief Get design variable i.
     const DesignVariable* JacobianContainer::designVariable(size_t i) const
     {
       SM_ASSERT_LT(Exception, i, numDesignVariables(), "Index out of range");
-      map_t::const_iterator it = _jacobianMap.begin();
-      for (size_t ii = 0; ii < i; ++ii)
-        it++;
-      return it->first;
+      return _jacobians[i].first;
     }
 
   void JacobianContainer::reset(int rows) {
@@ -201,7 +194,8 @@ namespace aslam {
     /// \brief Clear the contents of this container
     void JacobianContainer::clear()
     {
-      _jacobianMap.clear();
+      // Keep the entries so that their matrices are reused by the next add().
+      _numJacobians = 0;
     }
 
     Eigen::MatrixXd JacobianContainer::asDenseMatrix() const
@@ -223,8 +217,8 @@ namespace aslam {
       rows[0] = _rows;
       /// Step 2: fill the Jacobian
       SparseBlockMatrix J(rows, colBlockIndices, true);
-      map_t::const_iterator it = _jacobianMap.begin();
-      for (int col = 0; it != _jacobianMap.end(); ++it, col++) {
+      map_t::const_iterator it = begin();
+      for (int col = 0; it != end(); ++it, col++) {
         const bool allocateBlock = true;
         SM_ASSERT_GE_LT_DBG(aslam::IndexOutOfBoundsException, (size_t)it->first->blockIndex(), 0, colBlockIndices.size(), "Block index is out of bounds");
         Eigen::MatrixXd& Ji = *J.block(0, it->first->blockIndex(), allocateBlock);
@@ -240,15 +234,15 @@ namespace aslam {
       rows[0] = _rows;
       std::vector<int> cols(numDesignVariables());
       int sum = 0;
-      map_t::const_iterator it = _jacobianMap.begin();
-      for (int i = 0 ; it != _jacobianMap.end(); ++it, ++i) {
+      map_t::const_iterator it = begin();
+      for (int i = 0 ; it != end(); ++it, ++i) {
         sum += it->first->minimalDimensions();
         cols[i] = sum;
       }
       /// Step 2: fill the Jacobian
       SparseBlockMatrix J(rows, cols, true);
-      it = _jacobianMap.begin();
-      for (int col = 0; it != _jacobianMap.end(); ++it, col++) {
+      it = begin();
+      for (int col = 0; it != end(); ++it, col++) {
         const bool allocateBlock = true;
         Eigen::MatrixXd& Ji = *J.block(0, col, allocateBlock);
         Ji = it->second;
@@ -260,11 +254,41 @@ namespace aslam {
     int JacobianContainer::cols() const
     {
       int sum = 0;
-      map_t::const_iterator it = _jacobianMap.begin();
-      for (int i = 0 ; it != _jacobianMap.end(); ++it, ++i) {
+      map_t::const_iterator it = begin();
+      for (int i = 0 ; it != end(); ++it, ++i) {
         sum += it->first->minimalDimensions();
       }
       return sum;
     }
+
+    namespace {
+      struct Scratch {
+        Scratch() : container(0), inUse(false) {}
+        JacobianContainer container;
+        bool inUse;
+      };
+    }
+
+    JacobianContainer::ThreadLocalScratch::ThreadLocalScratch(int rows)
+    {
+      static boost::thread_specific_ptr<Scratch> scratch;
+      if (scratch.get() == NULL)
+        scratch.reset(new Scratch());
+      SM_ASSERT_FALSE(Exception, scratch->inUse, "The Jacobian container of this thread is already borrowed");
+      scratch->inUse = true;
+      scratch->container.reset(rows);
+      _container = &scratch->container;
+      _inUse = &scratch->inUse;
+    }
+
+    JacobianContainer::ThreadLocalScratch::~ThreadLocalScratch()
+    {
+      *_inUse = false;
+    }
+
+    JacobianContainer& JacobianContainer::ThreadLocalScratch::container()
+    {
+      return *_container;
+    }
   } // namespace backend
 } // namespace aslam
@@ -53,7 +53,7 @@ namespace aslam {
             
             if (isFirstIteration()) {
                 // This is the first step.
-                _solver->buildSystem(nThreads, true);
+                buildSystem(nThreads, true);
             } else {
                 ///get Rho and update Lambda:
                 double rho = getLmRho();
@@ -69,7 +69,7 @@ namespace aslam {
                 } else {
                     // The last iteration was successful
                     // Here we need to rebuild the system
-                    _solver->buildSystem(nThreads, true);
+                    buildSystem(nThreads, true);
                     if (_lambda > 1e-16) {
                         double u1 = 1 / _gamma;
                         double u2 = 1 - (_beta - 1) * pow((2 * rho - 1), _p);
@@ -85,7 +85,7 @@ namespace aslam {
             }
             
             _solver->setConstantConditioner(_lambda);
-            bool success = _solver->solveSystem(_dx);
+            bool success = solveLinearSystem(_dx);
             outDx = _dx;
             return success;
         }
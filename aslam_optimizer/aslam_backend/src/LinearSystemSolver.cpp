@@ -1,12 +1,14 @@
 #include <aslam/backend/LinearSystemSolver.hpp>
-#include <boost/thread.hpp>
+#include <aslam/backend/ThreadPool.hpp>
 #include <aslam/backend/ErrorTerm.hpp>
+#include <boost/bind.hpp>
 #include <boost/ref.hpp>
+#include <algorithm>
 
 namespace aslam {
   namespace backend {
 
-    LinearSystemSolver::LinearSystemSolver() {}
+    LinearSystemSolver::LinearSystemSolver() : _nextChunk(0) {}
     LinearSystemSolver::~LinearSystemSolver() {}
 
     void LinearSystemSolver::evaluateErrors(size_t threadId, size_t startIdx, size_t endIdx, bool useMEstimator)
@@ -22,61 +24,73 @@ namespace aslam {
       }
     }
 
-    struct SafeJobReturnValue {
-      SafeJobReturnValue(const std::exception& e) : _e(e) {}
-
-      std::exception _e;
-    };
-
-    struct SafeJob {
-      boost::function<void()> _fn;
-      SafeJobReturnValue* _rval;
-      SafeJob() : _rval(NULL) {}
-      SafeJob(boost::function<void()> fn) : _fn(fn), _rval(NULL) {}
-      ~SafeJob() {
-        if (_rval) delete _rval;
-      }
-
-      void operator()() {
-        try {
-          _fn();
-        } catch (const std::exception& e) {
-          _rval = new SafeJobReturnValue(e);
-          std::cout << "Exception in thread block: " << e.what() << std::endl;
-        }
-      }
-    };
+    /// \brief the number of chunks per thread. More chunks balance the load better at the cost of more synchronization.
+    static const size_t kChunksPerThread = 8;
 
     void LinearSystemSolver::setupThreadedJob(boost::function<void(size_t, size_t, size_t, bool)> job, size_t nThreads, bool useMEstimator)
     {
+      nThreads = std::min(nThreads, _errorTerms.size());
       if (nThreads <= 1) {
         job(0, 0, _errorTerms.size(), useMEstimator);
       } else {
-        nThreads = std::min(nThreads, _errorTerms.size());
-        // Give some error terms to each thread.
-        std::vector<int> indices(nThreads + 1, 0);
-        int nJPerThread = std::max(1, (int)(_errorTerms.size() / nThreads));
-        for (unsigned i = 0; i < nThreads; ++i)
-          indices[i + 1] = indices[i] + nJPerThread;
-        // deal with the remainder.
-        indices.back() = _errorTerms.size();
-        // Build a thread pool and evaluate the jacobians.
-        boost::thread_group threads;
-        std::vector<SafeJob> jobs(nThreads);
-        for (size_t i = 0; i < nThreads; ++i) {
-          jobs[i] = SafeJob(boost::bind(job, i, indices[i], indices[i + 1], useMEstimator));
-          threads.create_thread(boost::ref(jobs[i]));
+        // Split the error terms into chunks of equal estimated cost.
+        const size_t nChunks = std::min(nThreads * kChunksPerThread, _errorTerms.size());
+        SM_ASSERT_EQ_DBG(Exception, _cumulativeErrorTermCost.size(), _errorTerms.size(), "The error term costs are not initialized");
+        const double totalCost = _cumulativeErrorTermCost.back();
+        _chunkStarts.resize(nChunks + 1);
+        _chunkStarts[0] = 0;
+        for (size_t i = 1; i < nChunks; ++i) {
+          size_t start = std::upper_bound(_cumulativeErrorTermCost.begin(), _cumulativeErrorTermCost.end(), totalCost * i / nChunks) - _cumulativeErrorTermCost.begin();
+          _chunkStarts[i] = std::max(start, _chunkStarts[i - 1]);
+        }
+        _chunkStarts.back() = _errorTerms.size();
+        _nextChunk = 0;
+        threadPool()->run(nThreads, boost::bind(&LinearSystemSolver::runThreadedJobChunks, this, boost::cref(job), _1, useMEstimator));
+      }
+    }
+
+    void LinearSystemSolver::runThreadedJobChunks(const boost::function<void(size_t, size_t, size_t, bool)>& job, size_t threadId, bool useMEstimator)
+    {
+      while (true) {
+        size_t chunk;
+        {
+          boost::mutex::scoped_lock lock(_nextChunkMutex);
+          chunk = _nextChunk++;
+        }
+        if (chunk + 1 >= _chunkStarts.size()) {
+          return;
         }
-        threads.join_all();
-        // Now go through and look for exceptions.
-        for (size_t i = 0; i < nThreads; ++i) {
-          if (jobs[i]._rval) {
-            throw jobs[i]._rval->_e;
-          }
+        if (_chunkStarts[chunk] < _chunkStarts[chunk + 1]) {
+          job(threadId, _chunkStarts[chunk], _chunkStarts[chunk + 1], useMEstimator);
         }
       }
     }
 
+    double LinearSystemSolver::errorTermCost(const ErrorTerm* errorTerm) const
+    {
+      // The Jacobian blocks dominate the cost, so count their entries.
+      size_t nColumns = 0;
+      for (size_t i = 0; i < errorTerm->numDesignVariables(); ++i) {
+        if (errorTerm->designVariable(i)->isActive()) {
+          nColumns += errorTerm->designVariable(i)->minimalDimensions();
+        }
+      }
+      return (double)(errorTerm->dimension() * std::max((size_t)1, nColumns));
+    }
+
+    void LinearSystemSolver::setThreadPool(const boost::shared_ptr<ThreadPool>& threadPool)
+    {
+      _threadPool = threadPool;
+    }
+
+    boost::shared_ptr<ThreadPool> LinearSystemSolver::threadPool()
+    {
+      if (!_threadPool) {
+        _threadPool.reset(new ThreadPool());
+      }
+      return _threadPool;
+    }
+
 
     double LinearSystemSolver::evaluateError(size_t nThreads, bool useMEstimator)
     {
@@ -120,9 +134,14 @@ namespace aslam {
       _errorTerms = errors;
       // Figure out the size of the Jacobian matrix.
       _JRows = 0;
-      std::vector<ErrorTerm*>::const_iterator eit = errors.begin();
-      for (; eit != errors.end(); ++eit) {
-        _JRows += (*eit)->dimension();
+      _cumulativeErrorTermCost.resize(errors.size());
+      _hasJacobians.resize(errors.size());
+      double cost = 0.0;
+      for (size_t i = 0; i < errors.size(); ++i) {
+        _JRows += errors[i]->dimension();
+        _hasJacobians[i] = errors[i]->hasActiveDesignVariables();
+        cost += errorTermCost(errors[i]);
+        _cumulativeErrorTermCost[i] = cost;
       }
       _JCols = 0;
       std::vector<DesignVariable*>::const_iterator dit = dvs.begin();
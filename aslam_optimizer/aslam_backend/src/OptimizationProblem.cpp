@@ -2,6 +2,7 @@
 #include <aslam/backend/DesignVariable.hpp>
 #include <aslam/backend/ErrorTerm.hpp>
 #include <sm/boost/null_deleter.hpp>
+#include <unordered_set>
 
 namespace aslam {
   namespace backend {
@@ -163,19 +164,59 @@ namespace aslam {
       }
     }
 
+    void OptimizationProblem::removeErrorTerms(const std::vector<const ErrorTerm*>& errorTerms)
+    {
+      std::unordered_set<const ErrorTerm*> toRemove(errorTerms.begin(), errorTerms.end());
+      std::vector<bool> keep(_errorTerms.size());
+      size_t numFound = 0;
+      for (size_t i = 0; i < _errorTerms.size(); ++i) {
+        keep[i] = toRemove.count(_errorTerms[i].get()) == 0;
+        numFound += !keep[i];
+      }
+      SM_ASSERT_EQ(std::runtime_error, numFound, toRemove.size(), "Every error term to remove must be in the problem");
+      retainErrorTerms(keep);
+    }
+
+    void OptimizationProblem::retainErrorTerms(const std::vector<bool>& keep)
+    {
+      SM_ASSERT_EQ(std::runtime_error, keep.size(), _errorTerms.size(), "The mask must have one entry per error term");
+      // Move the retained error terms to the front, keeping their order.
+      std::unordered_set<const ErrorTerm*> removed;
+      size_t numRetained = 0;
+      for (size_t i = 0; i < _errorTerms.size(); ++i) {
+        if (keep[i]) {
+          if (numRetained != i) {
+            _errorTerms[numRetained].swap(_errorTerms[i]);
+          }
+          ++numRetained;
+        } else {
+          removed.insert(_errorTerms[i].get());
+        }
+      }
+      if (removed.empty()) {
+        return;
+      }
+      for (error_map_t::iterator it = _errorTermMap.begin(); it != _errorTermMap.end(); ) {
+        if (removed.count(it->second)) {
+          it = _errorTermMap.erase(it);
+        } else {
+          ++it;
+        }
+      }
+      _errorTerms.resize(numRetained);
+    }
+
     /// \brief Remove the design variable
     void OptimizationProblem::removeDesignVariable(const DesignVariable* dv)
     {
       // Remove any error terms from the project
       error_map_t::iterator it, it2, it_end;
       boost::tie(it, it_end) = _errorTermMap.equal_range(const_cast<DesignVariable*>(dv));
-      std::vector<ErrorTerm*> terms;
+      std::vector<const ErrorTerm*> terms;
       for (; it != it_end; ++it) {
         terms.push_back(it->second);
       }
-      for (size_t i = 0; i < terms.size(); ++i) {
-        removeErrorTerm(terms[i]);
-      }
+      removeErrorTerms(terms);
       // Now remove the design variable itself.
       std::vector< boost::shared_ptr<DesignVariable> >::iterator dit = _designVariables.begin();
       for (; dit != _designVariables.end(); ++dit) {
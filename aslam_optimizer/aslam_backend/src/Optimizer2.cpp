@@ -1,4 +1,6 @@
 #include <aslam/backend/Optimizer2.hpp>
+// std::find
+#include <algorithm>
 // std::partial_sum
 #include <numeric>
 #include <aslam/backend/ErrorTerm.hpp>
@@ -16,20 +18,77 @@
 #include <aslam/backend/SparseCholeskyLinearSystemSolver.hpp>
 #include <aslam/backend/DenseQrLinearSystemSolver.hpp>
 #include <sm/PropertyTree.hpp>
+#include <sm/timing/NsecTimeUtilities.hpp>
+#include <boost/math/special_functions/fpclassify.hpp>
+#include <fstream>
+#include <sys/resource.h>
 
 
 namespace aslam {
     namespace backend {
 
+        namespace {
+            /// \brief the peak resident memory of the process in bytes.
+            size_t peakMemory()
+            {
+                struct rusage usage;
+                if (getrusage(RUSAGE_SELF, &usage) != 0) {
+                    return 0;
+                }
+#ifdef __APPLE__
+                return (size_t)usage.ru_maxrss;
+#else
+                return (size_t)usage.ru_maxrss * 1024;
+#endif
+            }
+
+            double secondsSince(const sm::timing::NsecTime& start)
+            {
+                return sm::timing::nsecToSec(sm::timing::nsecNow() - start);
+            }
+
+            /// \brief JSON has no representation for inf and nan.
+            void writeJsonNumber(std::ostream& out, double value)
+            {
+                if (boost::math::isfinite(value)) {
+                    out << value;
+                } else {
+                    out << "null";
+                }
+            }
+
+            /// \brief write the statistics of an iteration as a single line JSON object.
+            void writeJsonLine(std::ostream& out, const IterationStatistics& stats)
+            {
+                out << "{\"iteration\": " << stats.iteration
+                    << ", \"accepted\": " << (stats.accepted ? "true" : "false")
+                    << ", \"linearSolverFailure\": " << (stats.linearSolverFailure ? "true" : "false")
+                    << ", \"J\": "; writeJsonNumber(out, stats.J);
+                out << ", \"dJ\": "; writeJsonNumber(out, stats.dJ);
+                out << ", \"dX\": "; writeJsonNumber(out, stats.dX);
+                out << ", \"lambda\": "; writeJsonNumber(out, stats.lambda);
+                out << ", \"timeBuildSystem\": " << stats.timeBuildSystem
+                    << ", \"timeSolveSystem\": " << stats.timeSolveSystem
+                    << ", \"timeStateUpdate\": " << stats.timeStateUpdate
+                    << ", \"timeEvaluateError\": " << stats.timeEvaluateError
+                    << ", \"timeTotal\": " << stats.timeTotal
+                    << ", \"hessianNonZeros\": " << stats.hessianNonZeros
+                    << ", \"factorNonZeros\": " << stats.factorNonZeros
+                    << ", \"peakMemory\": " << stats.peakMemory
+                    << "}" << std::endl;
+            }
+        } // namespace
+
 
         Optimizer2::Optimizer2(const Optimizer2Options& options) :
-            _options(options)
+            _threadPool(new ThreadPool()), _options(options)
         {
             initializeLinearSolver();
             initializeTrustRegionPolicy();
         }
 
-        Optimizer2::Optimizer2(const sm::PropertyTree& config, boost::shared_ptr<LinearSystemSolver> linearSystemSolver, boost::shared_ptr<TrustRegionPolicy> trustRegionPolicy) {
+        Optimizer2::Optimizer2(const sm::PropertyTree& config, boost::shared_ptr<LinearSystemSolver> linearSystemSolver, boost::shared_ptr<TrustRegionPolicy> trustRegionPolicy) :
+            _threadPool(new ThreadPool()) {
           Optimizer2Options options;
           options.convergenceJDescentRatioThreshold = config.getDouble("convergenceJDescentRatioThreshold", options.convergenceJDescentRatioThreshold);
           options.convergenceDeltaX = config.getDouble("convergenceDeltaX", options.convergenceDeltaX);
@@ -38,6 +97,7 @@ namespace aslam {
           options.verbose = config.getBool("verbose", options.verbose);
           options.linearSolverMaximumFails = config.getInt("linearSolverMaximumFails", options.linearSolverMaximumFails);
           options.nThreads = config.getInt("nThreads", options.nThreads);
+          options.telemetryFile = config.getString("telemetryFile", options.telemetryFile);
           options.linearSystemSolver = linearSystemSolver;
           options.trustRegionPolicy = trustRegionPolicy;
           _options = options;
@@ -86,6 +146,7 @@ namespace aslam {
           } else {
             _solver = _options.linearSystemSolver;
           }
+          _solver->setThreadPool(_threadPool);
 
           _options.verbose && std::cout << "Using the " << _solver->name() << " linear system solver\n";
         }
@@ -191,6 +252,13 @@ namespace aslam {
             initialize();
             SolutionReturnValue srv;
             _p_J = 0.0;
+            _iterationStatistics.clear();
+            std::ofstream telemetry;
+            if (!_options.telemetryFile.empty()) {
+                telemetry.open(_options.telemetryFile.c_str(), std::ios::app);
+                SM_ASSERT_TRUE(Exception, telemetry.good(), "Unable to open the telemetry file " << _options.telemetryFile);
+                telemetry.precision(17);
+            }
 
             //std::cout << "Evaluate error for the first time\n";
             // This sets _J
@@ -219,24 +287,34 @@ namespace aslam {
                      fabs(JDescentRatio) > _options.convergenceJDescentRatioThreshold) ||
                     linearSolverFailure)) {
 
+                IterationStatistics stats;
+                const sm::timing::NsecTime iterationStart = sm::timing::nsecNow();
                 timeSolve.start();
                 bool solutionSuccess = _trustRegionPolicy->solveSystem(_J, previousIterationFailed, _options.nThreads, _dx);
                 timeSolve.stop();
+                stats.timeBuildSystem = _trustRegionPolicy->buildSystemTime();
+                stats.timeSolveSystem = _trustRegionPolicy->solveLinearSystemTime();
 
                 if (!solutionSuccess) {
                     _options.verbose && std::cout << "[WARNING] System solution failed\n";
                     previousIterationFailed = true;
                     linearSolverFailure = true;
                     srv.failedIterations++;
+                    stats.linearSolverFailure = true;
+                    stats.J = _J;
                 } else {
                     /// Apply the state update. _A, _b, _dx, and _H are passed in implicitly.
+                    sm::timing::NsecTime start = sm::timing::nsecNow();
                     timeBackSub.start();
                     deltaX = applyStateUpdate();
                     timeBackSub.stop();
+                    stats.timeStateUpdate = secondsSince(start);
                     // This sets _J
+                    start = sm::timing::nsecNow();
                     timeErr.start();
                     evaluateError(true);
                     timeErr.stop();
+                    stats.timeEvaluateError = secondsSince(start);
                     deltaJ = _p_J - _J;
                     JDescentRatio = deltaJ / _p_J;
                     // This was a regression.
@@ -264,10 +342,27 @@ namespace aslam {
                     _options.verbose && std::cout << "[" << srv.iterations << "]: J: " << _J << ", dJ: " << deltaJ << ", deltaX: " << deltaX << ", ";
                     _options.verbose && _trustRegionPolicy->printState(std::cout);
                     _options.verbose && std::cout << std::endl;
+
+                    stats.accepted = !(_trustRegionPolicy->revertOnFailure() && JDescentRatio < 0.0);
+                    stats.J = _J;
+                    stats.dJ = deltaJ;
+                    stats.dX = deltaX;
                 } // if the linear solver failed / else
+
+                stats.iteration = srv.iterations;
+                stats.lambda = _trustRegionPolicy->lambda();
+                stats.hessianNonZeros = _solver->hessianNonZeros();
+                stats.factorNonZeros = _solver->factorNonZeros();
+                stats.peakMemory = peakMemory();
+                stats.timeTotal = secondsSince(iterationStart);
+                _iterationStatistics.push_back(stats);
+                if (telemetry.is_open()) {
+                    writeJsonLine(telemetry, stats);
+                }
             }
 
             srv.JFinal = _p_J;
+            srv.lmLambdaFinal = _trustRegionPolicy->lambda();
             srv.dXFinal = deltaX;
             srv.dJFinal = deltaJ;
             srv.linearSolverFailure = linearSolverFailure;
@@ -351,6 +446,11 @@ namespace aslam {
                 sm::timing::Timing::print(std::cout);
             }
 
+            const std::vector<IterationStatistics>& Optimizer2::iterationStatistics() const
+            {
+                return _iterationStatistics;
+            }
+
 
 
 
@@ -366,8 +466,6 @@ namespace aslam {
 
             void Optimizer2::computeDiagonalCovariances(SparseBlockMatrix& outP, double lambda)
             {
-                SM_THROW(Exception, "Broken");
-
                 std::vector<std::pair<int, int> > blockIndices;
                 for (size_t i = 0; i < _designVariables.size(); ++i) {
                     blockIndices.push_back(std::make_pair(i, i));
@@ -375,32 +473,94 @@ namespace aslam {
                 computeCovarianceBlocks(blockIndices, outP, lambda);
             }
 
-    void Optimizer2::computeCovarianceBlocks(const std::vector<std::pair<int, int> > & /* blockIndices */, SparseBlockMatrix& /* outP */, double /* lambda */)
+    boost::shared_ptr<BlockCholeskyLinearSystemSolver> Optimizer2::buildConditionedHessian(double lambda)
             {
-                SM_THROW(Exception, "Broken");
+              boost::shared_ptr<BlockCholeskyLinearSystemSolver> solver_sp = boost::dynamic_pointer_cast<BlockCholeskyLinearSystemSolver>(_solver);
+              if (!solver_sp) {
+                solver_sp.reset(new BlockCholeskyLinearSystemSolver());
+                solver_sp->setThreadPool(_threadPool);
+              }
+              // True here for creating the diagonal conditioning. The next call to optimize()
+              // initializes the matrix structure again for the trust region policy.
+              solver_sp->initMatrixStructure(_designVariables, _errorTerms, true);
 
+              _options.verbose && std::cout << "Setting the diagonal conditioner to: " << lambda << ".\n";
+              evaluateError(false);
+              solver_sp->setConstantConditioner(lambda);
+              solver_sp->buildSystem(_options.nThreads, false);
+              return solver_sp;
             }
 
-
-    void Optimizer2::computeCovariances(SparseBlockMatrix& /* outP */, double /* lambda */)
+    void Optimizer2::computeCovarianceBlocks(const std::vector<std::pair<int, int> > & blockIndices, SparseBlockMatrix& outP, double lambda)
             {
-                SM_THROW(Exception, "Broken");
+              // Only the requested entries of the inverse are computed from the Cholesky factor.
+              buildConditionedHessian(lambda)->computeCovarianceBlocks(blockIndices, outP);
+            }
 
+
+    void Optimizer2::computeCovariances(SparseBlockMatrix& outP, double lambda)
+            {
+                std::vector<std::pair<int, int> > blockIndices;
+                for (size_t i = 0; i < _designVariables.size(); ++i) {
+                    for (size_t j = i; j < _designVariables.size(); ++j) {
+                        blockIndices.push_back(std::make_pair(i, j));
+                    }
+                }
+                computeCovarianceBlocks(blockIndices, outP, lambda);
             }
 
-        void Optimizer2::computeHessian(SparseBlockMatrix& outH, double lambda)
+    Eigen::MatrixXd Optimizer2::computeMarginalCovariance(const std::vector<DesignVariable*>& designVariables, double lambda)
             {
+                std::vector<int> offsets(designVariables.size() + 1, 0);
+                for (size_t i = 0; i < designVariables.size(); ++i) {
+                    SM_ASSERT_TRUE(Exception, designVariables[i] != NULL, "Design variable " << i << " is null");
+                    SM_ASSERT_TRUE(Exception, designVariables[i]->isActive(), "Design variable " << i << " is not active");
+                    offsets[i + 1] = offsets[i] + designVariables[i]->minimalDimensions();
+                }
 
-              boost::shared_ptr<BlockCholeskyLinearSystemSolver> solver_sp;
-              solver_sp.reset(new BlockCholeskyLinearSystemSolver());
-              // True here for creating the diagonal conditioning.
-              solver_sp->initMatrixStructure(_designVariables, _errorTerms, true);
+                // The block indices are assigned by the solver in the order of _designVariables.
+                std::vector<int> blocks(designVariables.size());
+                for (size_t i = 0; i < designVariables.size(); ++i) {
+                    std::vector<DesignVariable*>::const_iterator it = std::find(_designVariables.begin(), _designVariables.end(), designVariables[i]);
+                    SM_ASSERT_TRUE(Exception, it != _designVariables.end(), "Design variable " << i << " is not part of the problem. Was initialize() called?");
+                    blocks[i] = it - _designVariables.begin();
+                }
 
-              _options.verbose && std::cout << "Setting the diagonal conditioner to: " << lambda << ".\n";
-              evaluateError(false);
-              solver_sp->setConstantConditioner(lambda);
-              solver_sp->buildSystem(_options.nThreads, false);
-              solver_sp->copyHessian(outH);
+                // The inverse is symmetric, so only the upper triangle is requested.
+                std::vector<std::pair<int, int> > blockIndices;
+                for (size_t i = 0; i < blocks.size(); ++i) {
+                    for (size_t j = i; j < blocks.size(); ++j) {
+                        blockIndices.push_back(std::make_pair(std::min(blocks[i], blocks[j]), std::max(blocks[i], blocks[j])));
+                    }
+                }
+                SparseBlockMatrix P;
+                computeCovarianceBlocks(blockIndices, P, lambda);
+
+                Eigen::MatrixXd outP(offsets.back(), offsets.back());
+                for (size_t i = 0; i < blocks.size(); ++i) {
+                    for (size_t j = i; j < blocks.size(); ++j) {
+                        const int dimI = offsets[i + 1] - offsets[i];
+                        const int dimJ = offsets[j + 1] - offsets[j];
+                        if (blocks[i] <= blocks[j]) {
+                            const Eigen::MatrixXd* Pij = P.block(blocks[i], blocks[j]);
+                            SM_ASSERT_TRUE(Exception, Pij != NULL, "Missing covariance block (" << blocks[i] << ", " << blocks[j] << ")");
+                            outP.block(offsets[i], offsets[j], dimI, dimJ) = *Pij;
+                        } else {
+                            const Eigen::MatrixXd* Pji = P.block(blocks[j], blocks[i]);
+                            SM_ASSERT_TRUE(Exception, Pji != NULL, "Missing covariance block (" << blocks[j] << ", " << blocks[i] << ")");
+                            outP.block(offsets[i], offsets[j], dimI, dimJ) = Pji->transpose();
+                        }
+                        if (i != j) {
+                            outP.block(offsets[j], offsets[i], dimJ, dimI) = outP.block(offsets[i], offsets[j], dimI, dimJ).transpose();
+                        }
+                    }
+                }
+                return outP;
+            }
+
+        void Optimizer2::computeHessian(SparseBlockMatrix& outH, double lambda)
+            {
+              buildConditionedHessian(lambda)->copyHessian(outH);
             }
 
       const LinearSystemSolver * Optimizer2::getBaseSolver() const {
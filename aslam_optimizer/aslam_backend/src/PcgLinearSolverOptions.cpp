@@ -0,0 +1,37 @@
+#include "aslam/backend/PcgLinearSolverOptions.h"
+
+namespace aslam {
+  namespace backend {
+
+/******************************************************************************/
+/* Constructors and Destructor                                                */
+/******************************************************************************/
+
+    PcgLinearSolverOptions::PcgLinearSolverOptions() :
+        maxIterations(1000),
+        tolerance(1e-8),
+        verbose(false) {
+    }
+
+    PcgLinearSolverOptions::PcgLinearSolverOptions(
+        const PcgLinearSolverOptions& other) :
+        maxIterations(other.maxIterations),
+        tolerance(other.tolerance),
+        verbose(other.verbose) {
+    }
+
+    PcgLinearSolverOptions& PcgLinearSolverOptions::operator =
+        (const PcgLinearSolverOptions& other) {
+      if (this != &other) {
+        maxIterations = other.maxIterations;
+        tolerance = other.tolerance;
+        verbose = other.verbose;
+      }
+      return *this;
+    }
+
+    PcgLinearSolverOptions::~PcgLinearSolverOptions() {
+    }
+
+  }
+}
@@ -0,0 +1,225 @@
+#include <aslam/backend/PcgLinearSystemSolver.hpp>
+#include <aslam/backend/ErrorTerm.hpp>
+#include <sm/PropertyTree.hpp>
+#include <boost/bind.hpp>
+#include <boost/math/special_functions/fpclassify.hpp>
+#include <iostream>
+
+namespace aslam {
+  namespace backend {
+
+    PcgLinearSystemSolver::PcgLinearSystemSolver(const PcgLinearSolverOptions& options) :
+        _productInput(NULL),
+        _nThreads(1),
+        _iterations(0),
+        _relativeResidual(0.0),
+        _options(options) {
+    }
+
+    PcgLinearSystemSolver::PcgLinearSystemSolver(const sm::PropertyTree& config) :
+        _productInput(NULL),
+        _nThreads(1),
+        _iterations(0),
+        _relativeResidual(0.0) {
+      PcgLinearSolverOptions options;
+      options.maxIterations = config.getInt("maxIterations", options.maxIterations);
+      options.tolerance = config.getDouble("tolerance", options.tolerance);
+      options.verbose = config.getBool("verbose", options.verbose);
+      _options = options;
+    }
+
+    PcgLinearSystemSolver::~PcgLinearSystemSolver()
+    {
+    }
+
+    void PcgLinearSystemSolver::initMatrixStructureImplementation(const std::vector<DesignVariable*>& dvs, const std::vector<ErrorTerm*>& errors, bool useDiagonalConditioner)
+    {
+      _useDiagonalConditioner = useDiagonalConditioner;
+      _errorTerms = errors;
+      _jacobians.clear();
+      _jacobians.resize(errors.size());
+      _blockColumnBase.resize(dvs.size());
+      _blockSizes.resize(dvs.size());
+      _blockOffsets.resize(dvs.size() + 1);
+      int columnBase = 0;
+      _blockOffsets[0] = 0;
+      for (size_t i = 0; i < dvs.size(); ++i) {
+        dvs[i]->setBlockIndex(i);
+        _blockColumnBase[i] = columnBase;
+        _blockSizes[i] = dvs[i]->minimalDimensions();
+        _blockOffsets[i + 1] = _blockOffsets[i] + _blockSizes[i] * _blockSizes[i];
+        columnBase += _blockSizes[i];
+      }
+      _preconditioner.resize(dvs.size());
+      _threadLocalBlockDiagonal.clear();
+      _threadLocalRhs.clear();
+      _threadLocalProducts.clear();
+    }
+
+    void PcgLinearSystemSolver::buildSystem(size_t nThreads, bool useMEstimator)
+    {
+      _nThreads = std::max((size_t)1, std::min(nThreads, _errorTerms.size()));
+      _threadLocalBlockDiagonal.resize(_nThreads);
+      _threadLocalRhs.resize(_nThreads);
+      for (size_t i = 0; i < _nThreads; ++i) {
+        _threadLocalBlockDiagonal[i] = Eigen::VectorXd::Zero(_blockOffsets.back());
+        _threadLocalRhs[i] = Eigen::VectorXd::Zero(_JCols);
+      }
+      setupThreadedJob(boost::bind(&PcgLinearSystemSolver::evaluateJacobians, this, _1, _2, _3, _4), _nThreads, useMEstimator);
+      _rhs = _threadLocalRhs[0];
+      for (size_t i = 1; i < _nThreads; ++i) {
+        _threadLocalBlockDiagonal[0] += _threadLocalBlockDiagonal[i];
+        _rhs += _threadLocalRhs[i];
+      }
+    }
+
+    void PcgLinearSystemSolver::evaluateJacobians(size_t threadId, size_t startIdx, size_t endIdx, bool useMEstimator)
+    {
+      SM_ASSERT_LT_DBG(Exception, threadId, _threadLocalBlockDiagonal.size(), "Index out of bounds in thread " << threadId);
+      Eigen::VectorXd& blockDiagonal = _threadLocalBlockDiagonal[threadId];
+      // rhs = J^T e, where _e holds the negative weighted error.
+      Eigen::VectorXd& rhs = _threadLocalRhs[threadId];
+      for (size_t i = startIdx; i < endIdx; ++i) {
+        std::vector<JacobianBlock>& blocks = _jacobians[i];
+        if (!_hasJacobians[i]) {
+          blocks.clear();
+          continue;
+        }
+        JacobianContainer::ThreadLocalScratch scratch(_errorTerms[i]->dimension());
+        JacobianContainer& jc = scratch.container();
+        _errorTerms[i]->getWeightedJacobians(jc, useMEstimator);
+        blocks.resize(jc.numDesignVariables());
+        JacobianContainer::map_t::iterator it = jc.begin();
+        for (size_t j = 0; it != jc.end(); ++it, ++j) {
+          const int b = it->first->blockIndex();
+          SM_ASSERT_GE_DBG(Exception, b, 0, "Inactive design variables shouldn't make it in here");
+          blocks[j].blockIndex = b;
+          blocks[j].J = it->second;
+          Eigen::Map<Eigen::MatrixXd>(blockDiagonal.data() + _blockOffsets[b], _blockSizes[b], _blockSizes[b]) += it->second.transpose() * it->second;
+          rhs.segment(_blockColumnBase[b], _blockSizes[b]) += it->second.transpose() * _e.segment(_errorTerms[i]->rowBase(), _errorTerms[i]->dimension());
+        }
+      }
+    }
+
+    void PcgLinearSystemSolver::multiplyJacobians(size_t threadId, size_t startIdx, size_t endIdx, bool /* useMEstimator */)
+    {
+      SM_ASSERT_LT_DBG(Exception, threadId, _threadLocalProducts.size(), "Index out of bounds in thread " << threadId);
+      const Eigen::VectorXd& x = *_productInput;
+      Eigen::VectorXd& product = _threadLocalProducts[threadId];
+      Eigen::VectorXd Jx;
+      for (size_t i = startIdx; i < endIdx; ++i) {
+        const std::vector<JacobianBlock>& blocks = _jacobians[i];
+        Jx = Eigen::VectorXd::Zero(_errorTerms[i]->dimension());
+        for (size_t j = 0; j < blocks.size(); ++j) {
+          const int b = blocks[j].blockIndex;
+          Jx += blocks[j].J * x.segment(_blockColumnBase[b], _blockSizes[b]);
+        }
+        for (size_t j = 0; j < blocks.size(); ++j) {
+          const int b = blocks[j].blockIndex;
+          product.segment(_blockColumnBase[b], _blockSizes[b]) += blocks[j].J.transpose() * Jx;
+        }
+      }
+    }
+
+    void PcgLinearSystemSolver::multiplyNormalEquations(const Eigen::VectorXd& x, Eigen::VectorXd& outProduct, bool addConditioner)
+    {
+      _threadLocalProducts.resize(_nThreads);
+      for (size_t i = 0; i < _nThreads; ++i) {
+        _threadLocalProducts[i] = Eigen::VectorXd::Zero(_JCols);
+      }
+      _productInput = &x;
+      setupThreadedJob(boost::bind(&PcgLinearSystemSolver::multiplyJacobians, this, _1, _2, _3, _4), _nThreads, false);
+      _productInput = NULL;
+      outProduct = _threadLocalProducts[0];
+      for (size_t i = 1; i < _nThreads; ++i) {
+        outProduct += _threadLocalProducts[i];
+      }
+      if (addConditioner && _useDiagonalConditioner) {
+        outProduct += _diagonalConditioner.cwiseProduct(_diagonalConditioner).cwiseProduct(x);
+      }
+    }
+
+    void PcgLinearSystemSolver::computePreconditioner()
+    {
+      SM_ASSERT_FALSE(Exception, _threadLocalBlockDiagonal.empty(), "The system has not been built");
+      const Eigen::VectorXd& blockDiagonal = _threadLocalBlockDiagonal[0];
+      for (size_t b = 0; b < _preconditioner.size(); ++b) {
+        Eigen::MatrixXd M = Eigen::Map<const Eigen::MatrixXd>(blockDiagonal.data() + _blockOffsets[b], _blockSizes[b], _blockSizes[b]);
+        if (_useDiagonalConditioner) {
+          M.diagonal() += _diagonalConditioner.segment(_blockColumnBase[b], _blockSizes[b]).cwiseAbs2();
+        }
+        _preconditioner[b].compute(M);
+      }
+    }
+
+    void PcgLinearSystemSolver::applyPreconditioner(const Eigen::VectorXd& r, Eigen::VectorXd& outZ) const
+    {
+      outZ.resize(r.size());
+      for (size_t b = 0; b < _preconditioner.size(); ++b) {
+        // Zero pivots of blocks without any information are skipped by the LDLT solve.
+        outZ.segment(_blockColumnBase[b], _blockSizes[b]) = _preconditioner[b].solve(r.segment(_blockColumnBase[b], _blockSizes[b]));
+      }
+    }
+
+    bool PcgLinearSystemSolver::solveSystem(Eigen::VectorXd& outDx)
+    {
+      computePreconditioner();
+      outDx = Eigen::VectorXd::Zero(_JCols);
+      _iterations = 0;
+      _relativeResidual = 0.0;
+      const double rhsNorm = _rhs.norm();
+      if (rhsNorm == 0.0) {
+        return true;
+      }
+      const int maxIterations = _options.maxIterations < 0 ? (int)_JCols : _options.maxIterations;
+      Eigen::VectorXd r = _rhs;
+      Eigen::VectorXd z, p, Ap;
+      applyPreconditioner(r, z);
+      p = z;
+      double rz = r.dot(z);
+      _relativeResidual = 1.0;
+      while (_iterations < maxIterations && _relativeResidual > _options.tolerance) {
+        multiplyNormalEquations(p, Ap, true);
+        const double pAp = p.dot(Ap);
+        if (!(pAp > 0.0) || !boost::math::isfinite(pAp)) {
+          // The system is not positive definite along p.
+          break;
+        }
+        const double alpha = rz / pAp;
+        outDx += alpha * p;
+        r -= alpha * Ap;
+        ++_iterations;
+        _relativeResidual = r.norm() / rhsNorm;
+        applyPreconditioner(r, z);
+        const double rzNew = r.dot(z);
+        p = z + (rzNew / rz) * p;
+        rz = rzNew;
+      }
+      _options.verbose && std::cout << "PCG: " << _iterations << " iterations, relative residual " << _relativeResidual << std::endl;
+      // Any reduction of the residual is a descent step that the trust region policy can accept or reject.
+      return _iterations > 0 && boost::math::isfinite(_relativeResidual);
+    }
+
+    double PcgLinearSystemSolver::rhsJtJrhs()
+    {
+      Eigen::VectorXd JtJrhs;
+      multiplyNormalEquations(_rhs, JtJrhs, false);
+      return _rhs.dot(JtJrhs);
+    }
+
+    const PcgLinearSolverOptions&
+    PcgLinearSystemSolver::getOptions() const {
+      return _options;
+    }
+
+    PcgLinearSolverOptions&
+    PcgLinearSystemSolver::getOptions() {
+      return _options;
+    }
+
+    void PcgLinearSystemSolver::setOptions(const PcgLinearSolverOptions& options) {
+      _options = options;
+    }
+
+  } // namespace backend
+} // namespace aslam
@@ -109,6 +109,14 @@ namespace aslam {
         J_transpose.leftMultiply(_rhs, Jrhs);
         return Jrhs.squaredNorm();
     }
+
+    size_t SparseCholeskyLinearSystemSolver::factorNonZeros() const {
+      if (_factor == NULL) {
+        return 0;
+      }
+      // Supernodal factors store dense blocks, simplicial factors one entry per non-zero.
+      return _factor->is_super ? _factor->xsize : _factor->nzmax;
+    }
       
       
 
@@ -0,0 +1,101 @@
+#include <aslam/backend/ThreadPool.hpp>
+#include <boost/bind.hpp>
+#include <iostream>
+
+namespace aslam {
+  namespace backend {
+
+    ThreadPool::ThreadPool() :
+        _nWorkers(0), _nThreads(0), _nPending(0), _generation(0), _stop(false)
+    {
+    }
+
+    ThreadPool::~ThreadPool()
+    {
+      {
+        boost::mutex::scoped_lock lock(_mutex);
+        _stop = true;
+      }
+      _jobAvailable.notify_all();
+      _threads.join_all();
+    }
+
+    size_t ThreadPool::numWorkers() const
+    {
+      boost::mutex::scoped_lock lock(_mutex);
+      return _nWorkers;
+    }
+
+    void ThreadPool::run(size_t nThreads, const boost::function<void(size_t)>& job)
+    {
+      if (nThreads <= 1) {
+        job(0);
+        return;
+      }
+      boost::mutex::scoped_lock runLock(_runMutex);
+      {
+        boost::mutex::scoped_lock lock(_mutex);
+        // The calling thread is thread 0, so nThreads - 1 workers are needed.
+        while (_nWorkers < nThreads - 1) {
+          ++_nWorkers;
+          _threads.create_thread(boost::bind(&ThreadPool::workerLoop, this, _nWorkers));
+        }
+        _job = job;
+        _nThreads = nThreads;
+        _nPending = nThreads - 1;
+        _error.clear();
+        ++_generation;
+      }
+      _jobAvailable.notify_all();
+      runJob(0);
+
+      boost::mutex::scoped_lock lock(_mutex);
+      while (_nPending > 0) {
+        _jobFinished.wait(lock);
+      }
+      _job.clear();
+      if (!_error.empty()) {
+        std::string error;
+        error.swap(_error);
+        SM_THROW(Exception, error);
+      }
+    }
+
+    void ThreadPool::workerLoop(size_t threadId)
+    {
+      size_t generation = 0;
+      while (true) {
+        {
+          boost::mutex::scoped_lock lock(_mutex);
+          // Workers with a thread id beyond the current job skip it.
+          while (!_stop && (generation == _generation || threadId >= _nThreads)) {
+            _jobAvailable.wait(lock);
+          }
+          if (_stop) {
+            return;
+          }
+          generation = _generation;
+        }
+        runJob(threadId);
+        boost::mutex::scoped_lock lock(_mutex);
+        if (--_nPending == 0) {
+          _jobFinished.notify_all();
+        }
+      }
+    }
+
+    void ThreadPool::runJob(size_t threadId)
+    {
+      try {
+        _job(threadId);
+      } catch (const std::exception& e) {
+        std::cout << "Exception in thread block: " << e.what() << std::endl;
+        boost::mutex::scoped_lock lock(_mutex);
+        if (_error.empty()) {
+          _error = e.what();
+        }
+      }
+    }
+
+  } // namespace backend
+} // namespace aslam
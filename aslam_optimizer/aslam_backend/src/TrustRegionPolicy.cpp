@@ -1,9 +1,10 @@
 #include <aslam/backend/TrustRegionPolicy.hpp>
+#include <sm/timing/NsecTimeUtilities.hpp>
 
 namespace aslam {
     namespace backend {
 
-        TrustRegionPolicy::TrustRegionPolicy(){}
+        TrustRegionPolicy::TrustRegionPolicy() : _buildSystemTime(0.0), _solveLinearSystemTime(0.0) {}
         TrustRegionPolicy::~TrustRegionPolicy(){}
 
 
@@ -46,6 +47,8 @@ namespace aslam {
                 _J = J;
             }
 
+            _buildSystemTime = 0.0;
+            _solveLinearSystemTime = 0.0;
             bool success = solveSystemImplementation(J, previousIterationFailed, nThreads, outDx);
             _isFirstIteration = false;
             return success;
@@ -56,6 +59,21 @@ namespace aslam {
             return _p_J - _J;
         }
 
+        void TrustRegionPolicy::buildSystem(int nThreads, bool useMEstimator)
+        {
+            const sm::timing::NsecTime start = sm::timing::nsecNow();
+            _solver->buildSystem(nThreads, useMEstimator);
+            _buildSystemTime += sm::timing::nsecToSec(sm::timing::nsecNow() - start);
+        }
+
+        bool TrustRegionPolicy::solveLinearSystem(Eigen::VectorXd& outDx)
+        {
+            const sm::timing::NsecTime start = sm::timing::nsecNow();
+            bool success = _solver->solveSystem(outDx);
+            _solveLinearSystemTime += sm::timing::nsecToSec(sm::timing::nsecNow() - start);
+            return success;
+        }
+
 
 
     } // namespace backend
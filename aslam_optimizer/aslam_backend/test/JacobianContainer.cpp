@@ -91,6 +91,68 @@ TEST(JacobianContainerTests, testOrdering)
     ASSERT_LT((itkm1)->first->blockIndex(), itk->first->blockIndex());
 }
 
+TEST(JacobianContainerTests, testReuseAfterClear)
+{
+  try {
+    using namespace aslam::backend;
+    JacobianContainer jc(2);
+    DummyDesignVariable<3> dv1;
+    dv1.setBlockIndex(1);
+    dv1.setActive(true);
+    DummyDesignVariable<1> dv3;
+    dv3.setBlockIndex(3);
+    dv3.setActive(true);
+    Eigen::Matrix<double, 2, 3> J1;
+    J1.setRandom();
+    Eigen::Matrix<double, 2, 1> J3;
+    J3.setRandom();
+    jc.add(&dv3, J3);
+    jc.add(&dv1, J1);
+    ASSERT_EQ(2u, jc.numDesignVariables());
+    const double* J1Data = jc.Jacobian(&dv1).data();
+    const double* J3Data = jc.Jacobian(&dv3).data();
+    // After clearing, the container is empty and refills in block index order
+    // with entries of different sizes.
+    jc.clear();
+    ASSERT_EQ(0u, jc.numDesignVariables());
+    ASSERT_TRUE(jc.begin() == jc.end());
+    ASSERT_THROW(jc.Jacobian(&dv1), JacobianContainer::Exception);
+    DummyDesignVariable<2> dv2;
+    dv2.setBlockIndex(2);
+    dv2.setActive(true);
+    Eigen::Matrix<double, 2, 2> J2;
+    J2.setRandom();
+    jc.add(&dv3, J3);
+    jc.add(&dv2, J2);
+    jc.add(&dv1, J1);
+    ASSERT_EQ(3u, jc.numDesignVariables());
+    ASSERT_EQ(&dv1, jc.designVariable(0));
+    ASSERT_EQ(&dv2, jc.designVariable(1));
+    ASSERT_EQ(&dv3, jc.designVariable(2));
+    sm::eigen::assertEqual(jc.Jacobian(&dv1), J1, SM_SOURCE_FILE_POS, "Recover the Jacobian");
+    sm::eigen::assertEqual(jc.Jacobian(&dv2), J2, SM_SOURCE_FILE_POS, "Recover the Jacobian");
+    sm::eigen::assertEqual(jc.Jacobian(&dv3), J3, SM_SOURCE_FILE_POS, "Recover the Jacobian");
+    // The Jacobians reuse the matrices of the same size.
+    ASSERT_EQ(J1Data, jc.Jacobian(&dv1).data());
+    ASSERT_EQ(J3Data, jc.Jacobian(&dv3).data());
+    // The thread local container is the same object on every borrow and starts empty.
+    JacobianContainer* scratchAddress = NULL;
+    {
+      JacobianContainer::ThreadLocalScratch scratch(2);
+      scratch.container().add(&dv1, J1);
+      scratchAddress = &scratch.container();
+      // It cannot be borrowed twice on the same thread.
+      ASSERT_THROW(JacobianContainer::ThreadLocalScratch nested(2), JacobianContainer::Exception);
+    }
+    JacobianContainer::ThreadLocalScratch scratch2(4);
+    ASSERT_EQ(scratchAddress, &scratch2.container());
+    ASSERT_EQ(0u, scratch2.container().numDesignVariables());
+    ASSERT_EQ(4, scratch2.container().rows());
+  } catch (const std::exception& e) {
+    FAIL() << "Exception: " << e.what();
+  }
+}
+
 TEST(JacobianContainerTests, testChainRule)
 {
   try {
@@ -317,3 +379,47 @@ TEST(JacobianContainerTests, testBuildHessian2)
     FAIL() << "Exception: " << e.what();
   }
 }
+
+
+TEST(JacobianContainerTests, testBuildHessianScalarWeight)
+{
+  try {
+    using namespace aslam::backend;
+    JacobianContainer jc1(4);
+    DummyDesignVariable<3> dv1;
+    dv1.setBlockIndex(0);
+    dv1.setActive(true);
+    Eigen::Matrix<double, 4, 3> J1;
+    J1.setRandom();
+    jc1.add(&dv1, J1);
+    DummyDesignVariable<2> dv2;
+    dv2.setBlockIndex(1);
+    dv2.setActive(true);
+    Eigen::Matrix<double, 4, 2> J2;
+    J2.setRandom();
+    jc1.add(&dv2, J2);
+    std::vector<int> bi;
+    bi.push_back(3);
+    bi.push_back(2);
+    std::partial_sum(bi.begin(), bi.end(), bi.begin());
+    sparse_block_matrix::SparseBlockMatrix<Eigen::MatrixXd> Hessian(bi, bi);
+    Eigen::VectorXd rhs(bi[bi.size() - 1]);
+    rhs.setZero();
+    sparse_block_matrix::SparseBlockMatrix<Eigen::MatrixXd> expectedHessian(bi, bi);
+    Eigen::VectorXd expectedRhs(bi[bi.size() - 1]);
+    expectedRhs.setZero();
+    Eigen::VectorXd e(4);
+    e.setRandom();
+    // The scalar weight must give the same system as the diagonal square root matrix.
+    const double sqrtInvR = 3.0;
+    jc1.evaluateHessian(e, sqrtInvR, Hessian, rhs);
+    jc1.evaluateHessian(e, Eigen::MatrixXd(sqrtInvR * Eigen::MatrixXd::Identity(4, 4)), expectedHessian, expectedRhs);
+    ASSERT_FALSE(Hessian.isBlockSet(1, 0));
+    ASSERT_DOUBLE_MX_EQ(*Hessian.block(0, 0), *expectedHessian.block(0, 0), 1e-9, "Block 0,0");
+    ASSERT_DOUBLE_MX_EQ(*Hessian.block(0, 1), *expectedHessian.block(0, 1), 1e-9, "Block 0,1");
+    ASSERT_DOUBLE_MX_EQ(*Hessian.block(1, 1), *expectedHessian.block(1, 1), 1e-9, "Block 1,1");
+    ASSERT_DOUBLE_MX_EQ(rhs, expectedRhs, 1e-9, "rhs");
+  } catch (const std::exception& e) {
+    FAIL() << "Exception: " << e.what();
+  }
+}
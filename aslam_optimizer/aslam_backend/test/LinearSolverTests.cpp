@@ -1,6 +1,8 @@
 #include <sm/eigen/gtest.hpp>
 
 #include <numeric>
+#include <fstream>
+#include <cstdio>
 
 #include "SampleDvAndError.hpp"
 
@@ -8,6 +10,7 @@
 #include <aslam/backend/SparseCholeskyLinearSystemSolver.hpp>
 #include <aslam/backend/SparseQrLinearSystemSolver.hpp>
 #include <aslam/backend/BlockCholeskyLinearSystemSolver.hpp>
+#include <aslam/backend/PcgLinearSystemSolver.hpp>
 #include <boost/lexical_cast.hpp>
 #include <aslam/backend/Optimizer2.hpp>
 #include <aslam/backend/OptimizationProblem.hpp>
@@ -116,6 +119,258 @@ TEST(LinearSolverTestSuite, testSparseCholesky)
 
 
 
+TEST(LinearSolverTestSuite, testPcg)
+{
+  using namespace aslam::backend;
+  const int D = 4;
+  const int E = 20;
+  const bool useM = false;
+  bool useDiag = true;
+  for (int nThreads = 0; nThreads < 4; ++nThreads) {
+    {
+      useDiag = false;
+      SCOPED_TRACE(("No Diagonal and " + boost::lexical_cast<std::string>(nThreads) + " threads").c_str());
+      compareSolvers<BlockCholeskyLinearSystemSolver, PcgLinearSystemSolver>(D, E, useM, useDiag, nThreads);
+    }
+    {
+      useDiag = true;
+      SCOPED_TRACE(("With Diagonal and " + boost::lexical_cast<std::string>(nThreads) + " threads").c_str());
+      compareSolvers<BlockCholeskyLinearSystemSolver, PcgLinearSystemSolver>(D, E, useM, useDiag, nThreads);
+    }
+  }
+}
+
+TEST(LinearSolverTestSuite, testInactiveDesignVariables)
+{
+  using namespace aslam::backend;
+  std::vector<DesignVariable*> dvs;
+  std::vector<ErrorTerm*> errs;
+  const int D = 4;
+  const int E = 20;
+  const int nThreads = 2;
+  try {
+    buildSystem(D, E, dvs, errs);
+    // Error term 0 only depends on the first design variable.
+    dvs[0]->setActive(false);
+    ASSERT_FALSE(errs[0]->hasActiveDesignVariables());
+    ASSERT_TRUE(errs[1]->hasActiveDesignVariables());
+    std::vector<DesignVariable*> activeDvs(dvs.begin() + 1, dvs.end());
+    int columnBase = 0;
+    for (size_t i = 0; i < activeDvs.size(); ++i) {
+      activeDvs[i]->setBlockIndex(i);
+      activeDvs[i]->setColumnBase(columnBase);
+      columnBase += activeDvs[i]->minimalDimensions();
+    }
+    SparseCholeskyLinearSystemSolver S1;
+    BlockCholeskyLinearSystemSolver S2;
+    PcgLinearSystemSolver S3;
+    S1.initMatrixStructure(activeDvs, errs, false);
+    S2.initMatrixStructure(activeDvs, errs, false);
+    S3.initMatrixStructure(activeDvs, errs, false);
+    // The error terms without active design variables still count in the cost.
+    double e2S1 = S1.evaluateError(nThreads, false);
+    ASSERT_NEAR(e2S1, S2.evaluateError(nThreads, false), 1e-9);
+    ASSERT_NEAR(e2S1, S3.evaluateError(nThreads, false), 1e-9);
+    S1.buildSystem(nThreads, false);
+    S2.buildSystem(nThreads, false);
+    S3.buildSystem(nThreads, false);
+    ASSERT_DOUBLE_MX_EQ(S1.rhs(), S2.rhs(), 1e-6, "Checking right-hand sides");
+    ASSERT_DOUBLE_MX_EQ(S1.rhs(), S3.rhs(), 1e-6, "Checking right-hand sides");
+    Eigen::VectorXd dxS1, dxS2, dxS3;
+    S1.solveSystem(dxS1);
+    S2.solveSystem(dxS2);
+    S3.solveSystem(dxS3);
+    ASSERT_DOUBLE_MX_EQ(dxS1, dxS2, 1e-6, "Checking the solutions");
+    ASSERT_DOUBLE_MX_EQ(dxS1, dxS3, 1e-6, "Checking the solutions");
+    deleteSystem(dvs, errs);
+  } catch (const std::exception& e) {
+    deleteSystem(dvs, errs);
+    FAIL() << e.what();
+  }
+}
+
+TEST(LinearSolverTestSuite, testBlockCholeskyStructureReuse)
+{
+  using namespace aslam::backend;
+  std::vector<DesignVariable*> dvs;
+  std::vector<ErrorTerm*> errs;
+  const int D = 6;
+  const int E = 20;
+  const int nThreads = 2;
+  const bool useDiag = true;
+  try {
+    buildSystem(D, E, dvs, errs);
+    BlockCholeskyLinearSystemSolver S1;
+    S1.initMatrixStructure(dvs, errs, useDiag);
+    ASSERT_FALSE(S1.isMatrixStructureReused());
+    Eigen::VectorXd diag(S1.JCols());
+    diag.setRandom();
+    Eigen::VectorXd dxS1, dxS2;
+    S1.setConditioner(diag);
+    S1.evaluateError(nThreads, false);
+    S1.buildSystem(nThreads, false);
+    ASSERT_TRUE(S1.solveSystem(dxS1));
+
+    // Dropping an error term keeps the structure and the symbolic factorization.
+    std::vector<ErrorTerm*> subset(errs.begin(), errs.end() - 1);
+    S1.initMatrixStructure(dvs, subset, useDiag);
+    ASSERT_TRUE(S1.isMatrixStructureReused());
+    BlockCholeskyLinearSystemSolver S2;
+    S2.initMatrixStructure(dvs, subset, useDiag);
+    S1.setConditioner(diag);
+    S2.setConditioner(diag);
+    S1.evaluateError(nThreads, false);
+    S2.evaluateError(nThreads, false);
+    S1.buildSystem(nThreads, false);
+    S2.buildSystem(nThreads, false);
+    ASSERT_DOUBLE_MX_EQ(S1.rhs(), S2.rhs(), 1e-6, "Checking right-hand sides");
+    ASSERT_TRUE(S1.solveSystem(dxS1));
+    ASSERT_TRUE(S2.solveSystem(dxS2));
+    ASSERT_DOUBLE_MX_EQ(dxS1, dxS2, 1e-6, "Checking the solutions");
+
+    // An error term coupling two new blocks requires a new structure.
+    errs.push_back(new LinearErr2((Point2d*)dvs[0], (Point2d*)dvs[3]));
+    errs.back()->setRowBase(errs[errs.size() - 2]->rowBase() + errs[errs.size() - 2]->dimension());
+    S1.initMatrixStructure(dvs, errs, useDiag);
+    ASSERT_FALSE(S1.isMatrixStructureReused());
+    deleteSystem(dvs, errs);
+  } catch (const std::exception& e) {
+    deleteSystem(dvs, errs);
+    FAIL() << e.what();
+  }
+}
+
+TEST(LinearSolverTestSuite, testBlockCholeskySolveKeepsHessian)
+{
+  using namespace aslam::backend;
+  std::vector<DesignVariable*> dvs;
+  std::vector<ErrorTerm*> errs;
+  const int D = 6;
+  const int E = 20;
+  const int nThreads = 2;
+  try {
+    buildSystem(D, E, dvs, errs);
+    BlockCholeskyLinearSystemSolver S1;
+    S1.initMatrixStructure(dvs, errs, true);
+    Eigen::VectorXd diag(S1.JCols());
+    diag.setRandom();
+    diag *= 2.0;
+    S1.setConditioner(diag);
+    S1.evaluateError(nThreads, false);
+    S1.buildSystem(nThreads, false);
+    BlockCholeskyLinearSystemSolver::SparseBlockMatrix H0, H1;
+    S1.copyHessian(H0);
+    Eigen::VectorXd dx0, dx1;
+    ASSERT_TRUE(S1.solveSystem(dx0));
+    S1.copyHessian(H1);
+    // The conditioner is added for the solve only and must be removed again.
+    ASSERT_DOUBLE_MX_EQ(H0.toDense(), H1.toDense(), 1e-9, "Checking the Hessian after one solve");
+    ASSERT_TRUE(S1.solveSystem(dx1));
+    S1.copyHessian(H1);
+    ASSERT_DOUBLE_MX_EQ(H0.toDense(), H1.toDense(), 1e-9, "Checking the Hessian after two solves");
+    ASSERT_DOUBLE_MX_EQ(dx0, dx1, 1e-9, "Checking the solutions");
+    deleteSystem(dvs, errs);
+  } catch (const std::exception& e) {
+    deleteSystem(dvs, errs);
+    FAIL() << e.what();
+  }
+}
+
+TEST(LinearSolverTestSuite, testOptimizerMarginalCovariance)
+{
+  using namespace aslam::backend;
+  const int D = 6;
+  const int E = 20;
+  try {
+    boost::shared_ptr<OptimizationProblem> problem = buildProblem(1, D, E);
+    Optimizer2Options options;
+    Optimizer2 optimizer(options);
+    optimizer.setProblem(problem);
+    optimizer.initialize();
+
+    const double lambda = 0.1;
+    Optimizer2::SparseBlockMatrix H;
+    optimizer.computeHessian(H, lambda);
+    Eigen::MatrixXd Hd = H.toDense().selfadjointView<Eigen::Upper>();
+    Hd.diagonal().array() += lambda * lambda;
+    const Eigen::MatrixXd P = Hd.inverse();
+
+    // The selected blocks out of order, to check the transposed blocks as well.
+    std::vector<DesignVariable*> selected;
+    selected.push_back(optimizer.designVariable(4));
+    selected.push_back(optimizer.designVariable(1));
+    selected.push_back(optimizer.designVariable(5));
+    Eigen::MatrixXd expected(6, 6);
+    const int blocks[] = {4, 1, 5};
+    for (int i = 0; i < 3; ++i) {
+      for (int j = 0; j < 3; ++j) {
+        expected.block<2, 2>(2 * i, 2 * j) = P.block<2, 2>(2 * blocks[i], 2 * blocks[j]);
+      }
+    }
+    Eigen::MatrixXd Ps = optimizer.computeMarginalCovariance(selected, lambda);
+    ASSERT_DOUBLE_MX_EQ(expected, Ps, 1e-6, "Checking the selected inverse against the dense inverse");
+
+    // The Hessian is left untouched, so the diagonal blocks are the same a second time.
+    Optimizer2::SparseBlockMatrix Pd;
+    optimizer.computeDiagonalCovariances(Pd, lambda);
+    for (int i = 0; i < D; ++i) {
+      ASSERT_TRUE(Pd.block(i, i) != NULL);
+      Eigen::MatrixXd Pii = *Pd.block(i, i);
+      Eigen::MatrixXd expectedPii = P.block<2, 2>(2 * i, 2 * i);
+      ASSERT_DOUBLE_MX_EQ(expectedPii, Pii, 1e-6, "Checking the diagonal blocks");
+    }
+  } catch (const std::exception& e) {
+    FAIL() << e.what();
+  }
+}
+
+TEST(LinearSolverTestSuite, testOptimizerIterationStatistics)
+{
+  using namespace aslam::backend;
+  const int D = 6;
+  const int E = 20;
+  try {
+    boost::shared_ptr<OptimizationProblem> problem = buildProblem(1, D, E);
+    Optimizer2Options options;
+    options.maxIterations = 3;
+    options.convergenceDeltaX = 0.0;
+    options.convergenceJDescentRatioThreshold = 0.0;
+    options.linearSystemSolver.reset(new BlockCholeskyLinearSystemSolver());
+    options.telemetryFile = "optimizer_telemetry_test.jsonl";
+    std::remove(options.telemetryFile.c_str());
+    Optimizer2 optimizer(options);
+    optimizer.setProblem(problem);
+    SolutionReturnValue srv = optimizer.optimize();
+
+    const std::vector<IterationStatistics>& stats = optimizer.iterationStatistics();
+    ASSERT_EQ((size_t)(srv.iterations + srv.failedIterations), stats.size());
+    ASSERT_FALSE(stats.empty());
+    for (size_t i = 0; i < stats.size(); ++i) {
+      EXPECT_GT(stats[i].hessianNonZeros, 0u);
+      EXPECT_GT(stats[i].factorNonZeros, 0u);
+      EXPECT_GT(stats[i].peakMemory, 0u);
+      EXPECT_GT(stats[i].lambda, 0.0);
+      EXPECT_GE(stats[i].timeTotal, stats[i].timeBuildSystem + stats[i].timeSolveSystem);
+    }
+    EXPECT_EQ(srv.iterations, stats.back().iteration);
+    EXPECT_DOUBLE_EQ(srv.lmLambdaFinal, stats.back().lambda);
+
+    // One JSON line per iteration.
+    std::ifstream telemetry(options.telemetryFile.c_str());
+    std::string line;
+    size_t nLines = 0;
+    while (std::getline(telemetry, line)) {
+      EXPECT_EQ('{', line[0]);
+      EXPECT_NE(std::string::npos, line.find("\"timeBuildSystem\""));
+      ++nLines;
+    }
+    EXPECT_EQ(stats.size(), nLines);
+    std::remove(options.telemetryFile.c_str());
+  } catch (const std::exception& e) {
+    FAIL() << e.what();
+  }
+}
+
 TEST(LinearSolverTestSuite, testSparseQR)
 {
   using namespace aslam::backend;
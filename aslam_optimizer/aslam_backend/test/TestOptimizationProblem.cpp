@@ -193,3 +193,64 @@ TEST(OptimizationProblemTestSuite,  testAddRemoveErrorTerm1)
   ASSERT_EQ(1, (int)et2.count(&et21));
   ASSERT_EQ(1, (int)et2.count(&et22));
 }
+
+TEST(OptimizationProblemTestSuite,  testRemoveRetainErrorTerms)
+{
+  OptimizationProblem op;
+  Dv dv1, dv2;
+  Et1 et11(&dv1), et12(&dv1), et21(&dv2), et22(&dv2);
+  Et2 ett1(&dv1, &dv2), ett2(&dv1, &dv2);
+  op.addDesignVariable(&dv1, false);
+  op.addDesignVariable(&dv2, false);
+  op.addErrorTerm(&et11, false);
+  op.addErrorTerm(&et12, false);
+  op.addErrorTerm(&et21, false);
+  op.addErrorTerm(&et22, false);
+  op.addErrorTerm(&ett1, false);
+  op.addErrorTerm(&ett2, false);
+  // Remove a single and a double error at once.
+  std::vector<const ErrorTerm*> toRemove;
+  toRemove.push_back(&ett2);
+  toRemove.push_back(&et11);
+  op.removeErrorTerms(toRemove);
+  ASSERT_EQ(4, (int)op.numErrorTerms());
+  ASSERT_EQ(&et12, op.errorTerm(0));
+  ASSERT_EQ(&et21, op.errorTerm(1));
+  ASSERT_EQ(&et22, op.errorTerm(2));
+  ASSERT_EQ(&ett1, op.errorTerm(3));
+  std::set<ErrorTerm*> et1;
+  op.getErrors(&dv1, et1);
+  ASSERT_EQ(2, (int)et1.size());
+  ASSERT_EQ(1, (int)et1.count(&et12));
+  ASSERT_EQ(1, (int)et1.count(&ett1));
+  std::set<ErrorTerm*> et2;
+  op.getErrors(&dv2, et2);
+  ASSERT_EQ(3, (int)et2.size());
+  ASSERT_EQ(0, (int)et2.count(&ett2));
+  // Removing an error term that is not in the problem throws and removes nothing.
+  toRemove.clear();
+  toRemove.push_back(&et12);
+  toRemove.push_back(&ett2);
+  ASSERT_THROW(op.removeErrorTerms(toRemove), std::runtime_error);
+  ASSERT_EQ(4, (int)op.numErrorTerms());
+  ASSERT_EQ(&et12, op.errorTerm(0));
+  // Keep every other error term.
+  std::vector<bool> keep(op.numErrorTerms(), false);
+  keep[1] = true;
+  keep[3] = true;
+  op.retainErrorTerms(keep);
+  ASSERT_EQ(2, (int)op.numErrorTerms());
+  ASSERT_EQ(&et21, op.errorTerm(0));
+  ASSERT_EQ(&ett1, op.errorTerm(1));
+  et1.clear();
+  op.getErrors(&dv1, et1);
+  ASSERT_EQ(1, (int)et1.size());
+  ASSERT_EQ(1, (int)et1.count(&ett1));
+  et2.clear();
+  op.getErrors(&dv2, et2);
+  ASSERT_EQ(2, (int)et2.size());
+  ASSERT_EQ(1, (int)et2.count(&et21));
+  ASSERT_EQ(1, (int)et2.count(&ett1));
+  // The mask has to match the error terms.
+  ASSERT_THROW(op.retainErrorTerms(std::vector<bool>(3, true)), std::runtime_error);
+}
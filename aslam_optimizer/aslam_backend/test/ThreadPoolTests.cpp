@@ -0,0 +1,49 @@
+#include <gtest/gtest.h>
+#include <aslam/backend/ThreadPool.hpp>
+#include <boost/bind.hpp>
+#include <vector>
+
+namespace {
+
+  void countCalls(std::vector<int>* calls, size_t threadId)
+  {
+    ++(*calls)[threadId];
+  }
+
+  void throwInThread(size_t throwingThread, size_t threadId)
+  {
+    if (threadId == throwingThread) {
+      throw std::runtime_error("failure in worker");
+    }
+  }
+
+} // namespace
+
+TEST(ThreadPoolTestSuite, testRunsEveryThreadOnce)
+{
+  using namespace aslam::backend;
+  ThreadPool pool;
+  // Changing the number of threads between jobs reuses the existing workers.
+  size_t nThreads[] = {4, 2, 1, 6, 3};
+  for (size_t j = 0; j < sizeof(nThreads) / sizeof(nThreads[0]); ++j) {
+    std::vector<int> calls(nThreads[j], 0);
+    pool.run(nThreads[j], boost::bind(&countCalls, &calls, _1));
+    for (size_t i = 0; i < calls.size(); ++i) {
+      ASSERT_EQ(1, calls[i]) << "thread " << i << " of job " << j;
+    }
+  }
+  ASSERT_EQ(5u, pool.numWorkers());
+}
+
+TEST(ThreadPoolTestSuite, testExceptionIsRethrown)
+{
+  using namespace aslam::backend;
+  ThreadPool pool;
+  ASSERT_THROW(pool.run(4, boost::bind(&throwInThread, 2, _1)), ThreadPool::Exception);
+  // The pool is still usable after a failed job.
+  std::vector<int> calls(4, 0);
+  pool.run(4, boost::bind(&countCalls, &calls, _1));
+  for (size_t i = 0; i < calls.size(); ++i) {
+    ASSERT_EQ(1, calls[i]);
+  }
+}
@@ -5,6 +5,7 @@
 #include <aslam/backend/SparseCholeskyLinearSystemSolver.hpp>
 #include <aslam/backend/SparseQrLinearSystemSolver.hpp>
 #include <aslam/backend/DenseQrLinearSystemSolver.hpp>
+#include <aslam/backend/PcgLinearSystemSolver.hpp>
 
 
 /// \brief solve the system storing the solution in outDx and returning true on success.
@@ -64,6 +65,12 @@ void exportLinearSystemSolver()
         // helper function for dog leg implementation / steepest descent solution
         .def("rhsJtJrhs", &LinearSystemSolver::rhsJtJrhs )
 
+        /// \brief the number of non-zero entries of the Hessian matrix. 0 if the Hessian is not formed.
+        .def("hessianNonZeros", &LinearSystemSolver::hessianNonZeros )
+
+        /// \brief the number of non-zero entries of the last factorization. 0 if not available.
+        .def("factorNonZeros", &LinearSystemSolver::factorNonZeros )
+
         ;
 
     SparseQRLinearSolverOptions& (SparseQrLinearSystemSolver::*getOptions)() = &SparseQrLinearSystemSolver::getOptions;
@@ -77,7 +84,8 @@ void exportLinearSystemSolver()
 
 
     class_<DenseQrLinearSystemSolver, boost::shared_ptr<DenseQrLinearSystemSolver>, bases<LinearSystemSolver> >("DenseQrLinearSystemSolver", init<>());
-    class_<BlockCholeskyLinearSystemSolver, boost::shared_ptr<BlockCholeskyLinearSystemSolver>, bases<LinearSystemSolver> >("BlockCholeskyLinearSystemSolver", init<>());
+    class_<BlockCholeskyLinearSystemSolver, boost::shared_ptr<BlockCholeskyLinearSystemSolver>, bases<LinearSystemSolver> >("BlockCholeskyLinearSystemSolver", init<>())
+        .def("isMatrixStructureReused", &BlockCholeskyLinearSystemSolver::isMatrixStructureReused);
     class_<SparseCholeskyLinearSystemSolver, boost::shared_ptr<SparseCholeskyLinearSystemSolver>, bases<LinearSystemSolver> >("SparseCholeskyLinearSystemSolver", init<>());
     class_<SparseQrLinearSystemSolver, boost::shared_ptr<SparseQrLinearSystemSolver>, bases<LinearSystemSolver> >("SparseQrLinearSystemSolver", init<>())
         .def("getJacobianTranspose", &SparseQrLinearSystemSolver::getJacobianTranspose, return_internal_reference<>())
@@ -91,4 +99,20 @@ void exportLinearSystemSolver()
         .def("setOptions", &SparseQrLinearSystemSolver::setOptions)
         ;
 
+    PcgLinearSolverOptions& (PcgLinearSystemSolver::*getPcgOptions)() = &PcgLinearSystemSolver::getOptions;
+
+    class_<PcgLinearSolverOptions>("PcgLinearSolverOptions", init<>())
+        .def_readwrite("maxIterations", &PcgLinearSolverOptions::maxIterations)
+        .def_readwrite("tolerance", &PcgLinearSolverOptions::tolerance)
+        .def_readwrite("verbose", &PcgLinearSolverOptions::verbose)
+        ;
+
+    class_<PcgLinearSystemSolver, boost::shared_ptr<PcgLinearSystemSolver>, bases<LinearSystemSolver> >("PcgLinearSystemSolver", init<>())
+        .def(init<PcgLinearSolverOptions>())
+        .def("getOptions", getPcgOptions, return_internal_reference<>())
+        .def("setOptions", &PcgLinearSystemSolver::setOptions)
+        .def("getIterations", &PcgLinearSystemSolver::getIterations)
+        .def("getRelativeResidual", &PcgLinearSystemSolver::getRelativeResidual)
+        ;
+
 }
@@ -20,6 +20,23 @@ void (SimpleOptimizationProblem::*sadv)( boost::shared_ptr<DesignVariable>) = &S
 
 void (SimpleOptimizationProblem::*saet)( const boost::shared_ptr<ErrorTerm> &) = &SimpleOptimizationProblem::addErrorTerm;
 
+void removeErrorTerms(OptimizationProblem * problem, const boost::python::list & errorTerms)
+{
+  std::vector<const ErrorTerm*> terms(boost::python::len(errorTerms));
+  for (size_t i = 0; i < terms.size(); ++i) {
+    terms[i] = boost::python::extract<ErrorTerm*>(errorTerms[i]);
+  }
+  problem->removeErrorTerms(terms);
+}
+
+void retainErrorTerms(OptimizationProblem * problem, const boost::python::list & keep)
+{
+  std::vector<bool> mask(boost::python::len(keep));
+  for (size_t i = 0; i < mask.size(); ++i) {
+    mask[i] = boost::python::extract<bool>(keep[i]);
+  }
+  problem->retainErrorTerms(mask);
+}
 
 
 void exportOptimizationProblem()
@@ -45,6 +62,10 @@ void exportOptimizationProblem()
 .def("clear", &OptimizationProblem::clear)
 	/// \brief remove an error term:
 .def("removeErrorTerm", &OptimizationProblem::removeErrorTerm)
+	/// \brief remove a list of error terms in one pass:
+.def("removeErrorTerms", &removeErrorTerms)
+	/// \brief keep the error terms whose entry in a list of booleans is true:
+.def("retainErrorTerms", &retainErrorTerms)
 .def("clearAllErrorTerms", &OptimizationProblem::clearAllErrorTerms)
     ;
 
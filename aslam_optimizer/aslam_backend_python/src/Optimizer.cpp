@@ -18,6 +18,24 @@ Eigen::VectorXd rhs(const aslam::backend::Optimizer * o)
 	return o->rhs();
 }
 
+Eigen::MatrixXd computeMarginalCovariance(aslam::backend::Optimizer2 * o, const boost::python::list & designVariables, double lambda)
+{
+	std::vector<aslam::backend::DesignVariable *> dvs;
+	for (int i = 0; i < boost::python::len(designVariables); ++i) {
+		dvs.push_back(boost::python::extract<aslam::backend::DesignVariable *>(designVariables[i]));
+	}
+	return o->computeMarginalCovariance(dvs, lambda);
+}
+
+boost::python::list iterationStatistics(const aslam::backend::Optimizer2 * o)
+{
+	boost::python::list stats;
+	for (size_t i = 0; i < o->iterationStatistics().size(); ++i) {
+		stats.append(o->iterationStatistics()[i]);
+	}
+	return stats;
+}
+
 
 void exportOptimizer()
 {
@@ -38,6 +56,24 @@ void exportOptimizer()
         .def_readwrite("linearSolverFailure",&SolutionReturnValue::linearSolverFailure)
         ;
 
+    class_<IterationStatistics>("IterationStatistics")
+        .def_readonly("iteration",&IterationStatistics::iteration)
+        .def_readonly("accepted",&IterationStatistics::accepted)
+        .def_readonly("linearSolverFailure",&IterationStatistics::linearSolverFailure)
+        .def_readonly("J",&IterationStatistics::J)
+        .def_readonly("dJ",&IterationStatistics::dJ)
+        .def_readonly("dX",&IterationStatistics::dX)
+        .def_readonly("lambda",&IterationStatistics::lambda)
+        .def_readonly("timeBuildSystem",&IterationStatistics::timeBuildSystem)
+        .def_readonly("timeSolveSystem",&IterationStatistics::timeSolveSystem)
+        .def_readonly("timeStateUpdate",&IterationStatistics::timeStateUpdate)
+        .def_readonly("timeEvaluateError",&IterationStatistics::timeEvaluateError)
+        .def_readonly("timeTotal",&IterationStatistics::timeTotal)
+        .def_readonly("hessianNonZeros",&IterationStatistics::hessianNonZeros)
+        .def_readonly("factorNonZeros",&IterationStatistics::factorNonZeros)
+        .def_readonly("peakMemory",&IterationStatistics::peakMemory)
+        ;
+
 
 
 
@@ -157,6 +193,9 @@ void exportOptimizer()
         // Eigen::MatrixXd getDenseSparseCovariance(int di, int si);
         .def("computeCovariances", &Optimizer2::computeCovariances)
         .def("computeDiagonalCovariances", &Optimizer2::computeDiagonalCovariances)
+        /// \brief compute the joint covariance of a list of design variables from the
+        ///        Cholesky factor of the Hessian. The optimizer has to be initialized.
+        .def("computeMarginalCovariance", &computeMarginalCovariance)
         
         /// \brief Evaluate the error at the current state.
         .def("evaluateError", &Optimizer2::evaluateError)
@@ -169,6 +208,9 @@ void exportOptimizer()
 
 
         .def("printTiming", &Optimizer2::printTiming)
+
+        /// \brief the statistics of every iteration of the last call to optimize()
+        .def("iterationStatistics", &iterationStatistics)
         .def("computeHessian", &Optimizer2::computeHessian)
    
         ;
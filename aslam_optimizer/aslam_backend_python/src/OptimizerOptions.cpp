@@ -35,6 +35,7 @@ void exportOptimizerOptions()
     .def_readwrite("maxIterations",&Optimizer2Options::maxIterations)
     .def_readwrite("verbose",&Optimizer2Options::verbose)
     .def_readwrite("linearSolver",&Optimizer2Options::linearSystemSolver)
+    .def_readwrite("telemetryFile",&Optimizer2Options::telemetryFile)
     .def_readwrite("nThreads", &Optimizer2Options::nThreads)
       .def_readwrite("trustRegionPolicy", &Optimizer2Options::trustRegionPolicy)
     ;
@@ -64,6 +64,12 @@ class LinearSolver
       (void) A;
       return false;
     }
+
+    /**
+     * number of non-zeros in the factor of the last decomposition
+     * @returns 0 if not available.
+     */
+    virtual size_t factorNonZeros() const { return 0; }
 };
 
 } // end namespace
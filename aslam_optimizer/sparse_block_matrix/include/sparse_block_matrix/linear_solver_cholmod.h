@@ -201,6 +201,14 @@ class LinearSolverCholmod : public LinearSolver<MatrixType>
       return true;
     }
 
+    //! number of non-zeros in L for the ordering selected by the last symbolic decomposition
+    virtual size_t factorNonZeros() const
+    {
+      if (! _cholmodFactor)
+        return 0;
+      return (size_t)_cholmodCommon.method[_cholmodCommon.selected].lnz;
+    }
+
     //! do the AMD ordering on the blocks or on the scalar matrix
     bool blockOrdering() const { return _blockOrdering;}
     void setBlockOrdering(bool blockOrdering) { _blockOrdering = blockOrdering;}